@@ -59,7 +59,8 @@ from .client import (
     MCPStdioClient,
     EnhancedMCPStdioClient,
     ConfigClient,
-    ToolsClient
+    ToolsClient,
+    MCPHTTPClient
 )
 
 __version__ = "0.1.1"
@@ -111,5 +112,6 @@ __all__ = [
     'MCPStdioClient',
     'EnhancedMCPStdioClient',
     'ConfigClient',
-    'ToolsClient'
+    'ToolsClient',
+    'MCPHTTPClient'
 ]
@@ -0,0 +1,4 @@
+"""
+MCP 框架基准测试
+提供合成服务器和各项性能指标的测量脚本；suite 汇总了框架的微基准和宏基准（mcp-framework bench）
+"""
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+配置读写往返延迟基准
+
+对比两种方式完成一次 get/set 往返的延迟：
+    before: 每个配置操作新建 ConfigClient（启动新服务器进程），即旧版 SimpleClient 的行为
+    after:  在 SimpleClient 已有的连接上执行配置操作
+
+用法:
+    python -m mcp_framework.benchmarks.config_roundtrip [--iterations 20] [--server path]
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from ..client.config import ConfigClient
+from ..client.simple import SimpleClient
+from .synthetic_server import SERVER_SCRIPT, server_environment
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """汇总延迟样本（毫秒）"""
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+        "min_ms": ordered[0] * 1000,
+    }
+
+
+async def _cycle_per_process(server: str, config_dir: str, i: int) -> None:
+    """旧路径：get 和 set 各自启动一个服务器进程"""
+    async with ConfigClient(server, config_dir=config_dir) as client:
+        await client.get_config_value("bench.counter")
+    async with ConfigClient(server, config_dir=config_dir) as client:
+        await client.set_config_value("bench.counter", i)
+
+
+async def run(iterations: int = 20, server: Optional[str] = None) -> Dict[str, Any]:
+    """运行基准并返回结果"""
+    server = server or SERVER_SCRIPT
+
+    with tempfile.TemporaryDirectory() as config_dir, server_environment(config_dir):
+        before = []
+        for i in range(iterations):
+            start = time.perf_counter()
+            await _cycle_per_process(server, config_dir, i)
+            before.append(time.perf_counter() - start)
+
+        after = []
+        async with SimpleClient(server, config_dir=config_dir) as client:
+            for i in range(iterations):
+                start = time.perf_counter()
+                await client.get("bench.counter")
+                await client.set("bench.counter", i)
+                after.append(time.perf_counter() - start)
+
+    result = {
+        "benchmark": "config_get_set_cycle",
+        "iterations": iterations,
+        "before": summarize(before),
+        "after": summarize(after),
+    }
+    result["speedup"] = result["before"]["mean_ms"] / max(result["after"]["mean_ms"], 1e-9)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="配置 get/set 往返延迟基准")
+    parser.add_argument("--iterations", type=int, default=20, help="迭代次数（默认: 20）")
+    parser.add_argument("--server", help="服务器脚本路径（默认: 合成服务器）")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.iterations, args.server)), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+客户端协议帧解析开销基准
+
+对比每条 stdout 消息在客户端的解析开销：
+    before: 旧版逐条匹配 emoji / 关键字的行过滤再 json.loads
+    after:  当前客户端的快速路径（stdout 只承载协议帧，只检查行首）
+
+同时统计旧过滤逻辑误丢弃的协议帧数量，并测量真实服务器上的单次调用往返延迟。
+
+用法:
+    python -m mcp_framework.benchmarks.frame_parsing [--messages 50000] [--calls 500]
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from ..client.enhanced import EnhancedMCPStdioClient
+from ..client.tools import ToolsClient
+from .config_roundtrip import summarize
+from .synthetic_server import SERVER_SCRIPT, server_environment
+
+
+_LEGACY_EMOJI_PREFIXES = [
+    '✅', '📂', '🔍', '❌', '🔧', '🚀', '🎯', '🛠️',
+    '📁', '📡', '👋', '🤖', '📤', '📥', '⚠️', '💡',
+    '🔗', '🌟', '🎉', '🔥', '💪', '🚨', '📋', '📊'
+]
+
+_LEGACY_TEXT_PATTERNS = [
+    'Required parameter missing', 'Failed to save default configuration',
+    'Failed to get tools from HTTP MCP server', 'Cannot connect to host',
+    'Connect call failed', '发送EOF', '按 Ctrl+C', 'Multiple exceptions',
+    '服务器版本:', '已注册工具:', '已注册资源:', '活跃传输:', '协议:', '格式:', '停止服务器'
+]
+
+_LEGACY_LIST_PREFIXES = ['•', '  •', '    -', '  -', '- ', '    • ']
+
+
+def legacy_parse_line(line_text: str) -> Optional[Dict[str, Any]]:
+    """旧版 EnhancedMCPStdioClient 的逐模式行过滤，仅用于对比"""
+    if not line_text.strip():
+        return None
+    for prefix in _LEGACY_EMOJI_PREFIXES:
+        if line_text.startswith(prefix):
+            return None
+    for pattern in _LEGACY_TEXT_PATTERNS:
+        if pattern in line_text:
+            return None
+    for prefix in _LEGACY_LIST_PREFIXES:
+        if line_text.startswith(prefix):
+            return None
+    if not line_text.startswith('{'):
+        return None
+    try:
+        message = json.loads(line_text)
+    except json.JSONDecodeError:
+        return None
+    if isinstance(message, dict) and 'jsonrpc' in message:
+        return message
+    return None
+
+
+def sample_frames() -> List[str]:
+    """构造一组有代表性的协议帧"""
+    frames = [
+        {"jsonrpc": "2.0", "id": 1, "result": {"content": [{"type": "text", "text": "ok"}]}},
+        {"jsonrpc": "2.0", "id": 2, "result": {"content": [{"type": "text", "text": "x" * 2048}]}},
+        {"jsonrpc": "2.0", "method": "stream/chunk", "params": {"request_id": 3, "chunk": "token "}},
+        {"jsonrpc": "2.0", "id": 4, "result": {"tools": [
+            {"name": f"tool_{i}", "description": f"合成工具 {i}", "inputSchema": {"type": "object"}}
+            for i in range(20)
+        ]}},
+        # 内容恰好包含旧过滤关键字的协议帧
+        {"jsonrpc": "2.0", "id": 5, "result": {"content": [{"type": "text", "text": "传输协议: HTTP/1.1"}]}},
+    ]
+    return [json.dumps(frame, ensure_ascii=False) for frame in frames]
+
+
+def measure_parse(parse, frames: List[str], messages: int) -> Dict[str, Any]:
+    """测量解析函数的单条消息开销"""
+    parsed = 0
+    start = time.perf_counter()
+    for i in range(messages):
+        if parse(frames[i % len(frames)]) is not None:
+            parsed += 1
+    elapsed = time.perf_counter() - start
+    return {
+        "ns_per_message": elapsed / messages * 1e9,
+        "dropped_frames": messages - parsed,
+    }
+
+
+async def measure_roundtrip(calls: int, server: str) -> Dict[str, float]:
+    """测量真实服务器上的单次工具调用往返延迟"""
+    samples = []
+    with tempfile.TemporaryDirectory() as config_dir, server_environment(config_dir):
+        async with ToolsClient(server, config_dir=config_dir) as client:
+            for i in range(calls):
+                start = time.perf_counter()
+                await client.call_tool("echo", {"message": str(i)})
+                samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def run(messages: int = 50000, calls: int = 500, server: Optional[str] = None) -> Dict[str, Any]:
+    """运行基准并返回结果"""
+    frames = sample_frames()
+    client = EnhancedMCPStdioClient(server or SERVER_SCRIPT)
+    result = {
+        "benchmark": "client_frame_parsing",
+        "messages": messages,
+        "before": measure_parse(legacy_parse_line, frames, messages),
+        "after": measure_parse(client._parse_line, frames, messages),
+    }
+    if calls > 0:
+        result["roundtrip"] = asyncio.run(measure_roundtrip(calls, server or SERVER_SCRIPT))
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="客户端协议帧解析开销基准")
+    parser.add_argument("--messages", type=int, default=50000, help="解析的消息数（默认: 50000）")
+    parser.add_argument("--calls", type=int, default=500, help="往返测量的调用次数，0 表示跳过（默认: 500）")
+    parser.add_argument("--server", help="服务器脚本路径（默认: 合成服务器）")
+    args = parser.parse_args()
+    print(json.dumps(run(args.messages, args.calls, args.server), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
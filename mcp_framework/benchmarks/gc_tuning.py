@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+GC 调优对工具调用尾延迟的影响
+
+进程中先保留一批长寿对象（模拟加载后的配置、缓存、模型元数据等），然后反复调用一个
+解析大 JSON 负载的工具。依次在以下模式下测量单次调用延迟的分布和 GC 停顿：
+
+    default:     默认回收阈值
+    thresholds:  提高第 0 代阈值，减少回收次数
+    freeze:      gc.freeze() 长寿对象，完整回收不再遍历它们
+    both:        同时使用以上两项
+
+各模式之间恢复默认阈值并 gc.unfreeze()，在同一进程内顺序执行。
+
+用法:
+    python -m mcp_framework.benchmarks.gc_tuning [--calls 2000] [--live-objects 500000]
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import statistics
+import time
+from typing import Annotated, Any, Dict, List
+
+from ..core.decorators import Required
+from ..core.gc_monitor import GCMonitor
+from .synthetic_server import create_server
+
+MODES = {
+    "default": {"thresholds": None, "freeze": False},
+    "thresholds": {"thresholds": [50000, 20, 20], "freeze": False},
+    "freeze": {"thresholds": None, "freeze": True},
+    "both": {"thresholds": [50000, 20, 20], "freeze": True},
+}
+
+
+def make_payload(records: int) -> str:
+    """生成一个由小对象组成的 JSON 数组"""
+    return json.dumps([{"id": i, "name": f"item-{i}", "tags": ["a", "b"], "meta": {"score": i * 0.5}}
+                       for i in range(records)])
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def measure_mode(mode: str, calls: int, payload: str) -> Dict[str, Any]:
+    """在指定模式下调用解析工具，返回延迟分位数和 GC 停顿统计"""
+    settings = MODES[mode]
+    server = create_server(tool_count=0)
+    server.loop_monitor_enabled = False
+
+    @server.tool("解析 JSON 负载并返回记录数")
+    async def parse(text: Annotated[str, Required("JSON 文本")]) -> int:
+        return len(json.loads(text))
+
+    await server.startup()
+    default_thresholds = gc.get_threshold()
+    gc.collect()
+    server.tune_gc(settings["thresholds"], settings["freeze"])
+    monitor = GCMonitor()
+    monitor.start()
+    arguments = {"text": payload}
+    latencies = []
+    try:
+        for _ in range(calls):
+            started = time.perf_counter()
+            await server.schedule_tool_call("parse", arguments)
+            latencies.append((time.perf_counter() - started) * 1000)
+    finally:
+        monitor.stop()
+        gc.unfreeze()
+        gc.set_threshold(*default_thresholds)
+        await server.shutdown()
+
+    snapshot = monitor.snapshot()
+    return {
+        "mode": mode,
+        "latency_ms": {
+            "p50": round(statistics.median(latencies), 3),
+            "p99": round(percentile(latencies, 0.99), 3),
+            "p999": round(percentile(latencies, 0.999), 3),
+            "max": round(max(latencies), 3),
+        },
+        "gc": {
+            generation: {
+                "collections": stats["collections"],
+                "pause_ms_total": stats["pause_ms"]["sum"],
+                "pause_ms_p99": stats["pause_ms"]["p99"],
+            }
+            for generation, stats in snapshot["generations"].items()
+        },
+    }
+
+
+def run(calls: int = 2000, live_objects: int = 500000, records: int = 2000) -> Dict[str, Any]:
+    """运行全部模式并返回结果"""
+    retained = [{"id": i, "values": [i]} for i in range(live_objects)]
+    payload = make_payload(records)
+    results = [asyncio.run(measure_mode(mode, calls, payload)) for mode in MODES]
+    del retained
+    return {
+        "benchmark": "gc_tuning",
+        "calls": calls,
+        "live_objects": live_objects,
+        "payload_bytes": len(payload),
+        "modes": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="GC 调优对工具调用尾延迟的影响")
+    parser.add_argument("--calls", type=int, default=2000, help="每种模式的调用次数（默认: 2000）")
+    parser.add_argument("--live-objects", type=int, default=500000, help="保留的长寿对象数量（默认: 500000）")
+    parser.add_argument("--records", type=int, default=2000, help="每次解析的 JSON 记录数（默认: 2000）")
+    args = parser.parse_args()
+    print(json.dumps(run(args.calls, args.live_objects, args.records), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
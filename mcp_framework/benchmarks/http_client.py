@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+HTTP 客户端基准
+
+在本地启动合成服务器的 MCPHTTPServer，对比：
+    before:  每次调用新建 aiohttp.ClientSession（无连接复用）
+    after:   MCPHTTPClient 共享的连接池会话
+    batch:   MCPHTTPClient.call_tools_batch 单次往返完成一组调用
+    stream:  /sse/tool/call 流式调用的首块延迟和总耗时
+
+用法:
+    python -m mcp_framework.benchmarks.http_client [--calls 300] [--concurrency 10]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict
+
+import aiohttp
+
+from ..client.http_client import MCPHTTPClient
+from .config_roundtrip import summarize
+from .synthetic_server import local_http_server
+
+
+async def _unpooled_call(base_url: str, i: int) -> None:
+    """旧方式：每次调用都新建会话和 TCP 连接"""
+    async with aiohttp.ClientSession() as session:
+        async with session.post(f"{base_url}/mcp", json={
+            "jsonrpc": "2.0", "id": i, "method": "tools/call",
+            "params": {"name": "echo", "arguments": {"message": str(i)}}
+        }) as response:
+            await response.json()
+
+
+async def _timed(samples, coro) -> None:
+    start = time.perf_counter()
+    await coro
+    samples.append(time.perf_counter() - start)
+
+
+async def _run_concurrent(calls: int, concurrency: int, make_coro) -> Dict[str, Any]:
+    """以固定并发度执行 calls 次调用，返回延迟统计和吞吐量"""
+    samples = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            await _timed(samples, make_coro(i))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    elapsed = time.perf_counter() - start
+    result = summarize(samples)
+    result["calls_per_sec"] = calls / elapsed
+    return result
+
+
+async def run(calls: int = 300, concurrency: int = 10, batch_size: int = 20) -> Dict[str, Any]:
+    """运行基准并返回结果"""
+    async with local_http_server() as base_url:
+        result: Dict[str, Any] = {
+            "benchmark": "http_client",
+            "calls": calls,
+            "concurrency": concurrency,
+            "before": await _run_concurrent(calls, concurrency, lambda i: _unpooled_call(base_url, i)),
+        }
+
+        async with MCPHTTPClient(base_url, limit_per_host=concurrency) as client:
+            result["after"] = await _run_concurrent(
+                calls, concurrency, lambda i: client.call_tool("echo", {"message": str(i)})
+            )
+
+            batches = max(1, calls // batch_size)
+            batch = [("echo", {"message": str(i)}) for i in range(batch_size)]
+            start = time.perf_counter()
+            for _ in range(batches):
+                await client.call_tools_batch(batch)
+            elapsed = time.perf_counter() - start
+            result["batch"] = {
+                "batch_size": batch_size,
+                "mean_batch_ms": elapsed / batches * 1000,
+                "calls_per_sec": batches * batch_size / elapsed,
+            }
+
+            start = time.perf_counter()
+            first_chunk = None
+            chunks = 0
+            async for _ in client.call_tool_stream("stream_chunks", {"count": 20}):
+                if first_chunk is None:
+                    first_chunk = time.perf_counter() - start
+                chunks += 1
+            result["stream"] = {
+                "chunks": chunks,
+                "first_chunk_ms": (first_chunk or 0) * 1000,
+                "total_ms": (time.perf_counter() - start) * 1000,
+            }
+
+    result["speedup"] = result["before"]["mean_ms"] / max(result["after"]["mean_ms"], 1e-9)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="HTTP 客户端基准")
+    parser.add_argument("--calls", type=int, default=300, help="调用次数（默认: 300）")
+    parser.add_argument("--concurrency", type=int, default=10, help="并发度（默认: 10）")
+    parser.add_argument("--batch-size", type=int, default=20, help="批量请求大小（默认: 20）")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.calls, args.concurrency, args.batch_size)), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+工具调用指标采集的开销基准
+
+测量三项：
+    record:   ToolMetrics.start() / finish() 一对调用本身的开销
+    slot:     进入并退出 tool_slot（不执行工具），开启与关闭 instrumentation_enabled 的差值，
+              即每次调用在调度路径上的实际采集开销（包含查找工具指标对象），目标低于 1 µs
+    dispatch: 进程内经 schedule_tool_call 调用空工具的同一差值（单次调用本身耗时数十微秒，
+              差值受噪声影响较大，仅作参照）
+
+开启和关闭按 ABBA 顺序交替测量小批调用（开、关、关、开），抵消先后位置带来的偏差；
+与 timeit 一样各自取多轮中最快的一轮（较慢的轮次来自其他进程的干扰，而不是被测代码），
+开销为两者之差，同时给出各轮差值的中位数作为参照。测量期间暂停垃圾回收。
+
+每次记录需要读取两次时钟，clock_read_ns 给出当前机器上单次 perf_counter() 的耗时作为参照。
+
+用法:
+    python -m mcp_framework.benchmarks.instrumentation [--calls 200000]
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import statistics
+import time
+import timeit
+from typing import Any, Dict
+
+from ..core.metrics import ToolMetrics
+from .synthetic_server import create_server
+
+
+def measure_record(calls: int, rounds: int = 5) -> float:
+    """返回单次 start/finish 的开销（纳秒，取多轮最小值），已扣除空循环本身的耗时"""
+    metrics = ToolMetrics("bench")
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(calls):
+            pass
+        empty = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(calls):
+            metrics.finish(metrics.start())
+        elapsed = time.perf_counter() - start
+        samples.append(max(0.0, elapsed - empty) / calls * 1e9)
+    return min(samples)
+
+
+async def _paired(timed, rounds: int, repeats: int) -> Dict[str, float]:
+    """
+    按 ABBA 顺序交替测量开启和关闭指标采集时的耗时
+
+    Args:
+        timed: 协程函数，参数为是否开启采集，返回一小批调用中单次调用的平均耗时（纳秒）
+        rounds: 轮数，开启和关闭各取最快的一轮
+        repeats: 每轮重复 ABBA 的次数
+    """
+    await timed(True)  # 预热
+    await timed(False)
+    enabled, disabled = [], []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            on = off = 0.0
+            for _ in range(repeats):
+                on += await timed(True)
+                off += await timed(False)
+                off += await timed(False)
+                on += await timed(True)
+            enabled.append(on / (2 * repeats))
+            disabled.append(off / (2 * repeats))
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return {
+        "ns_per_call_enabled": min(enabled),
+        "ns_per_call_disabled": min(disabled),
+        "overhead_ns": min(enabled) - min(disabled),
+        "overhead_ns_median": statistics.median(e - d for e, d in zip(enabled, disabled)),
+    }
+
+
+async def measure_dispatch(calls: int, rounds: int = 15, batch: int = 100) -> Dict[str, Dict[str, float]]:
+    """分别测量 tool_slot 本身和完整 schedule_tool_call 的采集开销（每批 batch 次调用）"""
+    server = create_server(tool_count=0)
+    server.loop_monitor_enabled = False
+    await server.startup()
+    arguments = {"message": "x"}
+    repeats = max(1, calls // (4 * batch * rounds))
+
+    async def timed_slot(enabled: bool) -> float:
+        server.instrumentation_enabled = enabled
+        start = time.perf_counter()
+        for _ in range(batch):
+            async with server.tool_slot("echo"):
+                pass
+        return (time.perf_counter() - start) / batch * 1e9
+
+    async def timed_call(enabled: bool) -> float:
+        server.instrumentation_enabled = enabled
+        start = time.perf_counter()
+        for _ in range(batch):
+            await server.schedule_tool_call("echo", arguments)
+        return (time.perf_counter() - start) / batch * 1e9
+
+    try:
+        return {
+            "slot": await _paired(timed_slot, rounds, repeats),
+            "dispatch": await _paired(timed_call, rounds, max(1, repeats // 4)),
+        }
+    finally:
+        await server.shutdown()
+
+
+def measure_clock(calls: int) -> float:
+    """返回单次 perf_counter() 的耗时（纳秒）"""
+    return min(timeit.repeat(time.perf_counter, number=calls, repeat=5)) / calls * 1e9
+
+
+def run(calls: int = 200000) -> Dict[str, Any]:
+    """运行基准并返回结果"""
+    record_ns = measure_record(calls)
+    dispatch = asyncio.run(measure_dispatch(calls))
+    return {
+        "benchmark": "instrumentation_overhead",
+        "calls": calls,
+        "clock_read_ns": measure_clock(calls),
+        "record_ns_per_call": record_ns,
+        **dispatch,
+        "record_under_1us": record_ns < 1000,
+        # 目标针对每次调用在调度路径上的实际开销，而不只是 start/finish 本身
+        "dispatch_under_1us": dispatch["slot"]["overhead_ns"] < 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="工具调用指标采集的开销基准")
+    parser.add_argument("--calls", type=int, default=200000, help="记录次数（默认: 200000）")
+    args = parser.parse_args()
+    print(json.dumps(run(args.calls), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+框架基准测试套件
+
+微基准（进程内，不经网络）:
+    dispatch:       经 schedule_tool_call 调用空工具的开销，与直接调用 handle_tool_call 对比
+    schema:         参数校验（_validate_arguments）和 HTTP 处理器的参数类型转换
+    tools_list:     tools/list 响应的构造和 JSON 序列化，随工具数量增长
+    openai_format:  OpenAI 格式流式数据块的构造和完整包装流程
+    config:         ServerConfig 的保存和加载
+
+宏基准（启动真实服务器）:
+    sse_stream:     经 HTTP SSE 接收流式工具输出的速率
+    stdio:          stdio 传输上的单次往返延迟和并发吞吐量
+
+所有用例由合成服务器驱动，工具数量和负载大小可配置。结果以 JSON 输出，
+可以保存为基线文件，之后用 compare() 对比；指标名以 _per_sec 结尾的越大越好，其余越小越好。
+
+用法:
+    python -m mcp_framework.benchmarks.suite [--case dispatch --case stdio] [--tools 50]
+        [--payload-size 1024] [--quick] [--output result.json] [--baseline baseline.json]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from ..core.config import ConfigManager, ServerConfig, ServerConfigManager
+from ..core.streaming import MCPStreamWrapper, OpenAIStreamFormatter
+from .config_roundtrip import summarize
+from .synthetic_server import SERVER_SCRIPT, create_server, local_http_server, server_environment
+
+
+# 用例名称 -> (类别, 测量函数)；测量函数接收 SuiteOptions，返回 {指标名: 数值}
+CASES: Dict[str, tuple] = {}
+
+# 判定为退化的默认相对变化
+DEFAULT_THRESHOLD = 0.10
+
+
+class SuiteOptions:
+    """
+    套件参数
+
+    Args:
+        tool_count: 合成服务器额外注册的工具数量
+        payload_size: 负载工具和流式数据块的字节数
+        scale: 迭代次数的缩放系数（--quick 时为 0.1）
+    """
+
+    def __init__(self, tool_count: int = 50, payload_size: int = 1024, scale: float = 1.0):
+        self.tool_count = tool_count
+        self.payload_size = payload_size
+        self.scale = scale
+
+    def iterations(self, base: int) -> int:
+        return max(1, int(base * self.scale))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"tool_count": self.tool_count, "payload_size": self.payload_size, "scale": self.scale}
+
+
+def case(name: str, kind: str):
+    """注册基准用例"""
+    def decorator(func: Callable[[SuiteOptions], Awaitable[Dict[str, float]]]):
+        CASES[name] = (kind, func)
+        return func
+    return decorator
+
+
+def time_per_op(func: Callable[[], Any], number: int, repeat: int = 5) -> float:
+    """返回同步调用的单次耗时（纳秒，取多轮最小值）"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number * 1e9)
+    return min(samples)
+
+
+async def async_time_per_op(func: Callable[[], Awaitable[Any]], number: int, repeat: int = 5) -> float:
+    """返回异步调用的单次耗时（纳秒，取多轮最小值）"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            await func()
+        samples.append((time.perf_counter() - start) / number * 1e9)
+    return min(samples)
+
+
+def _request_handler(server, config_dir: str):
+    from ..server.handlers import MCPRequestHandler
+    return MCPRequestHandler(server, ConfigManager(custom_config_dir=config_dir))
+
+
+@case("dispatch", "micro")
+async def bench_dispatch(options: SuiteOptions) -> Dict[str, float]:
+    server = create_server(options.tool_count, options.payload_size)
+    server.loop_monitor_enabled = False
+    await server.startup()
+    arguments = {"message": "x"}
+    number = options.iterations(20000)
+    try:
+        direct = await async_time_per_op(lambda: server.handle_tool_call("echo", arguments), number)
+        scheduled = await async_time_per_op(lambda: server.schedule_tool_call("echo", arguments), number)
+    finally:
+        await server.shutdown()
+    return {
+        "direct_ns": direct,
+        "scheduled_ns": scheduled,
+        "overhead_ns": scheduled - direct,
+    }
+
+
+@case("schema", "micro")
+async def bench_schema(options: SuiteOptions) -> Dict[str, float]:
+    server = create_server(options.tool_count, options.payload_size)
+    tool = next(t for t in server.tools if t["name"] == "tool_0")
+    typed = {"value": 42, "label": "bench"}
+    raw = {"value": "42", "label": "bench"}
+    number = options.iterations(100000)
+    with tempfile.TemporaryDirectory() as config_dir:
+        handler = _request_handler(server, config_dir)
+        # 查找最后注册的工具，体现按名称线性查找的代价
+        last = server.tools[-1]["name"]
+        return {
+            "validate_ns": time_per_op(lambda: server._validate_arguments("tool_0", typed, tool["input_schema"]),
+                                       number),
+            "coerce_first_tool_ns": time_per_op(lambda: handler._coerce_arguments_with_schema("echo", raw),
+                                                number),
+            "coerce_last_tool_ns": time_per_op(lambda: handler._coerce_arguments_with_schema(last, raw), number),
+        }
+
+
+@case("tools_list", "micro")
+async def bench_tools_list(options: SuiteOptions) -> Dict[str, float]:
+    server = create_server(options.tool_count, options.payload_size)
+    number = options.iterations(2000)
+    with tempfile.TemporaryDirectory() as config_dir:
+        handler = _request_handler(server, config_dir)
+
+        async def respond() -> str:
+            result = await handler.handle_tools_list()
+            return json.dumps({"jsonrpc": "2.0", "id": 1, "result": result}, ensure_ascii=False)
+
+        body = await respond()
+        build = await async_time_per_op(handler.handle_tools_list, number)
+        total = await async_time_per_op(respond, number)
+    return {
+        "tools": len(server.tools),
+        "response_bytes": len(body.encode("utf-8")),
+        "build_us": build / 1000,
+        "build_and_serialize_us": total / 1000,
+    }
+
+
+@case("openai_format", "micro")
+async def bench_openai_format(options: SuiteOptions) -> Dict[str, float]:
+    content = "x" * options.payload_size
+    formatter = OpenAIStreamFormatter("bench", "session")
+    number = options.iterations(50000)
+    chunk_ns = time_per_op(lambda: formatter.create_content_chunk(content).to_sse_data(), number)
+
+    chunks = options.iterations(20000)
+
+    async def source():
+        for _ in range(chunks):
+            yield content
+
+    wrapper = MCPStreamWrapper("bench")
+    start = time.perf_counter()
+    emitted = 0
+    async for _ in wrapper.wrap_tool_call_stream("bench", {}, source(), "session"):
+        emitted += 1
+    elapsed = time.perf_counter() - start
+    return {
+        "content_chunk_ns": chunk_ns,
+        "wrapped_chunks_per_sec": emitted / elapsed,
+    }
+
+
+@case("config", "micro")
+async def bench_config(options: SuiteOptions) -> Dict[str, float]:
+    number = options.iterations(500)
+    # 配置读写每次都输出 INFO 日志，测量期间关闭以免测到日志输出
+    logger = logging.getLogger(ConfigManager.__module__)
+    level = logger.level
+    logger.setLevel(logging.WARNING)
+    try:
+        with tempfile.TemporaryDirectory() as config_dir:
+            manager = ConfigManager(custom_config_dir=config_dir)
+            config = ServerConfig()
+            manager.save_config(config)
+            server_manager = ServerConfigManager("BenchServer", custom_config_dir=config_dir)
+            data = config.to_dict()
+            server_manager.save_server_config(data)
+            return {
+                "save_us": time_per_op(lambda: manager.save_config(config), number) / 1000,
+                "load_us": time_per_op(manager.load_config, number) / 1000,
+                "server_config_save_us": time_per_op(lambda: server_manager.save_server_config(data),
+                                                     number) / 1000,
+                "server_config_load_us": time_per_op(server_manager.load_server_config, number) / 1000,
+            }
+    finally:
+        logger.setLevel(level)
+
+
+@case("sse_stream", "macro")
+async def bench_sse_stream(options: SuiteOptions) -> Dict[str, float]:
+    from ..client.http_client import MCPHTTPClient
+
+    count = options.iterations(500)
+    server = create_server(options.tool_count, options.payload_size)
+    arguments = {"count": count, "chunk_size": options.payload_size}
+    async with local_http_server(server) as base_url:
+        async with MCPHTTPClient(base_url) as client:
+            start = time.perf_counter()
+            first_chunk = None
+            chunks = 0
+            received = 0
+            async for chunk in client.call_tool_stream("stream_chunks", arguments):
+                if first_chunk is None:
+                    first_chunk = time.perf_counter() - start
+                chunks += 1
+                received += len(chunk)
+            elapsed = time.perf_counter() - start
+    return {
+        "chunks": chunks,
+        "first_chunk_ms": (first_chunk or 0) * 1000,
+        "chunks_per_sec": chunks / elapsed,
+        "bytes_per_sec": received / elapsed,
+    }
+
+
+@case("stdio", "macro")
+async def bench_stdio(options: SuiteOptions) -> Dict[str, float]:
+    from ..client.tools import ToolsClient
+
+    calls = options.iterations(1000)
+    concurrency = 16
+    # 合成服务器进程从环境变量读取规模参数
+    with tempfile.TemporaryDirectory() as config_dir, \
+            server_environment(config_dir, MCP_BENCH_TOOLS=str(options.tool_count),
+                               MCP_BENCH_PAYLOAD_SIZE=str(options.payload_size)):
+        async with ToolsClient(SERVER_SCRIPT, config_dir=config_dir) as client:
+            samples = []
+            for i in range(calls):
+                start = time.perf_counter()
+                await client.call_tool("echo", {"message": str(i)})
+                samples.append(time.perf_counter() - start)
+            latency = summarize(samples)
+
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def one():
+                async with semaphore:
+                    await client.call_tool("payload", {})
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(calls)))
+            elapsed = time.perf_counter() - start
+    return {
+        "roundtrip_p50_ms": latency["p50_ms"],
+        "roundtrip_p99_ms": latency["p99_ms"],
+        "roundtrip_mean_ms": latency["mean_ms"],
+        "concurrent_calls_per_sec": calls / elapsed,
+    }
+
+
+def environment() -> Dict[str, Any]:
+    """记录运行环境，便于判断两次结果是否可比"""
+    from .. import __version__
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "mcp_framework": __version__,
+    }
+
+
+def run(cases: Optional[Iterable[str]] = None, tool_count: int = 50, payload_size: int = 1024,
+        quick: bool = False) -> Dict[str, Any]:
+    """
+    运行基准用例
+
+    Args:
+        cases: 用例名称，None 表示全部
+        tool_count: 合成服务器额外注册的工具数量
+        payload_size: 负载字节数
+        quick: 迭代次数缩小为十分之一，用于快速检查
+
+    Returns:
+        Dict[str, Any]: 运行环境、参数和各用例的指标
+    """
+    names = list(cases) if cases else list(CASES)
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        raise ValueError(f"Unknown benchmark cases: {', '.join(unknown)}")
+    options = SuiteOptions(tool_count, payload_size, 0.1 if quick else 1.0)
+
+    results = {}
+    for name in names:
+        kind, func = CASES[name]
+        started = time.perf_counter()
+        metrics = asyncio.run(func(options))
+        results[name] = {
+            "kind": kind,
+            "seconds": round(time.perf_counter() - started, 3),
+            "metrics": {key: round(value, 3) if isinstance(value, float) else value
+                        for key, value in metrics.items()},
+        }
+    return {
+        "benchmark": "suite",
+        "timestamp": time.time(),
+        "environment": environment(),
+        "options": options.to_dict(),
+        "results": results,
+    }
+
+
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith("_per_sec")
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float = DEFAULT_THRESHOLD) -> Dict[str, Any]:
+    """
+    与基线结果对比
+
+    计数类指标（tools、chunks、response_bytes）只随参数变化，同样列出但不判定退化。
+
+    Args:
+        current: 本次 run() 的结果
+        baseline: 基线文件中的 run() 结果
+        threshold: 向不利方向的相对变化超过该值时判定为退化
+
+    Returns:
+        Dict[str, Any]: 每个指标的基线值、当前值和相对变化，以及退化列表
+    """
+    cases: Dict[str, Dict[str, Any]] = {}
+    regressions: List[Dict[str, Any]] = []
+    baseline_results = baseline.get("results", {})
+    for name, result in current.get("results", {}).items():
+        previous = baseline_results.get(name)
+        if previous is None:
+            continue
+        rows = {}
+        for metric, value in result["metrics"].items():
+            old = previous.get("metrics", {}).get(metric)
+            if not isinstance(old, (int, float)) or not isinstance(value, (int, float)):
+                continue
+            change = (value - old) / abs(old) if old else 0.0
+            row = {"baseline": old, "current": value, "change": round(change, 4)}
+            if _is_timed(metric):
+                worse = -change if higher_is_better(metric) else change
+                row["regression"] = worse > threshold
+                if row["regression"]:
+                    regressions.append({"case": name, "metric": metric, **row})
+            rows[metric] = row
+        cases[name] = rows
+    return {
+        "threshold": threshold,
+        "options_match": current.get("options") == baseline.get("options"),
+        "cases": cases,
+        "regressions": regressions,
+    }
+
+
+def _is_timed(metric: str) -> bool:
+    return metric.endswith(("_ns", "_us", "_ms", "_per_sec"))
+
+
+def load_result(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_result(result: Dict[str, Any], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="MCP 框架基准测试套件")
+    parser.add_argument("--case", action="append", choices=list(CASES), help="要运行的用例，可重复（默认: 全部）")
+    parser.add_argument("--tools", type=int, default=50, help="合成服务器的工具数量（默认: 50）")
+    parser.add_argument("--payload-size", type=int, default=1024, help="负载字节数（默认: 1024）")
+    parser.add_argument("--quick", action="store_true", help="缩小迭代次数，快速检查")
+    parser.add_argument("--output", help="把结果保存到文件（可作为之后的基线）")
+    parser.add_argument("--baseline", help="与该基线文件对比")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"判定为退化的相对变化（默认: {DEFAULT_THRESHOLD}）")
+    args = parser.parse_args()
+
+    result = run(args.case, args.tools, args.payload_size, args.quick)
+    if args.output:
+        save_result(result, args.output)
+    if args.baseline:
+        result["comparison"] = compare(result, load_result(args.baseline), args.threshold)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.baseline and result["comparison"]["regressions"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
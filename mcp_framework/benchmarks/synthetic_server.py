@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+基准测试用的合成 MCP 服务器
+
+通过环境变量控制规模（命令行参数由 SimpleLauncher 解析）：
+    MCP_BENCH_TOOLS         额外注册的工具数量（默认 10）
+    MCP_BENCH_PAYLOAD_SIZE  payload 工具返回的字节数（默认 1024）
+
+基准以子进程启动本脚本时使用 server_environment()：未安装 mcp_framework 时也能导入，
+配置文件写入临时目录而不是当前目录下的 config/。
+
+用法:
+    python -m mcp_framework.benchmarks.synthetic_server stdio
+"""
+
+import asyncio
+import os
+import socket
+import tempfile
+from contextlib import asynccontextmanager, contextmanager
+from typing import Annotated, AsyncIterator, Dict, Iterator
+
+from mcp_framework.core.base import EnhancedMCPServer
+from mcp_framework.core.config import ServerConfigManager
+from mcp_framework.core.decorators import Required, Optional
+from mcp_framework.core.simple_launcher import simple_main
+
+
+SERVER_SCRIPT = os.path.abspath(__file__)
+
+# mcp_framework 包所在的目录，子进程据此导入框架
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(SERVER_SCRIPT)))
+
+# 进程内创建的合成服务器共用的临时配置目录，进程退出时删除
+_config_dir = None
+
+
+def _default_config_dir() -> str:
+    global _config_dir
+    if _config_dir is None:
+        _config_dir = tempfile.TemporaryDirectory(prefix="mcp-bench-config-")
+    return _config_dir.name
+
+
+def create_server(tool_count: int = 10, payload_size: int = 1024, config_dir: str = None) -> EnhancedMCPServer:
+    """
+    创建合成服务器
+
+    Args:
+        tool_count: 额外注册的同构工具数量
+        payload_size: payload 工具返回的字节数
+        config_dir: 配置目录，默认使用进程内共用的临时目录（或 MCP_CONFIG_DIR）
+    """
+    config_dir = config_dir or os.environ.get("MCP_CONFIG_DIR") or _default_config_dir()
+    server = EnhancedMCPServer(
+        name="BenchServer",
+        version="1.0.0",
+        description="MCP 框架基准测试合成服务器",
+        config_manager=ServerConfigManager("BenchServer", custom_config_dir=config_dir)
+    )
+
+    @server.tool("原样返回消息")
+    async def echo(message: Annotated[str, Required("消息")]) -> str:
+        return message
+
+    @server.tool("返回固定大小的负载")
+    async def payload(size: Annotated[int, Optional("字节数", default=payload_size)] = payload_size) -> str:
+        return "x" * size
+
+    @server.tool("等待指定毫秒后返回")
+    async def sleep_ms(ms: Annotated[int, Required("毫秒")]) -> str:
+        await asyncio.sleep(ms / 1000.0)
+        return "ok"
+
+    @server.streaming_tool("产出指定数量的数据块")
+    async def stream_chunks(count: Annotated[int, Required("数据块数量")],
+                            chunk_size: Annotated[int, Optional("每块字节数", default=64)] = 64):
+        chunk = "x" * chunk_size
+        for _ in range(count):
+            yield chunk
+
+    for i in range(tool_count):
+        server.register_tool(
+            name=f"tool_{i}",
+            description=f"合成工具 {i}",
+            input_schema={
+                "type": "object",
+                "properties": {
+                    "value": {"type": "integer", "description": "输入值"},
+                    "label": {"type": "string", "description": "标签", "default": ""}
+                },
+                "required": ["value"]
+            },
+            handler=_make_handler(i)
+        )
+
+    return server
+
+
+@contextmanager
+def server_environment(config_dir: str, **variables: str) -> Iterator[None]:
+    """
+    临时设置合成服务器子进程继承的环境变量
+
+    PYTHONPATH 加上包所在的目录，MCP_CONFIG_DIR 指向 config_dir，其余变量（如 MCP_BENCH_TOOLS）原样设置。
+
+    Args:
+        config_dir: 子进程使用的配置目录
+        variables: 额外的环境变量
+    """
+    python_path = os.environ.get("PYTHONPATH")
+    env: Dict[str, str] = {
+        "PYTHONPATH": os.pathsep.join(filter(None, [PACKAGE_ROOT, python_path])),
+        "MCP_CONFIG_DIR": config_dir,
+        **variables
+    }
+    previous = {key: os.environ.get(key) for key in env}
+    os.environ.update(env)
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def _free_port(host: str) -> int:
+    """获取一个空闲端口"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+@asynccontextmanager
+async def local_http_server(server: EnhancedMCPServer = None,
+                            host: str = "127.0.0.1") -> AsyncIterator[str]:
+    """
+    在当前事件循环中启动 MCPHTTPServer，产出其基础地址
+
+    Args:
+        server: MCP 服务器实例，默认创建合成服务器
+        host: 监听地址
+    """
+    from mcp_framework.core.config import ServerConfig, ConfigManager
+    from mcp_framework.server.http_server import MCPHTTPServer
+
+    server = server or create_server()
+    await server.startup()
+    with tempfile.TemporaryDirectory() as config_dir:
+        config = ServerConfig(host=host, port=_free_port(host))
+        http_server = MCPHTTPServer(server, config, ConfigManager(custom_config_dir=config_dir))
+        runner = await http_server.start()
+        try:
+            yield f"http://{host}:{config.port}"
+        finally:
+            await http_server.stop(runner)
+            await server.shutdown()
+
+
+def _make_handler(index: int):
+    async def handler(value: int, label: str = "") -> dict:
+        return {"tool": index, "value": value, "label": label}
+    return handler
+
+
+if __name__ == "__main__":
+    simple_main(
+        create_server(
+            tool_count=int(os.environ.get("MCP_BENCH_TOOLS", "10")),
+            payload_size=int(os.environ.get("MCP_BENCH_PAYLOAD_SIZE", "1024"))
+        ),
+        "BenchServer"
+    )
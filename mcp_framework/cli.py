@@ -187,6 +187,33 @@ async def stream_data(
     server_file.write_text(content, encoding='utf-8')
 
 
+@main.command()
+@click.option('--case', '-c', 'cases', multiple=True,
+              type=click.Choice(['dispatch', 'schema', 'tools_list', 'openai_format', 'config',
+                                 'sse_stream', 'stdio']),
+              help='要运行的用例，可重复（默认: 全部）')
+@click.option('--tools', default=50, show_default=True, help='合成服务器的工具数量')
+@click.option('--payload-size', default=1024, show_default=True, help='负载字节数')
+@click.option('--quick', is_flag=True, help='缩小迭代次数，快速检查')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), help='把结果保存到文件（可作为之后的基线）')
+@click.option('--baseline', '-b', type=click.Path(exists=True, dir_okay=False), help='与该基线文件对比')
+@click.option('--threshold', default=0.1, show_default=True, help='判定为退化的相对变化')
+def bench(cases, tools: int, payload_size: int, quick: bool, output: Optional[str],
+          baseline: Optional[str], threshold: float):
+    """运行框架基准测试，输出 JSON；与基线对比出现退化时以状态码 1 退出"""
+    import json
+    from .benchmarks import suite
+
+    result = suite.run(cases or None, tools, payload_size, quick)
+    if output:
+        suite.save_result(result, output)
+    if baseline:
+        result['comparison'] = suite.compare(result, suite.load_result(baseline), threshold)
+    click.echo(json.dumps(result, indent=2, ensure_ascii=False))
+    if baseline and result['comparison']['regressions']:
+        sys.exit(1)
+
+
 @main.command()
 @click.option('--version', '-v', is_flag=True, help='显示版本信息')
 def info(version: bool):
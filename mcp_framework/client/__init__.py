@@ -6,12 +6,17 @@ MCP 框架客户端 SDK
 from .base import MCPStdioClient
 from .enhanced import EnhancedMCPStdioClient
 from .config import ConfigClient
-from .tools import ToolsClient
+from .tools import ToolsClient, BatchResult
+from .http_client import MCPHTTPClient
+from .pool import MCPProcessPool, get_process_pool, close_process_pools
+from .loop import BackgroundLoop, get_background_loop
 from .simple import (
     SimpleClient,
     quick_call, quick_get, quick_set, quick_tools,
     sync_call, sync_get, sync_set, sync_tools
 )
+from .sync import SyncClient
+from ..core.tracing import trace_context
 
 __all__ = [
     # 原始客户端类
@@ -19,10 +24,25 @@ __all__ = [
     'EnhancedMCPStdioClient',
     'ConfigClient', 
     'ToolsClient',
+    'MCPHTTPClient',
+    'BatchResult',
+    
+    # 进程池
+    'MCPProcessPool',
+    'get_process_pool',
+    'close_process_pools',
     
     # 简化客户端
     'SimpleClient',
     
+    # 同步客户端
+    'SyncClient',
+    'BackgroundLoop',
+    'get_background_loop',
+    
+    # 请求追踪
+    'trace_context',
+    
     # 异步便捷函数
     'quick_call',
     'quick_get', 
@@ -5,12 +5,26 @@ MCP Stdio 客户端基础类
 
 import asyncio
 import json
+import logging
 import sys
 import os
 import stat
-from typing import Dict, Any, Optional, List, Union
+from collections import deque
+from typing import Dict, Any, Optional, List, Union, AsyncGenerator
 from pathlib import Path
 
+from ..core.tracing import inject_trace
+
+
+# 子进程 stdout 单行读取上限，避免大响应触发 LimitOverrunError 导致读取任务退出
+STREAM_READ_LIMIT = 16 * 1024 * 1024
+
+# 流式队列结束哨兵
+_STREAM_CLOSED = object()
+
+# stderr 单次读取的块大小
+STDERR_READ_CHUNK = 64 * 1024
+
 
 class MCPStdioClient:
     """MCP Stdio 客户端基础类"""
@@ -23,7 +37,11 @@ class MCPStdioClient:
                  client_version: str = "1.0.0",
                  startup_timeout: float = 5.0,
                  response_timeout: float = 30.0,
-                 config_dir: Optional[str] = None):
+                 config_dir: Optional[str] = None,
+                 stderr_buffer_size: int = 64 * 1024,
+                 stderr_log_level: Optional[int] = None,
+                 wait_for_ready: bool = True,
+                 ready_grace_period: float = 0.5):
         """
         初始化 MCP Stdio 客户端
         
@@ -36,6 +54,10 @@ class MCPStdioClient:
             startup_timeout: 启动超时时间（秒）
             response_timeout: 响应超时时间（秒）
             config_dir: 自定义配置目录路径
+            stderr_buffer_size: 保留的服务器 stderr 输出字节数（环形缓冲区）
+            stderr_log_level: 设置后将服务器 stderr 按行转发到日志（如 logging.DEBUG）
+            wait_for_ready: 连接时是否等待服务器的 notifications/ready 通知
+            ready_grace_period: 等待就绪通知的时间（秒），超过后改用 initialize 请求探测服务器
         """
         self.server_script = server_script
         self.alias = alias
@@ -50,6 +72,27 @@ class MCPStdioClient:
         self.request_id = 0
         self.is_connected = False
         self.is_initialized = False
+        
+        # 请求多路复用：后台读取任务按 id 分发响应
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Dict[Any, asyncio.Future] = {}
+        self._streams: Dict[Any, asyncio.Queue] = {}
+        self._write_lock: Optional[asyncio.Lock] = None
+        
+        # 后台持续读取 stderr，避免管道写满阻塞服务器
+        self.stderr_buffer_size = stderr_buffer_size
+        self.stderr_log_level = stderr_log_level
+        self._stderr_task: Optional[asyncio.Task] = None
+        self._stderr_chunks: deque = deque()
+        self._stderr_size = 0
+        self.stderr_logger = logging.getLogger(f"{__name__}.stderr")
+        
+        # 就绪握手：服务器启动完成后发送 notifications/ready
+        self.wait_for_ready = wait_for_ready
+        self.ready_grace_period = ready_grace_period
+        self.server_info: Dict[str, Any] = {}
+        self._ready: Optional[asyncio.Future] = None
+        self.logger = logging.getLogger(f"{__name__}.MCPStdioClient")
     
     def get_next_id(self) -> int:
         """获取下一个请求ID"""
@@ -165,16 +208,20 @@ class MCPStdioClient:
                 *cmd,
                 stdin=asyncio.subprocess.PIPE,
                 stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+                stderr=asyncio.subprocess.PIPE,
+                limit=STREAM_READ_LIMIT
             )
             
-            # 给服务器一点时间启动
-            await asyncio.sleep(0.1)
+            self._stderr_chunks.clear()
+            self._stderr_size = 0
+            self._stderr_task = asyncio.create_task(self._stderr_loop())
             
-            # 检查进程是否还在运行
-            if self.process.returncode is not None:
-                stderr_output = await self.process.stderr.read()
-                raise Exception(f"服务器启动失败: {stderr_output.decode()}")
+            # 启动后台读取任务
+            self._write_lock = asyncio.Lock()
+            self._ready = asyncio.get_running_loop().create_future()
+            self._reader_task = asyncio.create_task(self._reader_loop())
+            
+            await self._wait_until_ready()
             
             self.is_connected = True
             return True
@@ -183,6 +230,78 @@ class MCPStdioClient:
             await self.disconnect()
             raise Exception(f"连接服务器失败: {e}")
     
+    async def _wait_until_ready(self) -> None:
+        """
+        等待服务器就绪通知，服务器进程提前退出时立即失败
+        
+        旧版本服务器不会发送就绪通知：ready_grace_period 内没有收到通知时改用 initialize
+        请求探测，得到响应即视为就绪（同时完成初始化）；startup_timeout 内仍无响应则连接失败。
+        """
+        if not self.wait_for_ready:
+            # 不等待握手时只确认进程没有立即退出
+            await asyncio.sleep(0)
+            if self.process.returncode is not None:
+                await self._wait_stderr_drained()
+                raise Exception(f"服务器启动失败: {self.get_stderr_tail()}")
+            return
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.startup_timeout
+        exited = asyncio.create_task(self.process.wait())
+        probe = None
+        try:
+            # 快速路径：就绪通知
+            done, _ = await asyncio.wait(
+                {self._ready, exited},
+                timeout=min(self.ready_grace_period, self.startup_timeout),
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                self.logger.debug(f"{self.ready_grace_period}s 内未收到就绪通知，改用 initialize 探测: "
+                                  f"{self.server_script}")
+                probe = asyncio.create_task(self._probe_initialize())
+                done, _ = await asyncio.wait(
+                    {self._ready, exited, probe},
+                    timeout=max(0.0, deadline - loop.time()),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+        finally:
+            exited.cancel()
+            if probe is not None:
+                if not probe.done():
+                    probe.cancel()
+                elif not probe.cancelled():
+                    # 避免探测失败但未被检查时出现 "exception was never retrieved" 警告
+                    probe.exception()
+        
+        if self._ready in done and self._ready.exception() is None:
+            return
+        if probe in done and probe.exception() is None:
+            return
+        if not done:
+            raise Exception(f"服务器在 {self.startup_timeout}s 内没有响应: {self.server_script}")
+        await self._wait_stderr_drained()
+        raise Exception(f"服务器启动失败: {self.get_stderr_tail()}")
+    
+    async def _probe_initialize(self) -> None:
+        """发送 initialize 请求并等待响应（连接尚未标记为已连接，不经过 send_request）"""
+        request_id = self.get_next_id()
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            await self._write_message({
+                "jsonrpc": "2.0",
+                "method": "initialize",
+                "id": request_id,
+                "params": self._initialize_params()
+            })
+            response = await future
+        finally:
+            self._pending.pop(request_id, None)
+        # 出错的响应同样说明服务器已经在处理请求，之后由 initialize() 报告错误
+        if "error" not in response:
+            self.is_initialized = True
+    
     async def send_request(self, 
                           method: str, 
                           params: Optional[Dict[str, Any]] = None,
@@ -190,6 +309,8 @@ class MCPStdioClient:
         """
         发送 JSON-RPC 请求
         
+        多个协程可以在同一连接上并发调用，响应由后台读取任务按请求 id 分发。
+        
         Args:
             method: 方法名
             params: 参数字典
@@ -204,107 +325,281 @@ class MCPStdioClient:
         if not self.is_connected:
             raise Exception("客户端未连接")
         
-        # 构建请求
+        request_id = self.get_next_id()
         request = {
             "jsonrpc": "2.0",
             "method": method,
-            "id": self.get_next_id()
+            "id": request_id
         }
         
+        params = inject_trace(params)
         if params:
             request["params"] = params
         
-        request_json = json.dumps(request) + "\n"
+        timeout_value = timeout or self.response_timeout
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
         
         try:
-            # 检查进程状态
-            if self.process.returncode is not None:
-                raise Exception(f"服务器进程已退出，返回码: {self.process.returncode}")
-            
-            # 发送请求
-            self.process.stdin.write(request_json.encode())
-            await self.process.stdin.drain()
-            
-            # 读取响应
-            timeout_value = timeout or self.response_timeout
-            response = await asyncio.wait_for(
-                self._read_response(),
-                timeout=timeout_value
-            )
-            
-            return response
+            await self._write_message(request)
+            # 超时只影响当前请求，不会取消后台读取任务
+            return await asyncio.wait_for(asyncio.shield(future), timeout=timeout_value)
             
         except asyncio.TimeoutError:
-            raise Exception(f"请求超时 ({timeout_value}s): {method}")
+            raise MCPTimeoutError(f"请求超时 ({timeout_value}s): {method}")
+        except MCPClientError:
+            raise
         except Exception as e:
             raise Exception(f"发送请求失败: {e}")
+        finally:
+            self._pending.pop(request_id, None)
     
-    async def _read_response(self) -> Dict[str, Any]:
+    async def stream_request(self,
+                             method: str,
+                             params: Optional[Dict[str, Any]] = None,
+                             timeout: Optional[float] = None) -> AsyncGenerator[Dict[str, Any], None]:
         """
-        读取 JSON-RPC 响应
+        发送流式 JSON-RPC 请求，逐条产出属于该请求的消息
         
-        Returns:
-            Dict[str, Any]: 解析后的响应
+        产出 stream/start、stream/chunk 等消息，收到 stream/end、stream/error
+        或最终的 JSON-RPC 响应后结束。
+        
+        Args:
+            method: 方法名
+            params: 参数字典
+            timeout: 相邻两条消息之间的超时时间（秒），None 使用默认值
+            
+        Yields:
+            Dict[str, Any]: 属于该请求的原始消息
         """
-        max_attempts = 10  # 减少最大尝试次数
-        line_timeout = 5.0  # 每行读取超时时间
+        if not self.is_connected:
+            raise Exception("客户端未连接")
         
-        for attempt in range(max_attempts):
-            try:
-                # 为每行读取添加超时
-                response_line = await asyncio.wait_for(
-                    self.process.stdout.readline(),
-                    timeout=line_timeout
-                )
+        request_id = self.get_next_id()
+        request = {
+            "jsonrpc": "2.0",
+            "method": method,
+            "id": request_id
+        }
+        
+        params = inject_trace(params)
+        if params:
+            request["params"] = params
+        
+        timeout_value = timeout or self.response_timeout
+        queue: asyncio.Queue = asyncio.Queue()
+        self._streams[request_id] = queue
+        
+        try:
+            await self._write_message(request)
+            
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=timeout_value)
+                except asyncio.TimeoutError:
+                    raise MCPTimeoutError(f"流式响应超时 ({timeout_value}s): {method}")
                 
-                if not response_line:
-                    raise Exception("连接已断开")
+                if message is _STREAM_CLOSED:
+                    raise MCPConnectionError("连接已断开")
                 
-                line_text = response_line.decode().strip()
+                yield message
                 
-                if not line_text:
-                    continue
+                msg_method = message.get("method")
+                if msg_method in ("stream/end", "stream/error"):
+                    break
+                if msg_method is None and ("result" in message or "error" in message):
+                    break
+        finally:
+            self._streams.pop(request_id, None)
+    
+    async def _write_message(self, message: Dict[str, Any]) -> None:
+        """将一条 JSON-RPC 消息写入服务器 stdin"""
+        if self.process is None or self.process.returncode is not None:
+            returncode = self.process.returncode if self.process else None
+            raise MCPConnectionError(self._with_stderr(f"服务器进程已退出，返回码: {returncode}"))
+        
+        data = (json.dumps(message) + "\n").encode()
+        async with self._write_lock:
+            self.process.stdin.write(data)
+            await self.process.stdin.drain()
+    
+    async def _reader_loop(self) -> None:
+        """后台读取任务：解析 stdout 上的消息并按请求 id 分发"""
+        error: Optional[Exception] = None
+        try:
+            while True:
+                line = await self.process.stdout.readline()
+                if not line:
+                    break
                 
-                # 跳过非JSON行（如日志输出）
-                # 检查是否以emoji或其他日志标识符开头
-                if (line_text.startswith('✅') or 
-                    line_text.startswith('📂') or 
-                    line_text.startswith('🔍') or 
-                    line_text.startswith('❌') or 
-                    line_text.startswith('🔧') or 
-                    line_text.startswith('🚀') or 
-                    line_text.startswith('🎯') or 
-                    line_text.startswith('🛠️') or 
-                    line_text.startswith('📁') or 
-                    line_text.startswith('📡') or 
-                    line_text.startswith('👋') or
-                    line_text.startswith('Required parameter') or
-                    line_text.startswith('Failed to') or
-                    line_text.startswith('发送EOF') or
-                    line_text.startswith('按 Ctrl+C') or
-                    line_text.startswith('Cannot connect to host') or
-                    line_text.startswith('•') or  # 列表项
-                    line_text.startswith('  •') or  # 缩进的列表项
-                    line_text.startswith('    -') or  # 缩进的子项
-                    line_text.startswith('  -') or  # 缩进的子项
-                    line_text.startswith('- ') or  # 列表项
-                    line_text.strip() == '' or  # 空行
-                    not line_text.startswith('{')):
-                    continue
+                message = self._parse_line(line.decode(errors="replace").strip())
+                if message is not None:
+                    self._dispatch_message(message)
+            
+            # 服务器关闭了 stdout：等待 stderr 读完，便于在错误中给出诊断信息
+            await self._wait_stderr_drained()
+        except asyncio.CancelledError:
+            error = MCPConnectionError("连接已关闭")
+            raise
+        except Exception as e:
+            error = e
+        finally:
+            self._fail_all(error or MCPConnectionError(self._with_stderr("连接已断开")))
+    
+    async def _stderr_loop(self) -> None:
+        """后台读取任务：持续读取 stderr 写入环形缓冲区，并可按行转发到日志"""
+        stream = self.process.stderr
+        partial = b""
+        try:
+            while True:
+                data = await stream.read(STDERR_READ_CHUNK)
+                if not data:
+                    break
                 
-                try:
-                    response = json.loads(line_text)
-                    # 验证这是一个有效的JSON-RPC响应
-                    if isinstance(response, dict) and 'jsonrpc' in response:
-                        return response
-                except json.JSONDecodeError:
-                    continue
-                    
-            except asyncio.TimeoutError:
-                # 如果读取超时，说明没有更多输出了
-                break
+                self._record_stderr(data)
+                if self.stderr_log_level is not None:
+                    partial += data
+                    *lines, partial = partial.split(b"\n")
+                    for line in lines:
+                        self._log_stderr_line(line)
+                    partial = partial[-self.stderr_buffer_size:]
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stderr_logger.debug(f"读取服务器 stderr 失败: {e}")
+        finally:
+            if partial:
+                self._log_stderr_line(partial)
+    
+    def _record_stderr(self, data: bytes) -> None:
+        """将 stderr 数据追加到环形缓冲区，超出容量时丢弃最旧的数据"""
+        if self.stderr_buffer_size <= 0:
+            return
+        if len(data) >= self.stderr_buffer_size:
+            self._stderr_chunks.clear()
+            self._stderr_size = 0
+            data = data[-self.stderr_buffer_size:]
         
-        raise Exception("未收到有效的JSON响应")
+        self._stderr_chunks.append(data)
+        self._stderr_size += len(data)
+        while self._stderr_size > self.stderr_buffer_size:
+            oldest = self._stderr_chunks.popleft()
+            overflow = self._stderr_size - self.stderr_buffer_size
+            if len(oldest) > overflow:
+                # 只截掉溢出部分，保证缓冲区始终保留最近的 stderr_buffer_size 字节
+                self._stderr_chunks.appendleft(oldest[overflow:])
+                self._stderr_size -= overflow
+            else:
+                self._stderr_size -= len(oldest)
+    
+    def _log_stderr_line(self, line: bytes) -> None:
+        """将一行 stderr 输出转发到日志"""
+        if self.stderr_log_level is None or not self.stderr_logger.isEnabledFor(self.stderr_log_level):
+            return
+        text = line.decode(errors="replace").rstrip()
+        if text:
+            self.stderr_logger.log(self.stderr_log_level, "[%s] %s", self.server_script, text)
+    
+    async def _wait_stderr_drained(self, timeout: float = 1.0) -> None:
+        """等待 stderr 读取任务读到 EOF（最多 timeout 秒）"""
+        if self._stderr_task is not None and not self._stderr_task.done():
+            await asyncio.wait({self._stderr_task}, timeout=timeout)
+    
+    def get_stderr_tail(self, max_bytes: Optional[int] = None) -> str:
+        """
+        获取最近的服务器 stderr 输出，用于诊断启动失败、超时或连接断开
+        
+        Args:
+            max_bytes: 最多返回的字节数，None 返回整个缓冲区
+            
+        Returns:
+            str: 最近的 stderr 文本
+        """
+        data = b"".join(self._stderr_chunks)
+        if max_bytes is not None:
+            data = data[-max_bytes:]
+        return data.decode(errors="replace")
+    
+    def _with_stderr(self, message: str, max_bytes: int = 2048) -> str:
+        """在错误信息后附加最近的 stderr 输出"""
+        tail = self.get_stderr_tail(max_bytes).strip()
+        if not tail:
+            return message
+        return f"{message}\n服务器 stderr（最近 {max_bytes} 字节）:\n{tail}"
+    
+    def _parse_line(self, line_text: str) -> Optional[Dict[str, Any]]:
+        """
+        将一行输出解析为 JSON-RPC 消息
+        
+        Args:
+            line_text: 去除首尾空白后的行文本
+            
+        Returns:
+            Optional[Dict[str, Any]]: 有效的 JSON-RPC 消息，非协议行返回 None
+        """
+        # 框架的 stdio 服务器保证 stdout 只输出协议帧，日志都写入 stderr；
+        # 这里只需丢弃不以 { 开头的行（兼容仍向 stdout 打印的旧服务器）
+        if not line_text or line_text[0] != '{':
+            return None
+        
+        try:
+            message = json.loads(line_text)
+        except json.JSONDecodeError:
+            return None
+        
+        # 验证这是一个有效的JSON-RPC消息
+        if isinstance(message, dict) and 'jsonrpc' in message:
+            return message
+        return None
+    
+    def _dispatch_message(self, message: Dict[str, Any]) -> None:
+        """将消息分发给等待中的请求或流"""
+        method = message.get("method")
+        
+        if method is None:
+            # 普通响应：按 id 分发
+            msg_id = message.get("id")
+            future = self._pending.get(msg_id)
+            if future is not None:
+                if not future.done():
+                    future.set_result(message)
+                return
+            queue = self._streams.get(msg_id)
+            if queue is not None:
+                queue.put_nowait(message)
+            return
+        
+        if method.startswith("stream/"):
+            params = message.get("params") or {}
+            queue = self._streams.get(params.get("request_id"))
+            if queue is not None:
+                queue.put_nowait(message)
+            return
+        
+        if method == "notifications/ready":
+            self.server_info = message.get("params") or {}
+            if self._ready is not None and not self._ready.done():
+                self._ready.set_result(True)
+            return
+        
+        self._handle_notification(message)
+    
+    def _handle_notification(self, message: Dict[str, Any]) -> None:
+        """处理服务器主动发送的通知，子类可以重写"""
+        pass
+    
+    def _fail_all(self, error: Exception) -> None:
+        """连接结束时唤醒所有等待中的请求和流"""
+        if self._ready is not None and not self._ready.done():
+            self._ready.set_exception(error)
+            # 避免无人等待时出现 "exception was never retrieved" 警告
+            self._ready.exception()
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+        for queue in self._streams.values():
+            queue.put_nowait(_STREAM_CLOSED)
     
     async def initialize(self, 
                         protocol_version: str = "2024-11-05",
@@ -326,14 +621,7 @@ class MCPStdioClient:
             return True
         
         try:
-            response = await self.send_request("initialize", {
-                "protocolVersion": protocol_version,
-                "capabilities": capabilities or {},
-                "clientInfo": {
-                    "name": self.client_name,
-                    "version": self.client_version
-                }
-            })
+            response = await self.send_request("initialize", self._initialize_params(protocol_version, capabilities))
             
             if "error" in response:
                 raise Exception(f"初始化失败: {response['error']}")
@@ -344,11 +632,31 @@ class MCPStdioClient:
         except Exception as e:
             raise Exception(f"MCP 初始化失败: {e}")
     
+    def _initialize_params(self, protocol_version: str = "2024-11-05",
+                           capabilities: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """initialize 请求的参数"""
+        return {
+            "protocolVersion": protocol_version,
+            "capabilities": capabilities or {},
+            "clientInfo": {
+                "name": self.client_name,
+                "version": self.client_version
+            }
+        }
+    
     async def disconnect(self):
         """断开连接并清理资源"""
         self.is_connected = False
         self.is_initialized = False
         
+        if self._reader_task:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._reader_task = None
+        
         if self.process:
             try:
                 self.process.terminate()
@@ -360,6 +668,15 @@ class MCPStdioClient:
                 pass
             finally:
                 self.process = None
+        
+        if self._stderr_task:
+            await self._wait_stderr_drained()
+            self._stderr_task.cancel()
+            try:
+                await self._stderr_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._stderr_task = None
     
     async def __aenter__(self):
         """异步上下文管理器入口"""
@@ -392,4 +709,9 @@ class MCPTimeoutError(MCPClientError):
 
 class MCPConnectionError(MCPClientError):
     """MCP 连接异常"""
+    pass
+
+
+class MCPBatchNotSupportedError(MCPClientError):
+    """服务器不支持 JSON-RPC 批量请求"""
     pass
\ No newline at end of file
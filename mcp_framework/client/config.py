@@ -7,8 +7,13 @@ from typing import Dict, Any, Optional
 from .enhanced import EnhancedMCPStdioClient
 
 
-class ConfigClient(EnhancedMCPStdioClient):
-    """MCP 配置管理客户端"""
+class ConfigOperations:
+    """
+    配置管理相关的 JSON-RPC 方法
+    
+    只依赖 send_request 和 is_initialized，可以与任意 MCPStdioClient 子类组合，
+    使同一条连接同时提供工具调用和配置管理。
+    """
     
     async def get_config(self) -> Dict[str, Any]:
         """
@@ -150,6 +155,11 @@ class ConfigClient(EnhancedMCPStdioClient):
         return response.get("result", {"valid": False, "errors": ["未知验证错误"]})
 
 
+class ConfigClient(ConfigOperations, EnhancedMCPStdioClient):
+    """MCP 配置管理客户端"""
+    pass
+
+
 # 便捷函数
 async def get_server_config(server_script: str, 
                            alias: Optional[str] = None,
@@ -0,0 +1,522 @@
+"""
+MCP HTTP 客户端
+通过连接池复用的 aiohttp 会话与 MCPHTTPServer 通信
+"""
+
+import asyncio
+import codecs
+import json
+import logging
+import time
+from typing import Dict, Any, Iterable, List, Optional, Tuple, AsyncGenerator
+
+import aiohttp
+
+from ..core.base import TOOLS_VERSION_HEADER
+from ..core.tracing import TRACE_HEADER, current_trace_id
+from .base import MCPClientError, MCPTimeoutError, MCPConnectionError, MCPBatchNotSupportedError
+from .tools import BatchResult, ToolOperations
+
+
+def _trace_headers() -> Optional[Dict[str, str]]:
+    """在 trace_context() 中发出的请求通过请求头携带追踪 id"""
+    trace_id = current_trace_id()
+    return {TRACE_HEADER: trace_id} if trace_id else None
+
+
+class SSEParser:
+    """
+    增量式 Server-Sent Events 解析器
+
+    按任意边界喂入字节，返回已完整接收的事件；跨块的 UTF-8 字符和行都会被正确拼接。
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._buffer = ""
+        self._event = ""
+        self._data: List[str] = []
+        self._skip_lf = False
+
+    def feed(self, data: bytes) -> List[Tuple[str, str]]:
+        """
+        喂入一段字节
+
+        Args:
+            data: 从响应体读取到的字节
+
+        Returns:
+            List[Tuple[str, str]]: 完整事件列表，每项为 (事件类型, 数据文本)
+        """
+        text = self._decoder.decode(data)
+        if self._skip_lf and text:
+            # 上一块以 \r 结尾，紧随其后的 \n 属于同一个换行
+            if text.startswith("\n"):
+                text = text[1:]
+            self._skip_lf = False
+        self._buffer += text
+        events = []
+        while True:
+            index = self._find_line_end()
+            if index < 0:
+                break
+            line = self._buffer[:index]
+            # \r\n 作为一个换行处理
+            skip = 2 if self._buffer.startswith("\r\n", index) else 1
+            if skip == 1 and index == len(self._buffer) - 1 and self._buffer[index] == "\r":
+                self._skip_lf = True
+            self._buffer = self._buffer[index + skip:]
+            event = self._process_line(line)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def _find_line_end(self) -> int:
+        """查找第一个换行符位置（\\n、\\r 或 \\r\\n）"""
+        lf = self._buffer.find("\n")
+        cr = self._buffer.find("\r")
+        if cr < 0:
+            return lf
+        if lf < 0:
+            return cr
+        return min(lf, cr)
+
+    def _process_line(self, line: str) -> Optional[Tuple[str, str]]:
+        """处理一行，遇到空行时分发事件"""
+        if not line:
+            if not self._data:
+                self._event = ""
+                return None
+            event = (self._event or "message", "\n".join(self._data))
+            self._event = ""
+            self._data = []
+            return event
+
+        if line.startswith(":"):
+            return None
+
+        field, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+        if field == "event":
+            self._event = value
+        elif field == "data":
+            self._data.append(value)
+        return None
+
+
+class MCPHTTPClient(ToolOperations):
+    """
+    MCP HTTP 客户端
+
+    与 ToolsClient 提供相同的工具接口，所有请求共享同一个带连接池的 aiohttp.ClientSession，
+    支持 /mcp JSON-RPC（含批量请求）、/sse/tool/call 流式调用、按主机的连接数限制和单请求截止时间。
+    """
+
+    def __init__(self,
+                 base_url: str = "http://localhost:8080",
+                 timeout: float = 30.0,
+                 limit: int = 100,
+                 limit_per_host: int = 10,
+                 keepalive_timeout: float = 30.0,
+                 headers: Optional[Dict[str, str]] = None,
+                 client_name: str = "mcp-framework-client",
+                 client_version: str = "1.0.0",
+                 session: Optional[aiohttp.ClientSession] = None,
+                 tools_cache_ttl: Optional[float] = 60.0):
+        """
+        初始化 MCP HTTP 客户端
+
+        Args:
+            base_url: 服务器地址，如 http://localhost:8080
+            timeout: 默认单请求超时时间（秒）；流式调用中为相邻两次读取之间的超时
+            limit: 连接池总连接数上限
+            limit_per_host: 每个主机的连接数上限（0 表示不限制）
+            keepalive_timeout: 空闲连接保持时间（秒）
+            headers: 附加的请求头（如认证信息）
+            client_name: 客户端名称
+            client_version: 客户端版本
+            session: 外部提供的 aiohttp 会话（可选），由调用方负责关闭
+            tools_cache_ttl: 工具缓存的有效期（秒），None 表示只在响应头中的工具版本变化时失效
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.headers = headers or {}
+        self.client_name = client_name
+        self.client_version = client_version
+
+        self._session = session
+        self._owns_session = session is None
+        self.request_id = 0
+        self.is_connected = session is not None
+        self.is_initialized = False
+        self.logger = logging.getLogger(f"{__name__}.MCPHTTPClient")
+        self._init_tool_cache(ttl=tools_cache_ttl)
+
+    def get_next_id(self) -> int:
+        """获取下一个请求ID"""
+        self.request_id += 1
+        return self.request_id
+
+    async def connect(self) -> bool:
+        """创建带连接池的会话（重复调用无副作用）"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                json_serialize=json.dumps
+            )
+            self._owns_session = True
+        self.is_connected = True
+        return True
+
+    async def initialize(self,
+                         protocol_version: str = "2024-11-05",
+                         capabilities: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        初始化 MCP 会话
+
+        Args:
+            protocol_version: MCP 协议版本
+            capabilities: 客户端能力
+
+        Returns:
+            bool: 初始化是否成功
+        """
+        if self.is_initialized:
+            return True
+
+        response = await self.send_request("initialize", {
+            "protocolVersion": protocol_version,
+            "capabilities": capabilities or {},
+            "clientInfo": {
+                "name": self.client_name,
+                "version": self.client_version
+            }
+        })
+        if "error" in response:
+            raise Exception(f"MCP 初始化失败: {response['error']}")
+
+        self.is_initialized = True
+        return True
+
+    async def _ensure_connected(self):
+        """确保客户端已连接和初始化"""
+        if not self.is_connected or self._session is None or self._session.closed:
+            await self.connect()
+        if not self.is_initialized:
+            await self.initialize()
+
+    async def close(self) -> None:
+        """关闭会话（外部提供的会话不会被关闭）"""
+        session, self._session = self._session, None
+        self.is_connected = False
+        self.is_initialized = False
+        if session is not None and self._owns_session and not session.closed:
+            await session.close()
+
+    async def disconnect(self) -> None:
+        """与 stdio 客户端一致的关闭接口"""
+        await self.close()
+
+    async def __aenter__(self):
+        """异步上下文管理器入口"""
+        await self.connect()
+        await self.initialize()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """异步上下文管理器出口"""
+        await self.close()
+
+    # ==================== JSON-RPC ====================
+
+    def _remaining(self, timeout: Optional[float], deadline: Optional[float], method: str) -> float:
+        """根据超时时间和截止时间（time.monotonic() 时间点）计算本次请求可用的时间"""
+        remaining = timeout or self.timeout
+        if deadline is not None:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                raise MCPTimeoutError(f"请求已超过截止时间: {method}")
+            remaining = min(remaining, left)
+        return remaining
+
+    def _build_request(self, method: str, params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """构造一条 JSON-RPC 请求"""
+        request = {
+            "jsonrpc": "2.0",
+            "method": method,
+            "id": self.get_next_id()
+        }
+        if params:
+            request["params"] = params
+        return request
+
+    async def _post_json(self, payload: Any, timeout: float, method: str) -> Any:
+        """向 /mcp 发送 JSON 并返回解析后的响应"""
+        if self._session is None or self._session.closed:
+            await self.connect()
+
+        try:
+            async with self._session.post(
+                f"{self.base_url}/mcp",
+                json=payload,
+                headers=_trace_headers(),
+                timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as response:
+                if response.status >= 400:
+                    text = await response.text()
+                    raise MCPClientError(f"HTTP {response.status}: {text[:200]}")
+                self._observe_tools_version(response.headers.get(TOOLS_VERSION_HEADER))
+                return await response.json(content_type=None)
+        except asyncio.TimeoutError:
+            raise MCPTimeoutError(f"请求超时 ({timeout:.3f}s): {method}")
+        except aiohttp.ClientConnectionError as e:
+            raise MCPConnectionError(f"连接服务器失败: {e}")
+
+    async def send_request(self,
+                           method: str,
+                           params: Optional[Dict[str, Any]] = None,
+                           timeout: Optional[float] = None,
+                           deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        发送 JSON-RPC 请求
+
+        Args:
+            method: 方法名
+            params: 参数字典
+            timeout: 超时时间（秒），None 使用默认值
+            deadline: 截止时间（time.monotonic() 时间点），与 timeout 取较早者
+
+        Returns:
+            Dict[str, Any]: 响应数据
+        """
+        remaining = self._remaining(timeout, deadline, method)
+        return await self._post_json(self._build_request(method, params), remaining, method)
+
+    async def send_batch(self,
+                         calls: List[Tuple[str, Optional[Dict[str, Any]]]],
+                         timeout: Optional[float] = None,
+                         deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        在一次 HTTP 往返中发送多个 JSON-RPC 请求
+
+        Args:
+            calls: (方法名, 参数) 列表
+            timeout: 整个批量请求的超时时间（秒）
+            deadline: 截止时间（time.monotonic() 时间点）
+
+        Returns:
+            List[Dict[str, Any]]: 与 calls 顺序一致的响应列表
+        """
+        if not calls:
+            return []
+
+        remaining = self._remaining(timeout, deadline, "batch")
+        requests = [self._build_request(method, params) for method, params in calls]
+        responses = await self._post_json(requests, remaining, "batch")
+
+        if isinstance(responses, dict):
+            # 服务器不支持批量请求时返回单个错误对象
+            raise MCPBatchNotSupportedError(f"批量请求失败: {responses.get('error', responses)}")
+
+        by_id = {response.get("id"): response for response in responses if isinstance(response, dict)}
+        missing = {"jsonrpc": "2.0", "error": {"code": -32603, "message": "批量响应中缺少该请求"}}
+        return [by_id.get(request["id"], dict(missing, id=request["id"])) for request in requests]
+
+    async def call_tools_batch(self,
+                               calls: List[Tuple[str, Dict[str, Any]]],
+                               timeout: Optional[float] = None,
+                               deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        批量调用工具
+
+        Args:
+            calls: (工具名称, 参数) 列表
+            timeout: 整个批量请求的超时时间（秒）
+            deadline: 截止时间（time.monotonic() 时间点）
+
+        Returns:
+            List[Dict[str, Any]]: 每个调用的原始 JSON-RPC 响应（包含 result 或 error）
+        """
+        await self._ensure_connected()
+        return await self.send_batch(
+            [("tools/call", {"name": name, "arguments": arguments}) for name, arguments in calls],
+            timeout=timeout,
+            deadline=deadline
+        )
+
+    # ==================== SSE 流式调用 ====================
+
+    async def stream_events(self,
+                            tool_name: str,
+                            arguments: Dict[str, Any],
+                            timeout: Optional[float] = None,
+                            deadline: Optional[float] = None) -> AsyncGenerator[Tuple[str, Any], None]:
+        """
+        通过 /sse/tool/call 流式调用工具，逐个产出 SSE 事件
+
+        Args:
+            tool_name: 工具名称
+            arguments: 工具参数
+            timeout: 相邻两次读取之间的超时时间（秒），None 使用默认值
+            deadline: 整个流的截止时间（time.monotonic() 时间点）
+
+        Yields:
+            Tuple[str, Any]: (事件类型, 解析后的数据)
+        """
+        async for event, data in self._stream_sse(
+                "/sse/tool/call", {"tool_name": tool_name, "arguments": arguments}, tool_name, timeout, deadline):
+            yield event, data
+
+    async def _stream_sse(self,
+                          path: str,
+                          body: Dict[str, Any],
+                          label: str,
+                          timeout: Optional[float] = None,
+                          deadline: Optional[float] = None) -> AsyncGenerator[Tuple[str, Any], None]:
+        """POST 到 SSE 端点并逐个产出事件，收到 end / error / stopped 事件后结束"""
+        await self._ensure_connected()
+
+        total = None
+        if deadline is not None:
+            total = deadline - time.monotonic()
+            if total <= 0:
+                raise MCPTimeoutError(f"请求已超过截止时间: {label}")
+        client_timeout = aiohttp.ClientTimeout(total=total, sock_read=timeout or self.timeout)
+        parser = SSEParser()
+
+        try:
+            async with self._session.post(
+                f"{self.base_url}{path}",
+                json=body,
+                headers=_trace_headers(),
+                timeout=client_timeout
+            ) as response:
+                if response.status >= 400:
+                    text = await response.text()
+                    raise MCPClientError(f"HTTP {response.status}: {text[:200]}")
+
+                async for data in response.content.iter_any():
+                    for event, payload in parser.feed(data):
+                        try:
+                            parsed = json.loads(payload)
+                        except json.JSONDecodeError:
+                            parsed = payload
+                        yield event, parsed
+                        if event in ("end", "error", "stopped"):
+                            return
+        except asyncio.TimeoutError:
+            raise MCPTimeoutError(f"流式响应超时: {label}")
+        except aiohttp.ClientConnectionError as e:
+            raise MCPConnectionError(f"连接服务器失败: {e}")
+
+    async def call_tool_stream(self,
+                               tool_name: str,
+                               arguments: Dict[str, Any],
+                               timeout: Optional[float] = None,
+                               deadline: Optional[float] = None) -> AsyncGenerator[str, None]:
+        """
+        流式调用指定工具
+
+        Args:
+            tool_name: 工具名称
+            arguments: 工具参数
+            timeout: 相邻两次读取之间的超时时间（秒）
+            deadline: 整个流的截止时间（time.monotonic() 时间点）
+
+        Yields:
+            str: 流式输出的内容块
+
+        Raises:
+            Exception: 工具调用失败
+        """
+        async for event, data in self.stream_events(tool_name, arguments, timeout, deadline):
+            if event == "data":
+                content = self._extract_sse_content(data)
+                if content:
+                    yield content
+            elif event == "error":
+                error = data.get("error") if isinstance(data, dict) else data
+                raise Exception(f"流式工具调用失败: {error}")
+
+    async def call_tool_many(self,
+                             tool_name: str,
+                             arguments_list: Iterable[Dict[str, Any]],
+                             concurrency: Optional[int] = None,
+                             timeout: Optional[float] = None,
+                             deadline: Optional[float] = None,
+                             priority: Optional[str] = None) -> AsyncGenerator[BatchResult, None]:
+        """
+        由服务器端执行批量调用（/sse/tools/call_many），按完成顺序产出结果
+
+        Args:
+            tool_name: 工具名称
+            arguments_list: 参数列表，每项为一次调用的参数
+            concurrency: 期望的服务器端并发数，None 使用服务器默认值
+            timeout: 相邻两次读取之间的超时时间（秒）
+            deadline: 整个批次的截止时间（time.monotonic() 时间点）
+            priority: 优先级类别，None 使用工具的默认优先级
+
+        Yields:
+            BatchResult: 单个调用的结果，失败的调用通过 error 属性体现
+        """
+        arguments_list = list(arguments_list)
+        body = {"tool_name": tool_name, "arguments_list": arguments_list}
+        if concurrency:
+            body["concurrency"] = concurrency
+        if priority:
+            body["priority"] = priority
+
+        async for event, data in self._stream_sse("/sse/tools/call_many", body, tool_name, timeout, deadline):
+            if event == "result":
+                yield self._batch_result_from_item(tool_name, arguments_list, data)
+            elif event == "error":
+                error = data.get("error") if isinstance(data, dict) else data
+                raise Exception(f"批量工具调用失败: {error}")
+
+    async def stream_job(self, job_id: str, after: int = 0, wait: float = 25.0) -> AsyncGenerator[str, None]:
+        """
+        获取异步任务的流式输出，直到任务结束（通过 jobs/stream 长轮询）
+
+        Args:
+            job_id: 任务 id
+            after: 已收到的最后一个块的序号，断线重连时从该位置继续
+            wait: 每次轮询在服务器端最多等待的秒数
+
+        Yields:
+            str: 输出块
+
+        Raises:
+            Exception: 任务失败或被取消
+        """
+        while True:
+            response = await self.send_request(
+                "jobs/stream", {"job_id": job_id, "after": after, "wait": wait}, timeout=wait + self.timeout)
+            if "error" in response:
+                raise Exception(f"获取任务输出失败: {response['error']}")
+            update = response.get("result", {})
+            for chunk in update.get("chunks", []):
+                yield chunk["content"]
+            after = update.get("next", after)
+            if update.get("status") in ("succeeded", "failed", "cancelled"):
+                self._check_job_finished(update)
+                return
+
+    @staticmethod
+    def _extract_sse_content(data: Any) -> str:
+        """从 SSE data 事件中提取内容文本"""
+        if isinstance(data, dict):
+            for key in ("chunk", "content"):
+                if isinstance(data.get(key), str):
+                    return data[key]
+            return json.dumps(data, ensure_ascii=False)
+        return str(data)
@@ -0,0 +1,154 @@
+"""
+MCP 客户端后台事件循环
+在守护线程中运行一个长期存在的事件循环，供同步代码调用异步客户端
+"""
+
+import asyncio
+import atexit
+import logging
+import os
+import threading
+from typing import Any, Awaitable, Optional
+
+
+class BackgroundLoop:
+    """
+    运行在守护线程中的长期事件循环
+
+    同步调用方通过 run() 把协程提交到该循环并阻塞等待结果。
+    循环及其中创建的连接、进程池在多次调用之间保持存活，
+    因此每次调用只需要一次线程间切换，而不是创建新的事件循环和子进程。
+    """
+
+    def __init__(self, name: str = "mcp-client-loop"):
+        """
+        初始化后台事件循环（不会立即启动线程）
+
+        Args:
+            name: 后台线程名称
+        """
+        self.name = name
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(f"{__name__}.BackgroundLoop")
+
+    @property
+    def is_running(self) -> bool:
+        """后台循环是否在运行"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> 'BackgroundLoop':
+        """启动后台线程（重复调用无副作用）"""
+        with self._lock:
+            if self.is_running:
+                return self
+
+            ready = threading.Event()
+            self.loop = asyncio.new_event_loop()
+
+            def _run():
+                asyncio.set_event_loop(self.loop)
+                self.loop.call_soon(ready.set)
+                self.loop.run_forever()
+
+            self._thread = threading.Thread(target=_run, name=self.name, daemon=True)
+            self._thread.start()
+            ready.wait()
+            self.logger.debug(f"后台事件循环已启动: {self.name}")
+            return self
+
+    def in_loop_thread(self) -> bool:
+        """当前线程是否就是后台循环线程"""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(self, coro: Awaitable[Any]) -> 'asyncio.Future':
+        """
+        把协程提交到后台循环，返回 concurrent.futures.Future
+
+        Args:
+            coro: 要执行的协程
+        """
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """
+        在后台循环中执行协程并阻塞等待结果
+
+        Args:
+            coro: 要执行的协程
+            timeout: 等待超时时间（秒），None 表示一直等待
+
+        Returns:
+            Any: 协程的返回值
+        """
+        if self.in_loop_thread():
+            coro.close()
+            raise Exception("不能在后台事件循环线程中同步等待，请直接 await 异步接口")
+
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        关闭循环中的共享进程池并停止后台线程
+
+        Args:
+            timeout: 等待清理完成的超时时间（秒）
+        """
+        with self._lock:
+            if not self.is_running:
+                return
+            loop, thread = self.loop, self._thread
+
+        from .pool import close_process_pools
+        try:
+            asyncio.run_coroutine_threadsafe(close_process_pools(), loop).result(timeout)
+        except Exception as e:
+            self.logger.warning(f"关闭后台进程池失败: {e}")
+
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        if not thread.is_alive():
+            loop.close()
+
+        with self._lock:
+            if self._thread is thread:
+                self._thread = None
+                self.loop = None
+
+
+_default_loop: Optional[BackgroundLoop] = None
+_default_loop_lock = threading.Lock()
+
+
+def get_background_loop() -> BackgroundLoop:
+    """获取（必要时启动）进程内共享的后台事件循环"""
+    global _default_loop
+    with _default_loop_lock:
+        if _default_loop is None:
+            _default_loop = BackgroundLoop()
+        return _default_loop.start()
+
+
+def _shutdown_default_loop() -> None:
+    """解释器退出时关闭共享后台循环"""
+    if _default_loop is not None:
+        _default_loop.stop()
+
+
+def _reset_after_fork() -> None:
+    """fork 后子进程中不存在后台线程，丢弃继承的循环以便按需重建"""
+    global _default_loop, _default_loop_lock
+    _default_loop = None
+    _default_loop_lock = threading.Lock()
+
+
+atexit.register(_shutdown_default_loop)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,460 @@
+"""
+MCP 服务器进程池
+预先启动并初始化若干 stdio 服务器进程，按需租借给调用方，避免每次调用都付出进程启动开销
+"""
+
+import asyncio
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional, Tuple, AsyncGenerator, AsyncIterator
+
+from .tools import ToolsClient, Tool
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+PoolKey = Tuple[str, Optional[str], Optional[str], Tuple[str, ...]]
+
+
+class PooledProcess:
+    """进程池中的单个服务器进程"""
+
+    def __init__(self, client: ToolsClient):
+        self.client = client
+        self.calls = 0
+        self.in_flight = 0
+        self.created_at = time.monotonic()
+        self.base_rss: Optional[int] = None
+        self.retiring = False
+
+    @property
+    def pid(self) -> Optional[int]:
+        process = self.client.process
+        return process.pid if process else None
+
+    def is_alive(self) -> bool:
+        """进程是否仍在运行且连接可用"""
+        process = self.client.process
+        return (self.client.is_connected and
+                process is not None and
+                process.returncode is None)
+
+    def rss(self) -> Optional[int]:
+        """获取进程当前常驻内存（字节），无法获取时返回 None"""
+        if psutil is None or self.pid is None:
+            return None
+        try:
+            return psutil.Process(self.pid).memory_info().rss
+        except Exception:
+            return None
+
+    def __repr__(self):
+        return f"PooledProcess(pid={self.pid}, calls={self.calls}, in_flight={self.in_flight})"
+
+
+class MCPProcessPool:
+    """
+    MCP stdio 服务器进程池
+
+    池中的每个进程都已完成 initialize 握手，调用时直接复用。由于客户端连接
+    支持按请求 id 多路复用，同一进程可以同时承担多个调用；池在进程之间按
+    当前在途请求数做负载均衡，并在调用次数或内存增长超过阈值时回收进程。
+    """
+
+    def __init__(self,
+                 server_script: str,
+                 alias: Optional[str] = None,
+                 config_dir: Optional[str] = None,
+                 server_args: Optional[List[str]] = None,
+                 size: int = 1,
+                 max_calls_per_process: Optional[int] = 1000,
+                 max_memory_growth_mb: Optional[float] = None,
+                 max_concurrency_per_process: Optional[int] = None,
+                 health_check_interval: float = 30.0,
+                 **client_kwargs):
+        """
+        初始化进程池
+
+        Args:
+            server_script: 服务器脚本路径
+            alias: 服务器别名
+            config_dir: 自定义配置目录路径
+            server_args: 额外的服务器参数
+            size: 保持预热的进程数量
+            max_calls_per_process: 单个进程处理多少次调用后回收，None 表示不限制
+            max_memory_growth_mb: 进程内存相对启动时增长超过该值（MB）后回收，None 表示不检查
+            max_concurrency_per_process: 单个进程允许的最大在途请求数，None 表示不限制
+            health_check_interval: 健康检查间隔（秒），0 表示不进行后台检查
+            **client_kwargs: 传递给 ToolsClient 的其他参数（如超时时间）
+        """
+        if size < 1:
+            raise ValueError("进程池大小必须至少为 1")
+
+        self.server_script = server_script
+        self.alias = alias
+        self.config_dir = config_dir
+        self.server_args = list(server_args or [])
+        self.size = size
+        self.max_calls_per_process = max_calls_per_process
+        self.max_memory_growth_mb = max_memory_growth_mb
+        self.max_concurrency_per_process = max_concurrency_per_process
+        self.health_check_interval = health_check_interval
+        self.client_kwargs = client_kwargs
+
+        self._processes: List[PooledProcess] = []
+        self._condition: Optional[asyncio.Condition] = None
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._health_task: Optional[asyncio.Task] = None
+        self._background_tasks = set()
+        self._spawning = 0
+        self._started = False
+        self._closed = False
+
+        # 统计信息
+        self.total_spawned = 0
+        self.total_recycled = 0
+
+    @property
+    def key(self) -> PoolKey:
+        """进程池标识：(server_script, alias, config_dir, server_args)"""
+        return make_pool_key(self.server_script, self.alias, self.config_dir, self.server_args)
+
+    # ==================== 生命周期 ====================
+
+    async def start(self) -> 'MCPProcessPool':
+        """启动进程池，并发预热所有进程"""
+        if self._closed:
+            raise RuntimeError("进程池已关闭")
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+            self._condition = asyncio.Condition()
+
+        async with self._start_lock:
+            if self._started:
+                return self
+
+            spawned = await asyncio.gather(
+                *[self._spawn() for _ in range(self.size)],
+                return_exceptions=True
+            )
+            errors = [p for p in spawned if isinstance(p, BaseException)]
+            self._processes.extend(p for p in spawned if isinstance(p, PooledProcess))
+
+            if not self._processes:
+                raise errors[0]
+
+            if self.health_check_interval and self.health_check_interval > 0:
+                self._health_task = asyncio.create_task(self._health_loop())
+            self._started = True
+
+        return self
+
+    async def close(self) -> None:
+        """关闭进程池并终止所有进程"""
+        if self._closed:
+            return
+        self._closed = True
+
+        if self._health_task:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._health_task = None
+
+        for task in list(self._background_tasks):
+            task.cancel()
+
+        processes, self._processes = self._processes, []
+        await asyncio.gather(
+            *[p.client.disconnect() for p in processes],
+            return_exceptions=True
+        )
+
+        if self._condition is not None:
+            async with self._condition:
+                self._condition.notify_all()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    # ==================== 租借 ====================
+
+    async def acquire(self) -> PooledProcess:
+        """
+        租借一个进程
+
+        选择当前在途请求最少的健康进程；若所有进程都达到并发上限则等待。
+        使用完毕后必须调用 release 归还。
+        """
+        if not self._started:
+            await self.start()
+
+        async with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("进程池已关闭")
+
+                candidate = self._pick()
+                if candidate is not None:
+                    candidate.in_flight += 1
+                    candidate.calls += 1
+                    return candidate
+
+                # 没有可用进程时确保有补充进程在启动
+                self._replenish()
+                await self._condition.wait()
+
+    async def release(self, pooled: PooledProcess) -> None:
+        """归还租借的进程，必要时触发回收"""
+        async with self._condition:
+            pooled.in_flight -= 1
+
+            # 内存检查开销较大，留给后台健康检查
+            if (pooled.retiring or not pooled.is_alive() or
+                    (self.max_calls_per_process is not None and
+                     pooled.calls >= self.max_calls_per_process)):
+                self._retire(pooled)
+
+            self._condition.notify_all()
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[ToolsClient]:
+        """
+        以上下文管理器形式租借一个已初始化的客户端
+
+        用法:
+            async with pool.lease() as client:
+                await client.call_tool("name", {...})
+        """
+        pooled = await self.acquire()
+        try:
+            yield pooled.client
+        finally:
+            await self.release(pooled)
+
+    def _pick(self) -> Optional[PooledProcess]:
+        """选出负载最低的可用进程"""
+        best = None
+        for pooled in self._processes:
+            if pooled.retiring or not pooled.is_alive():
+                continue
+            if (self.max_concurrency_per_process is not None and
+                    pooled.in_flight >= self.max_concurrency_per_process):
+                continue
+            if best is None or pooled.in_flight < best.in_flight:
+                best = pooled
+        return best
+
+    # ==================== 便捷调用 ====================
+
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """在池中的进程上调用工具"""
+        async with self.lease() as client:
+            return await client.call_tool(tool_name, arguments)
+
+    async def call_tool_stream(self, tool_name: str, arguments: Dict[str, Any]) -> AsyncGenerator[str, None]:
+        """在池中的进程上流式调用工具"""
+        async with self.lease() as client:
+            async for chunk in client.call_tool_stream(tool_name, arguments):
+                yield chunk
+
+    async def list_tools(self, force_refresh: bool = False, role: Optional[str] = None) -> List[Tool]:
+        """获取工具列表"""
+        async with self.lease() as client:
+            return await client.list_tools(force_refresh=force_refresh, role=role)
+
+    async def send_request(self,
+                           method: str,
+                           params: Optional[Dict[str, Any]] = None,
+                           timeout: Optional[float] = None) -> Dict[str, Any]:
+        """在池中的进程上发送任意 JSON-RPC 请求"""
+        async with self.lease() as client:
+            return await client.send_request(method, params, timeout=timeout)
+
+    # ==================== 进程管理 ====================
+
+    async def _spawn(self) -> PooledProcess:
+        """启动并初始化一个新进程"""
+        client = ToolsClient(
+            server_script=self.server_script,
+            alias=self.alias,
+            config_dir=self.config_dir,
+            server_args=self.server_args,
+            **self.client_kwargs
+        )
+        try:
+            await client.connect()
+            await client.initialize()
+        except Exception:
+            await client.disconnect()
+            raise
+
+        pooled = PooledProcess(client)
+        pooled.base_rss = pooled.rss()
+        self.total_spawned += 1
+        return pooled
+
+    def _live_count(self) -> int:
+        return sum(1 for p in self._processes if not p.retiring)
+
+    def _retire(self, pooled: PooledProcess) -> None:
+        """将进程标记为回收：不再分配新请求，空闲后关闭，并补充新进程"""
+        if not pooled.retiring:
+            pooled.retiring = True
+            self.total_recycled += 1
+
+        if pooled.in_flight <= 0 and pooled in self._processes:
+            self._processes.remove(pooled)
+            self._run_background(pooled.client.disconnect())
+
+        self._replenish()
+
+    def _replenish(self) -> None:
+        """补充进程直到达到目标数量"""
+        if self._closed:
+            return
+        missing = self.size - self._live_count() - self._spawning
+        for _ in range(max(0, missing)):
+            self._spawning += 1
+            self._run_background(self._spawn_replacement())
+
+    async def _spawn_replacement(self) -> None:
+        try:
+            pooled = await self._spawn()
+        except Exception:
+            pooled = None
+        finally:
+            self._spawning -= 1
+
+        async with self._condition:
+            if pooled is not None:
+                if self._closed:
+                    self._run_background(pooled.client.disconnect())
+                else:
+                    self._processes.append(pooled)
+            self._condition.notify_all()
+
+    def _run_background(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    def _needs_recycle(self, pooled: PooledProcess) -> bool:
+        """检查进程是否需要回收"""
+        if not pooled.is_alive():
+            return True
+        if (self.max_calls_per_process is not None and
+                pooled.calls >= self.max_calls_per_process):
+            return True
+        if self.max_memory_growth_mb is not None and pooled.base_rss is not None:
+            current = pooled.rss()
+            if current is not None:
+                growth_mb = (current - pooled.base_rss) / (1024 * 1024)
+                if growth_mb > self.max_memory_growth_mb:
+                    return True
+        return False
+
+    async def health_check(self) -> Dict[str, Any]:
+        """检查所有进程，回收不健康的进程并返回池状态"""
+        async with self._condition:
+            for pooled in list(self._processes):
+                if not pooled.retiring and self._needs_recycle(pooled):
+                    self._retire(pooled)
+                elif pooled.retiring and pooled.in_flight <= 0:
+                    self._retire(pooled)
+            self._condition.notify_all()
+        return self.stats()
+
+    async def _health_loop(self) -> None:
+        while not self._closed:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                await self.health_check()
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """获取进程池状态"""
+        return {
+            "size": self.size,
+            "live": self._live_count(),
+            "in_flight": sum(p.in_flight for p in self._processes),
+            "total_spawned": self.total_spawned,
+            "total_recycled": self.total_recycled,
+            "processes": [
+                {
+                    "pid": p.pid,
+                    "calls": p.calls,
+                    "in_flight": p.in_flight,
+                    "retiring": p.retiring,
+                    "rss": p.rss()
+                } for p in self._processes
+            ]
+        }
+
+
+def make_pool_key(server_script: str,
+                  alias: Optional[str] = None,
+                  config_dir: Optional[str] = None,
+                  server_args: Optional[List[str]] = None) -> PoolKey:
+    """构建进程池键"""
+    return (server_script, alias, config_dir, tuple(server_args or ()))
+
+
+# 每个事件循环各自维护一组共享进程池（子进程传输绑定在创建它的事件循环上）
+_shared_pools: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[PoolKey, MCPProcessPool]]' = \
+    weakref.WeakKeyDictionary()
+
+
+async def get_process_pool(server_script: str,
+                           alias: Optional[str] = None,
+                           config_dir: Optional[str] = None,
+                           server_args: Optional[List[str]] = None,
+                           **pool_kwargs) -> MCPProcessPool:
+    """
+    获取（必要时创建）当前事件循环中共享的进程池
+
+    相同 (server_script, alias, config_dir, server_args) 的调用共享同一个进程池，
+    pool_kwargs 仅在首次创建时生效。
+
+    Returns:
+        MCPProcessPool: 已启动的进程池
+    """
+    loop = asyncio.get_running_loop()
+    pools = _shared_pools.setdefault(loop, {})
+    key = make_pool_key(server_script, alias, config_dir, server_args)
+
+    pool = pools.get(key)
+    if pool is None or pool._closed:
+        pool = MCPProcessPool(
+            server_script,
+            alias=alias,
+            config_dir=config_dir,
+            server_args=server_args,
+            **pool_kwargs
+        )
+        pools[key] = pool
+
+    try:
+        await pool.start()
+    except Exception:
+        pools.pop(key, None)
+        raise
+    return pool
+
+
+async def close_process_pools() -> None:
+    """关闭当前事件循环中的所有共享进程池"""
+    loop = asyncio.get_running_loop()
+    pools = _shared_pools.pop(loop, {})
+    await asyncio.gather(*[pool.close() for pool in pools.values()], return_exceptions=True)
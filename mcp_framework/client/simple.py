@@ -4,10 +4,11 @@ MCP 简化客户端
 """
 
 import asyncio
-from typing import Dict, Any, List, Optional, Union, AsyncGenerator
+from typing import Dict, Any, List, Optional, Union, AsyncGenerator, Iterable, Tuple
 from .base import MCPStdioClient
-from .config import ConfigClient
-from .tools import ToolsClient, Tool
+from .tools import ToolsClient, Tool, BatchResult
+from .pool import MCPProcessPool, get_process_pool
+from .loop import get_background_loop
 
 
 class SimpleClient:
@@ -22,6 +23,7 @@ class SimpleClient:
                  server_script: str,
                  alias: Optional[str] = None,
                  config_dir: Optional[str] = None,
+                 pool: Optional[MCPProcessPool] = None,
                  **kwargs):
         """
         初始化简化客户端
@@ -30,18 +32,25 @@ class SimpleClient:
             server_script: 服务器脚本路径
             alias: 服务器别名（可选）
             config_dir: 自定义配置目录路径（可选）
+            pool: 进程池（可选），提供时从池中租借已预热的进程而不是启动新进程
             **kwargs: 其他可选参数（如超时时间等）
         """
         self.server_script = server_script
         self.alias = alias
         self.config_dir = config_dir
+        self.pool = pool
         self.kwargs = kwargs
         self._client = None
+        self._lease = None
         self._is_ready = False
     
     async def _ensure_ready(self):
         """确保客户端已准备就绪"""
-        if not self._is_ready:
+        if not self._is_ready and self.pool is not None:
+            self._lease = await self.pool.acquire()
+            self._client = self._lease.client
+            self._is_ready = True
+        elif not self._is_ready:
             self._client = ToolsClient(
                 server_script=self.server_script,
                 alias=self.alias,
@@ -122,6 +131,54 @@ class SimpleClient:
         async for chunk in self._client.call_tool_stream(tool_name, kwargs):
             yield chunk
     
+    async def call_many(self, tool_name: str, arguments_list: Iterable[Dict[str, Any]],
+                        concurrency: int = 10) -> AsyncGenerator[BatchResult, None]:
+        """
+        用多组参数并发调用同一个工具，按完成顺序产出结果
+        
+        Args:
+            tool_name: 工具名称
+            arguments_list: 参数列表，每项为一次调用的参数
+            concurrency: 同时进行的请求数量
+            
+        Yields:
+            BatchResult: 单个调用的结果，失败的调用通过 error 属性体现
+        """
+        await self._ensure_ready()
+        async for result in self._client.call_many(tool_name, arguments_list, concurrency=concurrency):
+            yield result
+    
+    async def call_batch(self, calls: Iterable[Tuple[str, Dict[str, Any]]],
+                         concurrency: int = 10) -> AsyncGenerator[BatchResult, None]:
+        """
+        并发调用多个工具，按完成顺序产出结果
+        
+        Args:
+            calls: (工具名称, 参数) 列表
+            concurrency: 同时进行的请求数量
+            
+        Yields:
+            BatchResult: 单个调用的结果，失败的调用通过 error 属性体现
+        """
+        await self._ensure_ready()
+        async for result in self._client.call_batch(calls, concurrency=concurrency):
+            yield result
+    
+    async def pipeline(self, nodes: List[Dict[str, Any]],
+                       outputs: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        在服务器端执行工具调用流水线
+        
+        Args:
+            nodes: 节点列表，每项包含 id、tool、arguments（可引用 "$.上游节点id"）
+            outputs: 需要返回的节点 id 或引用
+            
+        Returns:
+            Dict[str, Any]: 输出值以及每个节点的状态和耗时
+        """
+        await self._ensure_ready()
+        return await self._client.run_pipeline(nodes, outputs)
+    
     # ==================== 配置相关方法 ====================
     
     async def config(self) -> Dict[str, Any]:
@@ -131,17 +188,10 @@ class SimpleClient:
         Returns:
             Dict[str, Any]: 当前配置字典
         """
-        await self._ensure_ready()
         try:
-            # 创建临时配置客户端
-            config_client = ConfigClient(
-                server_script=self.server_script,
-                alias=self.alias,
-                config_dir=self.config_dir,
-                **self.kwargs
-            )
-            async with config_client:
-                return await config_client.get_config()
+            # 复用工具调用所用的同一条连接
+            await self._ensure_ready()
+            return await self._client.get_config()
         except Exception as e:
             print(f"警告: 配置获取失败: {e}")
             return {}
@@ -158,14 +208,8 @@ class SimpleClient:
             Any: 配置项的值
         """
         try:
-            config_client = ConfigClient(
-                server_script=self.server_script,
-                alias=self.alias,
-                config_dir=self.config_dir,
-                **self.kwargs
-            )
-            async with config_client:
-                return await config_client.get_config_value(key, default)
+            await self._ensure_ready()
+            return await self._client.get_config_value(key, default)
         except Exception as e:
             print(f"警告: 配置获取失败: {e}")
             return default
@@ -182,14 +226,8 @@ class SimpleClient:
             bool: 设置是否成功
         """
         try:
-            config_client = ConfigClient(
-                server_script=self.server_script,
-                alias=self.alias,
-                config_dir=self.config_dir,
-                **self.kwargs
-            )
-            async with config_client:
-                return await config_client.set_config_value(key, value)
+            await self._ensure_ready()
+            return await self._client.set_config_value(key, value)
         except Exception as e:
             print(f"警告: 配置设置失败: {e}")
             return False
@@ -205,14 +243,8 @@ class SimpleClient:
             bool: 更新是否成功
         """
         try:
-            config_client = ConfigClient(
-                server_script=self.server_script,
-                alias=self.alias,
-                config_dir=self.config_dir,
-                **self.kwargs
-            )
-            async with config_client:
-                return await config_client.update_config(kwargs)
+            await self._ensure_ready()
+            return await self._client.update_config(kwargs)
         except Exception as e:
             print(f"警告: 配置更新失败: {e}")
             return False
@@ -226,13 +258,19 @@ class SimpleClient:
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """异步上下文管理器出口"""
-        if self._client:
+        if self._lease is not None:
+            # 租借的进程归还给进程池，而不是关闭
+            lease, self._lease = self._lease, None
+            self._client = None
+            self._is_ready = False
+            await self.pool.release(lease)
+        elif self._client:
             await self._client.disconnect()
             self._is_ready = False
     
     def __del__(self):
         """析构函数"""
-        if self._client:
+        if self._client and self._lease is None:
             try:
                 # 仅当存在运行中的事件循环时才调度异步清理
                 loop = asyncio.get_running_loop()
@@ -250,6 +288,20 @@ class SimpleClient:
 
 # ==================== 全局便捷函数 ====================
 
+async def _in_background(coro):
+    """
+    在进程内共享的后台事件循环中执行协程并等待结果
+
+    共享进程池按事件循环保存；调用方自己的事件循环（例如每次 asyncio.run）结束时
+    不会关闭其中的池，服务器进程会一直残留。放在后台循环中执行，进程池在多次调用
+    之间保持预热，并在解释器退出时统一关闭。
+    """
+    background = get_background_loop()
+    if background.in_loop_thread():
+        return await coro
+    return await asyncio.wrap_future(background.submit(coro))
+
+
 async def quick_call(server_script: str, 
                     tool_name: str, 
                     alias: Optional[str] = None,
@@ -258,6 +310,8 @@ async def quick_call(server_script: str,
     """
     快速调用工具（一行代码完成）
     
+    调用复用后台事件循环中共享的预热进程池，不再每次启动新的服务器进程。
+    
     Args:
         server_script: 服务器脚本路径
         tool_name: 工具名称
@@ -268,8 +322,11 @@ async def quick_call(server_script: str,
     Returns:
         Dict[str, Any]: 工具执行结果
     """
-    async with SimpleClient(server_script, alias, config_dir) as client:
-        return await client.call(tool_name, **tool_args)
+    async def call():
+        pool = await get_process_pool(server_script, alias, config_dir)
+        return await pool.call_tool(tool_name, tool_args)
+
+    return await _in_background(call())
 
 
 async def quick_get(server_script: str,
@@ -290,8 +347,12 @@ async def quick_get(server_script: str,
     Returns:
         Any: 配置项的值
     """
-    async with SimpleClient(server_script, alias, config_dir) as client:
-        return await client.get(config_key, default)
+    async def get():
+        pool = await get_process_pool(server_script, alias, config_dir)
+        async with SimpleClient(server_script, alias, config_dir, pool=pool) as client:
+            return await client.get(config_key, default)
+
+    return await _in_background(get())
 
 
 async def quick_set(server_script: str,
@@ -312,8 +373,12 @@ async def quick_set(server_script: str,
     Returns:
         bool: 设置是否成功
     """
-    async with SimpleClient(server_script, alias, config_dir) as client:
-        return await client.set(config_key, value)
+    async def set():
+        pool = await get_process_pool(server_script, alias, config_dir)
+        async with SimpleClient(server_script, alias, config_dir, pool=pool) as client:
+            return await client.set(config_key, value)
+
+    return await _in_background(set())
 
 
 async def quick_update(server_script: str,
@@ -332,8 +397,12 @@ async def quick_update(server_script: str,
     Returns:
         bool: 更新是否成功
     """
-    async with SimpleClient(server_script, alias, config_dir) as client:
-        return await client.update(**config_updates)
+    async def update():
+        pool = await get_process_pool(server_script, alias, config_dir)
+        async with SimpleClient(server_script, alias, config_dir, pool=pool) as client:
+            return await client.update(**config_updates)
+
+    return await _in_background(update())
 
 
 async def quick_tools(server_script: str,
@@ -348,8 +417,11 @@ async def quick_tools(server_script: str,
     Returns:
         List[str]: 工具名称列表
     """
-    async with SimpleClient(server_script, alias) as client:
-        return await client.tools()
+    async def tools():
+        pool = await get_process_pool(server_script, alias)
+        return [tool.name for tool in await pool.list_tools()]
+
+    return await _in_background(tools())
 
 
 async def quick_call_stream(server_script: str, 
@@ -368,13 +440,37 @@ async def quick_call_stream(server_script: str,
     Yields:
         str: 流式输出的内容块
     """
-    async with SimpleClient(server_script, alias) as client:
-        async for chunk in client.call_stream(tool_name, **tool_args):
+    async def open_stream():
+        pool = await get_process_pool(server_script, alias)
+        return pool.call_tool_stream(tool_name, tool_args)
+
+    stream = await _in_background(open_stream())
+
+    async def next_chunk():
+        return await stream.__anext__()
+
+    try:
+        while True:
+            try:
+                chunk = await _in_background(next_chunk())
+            except StopAsyncIteration:
+                break
             yield chunk
+    finally:
+        await _in_background(stream.aclose())
 
 
 # ==================== 同步包装器（可选） ====================
 
+def _run_sync(coro):
+    """
+    在进程内共享的后台事件循环中运行协程并阻塞等待结果
+    
+    后台循环中的共享进程池在多次调用之间保持预热，解释器退出时统一关闭。
+    """
+    return get_background_loop().run(coro)
+
+
 def sync_call(server_script: str, 
               tool_name: str, 
               alias: Optional[str] = None,
@@ -391,7 +487,7 @@ def sync_call(server_script: str,
     Returns:
         Dict[str, Any]: 工具执行结果
     """
-    return asyncio.run(quick_call(server_script, tool_name, alias, **tool_args))
+    return _run_sync(quick_call(server_script, tool_name, alias, **tool_args))
 
 
 def sync_get(server_script: str,
@@ -410,7 +506,7 @@ def sync_get(server_script: str,
     Returns:
         Any: 配置项的值
     """
-    return asyncio.run(quick_get(server_script, config_key, alias, default))
+    return _run_sync(quick_get(server_script, config_key, alias, default))
 
 
 def sync_set(server_script: str,
@@ -429,7 +525,7 @@ def sync_set(server_script: str,
     Returns:
         bool: 设置是否成功
     """
-    return asyncio.run(quick_set(server_script, config_key, value, alias))
+    return _run_sync(quick_set(server_script, config_key, value, alias))
 
 
 def sync_update(server_script: str,
@@ -446,7 +542,7 @@ def sync_update(server_script: str,
     Returns:
         bool: 更新是否成功
     """
-    return asyncio.run(quick_update(server_script, alias, **config_updates))
+    return _run_sync(quick_update(server_script, alias, **config_updates))
 
 
 def sync_tools(server_script: str,
@@ -461,7 +557,7 @@ def sync_tools(server_script: str,
     Returns:
         List[str]: 工具名称列表
     """
-    return asyncio.run(quick_tools(server_script, alias))
+    return _run_sync(quick_tools(server_script, alias))
 
 
 def sync_call_stream(server_script: str, 
@@ -486,4 +582,4 @@ def sync_call_stream(server_script: str,
             content += chunk
         return content
     
-    return asyncio.run(_collect_stream())
\ No newline at end of file
+    return _run_sync(_collect_stream())
\ No newline at end of file
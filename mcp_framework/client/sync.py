@@ -0,0 +1,219 @@
+"""
+MCP 同步客户端
+为 Flask、Celery 等同步代码提供阻塞式接口，底层复用后台事件循环中的持久连接
+"""
+
+import queue
+import threading
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .loop import BackgroundLoop, get_background_loop
+from .simple import SimpleClient
+from .tools import BatchResult, Tool
+
+
+_STREAM_END = object()
+
+
+class SyncClient:
+    """
+    MCP 同步客户端
+
+    与 SimpleClient 接口一致，但所有方法都是阻塞的。
+    连接建立在守护线程中的长期事件循环上，多次调用之间保持存活，
+    可以被多个线程同时使用（请求在同一条连接上按 id 复用）。
+
+    示例:
+        with SyncClient("server.py") as client:
+            result = client.call("echo", message="hi")
+            for chunk in client.call_stream("generate", prompt="..."):
+                print(chunk)
+    """
+
+    def __init__(self,
+                 server_script: str,
+                 alias: Optional[str] = None,
+                 config_dir: Optional[str] = None,
+                 background_loop: Optional[BackgroundLoop] = None,
+                 **kwargs):
+        """
+        初始化同步客户端（首次调用时才建立连接）
+
+        Args:
+            server_script: 服务器脚本路径
+            alias: 服务器别名（可选）
+            config_dir: 自定义配置目录路径（可选）
+            background_loop: 后台事件循环（可选），默认使用进程内共享的循环
+            **kwargs: 传递给 SimpleClient 的其他参数（如 pool、超时时间等）
+        """
+        self.server_script = server_script
+        self.alias = alias
+        self.config_dir = config_dir
+        self.kwargs = kwargs
+        self._background_loop = background_loop
+        self._client: Optional[SimpleClient] = None
+        self._lock = threading.Lock()
+
+    @property
+    def background_loop(self) -> BackgroundLoop:
+        """连接所在的后台事件循环"""
+        if self._background_loop is None:
+            self._background_loop = get_background_loop()
+        return self._background_loop.start()
+
+    @property
+    def is_connected(self) -> bool:
+        """是否已建立连接"""
+        return self._client is not None
+
+    def connect(self) -> 'SyncClient':
+        """建立连接（重复调用无副作用）"""
+        with self._lock:
+            if self._client is None:
+                client = SimpleClient(self.server_script, self.alias, self.config_dir, **self.kwargs)
+                self.background_loop.run(client.__aenter__())
+                self._client = client
+        return self
+
+    def close(self) -> None:
+        """关闭连接（池化连接归还给进程池）"""
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None and self._background_loop is not None and self._background_loop.is_running:
+            self._background_loop.run(client.__aexit__(None, None, None))
+
+    def _run(self, method: str, *args, **kwargs) -> Any:
+        """在后台循环中调用 SimpleClient 的异步方法"""
+        self.connect()
+        return self.background_loop.run(getattr(self._client, method)(*args, **kwargs))
+
+    def _iterate(self, method: str, *args, **kwargs) -> Iterator[Any]:
+        """在后台循环中迭代 SimpleClient 的异步生成器，逐项交给调用线程"""
+        self.connect()
+        items: 'queue.Queue' = queue.Queue()
+
+        async def _pump():
+            error = None
+            try:
+                generator: AsyncIterator = getattr(self._client, method)(*args, **kwargs)
+                async for item in generator:
+                    items.put(item)
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                items.put((_STREAM_END, error))
+
+        future = self.background_loop.submit(_pump())
+        try:
+            while True:
+                item = items.get()
+                if isinstance(item, tuple) and len(item) == 2 and item[0] is _STREAM_END:
+                    if item[1] is not None:
+                        raise item[1]
+                    return
+                yield item
+        finally:
+            if not future.done():
+                future.cancel()
+
+    # ==================== 工具相关方法 ====================
+
+    def tools(self, role: Optional[str] = None) -> List[str]:
+        """获取所有可用工具名称"""
+        return self._run("tools", role=role)
+
+    def call(self, tool_name: str, **kwargs) -> Dict[str, Any]:
+        """
+        调用工具
+
+        Args:
+            tool_name: 工具名称
+            **kwargs: 工具参数
+
+        Returns:
+            Dict[str, Any]: 工具执行结果
+        """
+        return self._run("call", tool_name, **kwargs)
+
+    def tool_info(self, tool_name: str, role: Optional[str] = None) -> Optional[Tool]:
+        """获取工具信息"""
+        return self._run("tool_info", tool_name, role=role)
+
+    def has_tool(self, tool_name: str, role: Optional[str] = None) -> bool:
+        """检查是否有指定工具"""
+        return self._run("has_tool", tool_name, role=role)
+
+    def call_stream(self, tool_name: str, **kwargs) -> Iterator[str]:
+        """
+        流式调用工具，逐块产出内容
+
+        数据块在后台循环中到达后立即交给调用线程；提前停止迭代会取消服务器端的流读取。
+
+        Args:
+            tool_name: 工具名称
+            **kwargs: 工具参数
+
+        Yields:
+            str: 流式输出的内容块
+        """
+        return self._iterate("call_stream", tool_name, **kwargs)
+
+    def call_many(self, tool_name: str, arguments_list: Iterable[Dict[str, Any]],
+                  concurrency: int = 10) -> Iterator[BatchResult]:
+        """
+        用多组参数并发调用同一个工具，按完成顺序产出结果
+
+        Args:
+            tool_name: 工具名称
+            arguments_list: 参数列表，每项为一次调用的参数
+            concurrency: 同时进行的请求数量
+
+        Yields:
+            BatchResult: 单个调用的结果，失败的调用通过 error 属性体现
+        """
+        return self._iterate("call_many", tool_name, list(arguments_list), concurrency=concurrency)
+
+    def call_batch(self, calls: Iterable[Tuple[str, Dict[str, Any]]],
+                   concurrency: int = 10) -> Iterator[BatchResult]:
+        """
+        并发调用多个工具，按完成顺序产出结果
+
+        Args:
+            calls: (工具名称, 参数) 列表
+            concurrency: 同时进行的请求数量
+
+        Yields:
+            BatchResult: 单个调用的结果，失败的调用通过 error 属性体现
+        """
+        return self._iterate("call_batch", list(calls), concurrency=concurrency)
+
+    def pipeline(self, nodes: List[Dict[str, Any]], outputs: Optional[List[str]] = None) -> Dict[str, Any]:
+        """在服务器端执行工具调用流水线"""
+        return self._run("pipeline", nodes, outputs)
+
+    # ==================== 配置相关方法 ====================
+
+    def config(self) -> Dict[str, Any]:
+        """获取当前配置"""
+        return self._run("config")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """获取配置项的值"""
+        return self._run("get", key, default)
+
+    def set(self, key: str, value: Any) -> bool:
+        """设置配置项的值"""
+        return self._run("set", key, value)
+
+    def update(self, **kwargs) -> bool:
+        """批量更新配置"""
+        return self._run("update", **kwargs)
+
+    # ==================== 上下文管理器 ====================
+
+    def __enter__(self):
+        return self.connect()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -3,10 +3,12 @@ MCP 工具调用客户端
 提供便捷的工具列表获取和工具调用功能
 """
 
-import json
 import asyncio
-from typing import Dict, Any, List, Optional, AsyncGenerator
+import time
+from typing import Dict, Any, List, Optional, AsyncGenerator, Iterable, Tuple
+from .base import MCPBatchNotSupportedError
 from .enhanced import EnhancedMCPStdioClient
+from .config import ConfigOperations
 
 
 class Tool:
@@ -21,49 +23,75 @@ class Tool:
         return f"Tool(name='{self.name}', description='{self.description}')"
 
 
-class ToolsClient(EnhancedMCPStdioClient):
-    """MCP 工具调用客户端"""
+class BatchResult:
+    """批量调用中单个调用的结果"""
     
-    def __init__(self, 
-                 server_script: str,
-                 alias: Optional[str] = None,
-                 config_dir: Optional[str] = None,
-                 server_args: Optional[List[str]] = None,
-                 client_name: str = "mcp-framework-client",
-                 client_version: str = "1.0.0",
-                 startup_timeout: float = 5.0,
-                 response_timeout: float = 30.0):
+    def __init__(self, index: int, tool_name: str, arguments: Dict[str, Any],
+                 result: Optional[Dict[str, Any]] = None, error: Optional[Exception] = None):
+        self.index = index
+        self.tool_name = tool_name
+        self.arguments = arguments
+        self.result = result
+        self.error = error
+    
+    @property
+    def ok(self) -> bool:
+        """调用是否成功"""
+        return self.error is None
+    
+    def __repr__(self):
+        status = "ok" if self.ok else f"error={self.error}"
+        return f"BatchResult(index={self.index}, tool_name='{self.tool_name}', {status})"
+
+
+class ToolOperations:
+    """
+    工具列表与工具调用操作
+    
+    只依赖 send_request 和 _ensure_connected，可以与 stdio 或 HTTP 客户端组合使用。
+    工具列表按 role 缓存，并为每次缓存填充建立名称索引。
+    """
+    
+    def _init_tool_cache(self, ttl: Optional[float] = None) -> None:
         """
-        初始化 MCP 工具调用客户端
+        初始化工具缓存（在客户端 __init__ 中调用）
         
         Args:
-            server_script: 服务器脚本路径
-            alias: 服务器别名（重要参数，用于多实例管理）
-            config_dir: 自定义配置目录路径（可选）
-            server_args: 额外的服务器参数
-            client_name: 客户端名称
-            client_version: 客户端版本
-            startup_timeout: 启动超时时间（秒）
-            response_timeout: 响应超时时间（秒）
+            ttl: 缓存有效期（秒），None 表示不过期
         """
-        super().__init__(
-            server_script=server_script,
-            alias=alias,
-            config_dir=config_dir,
-            server_args=server_args,
-            client_name=client_name,
-            client_version=client_version,
-            startup_timeout=startup_timeout,
-            response_timeout=response_timeout
-        )
-        self._tools_cache = None
+        # 按 role 缓存工具列表及名称索引，服务器推送 list_changed 或版本号变化时整体失效
+        self._tools_cache: Dict[Optional[str], List[Tool]] = {}
+        self._tools_index: Dict[Optional[str], Dict[str, Tool]] = {}
+        self._tools_cached_at: Dict[Optional[str], float] = {}
+        self._tools_generation = 0
+        self._tools_cache_ttl = ttl
+        # 最近一次响应中服务器报告的工具注册表版本（HTTP 传输），None 表示服务器未提供
+        self._tools_version: Optional[str] = None
+        # 服务器拒绝过 JSON-RPC 批量请求后改用并发流水线请求
+        self._batch_unsupported = False
     
-    async def _ensure_connected(self):
-        """确保客户端已连接和初始化"""
-        if not self.is_connected:
-            await self.connect()
-        if not self.is_initialized:
-            await self.initialize()
+    def invalidate_tools_cache(self) -> None:
+        """清空所有 role 的工具缓存"""
+        self._tools_generation += 1
+        self._tools_cache.clear()
+        self._tools_index.clear()
+        self._tools_cached_at.clear()
+    
+    def _observe_tools_version(self, version: Optional[str]) -> None:
+        """记录服务器报告的工具版本号，与上次不同时清空工具缓存"""
+        if version is None:
+            return
+        if self._tools_version is not None and version != self._tools_version:
+            self.invalidate_tools_cache()
+        self._tools_version = version
+    
+    def _tools_cache_fresh(self, role: Optional[str]) -> bool:
+        """判断 role 的工具缓存是否存在且未超过 TTL"""
+        if role not in self._tools_cache:
+            return False
+        if self._tools_cache_ttl is None:
+            return True
+        return time.monotonic() - self._tools_cached_at[role] < self._tools_cache_ttl
     
     async def list_tools(self, force_refresh: bool = False, role: Optional[str] = None) -> List[Tool]:
         """
@@ -71,6 +99,7 @@ class ToolsClient(EnhancedMCPStdioClient):
         
         Args:
             force_refresh: 是否强制刷新缓存
+            role: 角色过滤（可选），不同角色的结果分别缓存
             
         Returns:
             List[Tool]: 工具列表
@@ -81,9 +110,10 @@ class ToolsClient(EnhancedMCPStdioClient):
         await self._ensure_connected()
         
         # 使用缓存（除非强制刷新）
-        if self._tools_cache is not None and not force_refresh:
-            return self._tools_cache
+        if not force_refresh and self._tools_cache_fresh(role):
+            return self._tools_cache[role]
         
+        generation = self._tools_generation
         params = {}
         if role:
             params["role"] = role
@@ -101,12 +131,16 @@ class ToolsClient(EnhancedMCPStdioClient):
             tool = Tool(
                 name=tool_data.get("name", ""),
                 description=tool_data.get("description", ""),
-                input_schema=tool_data.get("inputSchema", {})
+                # 框架服务器使用 input_schema，标准 MCP 使用 inputSchema
+                input_schema=tool_data.get("inputSchema") or tool_data.get("input_schema") or {}
             )
             tools.append(tool)
         
-        # 缓存结果
-        self._tools_cache = tools
+        # 请求期间收到 list_changed 通知时结果可能已过期，只返回不缓存
+        if generation == self._tools_generation:
+            self._tools_cache[role] = tools
+            self._tools_index[role] = {tool.name: tool for tool in tools}
+            self._tools_cached_at[role] = time.monotonic()
         return tools
     
     async def get_tool(self, tool_name: str, role: Optional[str] = None) -> Optional[Tool]:
@@ -115,25 +149,28 @@ class ToolsClient(EnhancedMCPStdioClient):
         
         Args:
             tool_name: 工具名称
+            role: 角色过滤（可选）
             
         Returns:
             Optional[Tool]: 工具对象，如果不存在则返回 None
         """
         tools = await self.list_tools(role=role)
-        
-        for tool in tools:
-            if tool.name == tool_name:
-                return tool
-        
-        return None
+        index = self._tools_index.get(role)
+        if index is None:
+            index = {tool.name: tool for tool in tools}
+        return index.get(tool_name)
     
-    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any],
+                        idempotency_key: Optional[str] = None,
+                        priority: Optional[str] = None) -> Dict[str, Any]:
         """
         调用指定工具
         
         Args:
             tool_name: 工具名称
             arguments: 工具参数
+            idempotency_key: 幂等键，超时后用同一个键重试不会重复执行工具
+            priority: 优先级类别（interactive / default / bulk），None 使用工具的默认优先级
             
         Returns:
             Dict[str, Any]: 工具执行结果
@@ -147,6 +184,10 @@ class ToolsClient(EnhancedMCPStdioClient):
             "name": tool_name,
             "arguments": arguments
         }
+        if idempotency_key:
+            params["idempotencyKey"] = idempotency_key
+        if priority:
+            params["priority"] = priority
         
         response = await self.send_request("tools/call", params)
         
@@ -178,161 +219,222 @@ class ToolsClient(EnhancedMCPStdioClient):
         tools = await self.list_tools(role=role)
         return [tool.name for tool in tools]
     
-    async def call_tool_stream(self, tool_name: str, arguments: Dict[str, Any]) -> AsyncGenerator[str, None]:
+    async def call_many(self,
+                        tool_name: str,
+                        arguments_list: Iterable[Dict[str, Any]],
+                        concurrency: int = 10,
+                        batch_size: int = 50) -> AsyncGenerator[BatchResult, None]:
         """
-        流式调用指定工具
+        用多组参数调用同一个工具，按完成顺序产出结果
         
         Args:
             tool_name: 工具名称
-            arguments: 工具参数
+            arguments_list: 参数列表，每项为一次调用的参数
+            concurrency: 同时进行的请求（或批量请求）数量
+            batch_size: 支持批量请求时每个批次包含的调用数
             
         Yields:
-            str: 流式输出的内容块
+            BatchResult: 单个调用的结果，index 为其在 arguments_list 中的位置
+        """
+        calls = [(tool_name, arguments) for arguments in arguments_list]
+        async for result in self.call_batch(calls, concurrency=concurrency, batch_size=batch_size):
+            yield result
+    
+    async def call_batch(self,
+                         calls: Iterable[Tuple[str, Dict[str, Any]]],
+                         concurrency: int = 10,
+                         batch_size: int = 50) -> AsyncGenerator[BatchResult, None]:
+        """
+        批量调用多个工具，按完成顺序产出结果
+        
+        客户端支持 JSON-RPC 批量请求（send_batch）时按 batch_size 分批发送，
+        否则在同一连接上并发发送单个请求。单个调用失败只体现在对应结果的 error 中，
+        不会中断其他调用；提前停止迭代会取消尚未完成的请求。
+        
+        Args:
+            calls: (工具名称, 参数) 列表
+            concurrency: 同时进行的请求（或批量请求）数量
+            batch_size: 支持批量请求时每个批次包含的调用数
             
-        Raises:
-            Exception: 工具调用失败
+        Yields:
+            BatchResult: 单个调用的结果，index 为其在 calls 中的位置
         """
+        items = [(index, name, arguments) for index, (name, arguments) in enumerate(calls)]
+        if not items:
+            return
         await self._ensure_connected()
         
-        params = {
-            "name": tool_name,
-            "arguments": arguments,
-            "stream": True  # 标记为流式请求
-        }
+        if hasattr(self, "send_batch") and not self._batch_unsupported:
+            groups = [items[i:i + max(1, batch_size)] for i in range(0, len(items), max(1, batch_size))]
+        else:
+            groups = [[item] for item in items]
         
-        # 发送流式请求
-        request = {
-            "jsonrpc": "2.0",
-            "method": "tools/call",
-            "id": self.get_next_id(),
-            "params": params
-        }
+        results: asyncio.Queue = asyncio.Queue()
+        semaphore = asyncio.Semaphore(max(1, concurrency))
         
-        request_json = json.dumps(request) + "\n"
+        async def run_group(group):
+            async with semaphore:
+                for result in await self._call_group(group):
+                    results.put_nowait(result)
         
+        tasks = [asyncio.create_task(run_group(group)) for group in groups]
         try:
-            # 检查进程状态
-            if self.process.returncode is not None:
-                raise Exception(f"服务器进程已退出，返回码: {self.process.returncode}")
+            for _ in range(len(items)):
+                yield await results.get()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    async def _call_group(self, group: List[Tuple[int, str, Dict[str, Any]]]) -> List[BatchResult]:
+        """执行一组调用：多于一个时使用批量请求，结果中的错误按调用分别记录"""
+        if len(group) > 1 and not self._batch_unsupported:
+            try:
+                responses = await self.send_batch(
+                    [("tools/call", {"name": name, "arguments": arguments}) for _, name, arguments in group]
+                )
+            except MCPBatchNotSupportedError:
+                self._batch_unsupported = True
+            except Exception as e:
+                return [BatchResult(index, name, arguments, error=e) for index, name, arguments in group]
+            else:
+                return [
+                    BatchResult(index, name, arguments, error=Exception(f"工具调用失败: {response['error']}"))
+                    if "error" in response else
+                    BatchResult(index, name, arguments, result=response.get("result", {}))
+                    for (index, name, arguments), response in zip(group, responses)
+                ]
+        
+        # 单个调用或服务器不支持批量请求：在同一连接上并发发送
+        return list(await asyncio.gather(*(self._call_one(*item) for item in group)))
+    
+    async def _call_one(self, index: int, tool_name: str, arguments: Dict[str, Any]) -> BatchResult:
+        """执行单个调用并把异常记录到结果中"""
+        try:
+            return BatchResult(index, tool_name, arguments, result=await self.call_tool(tool_name, arguments))
+        except Exception as e:
+            return BatchResult(index, tool_name, arguments, error=e)
+    
+    async def run_pipeline(self,
+                           nodes: List[Dict[str, Any]],
+                           outputs: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        在服务器端执行工具调用 DAG（tools/pipeline），整个流水线只需一次往返
+        
+        Args:
+            nodes: 节点列表，每项包含 id、tool、arguments 以及可选的 depends_on；
+                参数中的 "$.节点id.字段[0]" 形式的字符串会替换为上游节点结果
+            outputs: 需要返回的节点 id 或引用，None 时返回没有下游的节点
             
-            # 发送请求
-            self.process.stdin.write(request_json.encode())
-            await self.process.stdin.drain()
+        Returns:
+            Dict[str, Any]: status、outputs、每个节点的状态和耗时（nodes）以及 duration_ms
             
-            # 读取流式响应
-            async for chunk in self._read_stream_response():
-                yield chunk
-                
-        except Exception as e:
-            raise Exception(f"流式工具调用失败: {e}")
+        Raises:
+            Exception: 流水线定义无效或请求失败
+        """
+        await self._ensure_connected()
+        
+        params: Dict[str, Any] = {"nodes": nodes}
+        if outputs is not None:
+            params["outputs"] = outputs
+        
+        response = await self.send_request("tools/pipeline", params)
+        
+        if "error" in response:
+            raise Exception(f"流水线执行失败: {response['error']}")
+        
+        return response.get("result", {})
     
-    async def _read_stream_response(self) -> AsyncGenerator[str, None]:
+    # ==================== 异步任务 ====================
+    
+    async def submit_job(self, tool_name: str, arguments: Dict[str, Any],
+                         idempotency_key: Optional[str] = None) -> str:
         """
-        读取流式响应
+        以异步任务模式调用工具，立即返回任务 id
         
-        Yields:
-            str: 流式内容块
+        任务在服务器后台执行，结果持久化保存，断线重连后仍可获取。
+        
+        Args:
+            tool_name: 工具名称
+            arguments: 工具参数
+            idempotency_key: 幂等键，重复提交时返回同一个任务
+            
+        Returns:
+            str: 任务 id
         """
-        while True:
-            try:
-                # 读取一行响应
-                response_line = await asyncio.wait_for(
-                    self.process.stdout.readline(),
-                    timeout=30.0
-                )
-                
-                if not response_line:
-                    break
-                
-                line_text = response_line.decode().strip()
-                
-                if not line_text:
-                    continue
-                
-                # 跳过非JSON行（如日志输出）
-                if (line_text.startswith('✅') or 
-                    line_text.startswith('📂') or 
-                    line_text.startswith('🔍') or 
-                    line_text.startswith('❌') or 
-                    line_text.startswith('🔧') or 
-                    line_text.startswith('🚀') or 
-                    line_text.startswith('🎯') or 
-                    line_text.startswith('🛠️') or 
-                    line_text.startswith('📁') or 
-                    line_text.startswith('📡') or 
-                    line_text.startswith('👋') or
-                    not line_text.startswith('{')):
-                    continue
-                
-                try:
-                    response = json.loads(line_text)
-                    
-                    # 检查是否是有效的JSON-RPC响应
-                    if not isinstance(response, dict) or 'jsonrpc' not in response:
-                        continue
-                    
-                    # 检查是否有错误
-                    if "error" in response:
-                        raise Exception(f"流式调用错误: {response['error']}")
-                    
-                    # 处理不同类型的流式响应
-                    method = response.get("method", "")
-                    
-                    # 处理流式数据块
-                    if method == "stream/chunk":
-                        params = response.get("params", {})
-                        chunk = params.get("chunk", {})
-                        content = chunk.get("content", "")
-                        if content:
-                            yield content
-                    
-                    # 处理流结束标记
-                    elif method == "stream/end":
-                        break
-                    
-                    # 处理流错误
-                    elif method == "stream/error":
-                        params = response.get("params", {})
-                        error_msg = params.get("error", "未知流式错误")
-                        raise Exception(f"流式调用错误: {error_msg}")
-                    
-                    # 兼容标准JSON-RPC响应格式
-                    elif "result" in response:
-                        result = response.get("result", {})
-                        
-                        # 检查是否是流结束标记
-                        if result.get("type") == "stream_end":
-                            break
-                        
-                        # 提取内容
-                        if result.get("type") == "tool_result_chunk":
-                            content = result.get("content", "")
-                            if content:
-                                yield content
-                        elif "content" in result:
-                            # 兼容其他格式
-                            yield str(result["content"])
-                        
-                except json.JSONDecodeError:
-                    continue
-                    
-            except asyncio.TimeoutError:
-                break
-            except Exception as e:
-                raise Exception(f"读取流式响应失败: {e}")
-
-    async def validate_tool_arguments(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        await self._ensure_connected()
+        params = {"name": tool_name, "arguments": arguments, "async": True}
+        if idempotency_key:
+            params["idempotencyKey"] = idempotency_key
+        response = await self.send_request("tools/call", params)
+        if "error" in response:
+            raise Exception(f"提交任务失败: {response['error']}")
+        return response.get("result", {}).get("job_id")
+    
+    async def get_job(self, job_id: str) -> Dict[str, Any]:
+        """
+        获取任务状态，任务成功结束时包含 result，失败时包含 error
+        
+        Args:
+            job_id: 任务 id
+            
+        Returns:
+            Dict[str, Any]: 任务信息
+        """
+        await self._ensure_connected()
+        response = await self.send_request("jobs/get", {"job_id": job_id})
+        if "error" in response:
+            raise Exception(f"获取任务失败: {response['error']}")
+        return response.get("result", {})
+    
+    async def cancel_job(self, job_id: str) -> Dict[str, Any]:
+        """
+        取消排队中或运行中的任务
+        
+        Args:
+            job_id: 任务 id
+            
+        Returns:
+            Dict[str, Any]: job_id 和取消后的状态
+        """
+        await self._ensure_connected()
+        response = await self.send_request("jobs/cancel", {"job_id": job_id})
+        if "error" in response:
+            raise Exception(f"取消任务失败: {response['error']}")
+        return response.get("result", {})
+    
+    @staticmethod
+    def _check_job_finished(status: Dict[str, Any]) -> None:
+        """任务以失败或取消结束时抛出异常"""
+        if status.get("status") == "failed":
+            raise Exception(f"任务执行失败: {status.get('error', '未知错误')}")
+        if status.get("status") == "cancelled":
+            raise Exception("任务已取消")
+    
+    @staticmethod
+    def _batch_result_from_item(tool_name: str, arguments_list: List[Dict[str, Any]],
+                                item: Dict[str, Any]) -> BatchResult:
+        """将服务器端批量调用（tools/call_many）返回的单项结果转换为 BatchResult"""
+        index = item.get("index", -1)
+        arguments = arguments_list[index] if 0 <= index < len(arguments_list) else {}
+        if "error" in item:
+            return BatchResult(index, tool_name, arguments, error=Exception(f"工具调用失败: {item['error']}"))
+        return BatchResult(index, tool_name, arguments, result=item.get("result", {}))
+    
+    async def validate_tool_arguments(self, tool_name: str, arguments: Dict[str, Any],
+                                      role: Optional[str] = None) -> Dict[str, Any]:
         """
         验证工具参数（基于工具的输入模式）
         
         Args:
             tool_name: 工具名称
             arguments: 要验证的参数
+            role: 角色过滤（可选）
             
         Returns:
             Dict[str, Any]: 验证结果，包含 valid 字段和可能的错误信息
         """
-        tool = await self.get_tool(tool_name)
+        tool = await self.get_tool(tool_name, role=role)
         
         if not tool:
             return {
@@ -374,6 +476,205 @@ class ToolsClient(EnhancedMCPStdioClient):
         }
 
 
+class ToolsClient(ToolOperations, ConfigOperations, EnhancedMCPStdioClient):
+    """MCP 工具调用客户端（同一连接也提供配置管理方法）"""
+    
+    def __init__(self, 
+                 server_script: str,
+                 alias: Optional[str] = None,
+                 config_dir: Optional[str] = None,
+                 server_args: Optional[List[str]] = None,
+                 client_name: str = "mcp-framework-client",
+                 client_version: str = "1.0.0",
+                 startup_timeout: float = 5.0,
+                 response_timeout: float = 30.0,
+                 **kwargs):
+        """
+        初始化 MCP 工具调用客户端
+        
+        Args:
+            server_script: 服务器脚本路径
+            alias: 服务器别名（重要参数，用于多实例管理）
+            config_dir: 自定义配置目录路径（可选）
+            server_args: 额外的服务器参数
+            client_name: 客户端名称
+            client_version: 客户端版本
+            startup_timeout: 启动超时时间（秒）
+            response_timeout: 响应超时时间（秒）
+            **kwargs: 传递给底层客户端的其他参数（如 stderr_buffer_size、stderr_log_level）
+        """
+        super().__init__(
+            server_script=server_script,
+            alias=alias,
+            config_dir=config_dir,
+            server_args=server_args,
+            client_name=client_name,
+            client_version=client_version,
+            startup_timeout=startup_timeout,
+            response_timeout=response_timeout,
+            **kwargs
+        )
+        self._init_tool_cache()
+    
+    def _handle_notification(self, message: Dict[str, Any]) -> None:
+        """处理服务器通知：工具列表变更时清空缓存"""
+        if message.get("method") == "notifications/tools/list_changed":
+            self.invalidate_tools_cache()
+            return
+        super()._handle_notification(message)
+    
+    async def _ensure_connected(self):
+        """确保客户端已连接和初始化"""
+        if not self.is_connected:
+            await self.connect()
+        if not self.is_initialized:
+            await self.initialize()
+    
+    async def call_tool_stream(self, tool_name: str, arguments: Dict[str, Any]) -> AsyncGenerator[str, None]:
+        """
+        流式调用指定工具
+        
+        Args:
+            tool_name: 工具名称
+            arguments: 工具参数
+            
+        Yields:
+            str: 流式输出的内容块
+            
+        Raises:
+            Exception: 工具调用失败
+        """
+        await self._ensure_connected()
+        
+        params = {
+            "name": tool_name,
+            "arguments": arguments,
+            "stream": True  # 标记为流式请求
+        }
+        
+        try:
+            async for message in self.stream_request("tools/call", params):
+                for content in self._extract_stream_content(message):
+                    yield content
+        except Exception as e:
+            raise Exception(f"流式工具调用失败: {e}")
+    
+    async def call_tool_many(self,
+                             tool_name: str,
+                             arguments_list: Iterable[Dict[str, Any]],
+                             concurrency: Optional[int] = None,
+                             priority: Optional[str] = None) -> AsyncGenerator[BatchResult, None]:
+        """
+        由服务器端执行批量调用（tools/call_many），按完成顺序产出结果
+        
+        与 call_many 不同，整个批次只发送一个请求，由服务器在自身的并发上限内调度。
+        
+        Args:
+            tool_name: 工具名称
+            arguments_list: 参数列表，每项为一次调用的参数
+            concurrency: 期望的服务器端并发数，None 使用服务器默认值
+            priority: 优先级类别，None 使用工具的默认优先级
+            
+        Yields:
+            BatchResult: 单个调用的结果，失败的调用通过 error 属性体现
+        """
+        await self._ensure_connected()
+        
+        arguments_list = list(arguments_list)
+        params = {
+            "name": tool_name,
+            "arguments_list": arguments_list
+        }
+        if concurrency:
+            params["concurrency"] = concurrency
+        if priority:
+            params["priority"] = priority
+        
+        async for message in self.stream_request("tools/call_many", params):
+            method = message.get("method")
+            if method == "stream/chunk":
+                chunk = message.get("params", {}).get("chunk", {})
+                if chunk.get("type") == "tool_call_result":
+                    yield self._batch_result_from_item(tool_name, arguments_list, chunk)
+            elif method == "stream/error":
+                raise Exception(f"批量工具调用失败: {message.get('params', {}).get('error', '未知错误')}")
+            elif "error" in message:
+                raise Exception(f"批量工具调用失败: {message['error']}")
+    
+    async def stream_job(self, job_id: str, after: int = 0) -> AsyncGenerator[str, None]:
+        """
+        获取异步任务的流式输出，直到任务结束
+        
+        Args:
+            job_id: 任务 id
+            after: 已收到的最后一个块的序号，断线重连时从该位置继续
+            
+        Yields:
+            str: 输出块
+            
+        Raises:
+            Exception: 任务失败或被取消
+        """
+        await self._ensure_connected()
+        
+        async for message in self.stream_request("jobs/stream", {"job_id": job_id, "after": after}):
+            method = message.get("method")
+            if method == "stream/chunk":
+                chunk = message.get("params", {}).get("chunk", {})
+                if chunk.get("type") == "job_chunk":
+                    yield chunk.get("content", "")
+                elif chunk.get("type") == "job_status":
+                    self._check_job_finished(chunk)
+            elif method == "stream/error":
+                raise Exception(f"获取任务输出失败: {message.get('params', {}).get('error', '未知错误')}")
+            elif "error" in message:
+                raise Exception(f"获取任务输出失败: {message['error']}")
+    
+    def _extract_stream_content(self, response: Dict[str, Any]) -> List[str]:
+        """
+        从单条流式消息中提取内容块
+        
+        Args:
+            response: 属于当前流式请求的消息
+            
+        Returns:
+            List[str]: 内容块列表（可能为空）
+        """
+        # 检查是否有错误
+        if "error" in response:
+            raise Exception(f"流式调用错误: {response['error']}")
+        
+        # 处理不同类型的流式响应
+        method = response.get("method", "")
+        
+        # 处理流式数据块
+        if method == "stream/chunk":
+            params = response.get("params", {})
+            chunk = params.get("chunk", {})
+            content = chunk.get("content", "")
+            return [content] if content else []
+        
+        # 处理流错误
+        if method == "stream/error":
+            params = response.get("params", {})
+            error_msg = params.get("error", "未知流式错误")
+            raise Exception(f"流式调用错误: {error_msg}")
+        
+        # 兼容标准JSON-RPC响应格式
+        if "result" in response:
+            result = response.get("result", {})
+            
+            # 提取内容
+            if result.get("type") == "tool_result_chunk":
+                content = result.get("content", "")
+                return [content] if content else []
+            elif "content" in result and result.get("type") != "stream_end":
+                # 兼容其他格式
+                return [str(result["content"])]
+        
+        return []
+
+
 # 便捷函数
 async def list_server_tools(server_script: str, 
                            alias: Optional[str] = None,
@@ -4,18 +4,30 @@ MCP 框架基础类定义
 """
 
 import logging
+import os
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any, Optional, AsyncGenerator, Callable, Set
+from typing import Dict, List, Any, Optional, AsyncGenerator, Awaitable, Callable, Iterable, Set, Tuple
 from dataclasses import dataclass
 import inspect
 import asyncio
 import uuid
-import sys
 
-from .config import ServerParameter, ServerConfigManager
+from .config import ServerConfig, ServerParameter, ServerConfigManager
 from .utils import get_data_dir
 from .streaming import MCPStreamWrapper, OpenAIStreamFormatter
-
+from .pipeline import ToolPipeline
+from .jobs import JobManager, JobStore
+from .idempotency import IdempotencyStore
+from .scheduler import ToolScheduler, ToolSlot, DEFAULT_PRIORITY, DEFAULT_PRIORITY_WEIGHTS
+from .limiter import AdaptiveLimiter
+from .loop_monitor import LoopMonitor
+from .metrics import PrometheusWriter, ServerMetrics, ToolMetrics, render_prometheus, request_bytes
+from .tracing import Tracer, tracing_active
+from .profiling import Profiler, SamplingProfiler
+from .gc_monitor import GCMonitor, tune_gc
+
+# HTTP 响应头：携带服务器当前的工具注册表版本，HTTP 客户端据此判断工具缓存是否过期
+TOOLS_VERSION_HEADER = "Mcp-Tools-Version"
 
 class BaseMCPServer(ABC):
     """MCP 服务器基类"""
@@ -49,6 +61,65 @@ class BaseMCPServer(ABC):
         # 配置更新回调机制
         self._config_update_callbacks: List[Callable[[Dict[str, Any], Dict[str, Any]], None]] = []
         
+        # 工具注册表版本：工具增删改时递增，并通知回调（传输层据此推送 list_changed 通知）
+        self.tools_version = 0
+        self._tools_changed_callbacks: List[Callable[[int], None]] = []
+        # 工具名 -> 注册时指定的默认优先级，供每次调用时查找（在 add_tool / remove_tool 中维护）
+        self._tool_priorities: Dict[str, str] = {}
+        
+        # tools/call_many 单次请求内同时执行的调用数上限
+        self.fanout_concurrency = 16
+        
+        # 批量工具（batch_tool）的调用合并器，按工具名索引
+        self._batchers: Dict[str, Any] = {}
+        
+        # 异步任务模式：同时执行的任务数上限，任务管理器在首次使用时创建
+        self.job_workers = 4
+        self._job_manager: Optional[JobManager] = None
+        
+        # 幂等键：结果保留时间（秒），以及是否持久化到数据目录
+        self.idempotency_ttl = 300.0
+        self.idempotency_persist = False
+        self._idempotency_store: Optional[IdempotencyStore] = None
+        
+        # 工具执行调度：同时执行的调用数上限和各优先级类别的权重
+        self.tool_concurrency = 64
+        self.priority_weights: Dict[str, float] = dict(DEFAULT_PRIORITY_WEIGHTS)
+        self._scheduler: Optional[ToolScheduler] = None
+        
+        # 自适应并发限制（可选）：按工具根据延迟和错误率调整并发上限，超出时快速失败
+        self.adaptive_concurrency = False
+        self.adaptive_limit_options: Dict[str, Any] = {}
+        self._limiters: Dict[str, AdaptiveLimiter] = {}
+        
+        # 事件循环延迟监控：循环停顿超过阈值时记录调用栈并归属到正在执行的工具
+        self.loop_monitor_enabled = True
+        self.slow_handler_threshold_ms = 100.0
+        self._loop_monitor: Optional[LoopMonitor] = None
+        
+        # 按工具的调用指标（调用数、错误、并发、延迟、字节数、流式输出块）
+        self.instrumentation_enabled = True
+        self.metrics = ServerMetrics()
+        
+        # 请求追踪：按采样率写入数据目录下的 Chrome trace-event 文件（默认关闭）
+        self.trace_sample_rate = float(os.environ.get('MCP_TRACE_SAMPLE_RATE', 0) or 0)
+        self.trace_max_bytes = 20 * 1024 * 1024
+        self.trace_backup_count = 3
+        self._tracer: Optional[Tracer] = None
+        
+        # 按需 CPU / 内存剖析（只在采集窗口内开启）
+        self.profiler = Profiler()
+        
+        # 常驻采样剖析器：约 100 Hz 采样所有线程，按窗口写入 data_dir/profiles（默认关闭）
+        self.sampling_profiler_enabled = os.environ.get('MCP_SAMPLING_PROFILER', '').lower() in ('1', 'true', 'yes')
+        self.sampling_profiler_interval = 0.01
+        self.sampling_profiler_window = 60.0
+        self._sampling_profiler: Optional[SamplingProfiler] = None
+        
+        # GC 停顿和内存监控；启用与调优由 ServerConfig 的 gc_* 字段控制
+        self.gc_slow_pause_ms = 10.0
+        self._gc_monitor: Optional[GCMonitor] = None
+        
         # OpenAI 格式流式包装器
         self._openai_stream_wrapper = MCPStreamWrapper(model_name=f"{name}-{version}")
         self._enable_openai_format = True  # 默认启用OpenAI格式
@@ -132,14 +203,14 @@ class BaseMCPServer(ABC):
         session_id = str(uuid.uuid4())
         self._streaming_sessions.add(session_id)
         self._session_stop_flags[session_id] = False
-        self.logger.debug(f"Started streaming session: {session_id}")
+        self.logger.debug("Started streaming session: %s", session_id)
         return session_id
 
     def stop_streaming_session(self, session_id: str) -> bool:
         """停止指定的流式会话"""
         if session_id in self._streaming_sessions:
             self._session_stop_flags[session_id] = True
-            self.logger.info(f"Stopped streaming session: {session_id}")
+            self.logger.info("Stopped streaming session: %s", session_id)
             return True
         return False
 
@@ -172,7 +243,7 @@ class BaseMCPServer(ABC):
         """清理流式会话"""
         self._streaming_sessions.discard(session_id)
         self._session_stop_flags.pop(session_id, None)
-        self.logger.debug(f"Cleaned up streaming session: {session_id}")
+        self.logger.debug("Cleaned up streaming session: %s", session_id)
 
     def get_active_streaming_sessions(self) -> List[str]:
         """获取所有活跃的流式会话ID"""
@@ -198,7 +269,7 @@ class BaseMCPServer(ABC):
                 async for chunk in self._handle_streaming_tool_call(tool_name, arguments, session_id):
                     # 检查是否应该停止
                     if self.is_streaming_stopped(session_id):
-                        self.logger.info(f"Streaming stopped for session {session_id}")
+                        self.logger.info("Streaming stopped for session %s", session_id)
                         break
                     yield chunk
             else:
@@ -207,7 +278,7 @@ class BaseMCPServer(ABC):
                 async for chunk in self._auto_chunk_result(result, tool_name, session_id):
                     # 检查是否应该停止
                     if self.is_streaming_stopped(session_id):
-                        self.logger.info(f"Streaming stopped for session {session_id}")
+                        self.logger.info("Streaming stopped for session %s", session_id)
                         break
                     yield chunk
         finally:
@@ -275,43 +346,32 @@ class BaseMCPServer(ABC):
         """
         import json
 
-        # 添加调试日志
-        self.logger.debug(f"_normalize_stream_chunk received: {type(chunk)} - {chunk}")
-
         # 如果chunk是字典类型，保持其结构化格式
         if isinstance(chunk, dict):
-            result = json.dumps(chunk, ensure_ascii=False)
-            self.logger.debug(f"_normalize_stream_chunk returning dict as JSON: {result}")
-            return result
-
+            how, result = "dict as JSON", json.dumps(chunk, ensure_ascii=False)
         # 确保chunk是字符串格式，不是JSON
-        if isinstance(chunk, str) and not chunk.startswith('{'):
-            self.logger.debug(f"_normalize_stream_chunk returning plain string: {chunk}")
-            return chunk
+        elif isinstance(chunk, str) and not chunk.startswith('{'):
+            how, result = "plain string", chunk
         else:
             # 如果是JSON格式，尝试解析并提取内容
             try:
                 data = json.loads(chunk) if isinstance(chunk, str) else chunk
                 if isinstance(data, dict) and 'content' in data:
-                    result = data['content']
-                    self.logger.debug(f"_normalize_stream_chunk extracted content: {result}")
-                    return result
+                    how, result = "extracted content", data['content']
                 elif isinstance(data, dict) and 'data' in data:
-                    result = str(data['data'])
-                    self.logger.debug(f"_normalize_stream_chunk extracted data: {result}")
-                    return result
+                    how, result = "extracted data", str(data['data'])
                 elif isinstance(data, dict) and 'ai_stream_chunk' in data:
-                    result = str(data['ai_stream_chunk'])
-                    self.logger.debug(f"_normalize_stream_chunk extracted ai_stream_chunk: {result}")
-                    return result
+                    how, result = "extracted ai_stream_chunk", str(data['ai_stream_chunk'])
                 else:
+                    how = "fallback"
                     result = json.dumps(data, ensure_ascii=False) if isinstance(data, dict) else str(chunk)
-                    self.logger.debug(f"_normalize_stream_chunk fallback: {result}")
-                    return result
             except Exception as e:
-                result = str(chunk)
-                self.logger.debug(f"_normalize_stream_chunk exception {e}, returning: {result}")
-                return result
+                how, result = f"exception {e}", str(chunk)
+
+        # 每个数据块都会调用：调试日志关闭时不做任何格式化
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("_normalize_stream_chunk %s (%s): %s", how, type(chunk).__name__, result)
+        return result
 
     async def _handle_stream_error(self, tool_name: str, error: Exception) -> str:
         """
@@ -332,6 +392,348 @@ class BaseMCPServer(ABC):
         """所有工具都支持流式输出（统一架构）"""
         return True
 
+    def _get_tool_invoker(self, tool_name: str) -> Callable[[Dict[str, Any]], Awaitable[Any]]:
+        """
+        返回调用指定工具的协程函数，子类可以重写以预先解析处理函数和参数校验
+
+        Args:
+            tool_name: 工具名称
+
+        Returns:
+            Callable: 接收参数字典并返回工具结果的协程函数
+        """
+        async def invoke(arguments: Dict[str, Any]) -> Any:
+            return await self.handle_tool_call(tool_name, arguments)
+        return invoke
+
+    async def handle_tool_call_many(self, tool_name: str, arguments_list: Iterable[Dict[str, Any]],
+                                    concurrency: Optional[int] = None, priority: Optional[str] = None,
+                                    session: str = "default") -> \
+    AsyncGenerator[Tuple[int, Any, Optional[Exception]], None]:
+        """
+        用多组参数调用同一个工具，按完成顺序产出结果
+
+        工具只解析一次，所有调用共享同一个调用函数；同时执行的调用数不超过
+        fanout_concurrency。单个调用失败不影响其他调用，提前停止迭代会取消未完成的调用。
+
+        Args:
+            tool_name: 工具名称
+            arguments_list: 参数列表，每项为一次调用的参数
+            concurrency: 请求方期望的并发数，不会超过 fanout_concurrency
+            priority: 优先级类别，None 使用工具的默认优先级
+            session: 客户端会话标识
+
+        Yields:
+            Tuple[int, Any, Optional[Exception]]: (参数在列表中的位置, 工具结果, 异常)
+        """
+        arguments_list = list(arguments_list)
+        if not arguments_list:
+            return
+        invoke = self._get_tool_invoker(tool_name)
+        priority = self.tool_priority(tool_name, priority)
+
+        limit = max(1, self.fanout_concurrency)
+        if concurrency:
+            limit = max(1, min(int(concurrency), limit))
+        semaphore = asyncio.Semaphore(limit)
+        results: asyncio.Queue = asyncio.Queue()
+
+        async def run_one(index: int, arguments: Dict[str, Any]) -> None:
+            async with semaphore:
+                try:
+                    if not isinstance(arguments, dict):
+                        raise TypeError(f"Tool '{tool_name}' arguments must be an object, got {type(arguments).__name__}")
+                    async with self.tool_slot(tool_name, priority, session):
+                        result = await invoke(arguments)
+                    results.put_nowait((index, result, None))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    results.put_nowait((index, None, e))
+
+        tasks = [asyncio.create_task(run_one(index, arguments)) for index, arguments in enumerate(arguments_list)]
+        try:
+            for _ in range(len(tasks)):
+                yield await results.get()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    @property
+    def scheduler(self) -> ToolScheduler:
+        """工具执行调度器（首次访问时按 tool_concurrency / priority_weights 创建）"""
+        if self._scheduler is None:
+            self._scheduler = ToolScheduler(self.tool_concurrency, self.priority_weights)
+        return self._scheduler
+
+    def tool_priority(self, tool_name: str, requested: Optional[str] = None) -> str:
+        """确定调用的优先级类别：请求指定的优先级优先，其次为工具注册时的默认值"""
+        return requested or self._tool_priorities.get(tool_name) or DEFAULT_PRIORITY
+
+    async def schedule_tool_call(self, tool_name: str, arguments: Dict[str, Any],
+                                 priority: Optional[str] = None, session: str = "default") -> Any:
+        """
+        经调度器执行工具调用：达到 tool_concurrency 上限时按优先级类别加权公平排队
+
+        Args:
+            tool_name: 工具名称
+            arguments: 工具参数
+            priority: 优先级类别（interactive / default / bulk），None 使用工具的默认优先级
+            session: 客户端会话标识，同一类别内按会话轮转
+
+        Returns:
+            Any: 工具结果
+        """
+        async with self.tool_slot(tool_name, priority, session):
+            return await self.handle_tool_call(tool_name, arguments)
+
+    def get_limiter(self, tool_name: str) -> Optional[AdaptiveLimiter]:
+        """返回工具的自适应并发限制器，未启用 adaptive_concurrency 或工具未注册时返回 None"""
+        if not self.adaptive_concurrency:
+            return None
+        limiter = self._limiters.get(tool_name)
+        if limiter is None:
+            # 未知的工具名不创建限制器，避免任意请求留下永久的条目
+            if not any(tool.get('name') == tool_name for tool in self.tools):
+                return None
+            limiter = self._limiters[tool_name] = AdaptiveLimiter(tool_name, **self.adaptive_limit_options)
+        return limiter
+
+    def tool_slot(self, tool_name: str, priority: Optional[str] = None, session: str = "default") -> ToolSlot:
+        """
+        工具调用的准入控制（async with 使用）：先经自适应并发限制（超限立即抛出 ToolOverloadedError），
+        再由调度器分配执行槽位。限制器测量的耗时包含调度排队时间。
+        启用 instrumentation_enabled 时同时记录工具的调用数、错误数、并发数和延迟。
+
+        Args:
+            tool_name: 工具名称
+            priority: 优先级类别，None 使用工具的默认优先级
+            session: 客户端会话标识
+        """
+        # 热路径：工具首次调用后指标对象已存在，之后只做一次字典查找
+        metrics = None
+        if self.instrumentation_enabled:
+            metrics = self.metrics.tools.get(tool_name)
+            if metrics is None:
+                metrics = self._tool_metrics(tool_name)
+        return ToolSlot(self._scheduler or self.scheduler, tool_name, self.tool_priority(tool_name, priority),
+                        session, metrics, self.get_limiter(tool_name) if self.adaptive_concurrency else None,
+                        (self._loop_monitor or self.loop_monitor).track(tool_name), tracing_active())
+
+    def _tool_metrics(self, tool_name: str) -> Optional[ToolMetrics]:
+        """返回工具的指标对象；只为已注册的工具创建，未知的工具名不产生新的指标标签"""
+        metrics = self.metrics.tools.get(tool_name)
+        if metrics is None and any(tool.get('name') == tool_name for tool in self.tools):
+            metrics = self.metrics.tool(tool_name)
+        return metrics
+
+    def get_scheduler_metrics(self) -> Dict[str, Any]:
+        """返回调度器各优先级类别的排队情况和排队等待时间直方图"""
+        return self.scheduler.snapshot()
+
+    @property
+    def loop_monitor(self) -> LoopMonitor:
+        """事件循环监控器（在 startup() 中启动）"""
+        if self._loop_monitor is None:
+            self._loop_monitor = LoopMonitor(slow_threshold_ms=self.slow_handler_threshold_ms)
+        return self._loop_monitor
+
+    def get_loop_metrics(self) -> Dict[str, Any]:
+        """返回事件循环延迟直方图和按工具汇总的慢事件统计"""
+        return self.loop_monitor.snapshot()
+
+    def get_slow_events(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        """返回最近的慢事件（包含停顿时长、所属工具和调用栈）"""
+        return {
+            "slow_threshold_ms": self.loop_monitor.slow_threshold_ms,
+            "events": self.loop_monitor.recent_events(limit)
+        }
+
+    def get_tool_metrics(self) -> Dict[str, Any]:
+        """返回每个工具的调用数、错误数、并发数、延迟直方图、字节数和流式输出块统计"""
+        return self.metrics.snapshot()
+
+    def record_tool_io(self, tool_name: str, result_text: Any = None) -> None:
+        """
+        记录一次工具请求的字节数：请求字节数取自传输层设置的 request_bytes，
+        响应字节数为结果文本的 UTF-8 长度
+
+        Args:
+            tool_name: 工具名称
+            result_text: 返回给客户端的结果文本
+        """
+        if not self.instrumentation_enabled:
+            return
+        metrics = self._tool_metrics(tool_name)
+        if metrics is not None:
+            bytes_out = len(result_text.encode("utf-8")) if isinstance(result_text, str) else 0
+            metrics.add_io(request_bytes.get(), bytes_out)
+
+    def record_stream_chunk(self, tool_name: str, chunk: Any) -> None:
+        """记录工具产生的一个流式输出块"""
+        if self.instrumentation_enabled:
+            metrics = self._tool_metrics(tool_name)
+            if metrics is not None:
+                metrics.add_chunk(chunk)
+
+    def render_prometheus_metrics(self) -> str:
+        """以 Prometheus 文本格式输出工具指标、调度器、并发限制、批量处理和事件循环延迟"""
+        writers = [self.scheduler.write_prometheus, self._write_limiter_prometheus, self._write_batch_prometheus]
+        if self._gc_monitor is not None:
+            writers.append(self._gc_monitor.write_prometheus)
+        return render_prometheus(self.metrics, {"event_loop_lag_ms": self.loop_monitor.lag_ms}, writers)
+
+    def _write_limiter_prometheus(self, writer: PrometheusWriter) -> None:
+        """输出每个工具的自适应并发上限、并发数和拒绝次数"""
+        limiters = list(self._limiters.items())
+        writer.metric("tool_concurrency_limit", "gauge", "Adaptive concurrency limit per tool",
+                      (({"tool": name}, limiter.limit) for name, limiter in limiters))
+        writer.metric("tool_concurrency_inflight", "gauge", "Tool calls admitted by the adaptive limiter",
+                      (({"tool": name}, limiter.inflight) for name, limiter in limiters))
+        writer.metric("tool_concurrency_rejected_total", "counter", "Tool calls rejected by the adaptive limiter",
+                      (({"tool": name}, limiter.rejected) for name, limiter in limiters))
+
+    def _write_batch_prometheus(self, writer: PrometheusWriter) -> None:
+        """输出每个批量工具的批量大小和等待时间直方图"""
+        batchers = list(self._batchers.items())
+        writer.histogram("tool_batch_size", "Calls merged into one batch",
+                         (({"tool": name}, batcher.batch_size) for name, batcher in batchers))
+        writer.histogram("tool_batch_wait_ms", "Time calls waited for their batch in milliseconds",
+                         (({"tool": name}, batcher.wait_ms) for name, batcher in batchers))
+
+    def get_limiter_metrics(self) -> Dict[str, Any]:
+        """返回每个工具当前的自适应并发上限和拒绝次数"""
+        return {
+            "enabled": self.adaptive_concurrency,
+            "tools": {name: limiter.snapshot() for name, limiter in self._limiters.items()}
+        }
+
+    def get_batch_metrics(self) -> Dict[str, Any]:
+        """返回每个批量工具的批量大小和等待时间直方图"""
+        return {name: batcher.snapshot() for name, batcher in self._batchers.items()}
+
+    @property
+    def _file_stem(self) -> str:
+        """由服务器名称生成的安全文件名"""
+        return "".join(c if c.isalnum() or c in "-_" else "_" for c in self.name)
+
+    @property
+    def job_store_path(self):
+        """异步任务数据库路径"""
+        return self.data_dir / "jobs" / f"{self._file_stem}.db"
+
+    @property
+    def tracer(self) -> Tracer:
+        """请求追踪器（追踪文件为 data_dir/traces/<服务器名>.trace.json，可在 Perfetto 中打开）"""
+        if self._tracer is None:
+            self._tracer = Tracer(self.data_dir / "traces" / f"{self._file_stem}.trace.json",
+                                  sample_rate=self.trace_sample_rate, max_bytes=self.trace_max_bytes,
+                                  backup_count=self.trace_backup_count)
+        return self._tracer
+
+    @property
+    def sampling_profiler(self) -> SamplingProfiler:
+        """常驻采样剖析器（窗口文件写入 data_dir/profiles/<服务器名>/，在 startup() 中按配置启动）"""
+        if self._sampling_profiler is None:
+            self._sampling_profiler = SamplingProfiler(self.data_dir / "profiles" / self._file_stem,
+                                                       interval=self.sampling_profiler_interval,
+                                                       window=self.sampling_profiler_window,
+                                                       tool_lookup=self.loop_monitor.tool_for_task)
+        return self._sampling_profiler
+
+    @property
+    def gc_monitor(self) -> GCMonitor:
+        """GC 停顿和内存监控器（在 startup() 中按配置启动）"""
+        if self._gc_monitor is None:
+            self._gc_monitor = GCMonitor(slow_pause_ms=self.gc_slow_pause_ms, inflight_tools=self._inflight_tools)
+        return self._gc_monitor
+
+    def _inflight_tools(self) -> List[str]:
+        return [name for name, metrics in self.metrics.tools.items() if metrics.inflight > 0]
+
+    def get_gc_metrics(self) -> Dict[str, Any]:
+        """返回 GC 停顿统计、最近的慢停顿和内存指标"""
+        if self._gc_monitor is None:
+            return {"running": False}
+        snapshot = self._gc_monitor.snapshot()
+        snapshot["slow_pauses"] = self._gc_monitor.recent_events(10)
+        return snapshot
+
+    def tune_gc(self, thresholds: Optional[List[int]] = None, freeze: bool = False) -> Dict[str, Any]:
+        """
+        调整垃圾回收参数（见 gc_monitor.tune_gc）
+
+        Args:
+            thresholds: 回收阈值，None 表示不修改
+            freeze: 是否 gc.freeze() 当前所有对象
+        """
+        result = tune_gc(thresholds, freeze)
+        self.logger.info(f"GC tuned: {result}")
+        return result
+
+    def get_profiler_metrics(self) -> Dict[str, Any]:
+        """返回常驻采样剖析器的状态"""
+        if self._sampling_profiler is None:
+            return {"running": False}
+        return self._sampling_profiler.snapshot()
+
+    @property
+    def jobs(self) -> JobManager:
+        """异步任务管理器（首次访问时创建 SQLite 存储）"""
+        if self._job_manager is None:
+            self._job_manager = JobManager(self, JobStore(self.job_store_path), max_workers=self.job_workers)
+        return self._job_manager
+
+    def resume_jobs(self) -> None:
+        """存在任务数据库时恢复上次遗留的排队任务（需在事件循环中调用）"""
+        if self._job_manager is not None or self.job_store_path.exists():
+            self.jobs._ensure_workers()
+
+    @property
+    def idempotency(self) -> IdempotencyStore:
+        """幂等键结果存储（首次访问时按 idempotency_ttl / idempotency_persist 创建）"""
+        if self._idempotency_store is None:
+            path = None
+            if self.idempotency_persist:
+                path = self.data_dir / "idempotency" / self.job_store_path.name
+            self._idempotency_store = IdempotencyStore(ttl=self.idempotency_ttl, path=path)
+        return self._idempotency_store
+
+    async def run_idempotent(self, key: Optional[str], scope: str, arguments: Dict[str, Any],
+                             call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        按幂等键执行调用：没有键时直接执行，否则同一个键在 TTL 内只执行一次
+
+        Args:
+            key: 客户端提供的幂等键（idempotencyKey），可以为空
+            scope: 调用范围，例如工具名
+            arguments: 调用参数
+            call: 实际执行调用的协程函数
+
+        Returns:
+            Any: 调用结果
+        """
+        if not key:
+            return await call()
+        return await self.idempotency.run(str(key), scope, arguments, call)
+
+    async def handle_tool_pipeline(self, spec: Dict[str, Any], session: str = "default") -> Dict[str, Any]:
+        """
+        执行工具调用 DAG（tools/pipeline）
+
+        Args:
+            spec: 流水线定义，包含 nodes、可选的 outputs 和 priority，格式见 core.pipeline
+            session: 客户端会话标识
+
+        Returns:
+            Dict[str, Any]: 请求的输出值以及每个节点的状态和耗时
+
+        Raises:
+            ValueError: 流水线定义无效（未知工具、无效引用、存在环等）
+        """
+        return await ToolPipeline(self, spec, session).run()
+
     def configure_server(self, config: Dict[str, Any]) -> bool:
         """配置服务器参数"""
         try:
@@ -510,7 +912,7 @@ class BaseMCPServer(ABC):
             ):
                 # 检查是否应该停止
                 if self.is_streaming_stopped(session_id):
-                    self.logger.info(f"OpenAI streaming stopped for session {session_id}")
+                    self.logger.info("OpenAI streaming stopped for session %s", session_id)
                     break
                 yield openai_chunk
                 
@@ -571,6 +973,50 @@ class BaseMCPServer(ABC):
         else:
             self.tools.append(tool)
             self.logger.info(f"Added tool: {tool.get('name')}")
+        if tool.get('priority'):
+            self._tool_priorities[tool.get('name')] = tool['priority']
+        else:
+            self._tool_priorities.pop(tool.get('name'), None)
+        self._notify_tools_changed()
+
+    @staticmethod
+    def serialize_tool(tool: dict) -> dict:
+        """返回可 JSON 序列化的工具描述（去除 register_tool 保存的处理函数等内部字段）"""
+        return {key: value for key, value in tool.items() if not callable(value)}
+
+    def remove_tool(self, tool_name: str) -> bool:
+        """移除工具，返回是否存在并被移除"""
+        for idx, existing in enumerate(self.tools):
+            if existing.get('name') == tool_name:
+                del self.tools[idx]
+                self._tool_priorities.pop(tool_name, None)
+                self.logger.info(f"Removed tool: {tool_name}")
+                self._notify_tools_changed()
+                return True
+        return False
+
+    def _notify_tools_changed(self) -> None:
+        """递增工具注册表版本并通知所有注册的回调函数"""
+        self.tools_version += 1
+        for callback in self._tools_changed_callbacks:
+            try:
+                callback(self.tools_version)
+            except Exception as e:
+                self.logger.error(f"Error in tools changed callback {callback.__name__}: {e}")
+
+    def register_tools_changed_callback(self, callback: Callable[[int], None]) -> None:
+        """注册工具列表变更回调函数
+        
+        Args:
+            callback: 回调函数，接收变更后的工具注册表版本号
+        """
+        if callback not in self._tools_changed_callbacks:
+            self._tools_changed_callbacks.append(callback)
+
+    def unregister_tools_changed_callback(self, callback: Callable[[int], None]) -> None:
+        """取消注册工具列表变更回调函数"""
+        if callback in self._tools_changed_callbacks:
+            self._tools_changed_callbacks.remove(callback)
 
     def add_resource(self, resource: dict) -> None:
         """添加资源（去重：同 URI 的资源将被替换而不是重复添加）"""
@@ -662,29 +1108,54 @@ class BaseMCPServer(ABC):
             # 检查是否有外部设置的配置管理器，如果有则重新加载配置
             if hasattr(self, 'server_config_manager') and self.server_config_manager is not None:
                 try:
-                    print(f"🔍 检查外部配置管理器: {self.server_config_manager.config_file}", file=sys.stderr)
+                    self.logger.debug(f"检查外部配置管理器: {self.server_config_manager.config_file}")
                     if self.server_config_manager.config_exists():
                         config = self.server_config_manager.load_server_config()
-                        print(f"📂 加载的配置内容: {config}", file=sys.stderr)
+                        self.logger.debug(f"加载的配置内容: {config}")
                         result = self.configure_server(config)
-                        print(f"⚙️ 配置应用结果: {result}", file=sys.stderr)
+                        self.logger.debug(f"配置应用结果: {result}")
                         self.logger.info(f"Reloaded configuration from external config manager: {self.server_config_manager.config_file}")
                     else:
-                        print(f"❌ 配置文件不存在: {self.server_config_manager.config_file}", file=sys.stderr)
+                        self.logger.debug(f"配置文件不存在: {self.server_config_manager.config_file}")
                 except Exception as e:
-                    print(f"❌ 配置加载失败: {e}", file=sys.stderr)
                     self.logger.warning(f"Failed to reload config from external config manager: {e}")
             
             await self.initialize()
             self._initialized = True
             self.logger.info(
                 f"MCP Server '{self.name}' initialized with {len(self.tools)} tools and {len(self.resources)} resources")
+            self.resume_jobs()
+            if self.loop_monitor_enabled:
+                self.loop_monitor.start()
+            if self.sampling_profiler_enabled:
+                self.sampling_profiler.start()
+            
+            gc_config = ServerConfig.from_dict(self.full_config)
+            if gc_config.gc_telemetry:
+                self.gc_monitor.start()
+            if gc_config.gc_thresholds or gc_config.gc_freeze_after_startup:
+                # 放在启动流程最后，启动期间创建的对象全部冻结
+                try:
+                    self.tune_gc(gc_config.gc_thresholds, gc_config.gc_freeze_after_startup)
+                except (TypeError, ValueError) as e:
+                    self.logger.warning(f"Ignoring invalid GC configuration: {e}")
 
     async def shutdown(self) -> None:
         """服务器关闭时调用"""
+        if self._loop_monitor is not None:
+            self._loop_monitor.stop()
+        if self._sampling_profiler is not None:
+            self._sampling_profiler.stop()
+        if self._gc_monitor is not None:
+            self._gc_monitor.stop()
+        if self._tracer is not None:
+            self._tracer.close()
+        if self._job_manager is not None:
+            await self._job_manager.shutdown()
         if self._initialized:
             # 清理资源
             self.tools.clear()
+            self._tool_priorities.clear()
             self.resources.clear()
             self._initialized = False
             self.logger.info(f"MCP Server '{self.name}' shutdown completed")
@@ -723,7 +1194,7 @@ class EnhancedMCPServer(BaseMCPServer):
 
     def register_tool(self, name: str, description: str, input_schema: Dict[str, Any],
                       handler: Callable, chunk_size: int = 100,
-                      stream_handler: Optional[Callable] = None) -> None:
+                      stream_handler: Optional[Callable] = None, priority: Optional[str] = None) -> None:
         """注册工具并绑定处理函数"""
         tool = {
             'name': name,
@@ -733,6 +1204,8 @@ class EnhancedMCPServer(BaseMCPServer):
             'handler': handler,
             'stream_handler': stream_handler
         }
+        if priority is not None:
+            tool['priority'] = priority
 
         self.add_tool(tool)
         self._tool_handlers[name] = handler
@@ -824,6 +1297,39 @@ class EnhancedMCPServer(BaseMCPServer):
             self.logger.error(f"Tool call failed for '{tool_name}': {e}")
             raise
 
+    def _get_tool_invoker(self, tool_name: str) -> Callable[[Dict[str, Any]], Awaitable[Any]]:
+        """预先解析处理函数和 input_schema，批量调用时每个调用只做参数校验和执行"""
+        # 子类重写了 handle_tool_call 时保持其分发逻辑
+        if type(self).handle_tool_call is not EnhancedMCPServer.handle_tool_call:
+            return super()._get_tool_invoker(tool_name)
+
+        if tool_name in self._tool_handlers:
+            handler = self._tool_handlers[tool_name]
+            is_stream = False
+        elif tool_name in self._stream_handlers:
+            handler = self._stream_handlers[tool_name]
+            is_stream = True
+        else:
+            raise ValueError(f"Tool '{tool_name}' not found")
+
+        tool = next((t for t in self.tools if t['name'] == tool_name), None)
+        input_schema = tool.get('input_schema') if tool else None
+        is_coroutine = inspect.iscoroutinefunction(handler)
+
+        async def invoke(arguments: Dict[str, Any]) -> Any:
+            try:
+                if input_schema:
+                    self._validate_arguments(tool_name, arguments, input_schema)
+                if is_stream:
+                    return ''.join([str(chunk) async for chunk in handler(**arguments)])
+                if is_coroutine:
+                    return await handler(**arguments)
+                return handler(**arguments)
+            except Exception as e:
+                self.logger.error(f"Tool call failed for '{tool_name}': {e}")
+                raise
+        return invoke
+
     async def handle_tool_call_stream(self, tool_name: str, arguments: Dict[str, Any], session_id: str = None) -> \
     AsyncGenerator[str, None]:
         """自动分发流式工具调用"""
@@ -841,16 +1347,24 @@ class EnhancedMCPServer(BaseMCPServer):
                 if params and params[0] == 'self':
                     # 调用handler获取async generator
                     async_gen = handler(**arguments)
-                    self.logger.debug(f"Stream handler returned: {type(async_gen)}")
+                    # 逐块日志只在开启 DEBUG 时格式化，判断在循环外完成一次
+                    debug = self.logger.isEnabledFor(logging.DEBUG)
+                    if debug:
+                        self.logger.debug("Stream handler returned: %s", type(async_gen))
                     async for chunk in async_gen:
-                        self.logger.debug(f"Stream handler yielded chunk: {type(chunk)} - {chunk}")
+                        if debug:
+                            self.logger.debug("Stream handler yielded chunk: %s - %s", type(chunk), chunk)
                         yield self._normalize_stream_chunk(chunk)
                 else:
                     # 调用handler获取async generator
                     async_gen = handler(**arguments)
-                    self.logger.debug(f"Stream handler returned: {type(async_gen)}")
+                    # 逐块日志只在开启 DEBUG 时格式化，判断在循环外完成一次
+                    debug = self.logger.isEnabledFor(logging.DEBUG)
+                    if debug:
+                        self.logger.debug("Stream handler returned: %s", type(async_gen))
                     async for chunk in async_gen:
-                        self.logger.debug(f"Stream handler yielded chunk: {type(chunk)} - {chunk}")
+                        if debug:
+                            self.logger.debug("Stream handler yielded chunk: %s - %s", type(chunk), chunk)
                         yield self._normalize_stream_chunk(chunk)
             except Exception as e:
                 self.logger.error(f"Stream tool call failed for '{tool_name}': {e}")
@@ -921,13 +1435,21 @@ class EnhancedMCPServer(BaseMCPServer):
         return unique_params
 
     # 提供装饰器直接访问
-    def tool(self, description: str = None, chunk_size: int = 100, role = None):
+    def tool(self, description: str = None, chunk_size: int = 100, role = None, priority: str = None):
         """工具装饰器"""
-        return self.decorators.tool(description=description, chunk_size=chunk_size, role=role)
+        return self.decorators.tool(description=description, chunk_size=chunk_size, role=role, priority=priority)
 
-    def streaming_tool(self, description: str = None, chunk_size: int = 50, role = None):
+    def streaming_tool(self, description: str = None, chunk_size: int = 50, role = None, priority: str = None):
         """流式工具装饰器"""
-        return self.decorators.streaming_tool(description=description, chunk_size=chunk_size, role=role)
+        return self.decorators.streaming_tool(description=description, chunk_size=chunk_size, role=role,
+                                              priority=priority)
+
+    def batch_tool(self, description: str = None, max_batch: int = 32, max_wait_ms: float = 5.0,
+                   input_schema: Dict[str, Any] = None, chunk_size: int = 100, role = None, priority: str = None):
+        """批量工具装饰器：处理函数接收参数列表，并发的单次调用会被自动合并"""
+        return self.decorators.batch_tool(description=description, max_batch=max_batch, max_wait_ms=max_wait_ms,
+                                          input_schema=input_schema, chunk_size=chunk_size, role=role,
+                                          priority=priority)
 
     def resource(self, uri: str, name: str = None, description: str = None, mime_type: str = 'text/plain'):
         """资源装饰器"""
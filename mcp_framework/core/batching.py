@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+批量工具的自动微批处理（DataLoader 风格）
+
+客户端仍然逐个调用工具；框架把等待窗口内到达的并发调用合并成一个列表，
+一次性交给处理函数，再把结果按位置分发回各个调用方。
+"""
+
+import asyncio
+import inspect
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from .metrics import Histogram, power_of_two_buckets
+
+
+BatchHandler = Callable[[List[Dict[str, Any]]], Union[List[Any], Awaitable[List[Any]]]]
+
+
+class MicroBatcher:
+    """
+    单个批量工具的调用合并器
+
+    第一个调用到达时开始计时，达到 max_batch 或等待 max_wait_ms 后立即执行一批。
+    处理函数返回与输入等长的结果列表；列表中的 Exception 实例只让对应调用失败，
+    处理函数抛出异常时整批调用都失败。
+    """
+
+    def __init__(self, name: str, handler: BatchHandler, max_batch: int = 32, max_wait_ms: float = 5.0):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.name = name
+        self.handler = handler
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self.logger = logging.getLogger(f"{__name__}.MicroBatcher")
+
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+        self._is_coroutine = inspect.iscoroutinefunction(handler)
+
+        self.batch_size = Histogram(power_of_two_buckets(max_batch))
+        self.wait_ms = Histogram()
+        self.batches = 0
+        self.calls = 0
+
+    async def submit(self, arguments: Dict[str, Any]) -> Any:
+        """
+        提交一次调用并等待其所在批次的结果
+
+        Args:
+            arguments: 单次调用的参数
+
+        Returns:
+            Any: 处理函数为该调用返回的结果
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((arguments, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        """取出当前等待中的调用（最多 max_batch 个）并启动一次批量执行"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch = [item for item in self._pending[:self.max_batch] if not item[1].done()]
+        del self._pending[:self.max_batch]
+        if self._pending:
+            # 超出 max_batch 的调用进入下一个窗口
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait_ms / 1000, self._flush)
+        if not batch:
+            return
+
+        now = time.perf_counter()
+        for _, _, enqueued in batch:
+            self.wait_ms.observe((now - enqueued) * 1000)
+        self.batch_size.observe(len(batch))
+        self.batches += 1
+        self.calls += len(batch)
+
+        task = asyncio.ensure_future(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[Dict[str, Any], asyncio.Future, float]]) -> None:
+        """执行处理函数并把结果分发给各个调用"""
+        try:
+            if self._is_coroutine:
+                results = await self.handler([arguments for arguments, _, _ in batch])
+            else:
+                results = self.handler([arguments for arguments, _, _ in batch])
+            results = list(results)
+            if len(results) != len(batch):
+                raise ValueError(
+                    f"Batch tool '{self.name}' returned {len(results)} results for {len(batch)} calls")
+        except Exception as e:
+            self.logger.error(f"Batch tool '{self.name}' failed: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """返回批量大小和等待时间直方图"""
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait_ms,
+            "calls": self.calls,
+            "batches": self.batches,
+            "batch_size": self.batch_size.snapshot(),
+            "wait_ms": self.wait_ms.snapshot()
+        }
@@ -19,9 +19,14 @@ class ServerConfig:
     port: int = 8080
     log_level: str = 'INFO'
     log_file: Optional[str] = None
+    log_format: str = 'text'
     default_dir: Optional[str] = None
     max_connections: int = 100
     timeout: int = 30
+    # GC 监控与调优（在服务器 startup() 时生效）
+    gc_telemetry: bool = True
+    gc_freeze_after_startup: bool = False
+    gc_thresholds: Optional[List[int]] = None
 
     def to_dict(self) -> Dict[str, Any]:
         return asdict(self)
@@ -137,8 +137,9 @@ class AnnotatedDecorators:
         self.registered_resources = {}
         self.server_parameters = []
 
-    def tool(self, description: str = None, chunk_size: int = 100, role: Union[str, List[str]] = None):
-        """工具装饰器（统一流式架构）"""
+    def tool(self, description: str = None, chunk_size: int = 100, role: Union[str, List[str]] = None,
+             priority: str = None):
+        """工具装饰器（统一流式架构），priority 为调用未指定优先级时使用的默认类别"""
 
         def decorator(func):
             tool_name = func.__name__
@@ -169,6 +170,9 @@ class AnnotatedDecorators:
                     raise ValueError(f"role参数必须是字符串或字符串列表，得到: {type(role)}")
                 # 保持向后兼容性
                 tool_dict['role'] = role if isinstance(role, str) else role[0] if role else None
+
+            if priority is not None:
+                tool_dict['priority'] = priority
                 
             self.server.add_tool(tool_dict)
 
@@ -184,7 +188,8 @@ class AnnotatedDecorators:
 
         return decorator
 
-    def streaming_tool(self, description: str = None, chunk_size: int = 50, role: Union[str, List[str]] = None):
+    def streaming_tool(self, description: str = None, chunk_size: int = 50, role: Union[str, List[str]] = None,
+                       priority: str = None):
         """流式工具装饰器（注册为真正的流式处理器）"""
 
         def decorator(func):
@@ -216,6 +221,9 @@ class AnnotatedDecorators:
                     raise ValueError(f"role参数必须是字符串或字符串列表，得到: {type(role)}")
                 # 保持向后兼容性
                 tool_dict['role'] = role if isinstance(role, str) else role[0] if role else None
+
+            if priority is not None:
+                tool_dict['priority'] = priority
                 
             self.server.add_tool(tool_dict)
 
@@ -231,6 +239,77 @@ class AnnotatedDecorators:
 
         return decorator
 
+    def batch_tool(self, description: str = None, max_batch: int = 32, max_wait_ms: float = 5.0,
+                   input_schema: Dict[str, Any] = None, chunk_size: int = 100,
+                   role: Union[str, List[str]] = None, priority: str = None):
+        """
+        批量工具装饰器（自动微批处理）
+
+        被装饰的函数接收参数字典列表并返回等长的结果列表，客户端仍按单次调用使用该工具。
+        等待窗口内的并发调用会被合并为一次函数调用。
+
+        示例:
+            @server.batch_tool(max_batch=64, max_wait_ms=2, input_schema={
+                "type": "object",
+                "properties": {"user_id": {"type": "integer"}},
+                "required": ["user_id"]
+            })
+            async def get_user(batch):
+                rows = await db.fetch_users([item["user_id"] for item in batch])
+                return [rows.get(item["user_id"]) for item in batch]
+
+        Args:
+            description: 工具描述，默认使用函数文档
+            max_batch: 单批最多合并的调用数
+            max_wait_ms: 第一个调用到达后最多等待的毫秒数
+            input_schema: 单次调用的参数 schema，用于校验和工具列表展示
+            chunk_size: 流式输出的分块大小
+            role: 工具角色
+            priority: 默认优先级类别（interactive / default / bulk）
+        """
+
+        def decorator(func):
+            from .batching import MicroBatcher
+
+            tool_name = func.__name__
+            tool_description = description or func.__doc__ or f"Tool: {tool_name}"
+            batcher = MicroBatcher(tool_name, func, max_batch=max_batch, max_wait_ms=max_wait_ms)
+
+            self.registered_tools[tool_name] = func
+
+            tool_dict = {
+                'name': tool_name,
+                'description': tool_description,
+                'input_schema': input_schema or {"type": "object", "properties": {}, "required": []},
+                'chunk_size': chunk_size,
+                'batch': {'max_batch': max_batch, 'max_wait_ms': max_wait_ms}
+            }
+
+            if role is not None:
+                if isinstance(role, str):
+                    tool_dict['roles'] = [role]
+                elif isinstance(role, list):
+                    tool_dict['roles'] = role
+                else:
+                    raise ValueError(f"role参数必须是字符串或字符串列表，得到: {type(role)}")
+                tool_dict['role'] = role if isinstance(role, str) else role[0] if role else None
+
+            if priority is not None:
+                tool_dict['priority'] = priority
+
+            async def submit(**arguments):
+                return await batcher.submit(arguments)
+
+            self.server._batchers[tool_name] = batcher
+            self.server.add_tool(tool_dict)
+
+            if hasattr(self.server, '_tool_handlers'):
+                self.server._tool_handlers[tool_name] = submit
+
+            return func
+
+        return decorator
+
     def resource(self, uri: str, name: str = None, description: str = None, mime_type: str = 'text/plain'):
         """资源装饰器"""
 
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+垃圾回收停顿和内存占用监控
+
+通过 gc.callbacks 记录每一代的回收次数、回收对象数和停顿时长（直方图），
+停顿按触发回收时正在执行的工具（current_tool）归属；超过阈值的停顿额外记录一条事件，
+附带当时所有正在执行的工具。RSS、已分配内存块数和各代待回收计数由定时回调周期采样。
+
+tune_gc() 提供可选的调优：调整回收阈值，以及在启动完成后 gc.freeze()，
+把启动期间创建的长寿对象移出回收范围，减少完整回收时需要遍历的对象。
+"""
+
+import asyncio
+import gc
+import logging
+import sys
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Sequence
+
+from .loop_monitor import current_tool
+from .metrics import Histogram, PrometheusWriter
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+# GC 停顿的桶边界（毫秒）
+GC_PAUSE_MS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 1000)
+
+
+def tune_gc(thresholds: Optional[Sequence[int]] = None, freeze: bool = False) -> Dict[str, Any]:
+    """
+    调整垃圾回收参数
+
+    Args:
+        thresholds: gc.set_threshold 的参数（1~3 个整数），None 表示不修改
+        freeze: 是否把当前所有对象移入永久代（gc.freeze）
+
+    Returns:
+        Dict[str, Any]: 调整后的阈值和永久代对象数
+    """
+    if thresholds:
+        values = [int(value) for value in thresholds]
+        if not 1 <= len(values) <= 3 or any(value < 0 for value in values):
+            raise ValueError(f"Invalid gc thresholds: {thresholds}")
+        gc.set_threshold(*values)
+    if freeze:
+        # 先做一次完整回收，避免把已经是垃圾的对象冻结
+        gc.collect()
+        gc.freeze()
+    return {"thresholds": list(gc.get_threshold()), "frozen_objects": gc.get_freeze_count()}
+
+
+class GCMonitor:
+    """
+    GC 停顿和内存占用监控
+
+    Args:
+        slow_pause_ms: 停顿超过该值（毫秒）时记录事件
+        sample_interval: RSS 等内存指标的采样间隔（秒）
+        max_events: 保留的最近慢停顿事件数量
+        inflight_tools: 返回当前正在执行的工具名称，用于慢停顿事件
+    """
+
+    def __init__(self, slow_pause_ms: float = 10.0, sample_interval: float = 5.0, max_events: int = 100,
+                 inflight_tools: Optional[Callable[[], Iterable[str]]] = None):
+        self.slow_pause_ms = slow_pause_ms
+        self.sample_interval = sample_interval
+        self.inflight_tools = inflight_tools
+        self.logger = logging.getLogger(f"{__name__}.GCMonitor")
+
+        self.pause_ms = [Histogram(GC_PAUSE_MS_BUCKETS) for _ in range(3)]
+        self.collected = [0, 0, 0]
+        self.uncollectable = [0, 0, 0]
+        self.tool_pauses: Dict[str, Dict[str, Any]] = {}
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+
+        self.rss_bytes: Optional[int] = None
+        self.peak_rss_bytes: Optional[int] = None
+        self.allocated_blocks = 0
+        self.gc_counts = (0, 0, 0)
+
+        self._started = 0.0
+        self._installed = False
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._process = None
+
+    @property
+    def running(self) -> bool:
+        return self._installed
+
+    def start(self) -> None:
+        """注册 gc 回调并开始周期采样（在事件循环中调用时启用定时采样）"""
+        if self._installed:
+            return
+        gc.callbacks.append(self._on_gc)
+        self._installed = True
+        if psutil is not None:
+            try:
+                self._process = psutil.Process()
+            except Exception:
+                self._process = None
+        self.sample()
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+        if self._loop is not None:
+            self._timer = self._loop.call_later(self.sample_interval, self._tick)
+
+    def stop(self) -> None:
+        """注销 gc 回调并停止采样"""
+        if not self._installed:
+            return
+        try:
+            gc.callbacks.remove(self._on_gc)
+        except ValueError:
+            pass
+        self._installed = False
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._loop = None
+
+    def _on_gc(self, phase: str, info: Dict[str, Any]) -> None:
+        """gc 回调：start 时记录时间，stop 时记录停顿（在触发回收的线程中执行，需尽量轻）"""
+        if phase == "start":
+            self._started = time.perf_counter()
+            return
+        pause_ms = (time.perf_counter() - self._started) * 1000
+        generation = info.get("generation", 0)
+        self.pause_ms[generation].observe(pause_ms)
+        self.collected[generation] += info.get("collected", 0)
+        self.uncollectable[generation] += info.get("uncollectable", 0)
+
+        tool = current_tool.get()
+        if tool is not None:
+            stats = self.tool_pauses.get(tool)
+            if stats is None:
+                stats = self.tool_pauses[tool] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+            stats["count"] += 1
+            stats["total_ms"] += pause_ms
+            if pause_ms > stats["max_ms"]:
+                stats["max_ms"] = pause_ms
+
+        if pause_ms >= self.slow_pause_ms:
+            self._record_slow(pause_ms, generation, info, tool)
+
+    def _record_slow(self, pause_ms: float, generation: int, info: Dict[str, Any], tool: Optional[str]) -> None:
+        inflight: List[str] = []
+        if self.inflight_tools is not None:
+            try:
+                inflight = sorted(self.inflight_tools())
+            except Exception as e:
+                self.logger.debug(f"Failed to read in-flight tools: {e}")
+        self.events.append({
+            "timestamp": time.time(),
+            "generation": generation,
+            "pause_ms": round(pause_ms, 3),
+            "collected": info.get("collected", 0),
+            "tool": tool,
+            "inflight_tools": inflight
+        })
+
+    def _tick(self) -> None:
+        self.sample()
+        if self._loop is not None:
+            self._timer = self._loop.call_later(self.sample_interval, self._tick)
+
+    def sample(self) -> None:
+        """采样 RSS、已分配内存块数和各代待回收计数"""
+        if self._process is not None:
+            try:
+                self.rss_bytes = self._process.memory_info().rss
+                self.peak_rss_bytes = max(self.peak_rss_bytes or 0, self.rss_bytes)
+            except Exception:
+                self._process = None
+        self.allocated_blocks = sys.getallocatedblocks()
+        self.gc_counts = gc.get_count()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """返回各代回收统计、按工具的停顿汇总和内存指标"""
+        generations = {}
+        for generation in range(3):
+            generations[str(generation)] = {
+                "collections": self.pause_ms[generation].count,
+                "collected": self.collected[generation],
+                "uncollectable": self.uncollectable[generation],
+                "pause_ms": self.pause_ms[generation].snapshot()
+            }
+        return {
+            "running": self.running,
+            "generations": generations,
+            "tools": {name: {"count": stats["count"], "total_ms": round(stats["total_ms"], 3),
+                             "max_ms": round(stats["max_ms"], 3)}
+                      for name, stats in self.tool_pauses.items()},
+            "thresholds": list(gc.get_threshold()),
+            "pending": list(self.gc_counts),
+            "frozen_objects": gc.get_freeze_count(),
+            "rss_bytes": self.rss_bytes,
+            "peak_rss_bytes": self.peak_rss_bytes,
+            "allocated_blocks": self.allocated_blocks
+        }
+
+    def write_prometheus(self, writer: PrometheusWriter) -> None:
+        """输出 Prometheus 指标"""
+        writer.histogram("gc_pause_ms", "Garbage collection pause in milliseconds",
+                         (({"generation": g}, self.pause_ms[g]) for g in range(3)))
+        writer.metric("gc_collected_objects_total", "counter", "Objects collected by the garbage collector",
+                      (({"generation": g}, self.collected[g]) for g in range(3)))
+        writer.metric("gc_tool_pause_ms_total", "counter", "GC pause time triggered while a tool was executing",
+                      (({"tool": name}, round(stats["total_ms"], 3)) for name, stats in self.tool_pauses.items()))
+        memory = [("allocated_blocks", "Memory blocks currently allocated by the interpreter", self.allocated_blocks)]
+        if self.rss_bytes is not None:
+            memory.append(("process_rss_bytes", "Resident set size of the server process", self.rss_bytes))
+        for name, help_text, value in memory:
+            writer.metric(name, "gauge", help_text, [({}, value)])
+
+    def recent_events(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """返回最近的慢停顿事件（最新的在前）"""
+        events = list(self.events)[::-1]
+        return events[:limit] if limit else events
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+工具调用的幂等键支持
+
+tools/call 携带 idempotencyKey 时，同一个键在 TTL 内只执行一次处理函数：
+重试请求会加入正在执行的调用，或直接拿到已保存的结果。结果默认只保存在内存中，
+可选持久化到数据目录下的 SQLite，使服务器重启后的重试同样不会重复执行。
+失败的调用不会被记住，重试时会重新执行。
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .pipeline import to_jsonable
+
+
+def arguments_fingerprint(scope: str, arguments: Dict[str, Any]) -> str:
+    """计算调用的指纹，用于发现同一个键被用于不同的调用"""
+    payload = json.dumps([scope, arguments], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    幂等键结果存储
+
+    内存中保存进行中的调用（Future）和已完成的结果；提供 path 时，
+    已完成的结果同时写入 SQLite，内存未命中时从磁盘读取。
+    """
+
+    def __init__(self, ttl: float = 300.0, path: Optional[Path] = None):
+        self.ttl = ttl
+        self.path = Path(path) if path else None
+        self.logger = logging.getLogger(f"{__name__}.IdempotencyStore")
+        # key -> (指纹, Future, 过期时间)；进行中的调用过期时间为 None
+        self._entries: Dict[str, Tuple[str, asyncio.Future, Optional[float]]] = {}
+        self._next_sweep = 0.0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS idempotency ("
+                "key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, result TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    async def run(self, key: str, scope: str, arguments: Dict[str, Any],
+                  call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        按幂等键执行调用
+
+        Args:
+            key: 幂等键
+            scope: 调用范围（通常为工具名），与参数一起构成调用指纹
+            arguments: 调用参数
+            call: 实际执行调用的协程函数
+
+        Returns:
+            Any: 调用结果（来自本次执行、进行中的执行或已保存的结果）
+
+        Raises:
+            ValueError: 同一个键被用于不同的工具或参数
+        """
+        now = time.monotonic()
+        self._sweep(now)
+        fingerprint = arguments_fingerprint(scope, arguments)
+
+        entry = self._entries.get(key)
+        if entry is not None and (entry[2] is None or entry[2] > now):
+            if entry[0] != fingerprint:
+                raise ValueError(f"Idempotency key '{key}' was already used for a different call")
+            # 重试不应取消原始执行，因此用 shield 等待
+            return await asyncio.shield(entry[1])
+
+        stored = self._load(key)
+        if stored is not None:
+            if stored[0] != fingerprint:
+                raise ValueError(f"Idempotency key '{key}' was already used for a different call")
+            return stored[1]
+
+        # 调用在独立任务中执行：原始请求被取消（例如客户端断开）时，执行仍会完成，
+        # 随后的重试可以加入它而不是重新执行
+        task = asyncio.ensure_future(self._execute(key, fingerprint, call))
+        # 原始请求已取消且没有重试时，避免任务异常未被读取的警告
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._entries[key] = (fingerprint, task, None)
+        return await asyncio.shield(task)
+
+    async def _execute(self, key: str, fingerprint: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        """执行调用并记录结果；失败的调用不记住，重试时会重新执行"""
+        try:
+            result = await call()
+        except BaseException:
+            self._entries.pop(key, None)
+            raise
+        self._entries[key] = (fingerprint, self._entries[key][1], time.monotonic() + self.ttl)
+        self._save(key, fingerprint, result)
+        return result
+
+    def _sweep(self, now: float) -> None:
+        """定期清理过期的条目"""
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + min(self.ttl, 60.0)
+        expired = [key for key, (_, _, expires) in self._entries.items() if expires is not None and expires <= now]
+        for key in expired:
+            del self._entries[key]
+        if self._conn is not None:
+            with self._lock:
+                self._conn.execute("DELETE FROM idempotency WHERE expires_at <= ?", (time.time(),))
+
+    def _load(self, key: str) -> Optional[Tuple[str, Any]]:
+        """从磁盘读取未过期的结果"""
+        if self._conn is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint, result FROM idempotency WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def _save(self, key: str, fingerprint: str, result: Any) -> None:
+        """将结果写入磁盘（转换为 JSON 兼容结构）"""
+        if self._conn is None:
+            return
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO idempotency (key, fingerprint, result, expires_at) VALUES (?, ?, ?, ?)",
+                    (key, fingerprint, json.dumps(to_jsonable(result), ensure_ascii=False), time.time() + self.ttl)
+                )
+        except sqlite3.Error as e:
+            self.logger.warning(f"Failed to persist idempotent result for key '{key}': {e}")
+
+    def close(self) -> None:
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+            self._conn = None
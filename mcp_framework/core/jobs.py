@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+长时间运行工具的异步任务模式
+
+tools/call 携带 "async": true 时立即返回 job_id，工具在后台的有界工作池中执行，
+与同步调用一样经 tool_slot 按任务保存的优先级和会话排队、限流并记录指标。
+任务状态、结果和流式输出块保存在 get_data_dir() 下的 SQLite 数据库中，
+客户端断线重连或服务器重启后仍可通过 jobs/get、jobs/stream 获取。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .base import BaseMCPServer
+
+
+# 任务状态
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    tool TEXT NOT NULL,
+    arguments TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    pid INTEGER,
+    priority TEXT,
+    session TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS job_chunks (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+# 旧版本数据库缺少的列：列名 -> 类型
+_ADDED_COLUMNS = {"priority": "TEXT", "session": "TEXT"}
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    """检查进程是否仍在运行"""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+class JobStore:
+    """基于 SQLite 的任务存储（WAL 模式，单连接加锁访问）"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+
+    def _migrate(self) -> None:
+        """为旧版本创建的数据库补上新增的列"""
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for name, kind in _ADDED_COLUMNS.items():
+            if name not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def create(self, job_id: str, tool: str, arguments: Dict[str, Any],
+               priority: Optional[str] = None, session: str = "default") -> None:
+        """创建排队中的任务"""
+        self._execute(
+            "INSERT INTO jobs (id, tool, arguments, status, priority, session, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, tool, json.dumps(arguments, ensure_ascii=False, default=str), JOB_QUEUED,
+             priority, session, time.time())
+        )
+
+    def mark_running(self, job_id: str) -> bool:
+        """将排队中的任务标记为运行中，任务已被取消时返回 False"""
+        cursor = self._execute(
+            "UPDATE jobs SET status = ?, pid = ?, started_at = ? WHERE id = ? AND status = ?",
+            (JOB_RUNNING, os.getpid(), time.time(), job_id, JOB_QUEUED)
+        )
+        return cursor.rowcount == 1
+
+    def finish(self, job_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None) -> bool:
+        """记录任务的最终状态，任务已结束时不覆盖并返回 False"""
+        cursor = self._execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? "
+            "WHERE id = ? AND status IN (?, ?)",
+            (status, result, error, time.time(), job_id, JOB_QUEUED, JOB_RUNNING)
+        )
+        return cursor.rowcount == 1
+
+    def append_chunk(self, job_id: str, seq: int, content: str) -> None:
+        """追加一个流式输出块"""
+        self._execute("INSERT INTO job_chunks (job_id, seq, content) VALUES (?, ?, ?)", (job_id, seq, content))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务记录"""
+        row = self._execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["arguments"] = json.loads(job["arguments"])
+        job["chunk_count"] = self._execute(
+            "SELECT COUNT(*) FROM job_chunks WHERE job_id = ?", (job_id,)).fetchone()[0]
+        return job
+
+    def chunks(self, job_id: str, after: int = 0) -> List[Dict[str, Any]]:
+        """获取序号大于 after 的输出块"""
+        rows = self._execute(
+            "SELECT seq, content FROM job_chunks WHERE job_id = ? AND seq > ? ORDER BY seq", (job_id, after)
+        ).fetchall()
+        return [{"seq": row["seq"], "content": row["content"]} for row in rows]
+
+    def recover(self) -> List[str]:
+        """
+        处理上次运行遗留的任务
+
+        运行中但所属进程已退出的任务标记为失败；排队中的任务返回其 id 以便重新入队。
+
+        Returns:
+            List[str]: 需要重新执行的排队任务 id
+        """
+        for row in self._execute("SELECT id, pid FROM jobs WHERE status = ?", (JOB_RUNNING,)).fetchall():
+            if row["pid"] != os.getpid() and not _pid_alive(row["pid"]):
+                self.finish(row["id"], JOB_FAILED, error="Server restarted while the job was running")
+        rows = self._execute("SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (JOB_QUEUED,)).fetchall()
+        return [row["id"] for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class JobManager:
+    """
+    异步任务调度器
+
+    最多 max_workers 个任务同时执行，其余任务在队列中等待。
+    每个任务的输出块写入存储后唤醒等待中的 jobs/stream 请求。
+    """
+
+    def __init__(self, server: 'BaseMCPServer', store: JobStore, max_workers: int = 4):
+        self.server = server
+        self.store = store
+        self.max_workers = max(1, max_workers)
+        self.logger = logging.getLogger(f"{__name__}.JobManager")
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._events: Dict[str, asyncio.Event] = {}
+        self._stopping = False
+
+    def _ensure_workers(self) -> None:
+        """首次使用时在当前事件循环中启动工作协程，并恢复上次遗留的排队任务"""
+        if self._queue is not None:
+            return
+        self._stopping = False
+        self._queue = asyncio.Queue()
+        for job_id in self.store.recover():
+            self._queue.put_nowait(job_id)
+        self._workers = [asyncio.ensure_future(self._worker()) for _ in range(self.max_workers)]
+
+    async def submit(self, tool_name: str, arguments: Dict[str, Any],
+                     priority: Optional[str] = None, session: str = "default") -> Dict[str, Any]:
+        """
+        创建任务并加入执行队列
+
+        Args:
+            tool_name: 工具名称
+            arguments: 工具参数
+            priority: 执行时使用的优先级类别，None 使用工具的默认优先级
+            session: 提交任务的客户端会话标识
+
+        Returns:
+            Dict[str, Any]: job_id 和 status
+        """
+        if not any(tool.get('name') == tool_name for tool in self.server.tools):
+            raise ValueError(f"Tool '{tool_name}' not found")
+        self._ensure_workers()
+        job_id = uuid.uuid4().hex
+        self.store.create(job_id, tool_name, arguments, priority, session)
+        self._queue.put_nowait(job_id)
+        return {"job_id": job_id, "status": JOB_QUEUED}
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        """获取任务状态和结果"""
+        job = self.store.get(job_id)
+        if job is None:
+            raise ValueError(f"Job '{job_id}' not found")
+        info = {
+            "job_id": job["id"],
+            "tool": job["tool"],
+            "status": job["status"],
+            "created_at": job["created_at"],
+            "started_at": job["started_at"],
+            "finished_at": job["finished_at"],
+            "chunk_count": job["chunk_count"]
+        }
+        if job["status"] == JOB_SUCCEEDED:
+            info["result"] = {"content": [{"type": "text", "text": job["result"]}]}
+        if job["error"]:
+            info["error"] = job["error"]
+        return info
+
+    async def cancel(self, job_id: str) -> Dict[str, Any]:
+        """取消排队中或运行中的任务"""
+        if self.store.get(job_id) is None:
+            raise ValueError(f"Job '{job_id}' not found")
+        self.store.finish(job_id, JOB_CANCELLED)
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        self._notify(job_id)
+        return {"job_id": job_id, "status": self.store.get(job_id)["status"]}
+
+    async def wait_for_update(self, job_id: str, after: int, timeout: float) -> Dict[str, Any]:
+        """
+        等待任务产生新的输出块或结束
+
+        Args:
+            job_id: 任务 id
+            after: 已收到的最后一个块的序号
+            timeout: 最长等待时间（秒），0 表示立即返回
+
+        Returns:
+            Dict[str, Any]: chunks（新的输出块）、status 以及任务结束时的 result / error
+        """
+        deadline = time.monotonic() + max(0.0, timeout)
+        while True:
+            event = self._events.setdefault(job_id, asyncio.Event())
+            event.clear()
+            chunks = self.store.chunks(job_id, after)
+            info = self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if chunks or info["status"] in FINISHED_STATES or remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(event.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                pass
+
+        if info["status"] in FINISHED_STATES:
+            self._events.pop(job_id, None)
+        update = {"job_id": job_id, "status": info["status"], "chunks": chunks,
+                  "next": chunks[-1]["seq"] if chunks else after}
+        for key in ("result", "error"):
+            if key in info:
+                update[key] = info[key]
+        return update
+
+    def _notify(self, job_id: str) -> None:
+        event = self._events.get(job_id)
+        if event is not None:
+            event.set()
+
+    async def _worker(self) -> None:
+        while not self._stopping:
+            job_id = await self._queue.get()
+            if not self.store.mark_running(job_id):
+                continue  # 已在排队时被取消
+            task = asyncio.ensure_future(self._execute(job_id))
+            self._running[job_id] = task
+            try:
+                await task
+            except asyncio.CancelledError:
+                if not task.cancelled():
+                    raise
+            finally:
+                self._running.pop(job_id, None)
+                self._notify(job_id)
+                self._events.pop(job_id, None)
+
+    async def _execute(self, job_id: str) -> None:
+        """执行任务：流式工具的每个输出块都会持久化，最终结果为全部输出"""
+        job = self.store.get(job_id)
+        await self._run(job_id, job["tool"], job["arguments"], job["priority"], job["session"] or "default")
+
+    async def _run(self, job_id: str, tool_name: str, arguments: Dict[str, Any],
+                   priority: Optional[str] = None, session: str = "default") -> None:
+        """经 tool_slot 执行工具并记录任务的最终状态"""
+        try:
+            async with self.server.tool_slot(tool_name, priority, session):
+                stream_handlers = getattr(self.server, '_stream_handlers', {})
+                tool_handlers = getattr(self.server, '_tool_handlers', {})
+                if tool_name in stream_handlers and tool_name not in tool_handlers:
+                    tool = next((t for t in self.server.tools if t['name'] == tool_name), None)
+                    if tool and tool.get('input_schema'):
+                        self.server._validate_arguments(tool_name, arguments, tool['input_schema'])
+                    parts = []
+                    async for chunk in stream_handlers[tool_name](**arguments):
+                        content = self.server._normalize_stream_chunk(chunk)
+                        self.server.record_stream_chunk(tool_name, chunk)
+                        parts.append(content)
+                        self.store.append_chunk(job_id, len(parts), content)
+                        self._notify(job_id)
+                    result = ''.join(parts)
+                else:
+                    result = str(await self.server.handle_tool_call(tool_name, arguments))
+            self.store.finish(job_id, JOB_SUCCEEDED, result=result)
+        except asyncio.CancelledError:
+            if self._stopping:
+                self.store.finish(job_id, JOB_FAILED, error="Server stopped while the job was running")
+            else:
+                self.store.finish(job_id, JOB_CANCELLED)
+            raise
+        except Exception as e:
+            self.logger.error(f"Job {job_id} ({tool_name}) failed: {e}")
+            self.store.finish(job_id, JOB_FAILED, error=str(e))
+
+    async def shutdown(self) -> None:
+        """停止工作协程；运行中的任务标记为失败，排队中的任务保留到下次启动"""
+        self._stopping = True
+        for task in list(self._running.values()):
+            task.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._running.values(), *self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+基于延迟的自适应并发限制（参考 Netflix concurrency-limits 的 Gradient 算法）
+
+每个工具维护一个动态的并发上限：近期延迟接近无负载基线（最小延迟）时上限逐步增大，
+延迟升高时按 基线延迟 / 近期延迟 的比例收缩，调用出错时按比例退避。
+达到上限的调用立即以 ToolOverloadedError 失败，而不是继续排队拖垮服务器。
+"""
+
+import asyncio
+import math
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+
+class ToolOverloadedError(Exception):
+    """工具并发达到自适应上限，调用被拒绝"""
+
+    def __init__(self, tool_name: str, limit: int):
+        super().__init__(f"Tool '{tool_name}' is overloaded (concurrency limit {limit}), retry later")
+        self.tool_name = tool_name
+        self.limit = limit
+
+
+class _ExpAverage:
+    """指数移动平均，样本数不足窗口时退化为算术平均以加快预热"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.count = 0
+        self.value = 0.0
+
+    def add(self, sample: float) -> float:
+        if self.count < self.window:
+            self.count += 1
+            self.value += (sample - self.value) / self.count
+        else:
+            self.value += (sample - self.value) * 2 / (self.window + 1)
+        return self.value
+
+
+class AdaptiveLimiter:
+    """
+    单个工具的自适应并发上限
+
+    Args:
+        name: 工具名称
+        initial_limit: 初始上限
+        min_limit: 上限下界
+        max_limit: 上限上界
+        smoothing: 新上限的平滑系数（0~1，越大变化越快）
+        tolerance: 允许近期延迟超出基线的倍数，超出后才开始收缩
+        backoff: 调用出错时上限乘以的系数
+        window: 近期延迟的平滑样本数
+        probe_interval: 每隔多少个样本重新测量基线延迟（后端本身变慢时基线随之更新）
+    """
+
+    def __init__(self, name: str, initial_limit: int = 20, min_limit: int = 1, max_limit: int = 1000,
+                 smoothing: float = 0.2, tolerance: float = 2.0, backoff: float = 0.9, window: int = 10,
+                 probe_interval: int = 1000):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.smoothing = smoothing
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.estimated_limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.window = window
+        self.probe_interval = probe_interval
+
+        self._rtt = _ExpAverage(window)
+        self._rtt_noload = 0.0
+        self._samples = 0
+        self.inflight = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.dropped = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self.estimated_limit)
+
+    def try_acquire(self) -> bool:
+        """占用一个并发名额，已达上限时返回 False 并计入拒绝数"""
+        if self.inflight >= self.limit:
+            self.rejected += 1
+            return False
+        self.inflight += 1
+        self.accepted += 1
+        return True
+
+    def on_success(self, rtt: float, inflight: int) -> None:
+        """
+        根据一次成功调用的耗时调整上限
+
+        Args:
+            rtt: 调用耗时（秒）
+            inflight: 调用开始时的并发数
+        """
+        self._samples += 1
+        if self._samples % self.probe_interval == 0:
+            # 定期丢弃基线重新测量，并让出一半并发以便测到接近无负载的延迟
+            self._rtt_noload = 0.0
+            self._rtt = _ExpAverage(self.window)
+            self._set_limit(self.estimated_limit / 2)
+            return
+        if self._rtt_noload == 0.0 or rtt < self._rtt_noload:
+            self._rtt_noload = rtt
+        recent = self._rtt.add(rtt)
+        # 并发远低于上限时延迟不能说明上限是否合适，不调整
+        if inflight < self.estimated_limit / 2:
+            return
+
+        gradient = max(0.5, min(1.0, self.tolerance * self._rtt_noload / max(recent, 1e-9)))
+        queue_size = math.sqrt(self.estimated_limit)
+        new_limit = self.estimated_limit * gradient + queue_size
+        self._set_limit(self.estimated_limit * (1 - self.smoothing) + new_limit * self.smoothing)
+
+    def on_dropped(self) -> None:
+        """调用出错或超时：按 backoff 收缩上限"""
+        self.dropped += 1
+        self._set_limit(self.estimated_limit * self.backoff)
+
+    def _set_limit(self, value: float) -> None:
+        self.estimated_limit = min(max(value, self.min_limit), self.max_limit)
+
+    def release(self, rtt: float, inflight: int, exc_type: Optional[type] = None) -> None:
+        """
+        归还 try_acquire 占用的名额，并按调用结果调整上限
+
+        参数类错误（ValueError / TypeError）说明请求本身有问题，不参与调整；
+        取消的调用同样不计入样本。
+
+        Args:
+            rtt: 调用耗时（秒）
+            inflight: 调用开始时的并发数
+            exc_type: 调用抛出的异常类型，成功时为 None
+        """
+        self.inflight -= 1
+        if exc_type is None:
+            self.on_success(rtt, inflight)
+        elif not issubclass(exc_type, (ValueError, TypeError, asyncio.CancelledError)):
+            self.on_dropped()
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """包裹一次调用：超出上限时抛出 ToolOverloadedError，结束时按结果调整上限（见 release）"""
+        if not self.try_acquire():
+            raise ToolOverloadedError(self.name, self.limit)
+        inflight = self.inflight
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            self.release(time.perf_counter() - started, inflight, type(e))
+            raise
+        else:
+            self.release(time.perf_counter() - started, inflight)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """返回当前上限、并发数、拒绝数和延迟基线"""
+        return {
+            "limit": self.limit,
+            "inflight": self.inflight,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "dropped": self.dropped,
+            "rtt_ms": {
+                "recent": round(self._rtt.value * 1000, 3),
+                "noload": round(self._rtt_noload * 1000, 3)
+            }
+        }
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+事件循环延迟监控和慢处理函数检测
+
+事件循环中每隔 interval 触发一次定时回调，回调实际执行时间与预定时间的差值即循环延迟。
+一个后台守护线程检查该心跳：心跳停滞超过阈值说明循环线程正在执行一段同步代码
+（例如在工具处理函数中做了阻塞 I/O），此时抓取循环线程的调用栈，
+并通过当前任务找到正在执行的工具。循环恢复后按实际停顿时长记录一条慢事件。
+
+开销只有一个定时回调和一个低频唤醒的线程，可以在生产环境常开。
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional
+
+from .metrics import Histogram
+
+# 当前任务正在执行的工具名称，由 LoopMonitor.track() 设置
+current_tool: ContextVar[Optional[str]] = ContextVar("mcp_current_tool", default=None)
+
+# Python 3.12+ 可以通过 Task.get_context() 从其他线程读取任务上下文中的 current_tool，
+# 不需要额外维护任务到工具的映射
+_TASK_HAS_CONTEXT = hasattr(asyncio.Task, "get_context")
+
+
+class _ToolTracker:
+    """LoopMonitor.track() 返回的上下文管理器"""
+
+    __slots__ = ("task_tools", "tool_name", "_token", "_task", "_previous")
+
+    def __init__(self, task_tools: Optional[Dict[asyncio.Task, str]], tool_name: str):
+        self.task_tools = task_tools
+        self.tool_name = tool_name
+        self._task: Optional[asyncio.Task] = None
+
+    def __enter__(self) -> '_ToolTracker':
+        self._token = current_tool.set(self.tool_name)
+        task_tools = self.task_tools
+        if task_tools is not None:
+            try:
+                task = asyncio.current_task()
+            except RuntimeError:
+                task = None
+            if task is not None:
+                self._task = task
+                self._previous = task_tools.get(task)
+                task_tools[task] = self.tool_name
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        current_tool.reset(self._token)
+        task = self._task
+        if task is not None:
+            if self._previous is None:
+                self.task_tools.pop(task, None)
+            else:
+                self.task_tools[task] = self._previous
+        return False
+
+
+class LoopMonitor:
+    """
+    事件循环延迟和慢同步代码监控
+
+    Args:
+        interval: 心跳间隔（秒）
+        slow_threshold_ms: 循环停顿超过该值（毫秒）时记录慢事件
+        max_events: 保留的最近慢事件数量
+    """
+
+    def __init__(self, interval: float = 0.05, slow_threshold_ms: float = 100.0, max_events: int = 100):
+        self.interval = interval
+        self.slow_threshold_ms = slow_threshold_ms
+        self.logger = logging.getLogger(f"{__name__}.LoopMonitor")
+
+        self.lag_ms = Histogram()
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+        self.tool_stats: Dict[str, Dict[str, Any]] = {}
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._expected = 0.0
+        self._heartbeat = 0.0
+        # 任务 -> 正在执行的工具名称，由 track() 维护，守护线程只读（仅 Python 3.12 之前使用）
+        self._task_tools: Dict[asyncio.Task, str] = {}
+        self._capture: Optional[Dict[str, Any]] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    def start(self) -> None:
+        """在当前事件循环中启动监控（需在事件循环中调用）"""
+        if self._loop is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._heartbeat = time.perf_counter()
+        self._schedule()
+        self._watchdog = threading.Thread(target=self._watch, name="mcp-loop-monitor", daemon=True)
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        """停止监控"""
+        if self._loop is None:
+            return
+        self._stop.set()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._loop = None
+
+    def track(self, tool_name: str) -> _ToolTracker:
+        """标记当前任务正在执行指定工具（with 语句使用，同时设置 current_tool），慢事件据此归属到工具"""
+        return _ToolTracker(None if _TASK_HAS_CONTEXT else self._task_tools, tool_name)
+
+    def tool_for_task(self, task: Optional[asyncio.Task]) -> Optional[str]:
+        """返回任务正在执行的工具名称（可在其他线程中调用）"""
+        if task is None:
+            return None
+        if _TASK_HAS_CONTEXT:
+            return task.get_context().get(current_tool)
+        return self._task_tools.get(task)
+
+    def _schedule(self) -> None:
+        self._expected = time.perf_counter() + self.interval
+        self._timer = self._loop.call_later(self.interval, self._tick)
+
+    def _tick(self) -> None:
+        """循环线程中的心跳：记录延迟，停顿过长时生成慢事件"""
+        now = time.perf_counter()
+        lag_ms = max(0.0, (now - self._expected) * 1000)
+        self.lag_ms.observe(lag_ms)
+        self._heartbeat = now
+
+        capture, self._capture = self._capture, None
+        if lag_ms >= self.slow_threshold_ms:
+            self._record(lag_ms, capture)
+        if self._loop is not None:
+            self._schedule()
+
+    def _watch(self) -> None:
+        """守护线程：心跳停滞超过阈值时抓取循环线程当前的调用栈（每次停顿只抓一次）"""
+        period = max(self.slow_threshold_ms / 2000, 0.005)
+        captured_for = None
+        while not self._stop.wait(period):
+            heartbeat = self._heartbeat
+            stalled_ms = (time.perf_counter() - heartbeat - self.interval) * 1000
+            if stalled_ms < self.slow_threshold_ms or captured_for == heartbeat:
+                continue
+            captured_for = heartbeat
+            try:
+                self._capture = self._capture_loop_stack()
+            except Exception as e:
+                self.logger.debug(f"Failed to capture loop stack: {e}")
+
+    def _capture_loop_stack(self) -> Dict[str, Any]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.format_stack(frame) if frame is not None else []
+        tool = None
+        loop = self._loop
+        if loop is not None:
+            # asyncio 没有提供跨线程读取当前任务的公开接口，这里只读内部映射
+            tool = self.tool_for_task(asyncio.tasks._current_tasks.get(loop))
+        return {"tool": tool, "stack": stack}
+
+    def _record(self, lag_ms: float, capture: Optional[Dict[str, Any]]) -> None:
+        tool = capture.get("tool") if capture else None
+        event = {
+            "timestamp": time.time(),
+            "duration_ms": round(lag_ms, 3),
+            "tool": tool,
+            "stack": capture.get("stack", []) if capture else []
+        }
+        self.events.append(event)
+        name = tool or "<unknown>"
+        stats = self.tool_stats.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        stats["count"] += 1
+        stats["total_ms"] = round(stats["total_ms"] + lag_ms, 3)
+        stats["max_ms"] = round(max(stats["max_ms"], lag_ms), 3)
+        self.logger.warning(f"Event loop blocked for {lag_ms:.1f}ms" + (f" in tool '{tool}'" if tool else ""))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """返回循环延迟直方图和按工具汇总的慢事件统计"""
+        return {
+            "running": self.running,
+            "interval_ms": self.interval * 1000,
+            "slow_threshold_ms": self.slow_threshold_ms,
+            "lag_ms": self.lag_ms.snapshot(),
+            "slow_tools": dict(self.tool_stats)
+        }
+
+    def recent_events(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """返回最近的慢事件（最新的在前）"""
+        events = list(self.events)[::-1]
+        return events[:limit] if limit else events
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+服务器运行指标的基础数据结构
+
+ToolMetrics 在工具调度路径上记录调用数、错误数、并发数、延迟、字节数和流式输出块，
+每次调用只做几次计数，延迟先追加到缓冲，分桶推迟到缓冲满或读取时批量完成；
+render_prometheus 输出 Prometheus 文本格式。
+"""
+
+import time
+from bisect import bisect_left, bisect_right
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# 毫秒级耗时的默认桶边界
+DEFAULT_MS_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Histogram.record() 缓冲的观测值数量，缓冲满时合并进各桶
+RECORD_BUFFER_SIZE = 1024
+
+
+def power_of_two_buckets(maximum: int) -> List[int]:
+    """生成 1, 2, 4, ... 直到覆盖 maximum 的桶边界，用于批量大小等计数类指标"""
+    buckets = [1]
+    while buckets[-1] < maximum:
+        buckets.append(buckets[-1] * 2)
+    return buckets
+
+
+class Histogram:
+    """
+    固定桶直方图
+
+    observe 只做一次二分查找和两次累加；请求热路径上使用 record，只把观测值追加到缓冲，
+    缓冲满或读取时排序后按桶边界批量分桶（总数在读取时由各桶求和）。
+    record 的原始值乘以 record_scale 才是直方图的单位（例如以秒记录、以毫秒分桶），
+    换算在合并时对桶边界做一次，热路径上不做乘法。
+    snapshot 输出 Prometheus 风格的累计桶（le 为桶上界）。
+    """
+
+    __slots__ = ("buckets", "record_scale", "_counts", "sum", "_pending", "_room")
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_MS_BUCKETS, record_scale: float = 1.0):
+        self.buckets = tuple(sorted(buckets))
+        self.record_scale = record_scale
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self._pending: List[float] = []
+        self._room = RECORD_BUFFER_SIZE
+
+    @property
+    def count(self) -> int:
+        """观测值总数（包括尚未合并的缓冲）"""
+        return sum(self._counts) + len(self._pending)
+
+    def observe(self, value: float) -> None:
+        """记录一个观测值"""
+        self._counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def record(self, value: float) -> None:
+        """记录一个以 1 / record_scale 为单位的原始观测值（热路径：追加到缓冲，缓冲满时合并）"""
+        self._pending.append(value)
+        self._room -= 1
+        if not self._room:
+            self.flush()
+
+    def flush(self) -> None:
+        """把 record 缓冲的观测值合并进各桶"""
+        self._room = RECORD_BUFFER_SIZE
+        pending = self._pending
+        if not pending:
+            return
+        pending.sort()
+        scale = self.record_scale
+        counts = self._counts
+        start = 0
+        for index, bound in enumerate(self.buckets):
+            end = bisect_right(pending, bound / scale, start)
+            counts[index] += end - start
+            start = end
+        counts[-1] += len(pending) - start
+        self.sum += sum(pending) * scale
+        pending.clear()
+
+    def quantile(self, q: float) -> float:
+        """
+        估算分位数（返回所在桶的上界，超出最大桶时返回最大桶边界）
+
+        Args:
+            q: 0 到 1 之间的分位
+
+        Returns:
+            float: 分位数估计值，没有观测值时为 0
+        """
+        self.flush()
+        count = self.count
+        if count == 0:
+            return 0.0
+        target = q * count
+        cumulative = 0
+        for index, bucket_count in enumerate(self._counts):
+            cumulative += bucket_count
+            if cumulative >= target and bucket_count:
+                return float(self.buckets[min(index, len(self.buckets) - 1)])
+        return float(self.buckets[-1])
+
+    def reset(self) -> None:
+        """清空所有观测值"""
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self._pending.clear()
+        self._room = RECORD_BUFFER_SIZE
+
+    def snapshot(self) -> Dict[str, Any]:
+        """返回可 JSON 序列化的直方图快照"""
+        self.flush()
+        cumulative = 0
+        buckets: Dict[str, int] = {}
+        for bound, bucket_count in zip(self.buckets, self._counts):
+            cumulative += bucket_count
+            buckets[f"{bound:g}"] = cumulative
+        buckets["+Inf"] = cumulative + self._counts[-1]
+        return {
+            "count": buckets["+Inf"],
+            "sum": round(self.sum, 6),
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": buckets
+        }
+
+
+_perf_counter = time.perf_counter
+
+# 当前请求的字节数，由传输层在分发请求前设置（任务创建时继承上下文）
+request_bytes: ContextVar[int] = ContextVar("mcp_request_bytes", default=0)
+
+
+class ToolMetrics:
+    """单个工具的调用指标"""
+
+    __slots__ = ("name", "errors", "started", "latency_ms",
+                 "bytes_in", "bytes_out", "stream_chunks", "stream_bytes")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.errors = 0
+        self.started = 0
+        # 以秒记录（perf_counter 的差值），以毫秒分桶
+        self.latency_ms = Histogram(record_scale=1000)
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.stream_chunks = 0
+        self.stream_bytes = 0
+
+    @property
+    def calls(self) -> int:
+        """已完成的调用数（即延迟直方图的观测数）"""
+        return self.latency_ms.count
+
+    @property
+    def inflight(self) -> int:
+        """正在执行的调用数（已开始减去已完成，结束时不必再单独递减）"""
+        return self.started - self.latency_ms.count
+
+    def start(self) -> float:
+        """调用开始：增加开始计数并返回开始时间"""
+        self.started += 1
+        return _perf_counter()
+
+    def finish(self, started: float, error: bool = False, ended: Optional[float] = None) -> None:
+        """
+        调用结束：记录耗时和结果（热路径，直接内联直方图的 record）
+
+        Args:
+            started: start() 返回的开始时间
+            error: 调用是否失败
+            ended: 调用方已经读取的结束时间，None 时读取当前时间
+        """
+        if ended is None:
+            ended = _perf_counter()
+        if error:
+            self.errors += 1
+        histogram = self.latency_ms
+        histogram._pending.append(ended - started)
+        histogram._room -= 1
+        if not histogram._room:
+            histogram.flush()
+
+    def add_io(self, bytes_in: int, bytes_out: int) -> None:
+        """记录请求和响应的字节数"""
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+
+    def add_chunk(self, chunk: Any) -> None:
+        """记录一个流式输出块"""
+        self.stream_chunks += 1
+        self.stream_bytes += len(chunk) if isinstance(chunk, (str, bytes)) else 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "inflight": self.inflight,
+            "latency_ms": self.latency_ms.snapshot(),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "stream_chunks": self.stream_chunks,
+            "stream_bytes": self.stream_bytes
+        }
+
+
+class ServerMetrics:
+    """按工具汇总的服务器指标"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.tools: Dict[str, ToolMetrics] = {}
+
+    def tool(self, name: str) -> ToolMetrics:
+        """获取（必要时创建）工具的指标对象"""
+        try:
+            return self.tools[name]
+        except KeyError:
+            metrics = self.tools[name] = ToolMetrics(name)
+            return metrics
+
+    def snapshot(self) -> Dict[str, Any]:
+        """返回每个工具的指标，流式输出块速率按运行时长平均"""
+        uptime = max(time.time() - self.started, 1e-9)
+        tools = {}
+        for name, metrics in self.tools.items():
+            tools[name] = metrics.snapshot()
+            tools[name]["stream_chunks_per_second"] = round(metrics.stream_chunks / uptime, 3)
+        return tools
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items()) + "}"
+
+
+class PrometheusWriter:
+    """Prometheus 文本格式（0.0.4）输出"""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self, prefix: str = "mcp"):
+        self.prefix = prefix
+        self._lines: List[str] = []
+
+    def metric(self, name: str, kind: str, help_text: str,
+               samples: Iterable[Tuple[Dict[str, Any], float]]) -> None:
+        """
+        输出一个 counter / gauge 指标
+
+        Args:
+            name: 指标名称（不含前缀）
+            kind: counter 或 gauge
+            help_text: 指标说明
+            samples: (标签, 值) 序列
+        """
+        full_name = f"{self.prefix}_{name}"
+        self._lines.append(f"# HELP {full_name} {help_text}")
+        self._lines.append(f"# TYPE {full_name} {kind}")
+        for labels, value in samples:
+            text = str(value) if isinstance(value, int) else f"{value:g}"
+            self._lines.append(f"{full_name}{_format_labels(labels)} {text}")
+
+    def histogram(self, name: str, help_text: str,
+                  samples: Iterable[Tuple[Dict[str, Any], Histogram]]) -> None:
+        """输出 histogram 指标（_bucket / _sum / _count）"""
+        full_name = f"{self.prefix}_{name}"
+        self._lines.append(f"# HELP {full_name} {help_text}")
+        self._lines.append(f"# TYPE {full_name} histogram")
+        for labels, histogram in samples:
+            histogram.flush()
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets, histogram._counts):
+                cumulative += bucket_count
+                self._lines.append(f"{full_name}_bucket{_format_labels({**labels, 'le': f'{bound:g}'})} {cumulative}")
+            self._lines.append(f"{full_name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {histogram.count}")
+            self._lines.append(f"{full_name}_sum{_format_labels(labels)} {histogram.sum:g}")
+            self._lines.append(f"{full_name}_count{_format_labels(labels)} {histogram.count}")
+
+    def render(self) -> str:
+        return "\n".join(self._lines) + "\n"
+
+
+def render_prometheus(metrics: ServerMetrics, extra_histograms: Optional[Dict[str, Histogram]] = None,
+                      writers: Iterable[Callable[[PrometheusWriter], None]] = ()) -> str:
+    """
+    将工具指标渲染为 Prometheus 文本格式
+
+    Args:
+        metrics: 服务器指标
+        extra_histograms: 额外输出的直方图，键为指标名称（例如事件循环延迟）
+        writers: 追加输出其他指标的函数（例如 GC 监控）
+
+    Returns:
+        str: Prometheus 文本
+    """
+    writer = PrometheusWriter()
+    tools = list(metrics.tools.values())
+    writer.metric("uptime_seconds", "gauge", "Seconds since the server started",
+                  [({}, round(time.time() - metrics.started, 3))])
+    writer.metric("tool_calls_total", "counter", "Tool calls completed",
+                  (({"tool": m.name}, m.calls) for m in tools))
+    writer.metric("tool_errors_total", "counter", "Tool calls that raised an error",
+                  (({"tool": m.name}, m.errors) for m in tools))
+    writer.metric("tool_inflight", "gauge", "Tool calls currently executing",
+                  (({"tool": m.name}, m.inflight) for m in tools))
+    writer.histogram("tool_latency_ms", "Tool call latency in milliseconds",
+                     (({"tool": m.name}, m.latency_ms) for m in tools))
+    writer.metric("tool_bytes_in_total", "counter", "Request bytes received for tool calls",
+                  (({"tool": m.name}, m.bytes_in) for m in tools))
+    writer.metric("tool_bytes_out_total", "counter", "Response bytes produced by tool calls",
+                  (({"tool": m.name}, m.bytes_out) for m in tools))
+    writer.metric("tool_stream_chunks_total", "counter", "Streaming chunks produced by tools",
+                  (({"tool": m.name}, m.stream_chunks) for m in tools))
+    writer.metric("tool_stream_bytes_total", "counter", "Streaming bytes produced by tools",
+                  (({"tool": m.name}, m.stream_bytes) for m in tools))
+    for name, histogram in (extra_histograms or {}).items():
+        writer.histogram(name, name.replace("_", " "), [({}, histogram)])
+    for write in writers:
+        write(writer)
+    return writer.render()
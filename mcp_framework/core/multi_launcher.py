@@ -23,7 +23,8 @@ from .utils import (
     setup_logging_from_args,
     check_dependencies,
     create_port_based_config_manager,
-    create_default_config_manager
+    create_default_config_manager,
+    reserve_stdout_for_protocol
 )
 
 logger = logging.getLogger(__name__)
@@ -54,8 +55,10 @@ async def run_multi_transport_server(
         # 解析传输方式
         transport_types = _parse_transports(transports)
         
-        # 确定输出流（stdio模式下使用stderr，避免干扰JSON-RPC通信）
-        output_stream = sys.stderr if TransportType.STDIO in transport_types and len(transport_types) == 1 else sys.stdout
+        # stdio 模式下 stdout 只承载协议帧：print 和日志统一重定向到 stderr
+        if TransportType.STDIO in transport_types:
+            reserve_stdout_for_protocol()
+        output_stream = sys.stderr if TransportType.STDIO in transport_types else sys.stdout
         
         # 检查依赖
         if required_dependencies:
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+服务器端工具流水线（tools/pipeline）
+
+一次请求提交一个由工具调用组成的小型 DAG，节点参数可以用 JSONPath 风格的引用
+读取前面节点的结果，例如:
+
+    {
+        "nodes": [
+            {"id": "page", "tool": "fetch", "arguments": {"url": "https://example.com"}},
+            {"id": "links", "tool": "extract_links", "arguments": {"html": "$.page"}},
+            {"id": "first", "tool": "fetch", "arguments": {"url": "$.links[0].href"}}
+        ],
+        "outputs": ["first", "$.links[0]"]
+    }
+
+没有依赖关系的节点并发执行；中间结果以 Python 对象直接传给下游节点，不经过 JSON
+序列化，只有 outputs 中请求的值会被返回。以 "$$" 开头的字符串表示字面量 "$..."。
+"""
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .base import BaseMCPServer
+
+
+# 单个流水线允许的最大节点数
+MAX_PIPELINE_NODES = 64
+
+_NODE_ID = re.compile(r"^[A-Za-z_][\w-]*$")
+_REF_ROOT = re.compile(r"^\$\.([A-Za-z_][\w-]*)")
+_REF_STEP = re.compile(r"\.([A-Za-z_][\w-]*)|\[(-?\d+)\]|\[(?:'([^']*)'|\"([^\"]*)\")\]")
+
+
+@dataclass
+class PipelineReference:
+    """对某个节点结果（或其中一部分）的引用"""
+    node_id: str
+    path: List[Union[str, int]] = field(default_factory=list)
+
+    def resolve(self, values: Dict[str, Any]) -> Any:
+        """沿路径从节点结果中取值"""
+        value = values[self.node_id]
+        for step in self.path:
+            try:
+                if isinstance(step, int) or isinstance(value, dict):
+                    value = value[step]
+                else:
+                    value = getattr(value, step)
+            except (KeyError, IndexError, TypeError, AttributeError):
+                raise ValueError(f"Reference '{self}' cannot be resolved at '{step}'")
+        return value
+
+    def __str__(self):
+        text = f"$.{self.node_id}"
+        for step in self.path:
+            text += f"[{step}]" if isinstance(step, int) else f".{step}"
+        return text
+
+
+def parse_reference(text: str) -> Optional[PipelineReference]:
+    """
+    解析 JSONPath 风格的引用
+
+    Args:
+        text: 形如 "$.node"、"$.node.key[0]"、"$.node['some key']" 的字符串
+
+    Returns:
+        Optional[PipelineReference]: 不是引用时返回 None
+
+    Raises:
+        ValueError: 以 "$." 开头但语法不正确
+    """
+    if not text.startswith("$."):
+        return None
+    match = _REF_ROOT.match(text)
+    if not match:
+        raise ValueError(f"Invalid reference: {text}")
+
+    reference = PipelineReference(match.group(1))
+    position = match.end()
+    while position < len(text):
+        step = _REF_STEP.match(text, position)
+        if not step:
+            raise ValueError(f"Invalid reference: {text}")
+        name, index, single_quoted, double_quoted = step.groups()
+        if index is not None:
+            reference.path.append(int(index))
+        elif name is not None:
+            reference.path.append(name)
+        else:
+            reference.path.append(single_quoted if single_quoted is not None else double_quoted)
+        position = step.end()
+    return reference
+
+
+def to_jsonable(value: Any) -> Any:
+    """将输出值转换为可 JSON 序列化的结构，无法表示的对象转为字符串"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, dict):
+        return {str(key): to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [to_jsonable(item) for item in value]
+    return str(value)
+
+
+@dataclass
+class PipelineNode:
+    """流水线中的一个工具调用"""
+    id: str
+    tool: str
+    arguments: Any
+    depends_on: Set[str]
+    invoke: Callable[[Dict[str, Any]], Awaitable[Any]]
+    priority: str
+
+
+class ToolPipeline:
+    """
+    编译并执行一个工具调用 DAG
+
+    构造时完成全部校验（节点 id、工具是否存在、引用是否有效、是否有环），
+    执行时每个节点在其依赖全部成功后立即开始；某个节点失败时其下游节点被跳过，
+    互不依赖的分支继续执行。
+    """
+
+    def __init__(self, server: 'BaseMCPServer', spec: Dict[str, Any], session: str = "default"):
+        if not isinstance(spec, dict):
+            raise ValueError("Pipeline must be an object")
+        nodes = spec.get("nodes")
+        if not isinstance(nodes, list) or not nodes:
+            raise ValueError("Pipeline requires a non-empty 'nodes' list")
+        if len(nodes) > MAX_PIPELINE_NODES:
+            raise ValueError(f"Pipeline has {len(nodes)} nodes, limit is {MAX_PIPELINE_NODES}")
+
+        self.server = server
+        self.session = session
+        self.priority = spec.get("priority")
+        self._references: Dict[str, PipelineReference] = {}
+        self.nodes: Dict[str, PipelineNode] = {}
+        invokers: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]] = {}
+
+        for raw in nodes:
+            if not isinstance(raw, dict):
+                raise ValueError("Pipeline node must be an object")
+            node_id = raw.get("id")
+            tool_name = raw.get("tool") or raw.get("name")
+            arguments = raw.get("arguments", {})
+            if not isinstance(node_id, str) or not _NODE_ID.match(node_id):
+                raise ValueError(f"Invalid pipeline node id: {node_id!r}")
+            if node_id in self.nodes:
+                raise ValueError(f"Duplicate pipeline node id: {node_id}")
+            if not tool_name:
+                raise ValueError(f"Pipeline node '{node_id}' requires a tool name")
+            if not isinstance(arguments, dict):
+                raise ValueError(f"Pipeline node '{node_id}' arguments must be an object")
+
+            depends_on = set(raw.get("depends_on") or [])
+            self._collect_references(arguments, depends_on)
+            if tool_name not in invokers:
+                invokers[tool_name] = server._get_tool_invoker(tool_name)
+            priority = server.tool_priority(tool_name, self.priority)
+            self.nodes[node_id] = PipelineNode(node_id, tool_name, arguments, depends_on, invokers[tool_name], priority)
+
+        for node in self.nodes.values():
+            unknown = node.depends_on - self.nodes.keys()
+            if unknown:
+                raise ValueError(f"Pipeline node '{node.id}' depends on unknown node(s): {sorted(unknown)}")
+        self._check_acyclic()
+
+        outputs = spec.get("outputs")
+        if outputs is None:
+            # 默认返回没有下游的节点
+            upstream = set().union(*(node.depends_on for node in self.nodes.values()))
+            outputs = [node_id for node_id in self.nodes if node_id not in upstream]
+        if not isinstance(outputs, list):
+            raise ValueError("Pipeline 'outputs' must be a list")
+        self.outputs: List[Tuple[str, PipelineReference]] = []
+        for output in outputs:
+            reference = self._parse(output if output.startswith("$.") else f"$.{output}") \
+                if isinstance(output, str) else None
+            if reference is None or reference.node_id not in self.nodes:
+                raise ValueError(f"Invalid pipeline output: {output!r}")
+            self.outputs.append((output, reference))
+
+    def _parse(self, text: str) -> Optional[PipelineReference]:
+        """解析引用并缓存，执行阶段不再重复解析"""
+        if text not in self._references:
+            reference = parse_reference(text)
+            if reference is None:
+                return None
+            self._references[text] = reference
+        return self._references[text]
+
+    def _collect_references(self, value: Any, depends_on: Set[str]) -> None:
+        """收集参数模板中引用的节点"""
+        if isinstance(value, str):
+            reference = self._parse(value)
+            if reference is not None:
+                depends_on.add(reference.node_id)
+        elif isinstance(value, dict):
+            for item in value.values():
+                self._collect_references(item, depends_on)
+        elif isinstance(value, list):
+            for item in value:
+                self._collect_references(item, depends_on)
+
+    def _check_acyclic(self) -> None:
+        """拓扑排序检查环"""
+        remaining = {node_id: set(node.depends_on) for node_id, node in self.nodes.items()}
+        while remaining:
+            ready = [node_id for node_id, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Pipeline contains a cycle among: {sorted(remaining)}")
+            for node_id in ready:
+                del remaining[node_id]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+    def _render(self, value: Any, values: Dict[str, Any]) -> Any:
+        """用上游结果替换参数模板中的引用"""
+        if isinstance(value, str):
+            if value.startswith("$$"):
+                return value[1:]
+            reference = self._references.get(value)
+            return reference.resolve(values) if reference is not None else value
+        if isinstance(value, dict):
+            return {key: self._render(item, values) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._render(item, values) for item in value]
+        return value
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        执行流水线
+
+        Returns:
+            Dict[str, Any]: status、outputs（请求的输出值）、nodes（每个节点的状态和耗时）
+                以及 duration_ms（总耗时）
+        """
+        started = time.perf_counter()
+        values: Dict[str, Any] = {}
+        report: Dict[str, Dict[str, Any]] = {}
+        semaphore = asyncio.Semaphore(max(1, self.server.fanout_concurrency))
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_node(node: PipelineNode) -> bool:
+            upstream = [tasks[node_id] for node_id in node.depends_on]
+            if upstream and not all(await asyncio.gather(*upstream)):
+                report[node.id] = {"tool": node.tool, "status": "skipped"}
+                return False
+
+            async with semaphore:
+                node_started = time.perf_counter()
+                entry = {"tool": node.tool, "start_ms": round((node_started - started) * 1000, 3)}
+                try:
+                    # 异常要经过 tool_slot，限制器和调用指标才能把它记为失败；
+                    # tool_slot 自身的异常（过载、无效优先级）同样只让该节点失败
+                    async with self.server.tool_slot(node.tool, node.priority, self.session):
+                        values[node.id] = await node.invoke(self._render(node.arguments, values))
+                    entry["status"] = "ok"
+                except Exception as e:
+                    entry["status"] = "error"
+                    entry["error"] = str(e)
+                entry["duration_ms"] = round((time.perf_counter() - node_started) * 1000, 3)
+                report[node.id] = entry
+                return entry["status"] == "ok"
+
+        for node in self.nodes.values():
+            tasks[node.id] = asyncio.ensure_future(run_node(node))
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+        outputs: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        for key, reference in self.outputs:
+            if reference.node_id not in values:
+                errors[key] = f"Node '{reference.node_id}' {report[reference.node_id]['status']}"
+                continue
+            try:
+                outputs[key] = to_jsonable(reference.resolve(values))
+            except ValueError as e:
+                errors[key] = str(e)
+
+        result = {
+            "status": "ok" if all(entry["status"] == "ok" for entry in report.values()) and not errors else "error",
+            "outputs": outputs,
+            "nodes": {node_id: report[node_id] for node_id in self.nodes},
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3)
+        }
+        if errors:
+            result["errors"] = errors
+        return result
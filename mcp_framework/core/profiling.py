@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+按需性能剖析：CPU（cProfile / 栈采样）和内存（tracemalloc）
+
+剖析只在请求的采集窗口内开启，窗口结束后恢复原状，平时没有任何开销。
+同一时间每种剖析只允许一个采集窗口。
+
+CPU 剖析输出:
+    pstats:    cProfile 统计的文本报告
+    raw:       cProfile 统计的二进制 dump（marshal 格式，可用 pstats / snakeviz 打开）
+    collapsed: 事件循环线程的栈采样，每行 "帧;帧;帧 次数"，可直接交给 flamegraph.pl / speedscope
+
+内存剖析在窗口开始和结束时各取一次 tracemalloc 快照，返回增长最多的 N 个分配位置。
+
+SamplingProfiler 是常驻的统计剖析器：后台线程以约 100 Hz 采样所有线程的调用栈，
+事件循环线程上的样本标注当前任务正在执行的工具，按固定窗口写出 collapsed 文件，
+用于捕捉按需采集时难以复现的偶发性能退化。
+"""
+
+import asyncio
+import cProfile
+import io
+import logging
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from .loop_monitor import current_tool
+
+# 单次采集窗口的最长时间（秒）
+MAX_CAPTURE_SECONDS = 300
+
+PROFILE_FORMATS = ("pstats", "raw", "collapsed")
+
+# 栈采样的最大深度
+MAX_STACK_DEPTH = 128
+
+
+class ProfilerBusyError(Exception):
+    """已有同类采集窗口在进行"""
+
+
+def frame_label(frame) -> str:
+    """栈帧在 collapsed 输出中的名称"""
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame, prefix: Optional[str] = None, cache: Optional[Dict[Any, str]] = None) -> str:
+    """
+    将栈帧折叠为 "根帧;...;当前帧" 形式
+
+    Args:
+        frame: 最内层栈帧
+        prefix: 加在最前面的标签（例如线程名或工具名）
+        cache: 代码对象到帧名称的缓存，频繁采样时避免重复格式化
+    """
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        if cache is None:
+            labels.append(frame_label(frame))
+        else:
+            label = cache.get(frame.f_code)
+            if label is None:
+                label = cache[frame.f_code] = frame_label(frame)
+            labels.append(label)
+        frame = frame.f_back
+    if prefix:
+        labels.append(prefix)
+    return ";".join(reversed(labels))
+
+
+def format_collapsed(stacks: Counter) -> str:
+    """按次数从多到少输出 collapsed 文本"""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def _check_seconds(seconds: float) -> float:
+    seconds = float(seconds)
+    if not 0 < seconds <= MAX_CAPTURE_SECONDS:
+        raise ValueError(f"seconds must be in (0, {MAX_CAPTURE_SECONDS}]")
+    return seconds
+
+
+class Profiler:
+    """
+    按需 CPU / 内存剖析
+
+    Args:
+        sample_interval: collapsed 格式的栈采样间隔（秒）
+    """
+
+    def __init__(self, sample_interval: float = 0.005):
+        self.sample_interval = sample_interval
+        self._cpu_active = False
+        self._heap_active = False
+
+    @property
+    def active(self) -> bool:
+        return self._cpu_active or self._heap_active
+
+    async def profile(self, seconds: float, output: str = "pstats", sort: str = "cumulative",
+                      limit: int = 50) -> Dict[str, Any]:
+        """
+        在当前事件循环线程上采集一个 CPU 剖析窗口
+
+        Args:
+            seconds: 采集时长（秒）
+            output: 输出格式，pstats / raw / collapsed
+            sort: pstats 报告的排序键（如 cumulative、tottime、calls）
+            limit: pstats 报告输出的函数数量
+
+        Returns:
+            Dict[str, Any]: format、seconds 和 data（raw 格式为 bytes，其余为文本）
+
+        Raises:
+            ValueError: 参数无效
+            ProfilerBusyError: 已有 CPU 采集窗口在进行
+        """
+        seconds = _check_seconds(seconds)
+        if output not in PROFILE_FORMATS:
+            raise ValueError(f"Unknown profile format '{output}', expected one of {PROFILE_FORMATS}")
+        if output == "pstats" and sort not in pstats.Stats.sort_arg_dict_default:
+            raise ValueError(f"Unknown sort key '{sort}'")
+        if self._cpu_active:
+            raise ProfilerBusyError("A CPU profile capture is already running")
+
+        self._cpu_active = True
+        try:
+            if output == "collapsed":
+                data = format_collapsed(await self._sample(seconds))
+            else:
+                profile = cProfile.Profile()
+                try:
+                    profile.enable()
+                except ValueError as e:
+                    # 进程中已有其他剖析器（如调试器）占用了 profile 钩子
+                    raise ProfilerBusyError(str(e))
+                try:
+                    await asyncio.sleep(seconds)
+                finally:
+                    profile.disable()
+                stats = pstats.Stats(profile)
+                if output == "raw":
+                    data = marshal.dumps(stats.stats)
+                else:
+                    stream = io.StringIO()
+                    stats.stream = stream
+                    stats.sort_stats(sort).print_stats(max(1, int(limit)))
+                    data = stream.getvalue()
+        finally:
+            self._cpu_active = False
+        return {"format": output, "seconds": seconds, "data": data}
+
+    async def _sample(self, seconds: float) -> Counter:
+        """在后台线程中按 sample_interval 采样事件循环线程的调用栈"""
+        loop_thread = threading.get_ident()
+        stacks: Counter = Counter()
+        stop = threading.Event()
+
+        def sample():
+            while not stop.wait(self.sample_interval):
+                frame = sys._current_frames().get(loop_thread)
+                if frame is not None:
+                    stacks[collapse_stack(frame)] += 1
+
+        sampler = threading.Thread(target=sample, name="mcp-profile-sampler", daemon=True)
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stop.set()
+            await asyncio.get_running_loop().run_in_executor(None, sampler.join)
+        return stacks
+
+    async def heap(self, seconds: float = 10.0, limit: int = 20, group_by: str = "lineno",
+                   frames: int = 1) -> Dict[str, Any]:
+        """
+        采集一个内存分配窗口，返回窗口内增长最多的分配位置
+
+        Args:
+            seconds: 窗口时长（秒）
+            limit: 返回的分配位置数量
+            group_by: 分组方式，lineno / filename / traceback
+            frames: 每次分配记录的栈深度（traceback 分组时有意义）
+
+        Returns:
+            Dict[str, Any]: 窗口前后的内存占用和 top 列表
+
+        Raises:
+            ValueError: 参数无效
+            ProfilerBusyError: 已有内存采集窗口在进行
+        """
+        seconds = _check_seconds(seconds)
+        if group_by not in ("lineno", "filename", "traceback"):
+            raise ValueError(f"Unknown group_by '{group_by}'")
+        if self._heap_active:
+            raise ProfilerBusyError("A heap capture is already running")
+
+        self._heap_active = True
+        # 进程已经在追踪（如 PYTHONTRACEMALLOC）时沿用，不在结束时关闭
+        started_here = not tracemalloc.is_tracing()
+        try:
+            if started_here:
+                tracemalloc.start(max(1, int(frames)))
+            exclude = [tracemalloc.Filter(False, tracemalloc.__file__),
+                       tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                       tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>")]
+            before = tracemalloc.take_snapshot().filter_traces(exclude)
+            started = time.perf_counter()
+            await asyncio.sleep(seconds)
+            after = tracemalloc.take_snapshot().filter_traces(exclude)
+            current, peak = tracemalloc.get_traced_memory()
+            elapsed = time.perf_counter() - started
+        finally:
+            if started_here:
+                tracemalloc.stop()
+            self._heap_active = False
+
+        diff = after.compare_to(before, group_by)
+        top = []
+        for stat in diff[:max(1, int(limit))]:
+            top.append({
+                "location": [str(frame) for frame in stat.traceback],
+                "size_diff": stat.size_diff,
+                "size": stat.size,
+                "count_diff": stat.count_diff,
+                "count": stat.count
+            })
+        return {
+            "seconds": round(elapsed, 3),
+            "group_by": group_by,
+            "traced_current_bytes": current,
+            "traced_peak_bytes": peak,
+            "total_size_diff": sum(stat.size_diff for stat in diff),
+            "top": top
+        }
+
+
+class SamplingProfiler:
+    """
+    常驻的统计剖析器
+
+    后台线程每隔 interval 通过 sys._current_frames() 采样所有线程的调用栈，按
+    "线程名;tool:<工具>;帧;..." 折叠计数；工具名从事件循环当前任务的上下文中读取
+    current_tool。每满 window 秒把该窗口的样本写成一个 collapsed 文件，只保留最近 keep 个。
+
+    Args:
+        output_dir: collapsed 文件目录
+        interval: 采样间隔（秒），默认 0.01 即约 100 Hz
+        window: 每个窗口的时长（秒）
+        keep: 保留的窗口文件数量
+        tool_lookup: 任务无法提供上下文时（Python 3.12 之前没有 Task.get_context）
+            用于查找任务正在执行的工具
+    """
+
+    def __init__(self, output_dir: Path, interval: float = 0.01, window: float = 60.0, keep: int = 60,
+                 tool_lookup: Optional[Callable[[asyncio.Task], Optional[str]]] = None):
+        self.output_dir = Path(output_dir)
+        self.tool_lookup = tool_lookup
+        self.interval = interval
+        self.window = window
+        self.keep = max(1, keep)
+        self.logger = logging.getLogger(f"{__name__}.SamplingProfiler")
+
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.windows_written = 0
+        self.last_file: Optional[Path] = None
+        self._sample_seconds = 0.0
+        self._started = 0.0
+        self._window_started = 0.0
+        self._labels: Dict[Any, str] = {}
+        self._thread_names: Dict[int, str] = {}
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        """启动采样线程（需在事件循环中调用，以便识别循环线程）"""
+        if self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._started = self._window_started = time.time()
+        self._thread = threading.Thread(target=self._run, name="mcp-sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止采样并写出当前窗口"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+        self._thread = None
+        self._loop = None
+        self._write_window()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            started = time.perf_counter()
+            try:
+                self._sample()
+            except Exception as e:
+                self.logger.debug(f"Stack sample failed: {e}")
+            self._sample_seconds += time.perf_counter() - started
+            if time.time() - self._window_started >= self.window:
+                self._write_window()
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            name = self._thread_names.get(thread_id)
+            if name is None:
+                self._thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+                name = self._thread_names.get(thread_id, f"thread-{thread_id}")
+            prefix = name
+            if thread_id == self._loop_thread_id:
+                tool = self._loop_tool()
+                if tool:
+                    prefix = f"{name};tool:{tool}"
+            self.stacks[collapse_stack(frame, prefix, self._labels)] += 1
+        self.samples += 1
+
+    def _loop_tool(self) -> Optional[str]:
+        """读取事件循环当前任务上下文中的 current_tool"""
+        loop = self._loop
+        if loop is None:
+            return None
+        # asyncio 没有提供跨线程读取当前任务的公开接口，这里只读内部映射
+        task = asyncio.tasks._current_tasks.get(loop)
+        if task is None:
+            return None
+        if hasattr(task, "get_context"):
+            return task.get_context().get(current_tool)
+        return self.tool_lookup(task) if self.tool_lookup is not None else None
+
+    def _write_window(self) -> None:
+        """把当前窗口的样本写成 collapsed 文件并清理旧文件"""
+        stacks, self.stacks = self.stacks, Counter()
+        started, self._window_started = self._window_started, time.time()
+        if not stacks:
+            return
+        name = time.strftime("%Y%m%d-%H%M%S", time.localtime(started)) + ".collapsed"
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            path = self.output_dir / name
+            path.write_text(format_collapsed(stacks), encoding="utf-8")
+            self.last_file = path
+            self.windows_written += 1
+            for old in sorted(self.output_dir.glob("*.collapsed"))[:-self.keep]:
+                old.unlink(missing_ok=True)
+        except OSError as e:
+            self.logger.warning(f"Failed to write profile window to {self.output_dir}: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """返回采样状态和采样线程占用的时间比例"""
+        elapsed = time.time() - self._started if self._started else 0.0
+        return {
+            "running": self.running,
+            "interval_ms": self.interval * 1000,
+            "window_seconds": self.window,
+            "samples": self.samples,
+            "windows_written": self.windows_written,
+            "last_file": str(self.last_file) if self.last_file else None,
+            "overhead_ratio": round(self._sample_seconds / elapsed, 6) if elapsed > 0 else 0.0
+        }
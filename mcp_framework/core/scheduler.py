@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+工具执行调度器：优先级类别之间加权公平排队
+
+服务器同时执行的工具调用数有上限；超出上限的调用按优先级类别排队。
+类别之间采用加权公平排队（虚拟时间），权重越大获得的执行份额越多；
+同一类别内按客户端会话轮转，单个会话的大量请求不会饿死其他会话。
+
+槽位是普通的异步上下文管理器对象（不是生成器）：有空闲槽位且没有排队时，
+进入槽位只做计数，不创建 Future，也不让出事件循环。ToolSlot 在同一个对象上
+叠加服务器的准入控制（自适应并发限制、指标、事件循环监控、追踪区间）。
+"""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from .limiter import ToolOverloadedError
+from .metrics import Histogram, PrometheusWriter
+from .tracing import trace_span
+
+
+_perf_counter = time.perf_counter
+
+# 默认优先级类别及权重
+DEFAULT_PRIORITY_WEIGHTS = {
+    "interactive": 8,
+    "default": 4,
+    "bulk": 1,
+}
+
+DEFAULT_PRIORITY = "default"
+
+
+class _PriorityClass:
+    """单个优先级类别的排队状态和统计"""
+
+    def __init__(self, name: str, weight: float):
+        self.name = name
+        self.weight = weight
+        # 虚拟完成时间：越小越先被调度
+        self.finish = 0.0
+        # 会话 -> 等待中的调用；OrderedDict 的顺序即轮转顺序
+        self.sessions: "OrderedDict[str, Deque[Tuple[asyncio.Future, float]]]" = OrderedDict()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.wait_ms = Histogram()
+
+
+class ToolScheduler:
+    """
+    工具调用调度器
+
+    没有排队时调用直接获得执行槽位（只做计数），只有达到并发上限后才进入加权公平排队。
+    """
+
+    def __init__(self, max_concurrency: int = 64, weights: Optional[Dict[str, float]] = None):
+        self.max_concurrency = max(1, max_concurrency)
+        self._classes: Dict[str, _PriorityClass] = {
+            name: _PriorityClass(name, weight)
+            for name, weight in (weights or DEFAULT_PRIORITY_WEIGHTS).items()
+        }
+        self._running = 0
+        self._queued = 0
+        self._virtual_time = 0.0
+
+    def _get_class(self, priority: Optional[str]) -> _PriorityClass:
+        name = priority or DEFAULT_PRIORITY
+        cls = self._classes.get(name)
+        if cls is None:
+            raise ValueError(f"Unknown priority '{name}', expected one of: {sorted(self._classes)}")
+        return cls
+
+    def slot(self, priority: Optional[str] = None, session: str = "default") -> 'SchedulerSlot':
+        """
+        返回一个执行槽位（async with 使用），进入时获取，退出时释放
+
+        Args:
+            priority: 优先级类别名称，None 使用默认类别
+            session: 客户端会话标识，同一类别内按会话轮转
+        """
+        return SchedulerSlot(self, priority, session)
+
+    def try_acquire(self, cls: _PriorityClass) -> bool:
+        """有空闲槽位且没有排队的调用时直接占用槽位（同步快速路径）"""
+        if self._running < self.max_concurrency and self._queued == 0:
+            self._running += 1
+            cls.running += 1
+            # 等待时间为 0，直接计入第一个桶（内联 Histogram.observe(0.0)）
+            cls.wait_ms._counts[0] += 1
+            return True
+        return False
+
+    async def _acquire(self, cls: _PriorityClass, session: str) -> None:
+        """进入排队，等待 _dispatch 分配槽位（调用方已确认 try_acquire 失败）"""
+        future = asyncio.get_running_loop().create_future()
+        if cls.queued == 0:
+            # 类别从空闲变为活跃时从当前虚拟时间开始，不能积攒空闲期间的份额
+            cls.finish = max(cls.finish, self._virtual_time)
+        cls.sessions.setdefault(session, deque()).append((future, time.perf_counter()))
+        cls.queued += 1
+        self._queued += 1
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 已分配槽位但调用方被取消：归还槽位
+                self._release(cls)
+            else:
+                self._remove(cls, session, future)
+            raise
+
+    def _remove(self, cls: _PriorityClass, session: str, future: asyncio.Future) -> None:
+        """从队列中移除被取消的等待者"""
+        queue = cls.sessions.get(session)
+        if not queue:
+            return
+        for index, (waiting, _) in enumerate(queue):
+            if waiting is future:
+                del queue[index]
+                cls.queued -= 1
+                self._queued -= 1
+                break
+        if not queue:
+            cls.sessions.pop(session, None)
+
+    def _release(self, cls: _PriorityClass) -> None:
+        self._running -= 1
+        cls.running -= 1
+        cls.completed += 1
+        if self._queued:
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        """把空闲槽位分配给虚拟完成时间最小的类别中轮到的会话"""
+        while self._running < self.max_concurrency and self._queued:
+            cls = min((c for c in self._classes.values() if c.queued), key=lambda c: c.finish)
+            session, queue = next(iter(cls.sessions.items()))
+            future, enqueued = queue.popleft()
+            # 轮转：该会话移到队尾（没有剩余请求时移除）
+            del cls.sessions[session]
+            if queue:
+                cls.sessions[session] = queue
+            cls.queued -= 1
+            self._queued -= 1
+            if future.cancelled():
+                continue
+
+            self._virtual_time = cls.finish
+            cls.finish += 1.0 / cls.weight
+
+            cls.wait_ms.observe((time.perf_counter() - enqueued) * 1000)
+            self._running += 1
+            cls.running += 1
+            future.set_result(None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """返回各优先级类别的排队、执行数量和排队等待时间直方图"""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "running": self._running,
+            "queued": self._queued,
+            "classes": {
+                name: {
+                    "weight": cls.weight,
+                    "running": cls.running,
+                    "queued": cls.queued,
+                    "completed": cls.completed,
+                    "sessions_waiting": len(cls.sessions),
+                    "wait_ms": cls.wait_ms.snapshot()
+                }
+                for name, cls in self._classes.items()
+            }
+        }
+
+    def write_prometheus(self, writer: PrometheusWriter) -> None:
+        """输出 Prometheus 指标（按优先级类别）"""
+        classes = list(self._classes.values())
+        writer.histogram("scheduler_queue_wait_ms", "Time tool calls waited for a scheduler slot in milliseconds",
+                         (({"priority": cls.name}, cls.wait_ms) for cls in classes))
+        writer.metric("scheduler_queued", "gauge", "Tool calls waiting for a scheduler slot",
+                      (({"priority": cls.name}, cls.queued) for cls in classes))
+        writer.metric("scheduler_running", "gauge", "Tool calls holding a scheduler slot",
+                      (({"priority": cls.name}, cls.running) for cls in classes))
+        writer.metric("scheduler_completed_total", "counter", "Tool calls that released a scheduler slot",
+                      (({"priority": cls.name}, cls.completed) for cls in classes))
+
+
+class SchedulerSlot:
+    """
+    调度器的一个执行槽位
+
+    Args:
+        scheduler: 所属调度器
+        priority: 优先级类别名称，None 使用默认类别
+        session: 客户端会话标识
+    """
+
+    __slots__ = ("scheduler", "priority", "session", "_cls")
+
+    def __init__(self, scheduler: ToolScheduler, priority: Optional[str] = None, session: str = "default"):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.session = session
+        self._cls: Optional[_PriorityClass] = None
+
+    async def __aenter__(self) -> 'SchedulerSlot':
+        scheduler = self.scheduler
+        cls = scheduler._get_class(self.priority)
+        if not scheduler.try_acquire(cls):
+            await scheduler._acquire(cls, self.session)
+        self._cls = cls
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        self.scheduler._release(self._cls)
+        return False
+
+
+class ToolSlot(SchedulerSlot):
+    """
+    一次工具调用的准入控制和执行槽位（BaseMCPServer.tool_slot 返回）
+
+    进入时依次：开始记录工具指标、自适应并发限制（超限立即抛出 ToolOverloadedError）、
+    调度器分配槽位、在事件循环监控中标记正在执行的工具；退出时按相反顺序释放。
+    限制器测量的耗时包含调度排队时间。进入过程中某一步失败时，已完成的步骤同样被撤销。
+
+    Args:
+        scheduler: 工具调度器
+        tool_name: 工具名称
+        priority: 优先级类别，None 使用默认类别
+        session: 客户端会话标识
+        metrics: 工具的指标对象（ToolMetrics），None 表示不记录
+        limiter: 工具的自适应并发限制器，None 表示不限制
+        tracker: 标记当前任务正在执行该工具的上下文管理器（LoopMonitor.track）
+        traced: 当前请求是否被追踪采样，是时记录 dispatch 和 handler 区间
+    """
+
+    __slots__ = ("tool_name", "metrics", "limiter", "tracker", "traced",
+                 "_stage", "_started", "_limiter_started", "_limiter_inflight", "_spans")
+
+    def __init__(self, scheduler: ToolScheduler, tool_name: str, priority: Optional[str] = None,
+                 session: str = "default", metrics: Any = None, limiter: Any = None, tracker: Any = None,
+                 traced: bool = False):
+        super().__init__(scheduler, priority, session)
+        self.tool_name = tool_name
+        self.metrics = metrics
+        self.limiter = limiter
+        self.tracker = tracker
+        self.traced = traced
+        # 已完成的进入步骤：1 已开始 dispatch 区间，2 已通过限制器，3 已获得槽位，4 已标记工具
+        self._stage = 0
+        self._started = 0.0
+        self._spans = None
+
+    async def __aenter__(self) -> 'ToolSlot':
+        metrics = self.metrics
+        if metrics is not None:
+            # 内联 ToolMetrics.start()：整个调用只读取一对时钟，不额外调用方法
+            metrics.started += 1
+            self._started = _perf_counter()
+        try:
+            if self.traced:
+                self._spans = [trace_span(f"dispatch {self.tool_name}").__enter__()]
+            self._stage = 1
+            limiter = self.limiter
+            if limiter is not None:
+                if not limiter.try_acquire():
+                    raise ToolOverloadedError(limiter.name, limiter.limit)
+                self._limiter_inflight = limiter.inflight
+                # 与指标共用一对时钟读取
+                self._limiter_started = self._started if metrics is not None else _perf_counter()
+            self._stage = 2
+            scheduler = self.scheduler
+            cls = scheduler._get_class(self.priority)
+            if not scheduler.try_acquire(cls):
+                await scheduler._acquire(cls, self.session)
+            self._cls = cls
+            self._stage = 3
+            if self.tracker is not None:
+                self.tracker.__enter__()
+            self._stage = 4
+            if self.traced:
+                self._spans.append(trace_span("handler", tool=self.tool_name).__enter__())
+        except BaseException as e:
+            self._exit(type(e), e, e.__traceback__)
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        self._exit(exc_type, exc, tb)
+        return False
+
+    def _exit(self, exc_type, exc, tb) -> None:
+        """按相反顺序撤销已完成的进入步骤，并记录调用结果"""
+        stage = self._stage
+        spans = self._spans
+        if stage >= 4:
+            if spans is not None and len(spans) > 1:
+                spans.pop().__exit__(exc_type, exc, tb)
+            if self.tracker is not None:
+                self.tracker.__exit__(exc_type, exc, tb)
+        if stage >= 3:
+            self.scheduler._release(self._cls)
+        ended = None
+        if stage >= 2 and self.limiter is not None:
+            ended = _perf_counter()
+            self.limiter.release(ended - self._limiter_started, self._limiter_inflight, exc_type)
+        if spans:
+            spans.pop().__exit__(exc_type, exc, tb)
+        metrics = self.metrics
+        if metrics is not None:
+            # 内联 ToolMetrics.finish()
+            if ended is None:
+                ended = _perf_counter()
+            if exc_type is not None and issubclass(exc_type, Exception):
+                metrics.errors += 1
+            histogram = metrics.latency_ms
+            histogram._pending.append(ended - self._started)
+            histogram._room -= 1
+            if not histogram._room:
+                histogram.flush()
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+轻量级请求追踪，输出 Chrome trace-event JSON（可直接在 Perfetto / chrome://tracing 打开）
+
+服务器在请求入口用 Tracer.trace() 开启一条追踪，之后经过的各个阶段（JSON 解析、参数转换、
+调度排队、处理函数执行、响应写出等）用 trace_span() 记录为子区间。当前追踪通过 contextvar
+传递，跨越 await 和新建的任务。客户端在 trace_context() 中发出的请求会在 params._meta.traceId
+（HTTP 为 X-Trace-Id 请求头）中携带追踪 id，服务器沿用该 id。
+
+是否记录按追踪 id 的哈希采样，同一个 id 在客户端和服务器上的采样结果一致；
+未被采样的请求上 trace_span() 只做一次 contextvar 读取。
+追踪写入本地按大小轮转的文件，不需要外部收集器。
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class _TraceState:
+    """一条被采样的追踪：所属的 Tracer、追踪 id 和在 trace 视图中的泳道"""
+
+    __slots__ = ("tracer", "trace_id", "lane")
+
+    def __init__(self, tracer: 'Tracer', trace_id: str, lane: int):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.lane = lane
+
+
+_current_trace: ContextVar[Optional[_TraceState]] = ContextVar("mcp_trace", default=None)
+# 客户端侧：在 trace_context() 中发出的请求携带的追踪 id
+_client_trace_id: ContextVar[Optional[str]] = ContextVar("mcp_client_trace_id", default=None)
+
+TRACE_HEADER = "X-Trace-Id"
+
+
+def new_trace_id() -> str:
+    """生成新的追踪 id"""
+    return uuid.uuid4().hex
+
+
+def current_trace_id() -> Optional[str]:
+    """当前上下文中的追踪 id（服务器端正在记录的追踪，或客户端 trace_context 设置的 id）"""
+    state = _current_trace.get()
+    if state is not None:
+        return state.trace_id
+    return _client_trace_id.get()
+
+
+@contextmanager
+def trace_context(trace_id: Optional[str] = None) -> Iterator[str]:
+    """
+    客户端：在该上下文中发出的请求都携带同一个追踪 id
+
+    Args:
+        trace_id: 追踪 id，None 时生成新的 id
+
+    Yields:
+        str: 追踪 id
+    """
+    trace_id = trace_id or new_trace_id()
+    token = _client_trace_id.set(trace_id)
+    try:
+        yield trace_id
+    finally:
+        _client_trace_id.reset(token)
+
+
+def inject_trace(params: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """客户端：存在追踪 id 时返回在 _meta.traceId 中携带它的参数副本，否则原样返回"""
+    trace_id = current_trace_id()
+    if not trace_id:
+        return params
+    params = dict(params or {})
+    params["_meta"] = {**(params.get("_meta") or {}), "traceId": trace_id}
+    return params
+
+
+def extract_trace_id(params: Any) -> Optional[str]:
+    """服务器：从请求参数的 _meta.traceId 中读取追踪 id"""
+    if not isinstance(params, dict):
+        return None
+    meta = params.get("_meta")
+    if isinstance(meta, dict):
+        trace_id = meta.get("traceId")
+        return str(trace_id) if trace_id else None
+    return None
+
+
+def now_us() -> float:
+    """追踪使用的时间基准（微秒）"""
+    return time.perf_counter_ns() / 1000
+
+
+class _NoopSpan:
+    """未采样时使用的空区间"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **args) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    """一个完整区间（Chrome trace 的 "X" 事件）"""
+
+    __slots__ = ("state", "name", "args", "start")
+
+    def __init__(self, state: _TraceState, name: str, args: Dict[str, Any]):
+        self.state = state
+        self.name = name
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = now_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = repr(exc) if exc is not None else exc_type.__name__
+        self.state.tracer.add_span(self.state, self.name, self.start, now_us(), self.args)
+        return False
+
+    def set(self, **args) -> None:
+        """补充区间参数"""
+        self.args.update(args)
+
+
+def tracing_active() -> bool:
+    """当前请求是否被采样记录（热路径上据此跳过区间参数的构造）"""
+    return _current_trace.get() is not None
+
+
+def trace_span(name: str, **args):
+    """
+    在当前追踪中记录一个子区间（with 语句使用）；当前请求未被采样时为空操作
+
+    Args:
+        name: 区间名称
+        **args: 附加在区间上的参数
+    """
+    state = _current_trace.get()
+    if state is None:
+        return _NOOP_SPAN
+    return _Span(state, name, args)
+
+
+class _RotatingTraceFile:
+    """
+    Chrome trace-event JSON 数组格式的轮转文件
+
+    文件以 "[" 开头、每行一个事件；轮转或关闭时补上 "]"。进程异常退出时留下的未闭合文件
+    Perfetto 同样可以打开。
+    """
+
+    def __init__(self, path: Path, max_bytes: int, backup_count: int):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._file = None
+        self._size = 0
+        self._empty = True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            # 上次运行留下的文件先移入备份，避免追加到可能未闭合的数组
+            self._shift_backups()
+
+    def write(self, events: List[Dict[str, Any]]) -> None:
+        if self._file is None:
+            self._file = open(self.path, "w", encoding="utf-8")
+            self._file.write("[\n")
+            self._size = 2
+            self._empty = True
+        parts = []
+        for event in events:
+            parts.append(("" if self._empty else ",\n") + json.dumps(event, separators=(",", ":"), default=str))
+            self._empty = False
+        text = "".join(parts)
+        self._file.write(text)
+        self._file.flush()
+        self._size += len(text)
+        if self._size >= self.max_bytes:
+            self.close()
+            self._shift_backups()
+
+    def _shift_backups(self) -> None:
+        if self.backup_count <= 0:
+            self.path.unlink(missing_ok=True)
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            source = self.path.with_name(f"{self.path.name}.{index}")
+            if source.exists():
+                source.replace(self.path.with_name(f"{self.path.name}.{index + 1}"))
+        self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.write("\n]\n")
+            self._file.close()
+            self._file = None
+
+
+class Tracer:
+    """
+    追踪记录器
+
+    Args:
+        path: 追踪文件路径
+        sample_rate: 采样率（0~1），0 表示只记录 force 的追踪
+        max_bytes: 单个文件的最大字节数，超出后轮转
+        backup_count: 保留的历史文件数量
+        flush_events: 缓冲多少个事件后写入文件
+        flush_interval: 缓冲的事件最迟在该秒数后写入（进程被直接终止时最多丢失这段时间内的追踪）
+    """
+
+    def __init__(self, path: Path, sample_rate: float = 0.0, max_bytes: int = 20 * 1024 * 1024,
+                 backup_count: int = 3, flush_events: int = 512, flush_interval: float = 1.0):
+        self.path = Path(path)
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_events = flush_events
+        self.flush_interval = flush_interval
+        self.logger = logging.getLogger(f"{__name__}.Tracer")
+        self.pid = os.getpid()
+
+        self._buffer: List[Dict[str, Any]] = []
+        self._file: Optional[_RotatingTraceFile] = None
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+        self._lane_counter = itertools.count(1)
+        self._free_lanes: List[int] = []
+        self.traces = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def sampled(self, trace_id: str) -> bool:
+        """按追踪 id 的哈希决定是否采样，同一个 id 的结果总是相同"""
+        if self.sample_rate >= 1:
+            return True
+        if self.sample_rate <= 0:
+            return False
+        return zlib.crc32(trace_id.encode("utf-8")) / 0xFFFFFFFF < self.sample_rate
+
+    @contextmanager
+    def trace(self, name: str, trace_id: Optional[str] = None, start_us: Optional[float] = None,
+              force: bool = False, **args) -> Iterator[Optional[str]]:
+        """
+        开启一条追踪并记录根区间；已处于追踪中时只记录一个子区间
+
+        Args:
+            name: 根区间名称
+            trace_id: 客户端传入的追踪 id，None 时生成新的 id
+            start_us: 根区间的开始时间（now_us 时间基准），用于把进入处理前的阶段计入
+            force: 忽略采样率强制记录
+            **args: 附加在根区间上的参数
+
+        Yields:
+            Optional[str]: 被采样时为追踪 id，否则为 None
+        """
+        if _current_trace.get() is not None:
+            with trace_span(name, **args):
+                yield current_trace_id()
+            return
+        if not (self.enabled or force):
+            yield None
+            return
+        trace_id = trace_id or new_trace_id()
+        if not (force or self.sampled(trace_id)):
+            yield None
+            return
+
+        lane = self._free_lanes.pop() if self._free_lanes else next(self._lane_counter)
+        state = _TraceState(self, trace_id, lane)
+        token = _current_trace.set(state)
+        self.traces += 1
+        self._buffer.append({"name": "thread_name", "ph": "M", "pid": self.pid, "tid": lane,
+                             "args": {"name": f"{name} {trace_id[:8]}"}})
+        start = start_us if start_us is not None else now_us()
+        try:
+            with trace_span(name, **args) as root:
+                root.start = start
+                yield trace_id
+        finally:
+            _current_trace.reset(token)
+            self._free_lanes.append(lane)
+            self._schedule_flush()
+
+    def add_span(self, state: _TraceState, name: str, start_us: float, end_us: float,
+                 args: Optional[Dict[str, Any]] = None) -> None:
+        """记录一个已完成的区间"""
+        event_args = {"trace_id": state.trace_id}
+        if args:
+            event_args.update(args)
+        self._buffer.append({
+            "name": name, "cat": "mcp", "ph": "X", "pid": self.pid, "tid": state.lane,
+            "ts": round(start_us, 3), "dur": round(max(0.0, end_us - start_us), 3), "args": event_args
+        })
+        if len(self._buffer) >= self.flush_events:
+            self.flush()
+
+    def record(self, name: str, start_us: float, end_us: float, **args) -> None:
+        """在当前追踪中补记一个已发生的区间（例如进入追踪之前完成的 JSON 解析）"""
+        state = _current_trace.get()
+        if state is not None:
+            self.add_span(state, name, start_us, end_us, args)
+
+    def _schedule_flush(self) -> None:
+        """缓冲中有事件时在 flush_interval 后写入；不在事件循环中时立即写入"""
+        if self._flush_timer is not None or not self._buffer:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        self._flush_timer = loop.call_later(self.flush_interval, self.flush)
+
+    def flush(self) -> None:
+        """把缓冲的事件写入追踪文件"""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if not self._buffer:
+            return
+        events, self._buffer = self._buffer, []
+        try:
+            if self._file is None:
+                self._file = _RotatingTraceFile(self.path, self.max_bytes, self.backup_count)
+            self._file.write(events)
+        except OSError as e:
+            self.logger.warning(f"Failed to write trace file {self.path}: {e}")
+
+    def close(self) -> None:
+        """写出剩余事件并闭合追踪文件"""
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -6,8 +6,14 @@ MCP 框架工具函数
 import sys
 import os
 import argparse
+import atexit
+import copy
+import json
+import queue
+from datetime import datetime, timezone
 from pathlib import Path
 import logging
+import logging.handlers
 from typing import Optional, Dict, Any, List
 
 
@@ -102,6 +108,7 @@ def parse_command_line_args(server_name: str = "MCP Server",
   %(prog)s --host 0.0.0.0 --port 9000    # 绑定所有接口，端口 9000  
   %(prog)s --log-level DEBUG              # 启用调试日志
   %(prog)s --log-file server.log          # 保存日志到文件
+  %(prog)s --log-format json              # 输出 JSON 格式日志
         """
     )
     
@@ -134,6 +141,13 @@ def parse_command_line_args(server_name: str = "MCP Server",
         help='日志文件路径 (可选，不指定则只输出到控制台)'
     )
     
+    parser.add_argument(
+        '--log-format',
+        choices=['text', 'json'],
+        default=os.environ.get('MCP_LOG_FORMAT', 'text'),
+        help='日志格式 (默认: text，也可通过环境变量 MCP_LOG_FORMAT 设置)'
+    )
+    
     # 其他配置参数
     parser.add_argument(
         '--config-dir',
@@ -170,6 +184,7 @@ def parse_command_line_args(server_name: str = "MCP Server",
         'port': args.port,
         'log_level': args.log_level,
         'log_file': args.log_file,
+        'log_format': args.log_format,
         'config_dir': args.config_dir,
         'data_dir': args.data_dir,
         'max_connections': args.max_connections,
@@ -195,7 +210,7 @@ def create_server_config_from_args(args: Dict[str, Any]):
     
     # 移除非 ServerConfig 字段
     server_config_fields = {
-        'host', 'port', 'log_level', 'log_file', 'max_connections', 'timeout'
+        'host', 'port', 'log_level', 'log_file', 'log_format', 'max_connections', 'timeout'
     }
     
     filtered_config = {k: v for k, v in config_data.items() if k in server_config_fields}
@@ -293,11 +308,121 @@ def list_all_port_configs(server_name: str) -> Dict[str, Any]:
     return config_info
 
 
-def setup_logging(log_level=logging.INFO, log_file=None):
-    """设置日志配置"""
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
+# stdio 模式下专用于协议帧的输出流（由 reserve_stdout_for_protocol 设置）
+_protocol_stream = None
+
+
+def reserve_stdout_for_protocol():
+    """
+    将 stdout 保留给 JSON-RPC 协议帧
+
+    复制一份原始 stdout 作为协议输出流，然后把文件描述符 1、sys.stdout
+    以及指向 stdout 的日志处理器都重定向到 stderr。此后 print()、日志、
+    C 扩展和子进程的输出都不会混入协议流。重复调用返回同一个流。
+
+    Returns:
+        TextIO: 协议帧专用输出流
+    """
+    global _protocol_stream
+    if _protocol_stream is not None:
+        return _protocol_stream
+
+    original_stdout = sys.stdout
+    sys.stdout.flush()
+    try:
+        protocol_fd = os.dup(original_stdout.fileno())
+        os.dup2(sys.stderr.fileno(), original_stdout.fileno())
+        _protocol_stream = os.fdopen(protocol_fd, "w", encoding="utf-8", newline="\n")
+    except (AttributeError, OSError, ValueError):
+        # 没有真实文件描述符（如被测试框架替换），只在 Python 层重定向
+        _protocol_stream = original_stdout
+
+    sys.stdout = sys.stderr
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.StreamHandler) and handler.stream is original_stdout:
+            handler.setStream(sys.stderr)
+
+    return _protocol_stream
+
+
+def get_protocol_stream():
+    """获取协议帧输出流，未调用 reserve_stdout_for_protocol 时为当前的 sys.stdout"""
+    return _protocol_stream if _protocol_stream is not None else sys.stdout
+
+
+class JSONFormatter(logging.Formatter):
+    """每条日志输出一行 JSON，通过 extra 传入的字段原样附加"""
+
+    # LogRecord 的标准属性，不作为附加字段输出
+    _RESERVED = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in self._RESERVED and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _LoggingQueueHandler(logging.handlers.QueueHandler):
+    """
+    只在调用线程中合并消息参数，格式化（时间、JSON 等）和 I/O 交给监听线程
+
+    标准 QueueHandler.prepare 会在调用线程中完成整条日志的格式化。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        # 参数可能是之后会被修改的对象，在这里固定消息内容
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_queue_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _stop_queue_listener() -> None:
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
+def setup_logging(log_level=logging.INFO, log_file=None, log_format: str = 'text', use_queue: bool = True):
+    """
+    设置日志配置
+
+    Args:
+        log_level: 日志级别
+        log_file: 日志文件名（写入数据目录的 logs 子目录），None 表示只输出到控制台
+        log_format: text 或 json（每行一个 JSON 对象）
+        use_queue: 通过 QueueHandler / QueueListener 在后台线程中格式化和写出日志，
+            调用方（通常是事件循环线程）只需把日志记录放入队列
+    """
+    root = logging.getLogger()
+    if root.handlers and not any(isinstance(handler, _LoggingQueueHandler) for handler in root.handlers):
+        # 与 logging.basicConfig 一致：根日志器已由应用配置时不覆盖
+        return
+
+    if log_format == 'json':
+        formatter = JSONFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
     # 控制台处理器
     console_handler = logging.StreamHandler()
@@ -313,10 +438,18 @@ def setup_logging(log_level=logging.INFO, log_file=None):
         file_handler.setFormatter(formatter)
         handlers.append(file_handler)
 
+    global _queue_listener
+    _stop_queue_listener()
+    if use_queue:
+        log_queue = queue.SimpleQueue()
+        _queue_listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _queue_listener.start()
+        handlers = [_LoggingQueueHandler(log_queue)]
+
     logging.basicConfig(
         level=log_level,
         handlers=handlers,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        force=True
     )
 
 
@@ -329,7 +462,11 @@ def setup_logging_from_args(args: Dict[str, Any]) -> None:
     """
     log_level = getattr(logging, args.get('log_level', 'INFO').upper())
     log_file = args.get('log_file')
-    setup_logging(log_level, log_file)
+    setup_logging(log_level, log_file, args.get('log_format') or os.environ.get('MCP_LOG_FORMAT', 'text'))
+
+
+# 进程退出时写出队列中剩余的日志
+atexit.register(_stop_queue_listener)
 
 
 def check_dependencies():
@@ -9,13 +9,44 @@ from aiohttp import web
 from typing import Dict, Any, Union
 import json
 import asyncio
-
-from ..core.base import BaseMCPServer
+import hmac
+import ipaddress
+import os
+
+from ..core.base import BaseMCPServer, TOOLS_VERSION_HEADER
+from ..core.metrics import PrometheusWriter, request_bytes
+from ..core.tracing import TRACE_HEADER, extract_trace_id, now_us, trace_span
+from ..core.profiling import ProfilerBusyError
 from ..core.config import ConfigManager, ServerConfigAdapter
 
 logger = logging.getLogger(__name__)
 
 
+def _tool_call_many_item(index: int, result: Any, error: Exception = None) -> Dict[str, Any]:
+    """构造批量工具调用中单个调用的结果对象"""
+    if error is not None:
+        return {
+            'index': index,
+            'error': str(error)
+        }
+    return {
+        'index': index,
+        'result': {
+            'content': [
+                {
+                    'type': 'text',
+                    'text': str(result)
+                }
+            ]
+        }
+    }
+
+
+def _session_id(request) -> str:
+    """调度器使用的客户端会话标识：优先取 Mcp-Session-Id 请求头，否则使用客户端地址"""
+    return request.headers.get('Mcp-Session-Id') or request.remote or "default"
+
+
 class MCPRequestHandler:
     """MCP 请求处理器"""
 
@@ -26,29 +57,73 @@ class MCPRequestHandler:
         self.logger = logging.getLogger(f"{__name__}.MCPRequestHandler")
 
     async def handle_mcp_request(self, request):
-        """处理 MCP 请求"""
+        """处理 MCP 请求（支持 JSON-RPC 批量请求）"""
+        started = now_us()
         try:
             data = await request.json()
+        except Exception as e:
+            self.logger.error(f"Error in MCP request: {str(e)}")
+            return web.json_response({
+                'jsonrpc': '2.0',
+                'id': None,
+                'error': {
+                    'code': -32700,
+                    'message': f"Parse error: {e}"
+                }
+            })
+        parsed = now_us()
+
+        trace_id = request.headers.get(TRACE_HEADER) or extract_trace_id(
+            data.get('params') if isinstance(data, dict) else None)
+        tracer = self.mcp_server.tracer
+        with tracer.trace("http /mcp", trace_id, start_us=started):
+            tracer.record("parse_json", started, parsed, bytes=request.content_length or 0)
+            response = await self._handle_mcp_data(request, data)
+        # HTTP 没有服务器推送，客户端通过每个响应携带的版本号发现工具列表变更
+        response.headers[TOOLS_VERSION_HEADER] = str(self.mcp_server.tools_version)
+        return response
+
+    async def _handle_mcp_data(self, request, data: Any):
+        """分发已解析的单个或批量请求"""
+        session = _session_id(request)
+        # 请求字节数随上下文传给处理协程，用于按工具统计流量（批量请求按条目平均）
+        body_size = request.content_length or 0
+        if isinstance(data, list):
+            request_bytes.set(body_size // max(1, len(data)))
+            if not data:
+                return web.json_response({
+                    'jsonrpc': '2.0',
+                    'id': None,
+                    'error': {
+                        'code': -32600,
+                        'message': 'Invalid Request: empty batch'
+                    }
+                })
+            # 批量请求中的各个调用并发执行，响应顺序与请求顺序一致
+            responses = await asyncio.gather(*(self._handle_single_request(item, session) for item in data))
+            with trace_span("encode_response"):
+                return web.json_response(list(responses))
+
+        request_bytes.set(body_size)
+        result = await self._handle_single_request(data, session)
+        with trace_span("encode_response"):
+            return web.json_response(result)
+
+    async def _handle_single_request(self, data: Any, session: str = "default") -> Dict[str, Any]:
+        """处理单个 JSON-RPC 请求并返回响应对象；session 用于调度器的会话轮转"""
+        try:
+            if not isinstance(data, dict):
+                raise ValueError("Invalid Request")
+
             method = data.get('method')
             params = data.get('params', {})
             request_id = data.get('id')
 
-            self.logger.debug(f"MCP Request: {method} with params: {params}")
-
-            if method == 'initialize':
-                result = await self.handle_initialize(params)
-            elif method == 'tools/list':
-                result = await self.handle_tools_list(params)
-            elif method == 'tools/call':
-                result = await self.handle_tool_call(params)
-            elif method == 'resources/list':
-                result = await self.handle_resources_list()
-            elif method == 'resources/read':
-                result = await self.handle_resource_read(params)
-            else:
-                raise ValueError(f"Unknown method: {method}")
+            self.logger.debug("MCP Request: %s with params: %s", method, params)
+            with trace_span(f"rpc {method}"):
+                result = await self._dispatch_method(method, params, session)
 
-            response = {
+            return {
                 'jsonrpc': '2.0',
                 'id': request_id,
                 'result': result
@@ -56,16 +131,41 @@ class MCPRequestHandler:
 
         except Exception as e:
             self.logger.error(f"Error in MCP request: {str(e)}")
-            response = {
+            return {
                 'jsonrpc': '2.0',
-                'id': data.get('id') if 'data' in locals() else None,
+                'id': data.get('id') if isinstance(data, dict) else None,
                 'error': {
                     'code': -32603,
                     'message': str(e)
                 }
             }
 
-        return web.json_response(response)
+    async def _dispatch_method(self, method: str, params: Dict[str, Any], session: str) -> Any:
+        """按方法名分发 JSON-RPC 请求并返回结果"""
+        if method == 'initialize':
+            result = await self.handle_initialize(params)
+        elif method == 'tools/list':
+            result = await self.handle_tools_list(params)
+        elif method == 'tools/call':
+            result = await self.handle_tool_call(params, session)
+        elif method == 'tools/call_many':
+            result = await self.handle_tool_call_many(params, session)
+        elif method == 'tools/pipeline':
+            result = await self.mcp_server.handle_tool_pipeline(params, session)
+        elif method == 'jobs/get':
+            result = self.mcp_server.jobs.get(params.get('job_id'))
+        elif method == 'jobs/stream':
+            result = await self.mcp_server.jobs.wait_for_update(
+                params.get('job_id'), int(params.get('after', 0)), float(params.get('wait', 0)))
+        elif method == 'jobs/cancel':
+            result = await self.mcp_server.jobs.cancel(params.get('job_id'))
+        elif method == 'resources/list':
+            result = await self.handle_resources_list()
+        elif method == 'resources/read':
+            result = await self.handle_resource_read(params)
+        else:
+            raise ValueError(f"Unknown method: {method}")
+        return result
 
     async def handle_initialize(self, params):
         """处理初始化请求"""
@@ -103,12 +203,12 @@ class MCPRequestHandler:
                 elif tool.get('role') is None and tool.get('roles') is None:
                     filtered_tools.append(tool)
             return {
-                'tools': filtered_tools
+                'tools': [self.mcp_server.serialize_tool(tool) for tool in filtered_tools]
             }
         else:
             # 如果没有指定role，返回所有工具
             return {
-                'tools': self.mcp_server.tools
+                'tools': [self.mcp_server.serialize_tool(tool) for tool in self.mcp_server.tools]
             }
 
     def _coerce_value(self, value, expected_type: str):
@@ -187,8 +287,7 @@ class MCPRequestHandler:
 
         schema = getattr(tool, 'input_schema', {}) or {}
         props: Dict[str, Any] = schema.get('properties', {}) or {}
-        self.logger.info(f"Tool '{tool_name}' schema: {schema}")
-        self.logger.info(f"Tool '{tool_name}' properties: {props}")
+        self.logger.debug("Tool '%s' schema: %s", tool_name, schema)
         coerced: Dict[str, Any] = {}
 
         for key, prop_schema in props.items():
@@ -230,7 +329,7 @@ class MCPRequestHandler:
 
         return coerced
 
-    async def handle_tool_call(self, params):
+    async def handle_tool_call(self, params, session: str = "default"):
         """处理工具调用请求"""
         tool_name = params.get('name')
         arguments = params.get('arguments', {})
@@ -245,21 +344,56 @@ class MCPRequestHandler:
 
         # 基于工具 schema 对参数进行类型转换和默认值填充
         try:
-            arguments = self._coerce_arguments_with_schema(tool_name, arguments)
+            with trace_span("coerce_arguments"):
+                arguments = self._coerce_arguments_with_schema(tool_name, arguments)
         except Exception as e:
             self.logger.warning(f"Failed to coerce arguments for tool '{tool_name}': {e}")
 
-        result = await self.mcp_server.handle_tool_call(tool_name, arguments)
+        # 同一个 idempotencyKey 的重试加入进行中的调用或直接返回已保存的结果
+        key = params.get('idempotencyKey')
+
+        # 异步任务模式：立即返回 job_id，通过 jobs/get、jobs/stream 获取结果
+        if params.get('async', False):
+            return await self.mcp_server.run_idempotent(
+                key, f"{tool_name}:async", arguments,
+                lambda: self.mcp_server.jobs.submit(tool_name, arguments, params.get('priority'), session))
+
+        # 经调度器执行：并发达到上限时按优先级类别加权公平排队
+        priority = params.get('priority')
+        result = await self.mcp_server.run_idempotent(
+            key, tool_name, arguments,
+            lambda: self.mcp_server.schedule_tool_call(tool_name, arguments, priority, session))
 
+        text = str(result)
+        self.mcp_server.record_tool_io(tool_name, text)
         return {
             'content': [
                 {
                     'type': 'text',
-                    'text': str(result)
+                    'text': text
                 }
             ]
         }
 
+    async def handle_tool_call_many(self, params, session: str = "default"):
+        """处理批量工具调用请求，结果按 arguments_list 的顺序返回"""
+        tool_name = params.get('name')
+        arguments_list = params.get('arguments_list', [])
+
+        if not tool_name:
+            raise ValueError("Tool name is required")
+        if not isinstance(arguments_list, list):
+            raise ValueError("arguments_list must be a list")
+
+        results = [None] * len(arguments_list)
+        async for index, result, error in self.mcp_server.handle_tool_call_many(
+                tool_name, arguments_list, params.get('concurrency'), params.get('priority'), session):
+            results[index] = _tool_call_many_item(index, result, error)
+
+        return {
+            'results': results
+        }
+
     async def handle_resources_list(self):
         """处理资源列表请求"""
         return {
@@ -360,8 +494,7 @@ class SSEHandler:
 
         schema = getattr(tool, 'input_schema', {}) or {}
         props: Dict[str, Any] = schema.get('properties', {}) or {}
-        self.logger.info(f"Tool '{tool_name}' schema: {schema}")
-        self.logger.info(f"Tool '{tool_name}' properties: {props}")
+        self.logger.debug("Tool '%s' schema: %s", tool_name, schema)
         coerced: Dict[str, Any] = {}
 
         for key, prop_schema in props.items():
@@ -405,6 +538,11 @@ class SSEHandler:
 
     async def handle_sse_tool_call(self, request):
         """处理 SSE 工具调用请求"""
+        with self.mcp_server.tracer.trace(f"sse {request.path}", request.headers.get(TRACE_HEADER)):
+            return await self._handle_sse_tool_call(request)
+
+    async def _handle_sse_tool_call(self, request):
+        """SSE 工具调用的实际处理"""
         # 先创建 SSE 响应，确保所有错误都能通过 SSE 事件返回
         response = web.StreamResponse()
         response.headers['Content-Type'] = 'text/event-stream'
@@ -418,10 +556,12 @@ class SSEHandler:
         session_id = None
         try:
             # 获取查询参数或 POST 数据
+            priority = None
             if request.method == 'POST':
                 data = await request.json()
                 tool_name = data.get('tool_name')
                 arguments = data.get('arguments', {})
+                priority = data.get('priority')
             else:
                 # GET 请求，从查询参数获取
                 tool_name = request.query.get('tool_name')
@@ -443,9 +583,9 @@ class SSEHandler:
                         if key != 'tool_name':
                             arguments[key] = value
 
-                self.logger.debug(f"Parsed arguments from query params: {arguments}")
+                self.logger.debug("Parsed arguments from query params: %s", arguments)
 
-            self.logger.info(f"SSE tool call - tool_name: {tool_name}, arguments: {arguments}")
+            self.logger.debug("SSE tool call - tool_name: %s, arguments: %s", tool_name, arguments)
 
             if not tool_name:
                 raise ValueError("Tool name is required")
@@ -457,9 +597,10 @@ class SSEHandler:
 
             # 基于工具 schema 对参数进行类型转换和默认值填充
             try:
-                self.logger.info(f"Before coercion: {arguments}")
-                arguments = self._coerce_arguments_with_schema(tool_name, arguments)
-                self.logger.info(f"After coercion: {arguments}")
+                self.logger.debug("Before coercion: %s", arguments)
+                with trace_span("coerce_arguments"):
+                    arguments = self._coerce_arguments_with_schema(tool_name, arguments)
+                self.logger.debug("After coercion: %s", arguments)
             except Exception as e:
                 self.logger.warning(f"Failed to coerce arguments for tool '{tool_name}': {e}")
                 raise ValueError(f"Tool '{tool_name}' missing required parameter: {str(e).split(': ')[-1] if ': ' in str(e) else str(e)}")
@@ -479,32 +620,40 @@ class SSEHandler:
                 return response  # 连接已关闭，直接返回
 
             try:
-                # 所有工具都使用统一的流式处理
-                async for chunk in self.mcp_server.handle_tool_call_stream(tool_name, arguments, session_id):
-                    # 检查是否应该停止
-                    if self.mcp_server.is_streaming_stopped(session_id):
-                        await self._send_sse_event(response, 'stopped',
-                                                   {'session_id': session_id, 'reason': 'User requested stop'})
-                        break
-
-                    logger.debug(f"SSE Handler received chunk: {type(chunk)} - {chunk}")
-                    # 直接发送chunk内容，不再包装在另一个字典中
-                    if isinstance(chunk, str):
-                        try:
-                            # 尝试解析为JSON
-                            chunk_data = json.loads(chunk)
-                            logger.debug(f"SSE Handler parsed JSON chunk: {chunk_data}")
-                            if not await self._send_sse_event(response, 'data', chunk_data):
-                                break
-                        except json.JSONDecodeError:
-                            logger.debug(f"SSE Handler sending plain text chunk: {chunk}")
-                            if not await self._send_sse_event(response, 'data', {'chunk': chunk}):
-                                break
-                    else:
-                        logger.debug(f"SSE Handler sending dict chunk: {chunk}")
-                        if not await self._send_sse_event(response, 'data', chunk):
-                            break  # 连接已关闭，退出循环
-                    await asyncio.sleep(0.01)  # 小延迟避免过快发送
+                # 逐块日志只在开启 DEBUG 时格式化，判断在循环外完成一次
+                debug = logger.isEnabledFor(logging.DEBUG)
+                # 所有工具都使用统一的流式处理，与普通调用一样经 tool_slot 排队、限流并记录指标
+                async with self.mcp_server.tool_slot(tool_name, priority, _session_id(request)):
+                    async for chunk in self.mcp_server.handle_tool_call_stream(tool_name, arguments, session_id):
+                        self.mcp_server.record_stream_chunk(tool_name, chunk)
+                        # 检查是否应该停止
+                        if self.mcp_server.is_streaming_stopped(session_id):
+                            await self._send_sse_event(response, 'stopped',
+                                                       {'session_id': session_id, 'reason': 'User requested stop'})
+                            break
+
+                        if debug:
+                            logger.debug("SSE Handler received chunk: %s - %s", type(chunk), chunk)
+                        # 直接发送chunk内容，不再包装在另一个字典中
+                        if isinstance(chunk, str):
+                            try:
+                                # 尝试解析为JSON
+                                chunk_data = json.loads(chunk)
+                                if debug:
+                                    logger.debug("SSE Handler parsed JSON chunk: %s", chunk_data)
+                                if not await self._send_sse_event(response, 'data', chunk_data):
+                                    break
+                            except json.JSONDecodeError:
+                                if debug:
+                                    logger.debug("SSE Handler sending plain text chunk: %s", chunk)
+                                if not await self._send_sse_event(response, 'data', {'chunk': chunk}):
+                                    break
+                        else:
+                            if debug:
+                                logger.debug("SSE Handler sending dict chunk: %s", chunk)
+                            if not await self._send_sse_event(response, 'data', chunk):
+                                break  # 连接已关闭，退出循环
+                        await asyncio.sleep(0.01)  # 小延迟避免过快发送
 
                 # 发送完成事件
                 await self._send_sse_event(response, 'end', {'status': 'completed', 'session_id': session_id})
@@ -536,6 +685,58 @@ class SSEHandler:
         
         return response
 
+    async def handle_sse_tool_call_many(self, request):
+        """处理 SSE 批量工具调用请求，每个调用完成后发送一个 result 事件"""
+        with self.mcp_server.tracer.trace(f"sse {request.path}", request.headers.get(TRACE_HEADER)):
+            return await self._handle_sse_tool_call_many(request)
+
+    async def _handle_sse_tool_call_many(self, request):
+        """SSE 批量工具调用的实际处理"""
+        response = web.StreamResponse()
+        response.headers['Content-Type'] = 'text/event-stream'
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['Connection'] = 'keep-alive'
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        response.headers['Access-Control-Allow-Headers'] = 'Cache-Control'
+
+        await response.prepare(request)
+
+        try:
+            data = await request.json()
+            tool_name = data.get('tool_name')
+            arguments_list = data.get('arguments_list', [])
+
+            if not tool_name:
+                raise ValueError("Tool name is required")
+            if not isinstance(arguments_list, list):
+                raise ValueError("arguments_list must be a list")
+
+            if not await self._send_sse_event(response, 'start', {
+                'tool_name': tool_name,
+                'count': len(arguments_list)
+            }):
+                return response
+
+            results = self.mcp_server.handle_tool_call_many(
+                tool_name, arguments_list, data.get('concurrency'), data.get('priority'), _session_id(request))
+            try:
+                async for index, result, error in results:
+                    if not await self._send_sse_event(response, 'result', _tool_call_many_item(index, result, error)):
+                        return response  # 连接已关闭，取消剩余调用
+            finally:
+                await results.aclose()
+
+            await self._send_sse_event(response, 'end', {'status': 'completed'})
+
+        except Exception as e:
+            self.logger.error(f"SSE tool call_many error: {str(e)}")
+            await self._send_sse_event(response, 'error', {
+                'error': str(e),
+                'code': 'TOOL_CALL_ERROR'
+            })
+
+        return response
+
     async def _send_sse_event(self, response, event_type: str, data: dict):
         """发送 SSE 事件"""
         try:
@@ -551,10 +752,11 @@ class SSEHandler:
                 self.logger.warning(f"SSE响应未准备好，跳过发送事件: {event_type}")
                 return False
 
-            event_data = json.dumps(data, ensure_ascii=False)
-            message = f"event: {event_type}\ndata: {event_data}\n\n"
-            await response.write(message.encode('utf-8'))
-            await response.drain()
+            with trace_span("sse_write", event=event_type):
+                event_data = json.dumps(data, ensure_ascii=False)
+                message = f"event: {event_type}\ndata: {event_data}\n\n"
+                await response.write(message.encode('utf-8'))
+                await response.drain()
             return True
         except Exception as e:
             self.logger.warning(f"发送SSE事件失败: {e}")
@@ -600,6 +802,11 @@ class SSEHandler:
     
     async def handle_sse_tool_call_openai(self, request):
         """处理 OpenAI 格式的 SSE 工具调用请求"""
+        with self.mcp_server.tracer.trace(f"sse {request.path}", request.headers.get(TRACE_HEADER)):
+            return await self._handle_sse_tool_call_openai(request)
+
+    async def _handle_sse_tool_call_openai(self, request):
+        """OpenAI 格式 SSE 工具调用的实际处理"""
         # 创建 SSE 响应
         response = web.StreamResponse()
         response.headers['Content-Type'] = 'text/event-stream'
@@ -613,10 +820,12 @@ class SSEHandler:
         session_id = None
         try:
             # 获取查询参数或 POST 数据
+            priority = None
             if request.method == 'POST':
                 data = await request.json()
                 tool_name = data.get('tool_name')
                 arguments = data.get('arguments', {})
+                priority = data.get('priority')
             else:
                 # GET 请求，从查询参数获取
                 tool_name = request.query.get('tool_name')
@@ -636,7 +845,7 @@ class SSEHandler:
                         if key != 'tool_name':
                             arguments[key] = value
 
-            self.logger.info(f"OpenAI SSE tool call - tool_name: {tool_name}, arguments: {arguments}")
+            self.logger.debug("OpenAI SSE tool call - tool_name: %s, arguments: %s", tool_name, arguments)
 
             if not tool_name:
                 raise ValueError("Tool name is required")
@@ -659,23 +868,25 @@ class SSEHandler:
             response.headers['X-Session-ID'] = session_id
 
             try:
-                # 使用OpenAI格式的流式处理
-                async for openai_chunk in self.mcp_server.handle_tool_call_stream_openai(tool_name, arguments, session_id):
-                    # 检查是否应该停止
-                    if self.mcp_server.is_streaming_stopped(session_id):
-                        # 发送停止事件
-                        await response.write(b"data: [DONE]\n\n")
-                        break
-
-                    # 直接写入OpenAI格式的SSE数据
-                    try:
-                        await response.write(openai_chunk.encode('utf-8'))
-                        await response.drain()
-                    except Exception as write_error:
-                        self.logger.warning(f"Failed to write OpenAI SSE data: {write_error}")
-                        break
+                # 使用OpenAI格式的流式处理（经 tool_slot 排队、限流并记录指标）
+                async with self.mcp_server.tool_slot(tool_name, priority, _session_id(request)):
+                    async for openai_chunk in self.mcp_server.handle_tool_call_stream_openai(tool_name, arguments, session_id):
+                        self.mcp_server.record_stream_chunk(tool_name, openai_chunk)
+                        # 检查是否应该停止
+                        if self.mcp_server.is_streaming_stopped(session_id):
+                            # 发送停止事件
+                            await response.write(b"data: [DONE]\n\n")
+                            break
+
+                        # 直接写入OpenAI格式的SSE数据
+                        try:
+                            await response.write(openai_chunk.encode('utf-8'))
+                            await response.drain()
+                        except Exception as write_error:
+                            self.logger.warning(f"Failed to write OpenAI SSE data: {write_error}")
+                            break
                     
-                    await asyncio.sleep(0.01)  # 小延迟避免过快发送
+                        await asyncio.sleep(0.01)  # 小延迟避免过快发送
 
                 # 发送完成标记
                 await response.write(b"data: [DONE]\n\n")
@@ -716,6 +927,33 @@ class APIHandler:
         self.config_manager = config_manager
         self.start_time = datetime.now()
         self.logger = logging.getLogger(f"{__name__}.APIHandler")
+        # /debug/* 管理接口的令牌；未设置时只允许本机访问
+        self.admin_token = os.environ.get('MCP_ADMIN_TOKEN') or None
+
+    def _check_admin(self, request):
+        """
+        校验管理接口的访问权限
+
+        设置了 MCP_ADMIN_TOKEN 时要求 Authorization: Bearer <token>（或 X-Admin-Token 请求头），
+        否则只允许来自本机回环地址的请求。
+
+        Returns:
+            通过时返回 None，否则返回 401 / 403 响应
+        """
+        if self.admin_token:
+            auth = request.headers.get('Authorization', '')
+            token = auth[7:] if auth.startswith('Bearer ') else request.headers.get('X-Admin-Token', '')
+            if hmac.compare_digest(token.encode('utf-8'), self.admin_token.encode('utf-8')):
+                return None
+            return web.json_response({'error': 'Admin token required'}, status=401,
+                                     headers={'WWW-Authenticate': 'Bearer'})
+        try:
+            if ipaddress.ip_address(request.remote or '').is_loopback:
+                return None
+        except ValueError:
+            pass
+        return web.json_response({'error': 'Debug endpoints are only available from localhost '
+                                           'unless MCP_ADMIN_TOKEN is set'}, status=403)
 
     async def health_check(self, request):
         """健康检查"""
@@ -741,15 +979,93 @@ class APIHandler:
         })
 
     async def metrics(self, request):
-        """服务器指标"""
+        """服务器指标（JSON；?format=prometheus 时输出 Prometheus 文本格式）"""
+        if request.query.get('format') == 'prometheus':
+            return await self.metrics_prometheus(request)
         uptime = (datetime.now() - self.start_time).total_seconds()
         return web.json_response({
             'uptime_seconds': uptime,
             'tools_count': len(self.mcp_server.tools),
             'resources_count': len(self.mcp_server.resources),
-            'streaming_tools_count': len(self.mcp_server.tools)  # 所有工具都支持流式
+            'streaming_tools_count': len(self.mcp_server.tools),  # 所有工具都支持流式
+            'tools': self.mcp_server.get_tool_metrics(),
+            'batch_tools': self.mcp_server.get_batch_metrics(),
+            'scheduler': self.mcp_server.get_scheduler_metrics(),
+            'concurrency_limits': self.mcp_server.get_limiter_metrics(),
+            'event_loop': self.mcp_server.get_loop_metrics(),
+            'sampling_profiler': self.mcp_server.get_profiler_metrics(),
+            'gc': self.mcp_server.get_gc_metrics()
         })
 
+    async def metrics_prometheus(self, request):
+        """Prometheus 文本格式的服务器指标"""
+        return web.Response(body=self.mcp_server.render_prometheus_metrics().encode('utf-8'),
+                            headers={'Content-Type': PrometheusWriter.CONTENT_TYPE})
+
+    async def debug_slow(self, request):
+        """最近的事件循环停顿（慢处理函数）及其调用栈"""
+        denied = self._check_admin(request)
+        if denied is not None:
+            return denied
+        try:
+            limit = int(request.query.get('limit', 0)) or None
+        except ValueError:
+            limit = None
+        return web.json_response(self.mcp_server.get_slow_events(limit))
+
+    async def debug_profile(self, request):
+        """
+        采集一个 CPU 剖析窗口
+
+        查询参数: seconds（默认 10）、format（pstats / raw / collapsed，默认 pstats）、
+        sort（pstats 排序键，默认 cumulative）、limit（pstats 输出的函数数量，默认 50）
+        """
+        denied = self._check_admin(request)
+        if denied is not None:
+            return denied
+        query = request.query
+        try:
+            capture = await self.mcp_server.profiler.profile(
+                float(query.get('seconds', 10)),
+                output=query.get('format', 'pstats'),
+                sort=query.get('sort', 'cumulative'),
+                limit=int(query.get('limit', 50))
+            )
+        except ValueError as e:
+            return web.json_response({'error': str(e)}, status=400)
+        except ProfilerBusyError as e:
+            return web.json_response({'error': str(e)}, status=409)
+
+        if capture['format'] == 'raw':
+            return web.Response(body=capture['data'], content_type='application/octet-stream', headers={
+                'Content-Disposition': f'attachment; filename="{self.mcp_server.name}.prof"'
+            })
+        return web.Response(text=capture['data'], content_type='text/plain')
+
+    async def debug_heap(self, request):
+        """
+        采集一个内存分配窗口，返回窗口内增长最多的分配位置
+
+        查询参数: seconds（默认 10）、limit（默认 20）、group_by（lineno / filename / traceback）、
+        frames（每次分配记录的栈深度，默认 1）
+        """
+        denied = self._check_admin(request)
+        if denied is not None:
+            return denied
+        query = request.query
+        try:
+            result = await self.mcp_server.profiler.heap(
+                float(query.get('seconds', 10)),
+                limit=int(query.get('limit', 20)),
+                group_by=query.get('group_by', 'lineno'),
+                frames=int(query.get('frames', 1))
+            )
+        except ValueError as e:
+            return web.json_response({'error': str(e)}, status=400)
+        except ProfilerBusyError as e:
+            return web.json_response({'error': str(e)}, status=409)
+        return web.json_response(result)
+
     async def version_info(self, request):
         """版本信息"""
         return web.json_response({
@@ -778,12 +1094,12 @@ class APIHandler:
                 elif tool.get('role') is None and tool.get('roles') is None:
                     filtered_tools.append(tool)
             return web.json_response({
-                'tools': filtered_tools
+                'tools': [self.mcp_server.serialize_tool(tool) for tool in filtered_tools]
             })
         else:
             # 如果没有指定role，返回所有工具
             return web.json_response({
-                'tools': self.mcp_server.tools
+                'tools': [self.mcp_server.serialize_tool(tool) for tool in self.mcp_server.tools]
             })
 
     async def get_config(self, request):
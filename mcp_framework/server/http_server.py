@@ -63,6 +63,10 @@ class MCPHTTPServer:
         self.app.router.add_get('/health', self.api_handler.health_check)
         self.app.router.add_get('/info', self.api_handler.server_info)
         self.app.router.add_get('/metrics', self.api_handler.metrics)
+        self.app.router.add_get('/metrics/prometheus', self.api_handler.metrics_prometheus)
+        self.app.router.add_get('/debug/slow', self.api_handler.debug_slow)
+        self.app.router.add_get('/debug/profile', self.api_handler.debug_profile)
+        self.app.router.add_get('/debug/heap', self.api_handler.debug_heap)
         self.app.router.add_get('/version', self.api_handler.version_info)
         self.app.router.add_get('/tools/list', self.api_handler.tools_list)
 
@@ -91,6 +95,7 @@ class MCPHTTPServer:
         self.app.router.add_get('/sse/tool/call', self.sse_handler.handle_sse_tool_call)
         self.app.router.add_post('/sse/tool/call', self.sse_handler.handle_sse_tool_call)
         self.app.router.add_get('/sse/info', self.sse_handler.handle_sse_info)
+        self.app.router.add_post('/sse/tools/call_many', self.sse_handler.handle_sse_tool_call_many)
         
         # OpenAI 格式的 SSE 路由 - 新增
         self.app.router.add_get('/sse/openai/tool/call', self.sse_handler.handle_sse_tool_call_openai)
@@ -100,6 +105,7 @@ class MCPHTTPServer:
         self.app.router.add_get('/mcp/sse/tool/call', self.sse_handler.handle_sse_tool_call)
         self.app.router.add_post('/mcp/sse/tool/call', self.sse_handler.handle_sse_tool_call)
         self.app.router.add_get('/mcp/sse/info', self.sse_handler.handle_sse_info)
+        self.app.router.add_post('/mcp/sse/tools/call_many', self.sse_handler.handle_sse_tool_call_many)
         
         # OpenAI 格式的 SSE 路由 - 兼容 /mcp 前缀
         self.app.router.add_get('/mcp/sse/openai/tool/call', self.sse_handler.handle_sse_tool_call_openai)
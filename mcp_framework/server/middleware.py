@@ -4,8 +4,8 @@ MCP HTTP 服务器中间件
 """
 
 import logging
+import time
 import traceback
-from datetime import datetime
 from aiohttp import web
 
 logger = logging.getLogger(__name__)
@@ -37,8 +37,8 @@ async def error_middleware(request, handler):
 @web.middleware
 async def logging_middleware(request, handler):
     """日志中间件"""
-    start_time = datetime.now()
+    start_time = time.perf_counter()
     response = await handler(request)
-    duration = (datetime.now() - start_time).total_seconds()
-    logger.info(f"{request.method} {request.path} - {response.status} - {duration:.3f}s")
+    duration = time.perf_counter() - start_time
+    logger.info("%s %s - %s - %.3fs", request.method, request.path, response.status, duration)
     return response
@@ -5,12 +5,19 @@ MCP stdio 服务器实现
 """
 
 import asyncio
+import base64
 import json
 import logging
+import os
 import sys
-from typing import Dict, Any, Optional, AsyncGenerator
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, AsyncGenerator, Iterator, Tuple
 from ..core.base import BaseMCPServer
 from ..core.config import ConfigManager
+from ..core.jobs import FINISHED_STATES
+from ..core.metrics import request_bytes
+from ..core.tracing import extract_trace_id, now_us, trace_span
+from ..core.utils import get_protocol_stream
 
 logger = logging.getLogger(__name__)
 
@@ -23,7 +30,8 @@ class MCPStdioServer:
         self.config_manager = config_manager
         self.logger = logging.getLogger(f"{__name__}.MCPStdioServer")
         self._running = False
-        self._stream_tasks = set()  # 跟踪流式任务
+        self._stream_tasks = set()  # 跟踪流式任务和普通请求任务
+        self._tools_changed_pending = False
         
     async def start(self):
         """启动stdio服务器"""
@@ -34,6 +42,10 @@ class MCPStdioServer:
         if not self.mcp_server._initialized:
             await self.mcp_server.initialize()
         
+        # 通知客户端服务器已就绪，客户端据此结束连接等待而不是固定休眠
+        await self._send_ready()
+        self.mcp_server.register_tools_changed_callback(self._on_tools_changed)
+        
         try:
             # 主循环：读取stdin，处理请求，写入stdout
             while self._running:
@@ -43,12 +55,17 @@ class MCPStdioServer:
                     if not line:
                         break
                         
-                    # 解析JSON请求
+                    # 解析JSON请求（记录解析耗时，请求被追踪采样时计入追踪）
+                    received = now_us()
                     try:
                         request = json.loads(line.strip())
                     except json.JSONDecodeError as e:
                         await self._send_error(f"Invalid JSON: {e}")
                         continue
+                    parse_span = (received, now_us())
+                    
+                    # 请求字节数随上下文传给处理任务，用于按工具统计流量
+                    request_bytes.set(len(line))
                     
                     # 处理请求 - 支持流式和非流式
                     request_id = request.get("id")
@@ -58,14 +75,15 @@ class MCPStdioServer:
                     if self._is_streaming_request(request):
                         # 创建流式处理任务
                         task = asyncio.create_task(
-                            self._handle_streaming_request(request)
+                            self._handle_streaming_request(request, parse_span)
                         )
-                        self._stream_tasks.add(task)
-                        task.add_done_callback(self._stream_tasks.discard)
                     else:
-                        # 普通请求处理
-                        response = await self._handle_request(request)
-                        await self._send_response(response)
+                        # 普通请求同样并发处理，客户端按 id 匹配响应
+                        task = asyncio.create_task(
+                            self._handle_and_respond(request, parse_span)
+                        )
+                    self._stream_tasks.add(task)
+                    task.add_done_callback(self._stream_tasks.discard)
                     
                 except Exception as e:
                     self.logger.error(f"处理请求时出错: {e}")
@@ -75,6 +93,10 @@ class MCPStdioServer:
             self.logger.info("收到中断信号，停止服务器")
         finally:
             self._running = False
+            self.mcp_server.unregister_tools_changed_callback(self._on_tools_changed)
+            # 输入结束后等待已接收的请求处理完毕，保证响应写出
+            if self._stream_tasks:
+                await asyncio.gather(*list(self._stream_tasks), return_exceptions=True)
             
     async def stop(self):
         """停止stdio服务器"""
@@ -87,10 +109,35 @@ class MCPStdioServer:
         
         # 等待所有任务完成
         if self._stream_tasks:
-            await asyncio.gather(*self._stream_tasks, return_exceptions=True)
+            await asyncio.gather(*list(self._stream_tasks), return_exceptions=True)
             
         self.logger.info("MCP stdio服务器停止")
         
+    @contextmanager
+    def _trace_request(self, request: Dict[str, Any],
+                       parse_span: Optional[Tuple[float, float]]) -> Iterator[None]:
+        """
+        为一个请求开启追踪（按采样率），沿用 params._meta.traceId 中客户端传入的追踪 id
+
+        Args:
+            request: 请求
+            parse_span: 读取循环中 JSON 解析的开始和结束时间（now_us 时间基准）
+        """
+        tracer = self.mcp_server.tracer
+        started = parse_span[0] if parse_span else None
+        with tracer.trace(f"stdio {request.get('method', '')}", extract_trace_id(request.get("params")),
+                          start_us=started):
+            if parse_span:
+                tracer.record("parse_json", *parse_span)
+            yield
+
+    async def _handle_and_respond(self, request: Dict[str, Any],
+                                  parse_span: Optional[Tuple[float, float]] = None):
+        """处理普通请求并写出响应"""
+        with self._trace_request(request, parse_span):
+            response = await self._handle_request(request)
+            await self._send_response(response)
+        
     async def _read_line(self) -> Optional[str]:
         """从stdin异步读取一行"""
         try:
@@ -105,8 +152,11 @@ class MCPStdioServer:
     async def _send_response(self, response: Dict[str, Any]):
         """发送响应到stdout"""
         try:
-            json_str = json.dumps(response, ensure_ascii=False)
-            print(json_str, flush=True)
+            with trace_span("write_response"):
+                json_str = json.dumps(response, ensure_ascii=False)
+                stream = get_protocol_stream()
+                stream.write(json_str + "\n")
+                stream.flush()
         except Exception as e:
             self.logger.error(f"发送响应失败: {e}")
             
@@ -147,6 +197,12 @@ class MCPStdioServer:
                 result = await self._handle_tools_list(params)
             elif method == "tools/call":
                 result = await self._handle_tool_call(params)
+            elif method == "tools/pipeline":
+                result = await self.mcp_server.handle_tool_pipeline(params, params.get("session", "stdio"))
+            elif method == "jobs/get":
+                result = self.mcp_server.jobs.get(params.get("job_id"))
+            elif method == "jobs/cancel":
+                result = await self.mcp_server.jobs.cancel(params.get("job_id"))
             elif method == "resources/list":
                 result = await self._handle_resources_list()
             elif method == "resources/read":
@@ -162,6 +218,30 @@ class MCPStdioServer:
                 result = await self._handle_server_parameters(params)
             elif method == "server/configure":
                 result = await self._handle_server_configure(params)
+            elif method == "server/metrics":
+                if params.get("format") == "prometheus":
+                    result = {"text": self.mcp_server.render_prometheus_metrics()}
+                else:
+                    result = {
+                        "tools": self.mcp_server.get_tool_metrics(),
+                        "batch_tools": self.mcp_server.get_batch_metrics(),
+                        "scheduler": self.mcp_server.get_scheduler_metrics(),
+                        "concurrency_limits": self.mcp_server.get_limiter_metrics(),
+                        "event_loop": self.mcp_server.get_loop_metrics(),
+                        "sampling_profiler": self.mcp_server.get_profiler_metrics(),
+                        "gc": self.mcp_server.get_gc_metrics()
+                    }
+            elif method == "debug/slow":
+                result = self.mcp_server.get_slow_events(params.get("limit"))
+            elif method == "debug/profile":
+                result = await self._handle_debug_profile(params)
+            elif method == "debug/heap":
+                result = await self.mcp_server.profiler.heap(
+                    params.get("seconds", 10),
+                    limit=params.get("limit", 20),
+                    group_by=params.get("group_by", "lineno"),
+                    frames=params.get("frames", 1)
+                )
             else:
                 return {
                     "jsonrpc": "2.0",
@@ -194,7 +274,9 @@ class MCPStdioServer:
         return {
             "protocolVersion": "2024-11-05",
             "capabilities": {
-                "tools": {},
+                "tools": {
+                    "listChanged": True
+                },
                 "resources": {}
             },
             "serverInfo": {
@@ -208,6 +290,10 @@ class MCPStdioServer:
         method = request.get("method", "")
         params = request.get("params", {})
         
+        # 异步任务模式立即返回 job_id，不走流式通道
+        if method == "tools/call" and params.get("async", False):
+            return False
+        
         # 检查是否明确要求流式传输
         if params.get("stream", False):
             return True
@@ -215,14 +301,22 @@ class MCPStdioServer:
         # 检查特定的流式方法
         streaming_methods = [
             "tools/call_streaming",
+            "tools/call_many",
+            "jobs/stream",
             "resources/read_streaming", 
             "completion/stream"
         ]
         
         return method in streaming_methods
     
-    async def _handle_streaming_request(self, request: Dict[str, Any]):
+    async def _handle_streaming_request(self, request: Dict[str, Any],
+                                        parse_span: Optional[Tuple[float, float]] = None):
         """处理流式请求"""
+        with self._trace_request(request, parse_span):
+            await self._run_streaming_request(request)
+
+    async def _run_streaming_request(self, request: Dict[str, Any]):
+        """执行流式请求并逐块写出"""
         try:
             method = request.get("method", "")
             request_id = request.get("id")
@@ -238,6 +332,14 @@ class MCPStdioServer:
             elif method == "resources/read" or method == "resources/read_streaming":
                 async for chunk in self._handle_resource_read_streaming(params):
                     await self._send_stream_chunk(request_id, chunk)
+            
+            elif method == "tools/call_many":
+                async for chunk in self._handle_tool_call_many(params):
+                    await self._send_stream_chunk(request_id, chunk)
+            
+            elif method == "jobs/stream":
+                async for chunk in self._handle_job_stream(params):
+                    await self._send_stream_chunk(request_id, chunk)
                     
             else:
                 # 默认流式处理
@@ -252,37 +354,41 @@ class MCPStdioServer:
             await self._send_stream_error(request_id, str(e))
     
     async def _handle_tool_call_streaming(self, params: Dict[str, Any]) -> AsyncGenerator[Dict[str, Any], None]:
-        """流式工具调用"""
+        """流式工具调用（与普通调用一样经 tool_slot 排队、限流并记录指标）"""
         tool_name = params.get("name", "")
         arguments = params.get("arguments", {})
         
         try:
-            # 检查工具是否支持流式
-            if hasattr(self.mcp_server, '_stream_handlers') and tool_name in self.mcp_server._stream_handlers:
-                async for chunk in self.mcp_server._stream_handlers[tool_name](**arguments):
-                    yield {
-                        "type": "tool_result_chunk",
-                        "tool": tool_name,
-                        "content": chunk
-                    }
-            else:
-                # 回退到普通调用，模拟流式
-                result = await self.mcp_server.handle_tool_call(tool_name, arguments)
-                
-                # 将结果分块发送
-                content = str(result.get("content", ""))
-                chunk_size = 50  # 每块50字符
-                
-                for i in range(0, len(content), chunk_size):
-                    chunk = content[i:i + chunk_size]
-                    yield {
-                        "type": "tool_result_chunk", 
-                        "tool": tool_name,
-                        "content": chunk,
-                        "is_final": i + chunk_size >= len(content)
-                    }
-                    # 模拟流式延迟
-                    await asyncio.sleep(0.1)
+            if not any(tool.get('name') == tool_name for tool in self.mcp_server.tools):
+                raise ValueError(f"Tool '{tool_name}' not found")
+            async with self.mcp_server.tool_slot(tool_name, params.get("priority"), params.get("session", "stdio")):
+                # 检查工具是否支持流式
+                if hasattr(self.mcp_server, '_stream_handlers') and tool_name in self.mcp_server._stream_handlers:
+                    async for chunk in self.mcp_server._stream_handlers[tool_name](**arguments):
+                        self.mcp_server.record_stream_chunk(tool_name, chunk)
+                        yield {
+                            "type": "tool_result_chunk",
+                            "tool": tool_name,
+                            "content": chunk
+                        }
+                else:
+                    # 回退到普通调用，模拟流式
+                    result = await self.mcp_server.handle_tool_call(tool_name, arguments)
+                    
+                    # 将结果分块发送
+                    content = str(result.get("content", ""))
+                    chunk_size = 50  # 每块50字符
+                    
+                    for i in range(0, len(content), chunk_size):
+                        chunk = content[i:i + chunk_size]
+                        yield {
+                            "type": "tool_result_chunk", 
+                            "tool": tool_name,
+                            "content": chunk,
+                            "is_final": i + chunk_size >= len(content)
+                        }
+                        # 模拟流式延迟
+                        await asyncio.sleep(0.1)
                     
         except Exception as e:
             yield {
@@ -290,6 +396,60 @@ class MCPStdioServer:
                 "message": f"工具调用失败: {e}"
             }
     
+    async def _handle_tool_call_many(self, params: Dict[str, Any]) -> AsyncGenerator[Dict[str, Any], None]:
+        """批量工具调用：每个调用完成后产出一个带 index 的结果块"""
+        tool_name = params.get("name")
+        arguments_list = params.get("arguments_list", [])
+        
+        if not tool_name:
+            raise ValueError("Missing tool name")
+        if not isinstance(arguments_list, list):
+            raise ValueError("arguments_list must be a list")
+        
+        async for index, result, error in self.mcp_server.handle_tool_call_many(
+                tool_name, arguments_list, params.get("concurrency"),
+                params.get("priority"), params.get("session", "stdio")):
+            if error is not None:
+                yield {
+                    "type": "tool_call_result",
+                    "index": index,
+                    "error": str(error)
+                }
+            else:
+                yield {
+                    "type": "tool_call_result",
+                    "index": index,
+                    "result": {
+                        "content": [
+                            {
+                                "type": "text",
+                                "text": str(result)
+                            }
+                        ]
+                    }
+                }
+    
+    async def _handle_job_stream(self, params: Dict[str, Any]) -> AsyncGenerator[Dict[str, Any], None]:
+        """异步任务输出流：从 after 之后的块开始推送，任务结束时发送最终状态"""
+        job_id = params.get("job_id")
+        after = int(params.get("after", 0))
+        
+        while True:
+            update = await self.mcp_server.jobs.wait_for_update(job_id, after, timeout=30)
+            for chunk in update["chunks"]:
+                yield {
+                    "type": "job_chunk",
+                    "seq": chunk["seq"],
+                    "content": chunk["content"]
+                }
+            after = update["next"]
+            if update["status"] in FINISHED_STATES:
+                yield {
+                    "type": "job_status",
+                    **{key: value for key, value in update.items() if key not in ("chunks", "next")}
+                }
+                return
+    
     async def _handle_resource_read_streaming(self, params: Dict[str, Any]) -> AsyncGenerator[Dict[str, Any], None]:
         """流式资源读取"""
         uri = params.get("uri", "")
@@ -326,6 +486,43 @@ class MCPStdioServer:
                 "message": f"资源读取失败: {e}"
             }
     
+    async def _send_ready(self):
+        """发送就绪通知"""
+        message = {
+            "jsonrpc": "2.0",
+            "method": "notifications/ready",
+            "params": {
+                "name": self.mcp_server.name,
+                "version": self.mcp_server.version,
+                "pid": os.getpid()
+            }
+        }
+        await self._send_response(message)
+    
+    def _on_tools_changed(self, version: int):
+        """工具注册表变更回调：同一轮事件循环内的多次变更合并为一条通知"""
+        if self._tools_changed_pending:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._tools_changed_pending = True
+        loop.call_soon(self._flush_tools_changed)
+    
+    def _flush_tools_changed(self):
+        """发送工具列表变更通知"""
+        self._tools_changed_pending = False
+        task = asyncio.ensure_future(self._send_response({
+            "jsonrpc": "2.0",
+            "method": "notifications/tools/list_changed",
+            "params": {
+                "version": self.mcp_server.tools_version
+            }
+        }))
+        self._stream_tasks.add(task)
+        task.add_done_callback(self._stream_tasks.discard)
+    
     async def _send_stream_start(self, request_id: Any):
         """发送流开始标记"""
         message = {
@@ -389,11 +586,11 @@ class MCPStdioServer:
                 elif tool.get('role') is None and tool.get('roles') is None:
                     filtered_tools.append(tool)
             return {
-                "tools": filtered_tools
+                "tools": [self.mcp_server.serialize_tool(tool) for tool in filtered_tools]
             }
         else:
             return {
-                "tools": self.mcp_server.tools
+                "tools": [self.mcp_server.serialize_tool(tool) for tool in self.mcp_server.tools]
             }
     
     async def _handle_tool_call(self, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -403,19 +600,49 @@ class MCPStdioServer:
         
         if not tool_name:
             raise ValueError("Missing tool name")
+        # 与 HTTP 一样在进入 tool_slot 之前拒绝未知的工具
+        if not any(tool.get('name') == tool_name for tool in self.mcp_server.tools):
+            raise ValueError(f"Tool '{tool_name}' not found")
+        
+        # 同一个 idempotencyKey 的重试加入进行中的调用或直接返回已保存的结果
+        key = params.get("idempotencyKey")
         
-        # 调用MCP服务器的工具处理方法
-        result = await self.mcp_server.handle_tool_call(tool_name, arguments)
+        # 异步任务模式：立即返回 job_id，通过 jobs/get、jobs/stream 获取结果
+        priority, session = params.get("priority"), params.get("session", "stdio")
+        if params.get("async", False):
+            return await self.mcp_server.run_idempotent(
+                key, f"{tool_name}:async", arguments,
+                lambda: self.mcp_server.jobs.submit(tool_name, arguments, priority, session))
         
+        # 调用MCP服务器的工具处理方法（经调度器按优先级排队）
+        result = await self.mcp_server.run_idempotent(
+            key, tool_name, arguments,
+            lambda: self.mcp_server.schedule_tool_call(tool_name, arguments, priority, session))
+        
+        text = str(result)
+        self.mcp_server.record_tool_io(tool_name, text)
         return {
             "content": [
                 {
                     "type": "text",
-                    "text": str(result)
+                    "text": text
                 }
             ]
         }
     
+    async def _handle_debug_profile(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """采集 CPU 剖析窗口；raw 格式的二进制 dump 以 base64 放在 data 中"""
+        capture = await self.mcp_server.profiler.profile(
+            params.get("seconds", 10),
+            output=params.get("format", "pstats"),
+            sort=params.get("sort", "cumulative"),
+            limit=params.get("limit", 50)
+        )
+        if capture["format"] == "raw":
+            capture["data"] = base64.b64encode(capture["data"]).decode("ascii")
+            capture["encoding"] = "base64"
+        return capture
+
     async def _handle_resources_list(self) -> Dict[str, Any]:
         """处理资源列表请求"""
         return {
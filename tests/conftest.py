@@ -0,0 +1,37 @@
+"""
+测试公共夹具
+"""
+
+from typing import Annotated
+
+import pytest
+
+from mcp_framework.core.base import EnhancedMCPServer
+from mcp_framework.core.decorators import Required
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """带几个简单工具的服务器；数据目录位于临时目录"""
+    # 服务器在当前目录下创建 data 目录
+    monkeypatch.chdir(tmp_path)
+    server = EnhancedMCPServer(name="TestServer", version="1.0.0", description="测试服务器")
+    server.loop_monitor_enabled = False
+
+    @server.tool("返回两倍的值")
+    async def double(value: Annotated[int, Required("输入值")]) -> int:
+        return value * 2
+
+    @server.tool("返回一个嵌套结构")
+    async def make() -> dict:
+        return {"items": [{"n": 1}, {"n": 2}, {"n": 3}], "label": "made"}
+
+    @server.tool("原样返回消息")
+    async def echo(message: Annotated[str, Required("消息")]) -> str:
+        return message
+
+    @server.tool("总是失败")
+    async def fail() -> str:
+        raise RuntimeError("boom")
+
+    return server
@@ -0,0 +1,95 @@
+"""
+测试用的最小 stdio JSON-RPC 服务器（不依赖框架）
+
+    tools/list             返回 echo 工具（role 为 admin 时多一个 admin_tool），描述中带有第几次列出
+    tools/call             以文本返回参数；参数含 fail 时返回错误，含 sleep 时先等待
+    change_tools           先发送 notifications/tools/list_changed 再响应
+    sleep   {"seconds": s}  等待 s 秒后返回，多个请求在各自的线程中并发执行
+    never                  从不响应
+    count   {"n": n}        先发送 n 个 stream/chunk 消息，再返回最终响应
+    exit    {"code": c}     向 stderr 写入一行后立即退出
+    pid                    返回进程号
+
+命令行参数 --no-ready 模拟不发送 notifications/ready 的旧版本服务器，
+--hang 模拟启动后一直不读取 stdin 的服务器。
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+_lock = threading.Lock()
+_list_calls = 0
+
+
+def send(message):
+    with _lock:
+        sys.stdout.write(json.dumps(message) + "\n")
+        sys.stdout.flush()
+
+
+def handle(request):
+    method = request.get("method")
+    params = request.get("params") or {}
+    request_id = request.get("id")
+    if request_id is None:
+        return  # 通知不需要响应
+    if method == "initialize":
+        result = {"protocolVersion": "2024-11-05", "capabilities": {}, "serverInfo": {"name": "fake"}}
+    elif method == "tools/list":
+        global _list_calls
+        _list_calls += 1
+        tools = [{"name": "echo", "description": f"listing {_list_calls}", "inputSchema": {}}]
+        if params.get("role") == "admin":
+            tools.append({"name": "admin_tool", "description": "admin only", "inputSchema": {}})
+        result = {"tools": tools}
+    elif method == "tools/call":
+        arguments = params.get("arguments", {})
+        if "sleep" in arguments:
+            time.sleep(arguments["sleep"])
+        if "fail" in arguments:
+            send({"jsonrpc": "2.0", "id": request_id, "error": {"code": -32603, "message": arguments["fail"]}})
+            return
+        result = {"content": [{"type": "text", "text": json.dumps(arguments)}]}
+    elif method == "change_tools":
+        send({"jsonrpc": "2.0", "method": "notifications/tools/list_changed"})
+        result = {}
+    elif method == "sleep":
+        time.sleep(params["seconds"])
+        result = {"slept": params["seconds"]}
+    elif method == "never":
+        return
+    elif method == "count":
+        for index in range(params["n"]):
+            send({"jsonrpc": "2.0", "method": "stream/chunk",
+                  "params": {"request_id": request_id, "chunk": index}})
+            time.sleep(0.01)
+        result = {"count": params["n"]}
+    elif method == "exit":
+        sys.stderr.write("fake server exiting\n")
+        sys.stderr.flush()
+        os._exit(params.get("code", 3))
+    elif method == "pid":
+        result = {"pid": os.getpid()}
+    else:
+        send({"jsonrpc": "2.0", "id": request_id, "error": {"code": -32601, "message": f"Unknown method: {method}"}})
+        return
+    send({"jsonrpc": "2.0", "id": request_id, "result": result})
+
+
+def main():
+    # 旧版本服务器可能在 stdout 上打印非协议内容，客户端应忽略
+    print("fake server starting", flush=True)
+    if "--no-ready" not in sys.argv:
+        send({"jsonrpc": "2.0", "method": "notifications/ready", "params": {"name": "fake"}})
+    if "--hang" in sys.argv:
+        time.sleep(60)
+    for line in sys.stdin:
+        if line.strip():
+            threading.Thread(target=handle, args=(json.loads(line),), daemon=True).start()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+客户端批量调用：call_many / call_batch 按调用分别返回结果，单个失败不影响其他调用
+"""
+
+import asyncio
+import json
+import time
+from pathlib import Path
+
+from mcp_framework.benchmarks.synthetic_server import local_http_server
+from mcp_framework.client.http_client import MCPHTTPClient
+from mcp_framework.client.tools import ToolsClient
+
+FAKE_SERVER = str(Path(__file__).with_name("fake_stdio_server.py"))
+
+
+def _with_stdio(test):
+    async def run():
+        async with ToolsClient(FAKE_SERVER) as client:
+            return await test(client)
+    return asyncio.run(run())
+
+
+def test_call_many_returns_one_result_per_argument_set():
+    async def test(client):
+        return [result async for result in client.call_many("echo", [{"n": i} for i in range(10)], concurrency=4)]
+
+    results = _with_stdio(test)
+    assert sorted(result.index for result in results) == list(range(10))
+    for result in results:
+        assert result.ok
+        assert json.loads(result.result["content"][0]["text"]) == {"n": result.index}
+        assert result.arguments == {"n": result.index}
+
+
+def test_failures_are_reported_per_call():
+    async def test(client):
+        calls = [("echo", {"n": 0}), ("echo", {"fail": "bad input"}), ("echo", {"n": 2})]
+        return {result.index: result async for result in client.call_batch(calls)}
+
+    results = _with_stdio(test)
+    assert results[0].ok and results[2].ok
+    assert not results[1].ok
+    assert "bad input" in str(results[1].error)
+
+
+def test_results_arrive_in_completion_order():
+    async def test(client):
+        calls = [("echo", {"sleep": 0.3}), ("echo", {"sleep": 0.0})]
+        started = time.perf_counter()
+        order = [result.index async for result in client.call_batch(calls, concurrency=2)]
+        return order, time.perf_counter() - started
+
+    order, elapsed = _with_stdio(test)
+    assert order == [1, 0]
+    assert elapsed < 0.55
+
+
+def test_stopping_early_cancels_remaining_calls():
+    async def test(client):
+        calls = [("echo", {"sleep": 0.0})] + [("echo", {"sleep": 5})] * 3
+        results = client.call_batch(calls, concurrency=4)
+        first = await results.__anext__()
+        await results.aclose()
+        return first, len(client._pending)
+
+    first, pending = _with_stdio(test)
+    assert first.index == 0
+    assert pending == 0
+
+
+def test_http_client_sends_json_rpc_batches(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    async def run():
+        async with local_http_server() as base_url:
+            async with MCPHTTPClient(base_url) as client:
+                sent = client.request_id
+                results = [r async for r in client.call_many("echo", [{"message": str(i)} for i in range(10)],
+                                                             batch_size=5)]
+                return results, client.request_id - sent
+
+    results, request_ids = asyncio.run(run())
+    assert sorted(r.index for r in results) == list(range(10))
+    assert all(r.result["content"][0]["text"] == str(r.index) for r in results)
+    assert not any(r.error for r in results)
+    assert request_ids == 10
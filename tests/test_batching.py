@@ -0,0 +1,94 @@
+"""
+批量工具：等待窗口内的并发调用合并为一次处理函数调用
+"""
+
+import asyncio
+
+import pytest
+
+from mcp_framework.core.batching import MicroBatcher
+
+
+def _run_calls(batcher, arguments_list):
+    async def run():
+        return await asyncio.gather(*(batcher.submit(arguments) for arguments in arguments_list),
+                                    return_exceptions=True)
+    return asyncio.run(run())
+
+
+def test_concurrent_calls_are_merged():
+    batches = []
+
+    async def handler(batch):
+        batches.append(len(batch))
+        return [item["x"] * 10 for item in batch]
+
+    batcher = MicroBatcher("tool", handler, max_batch=32, max_wait_ms=5)
+    assert _run_calls(batcher, [{"x": i} for i in range(10)]) == [i * 10 for i in range(10)]
+    assert batches == [10]
+    assert batcher.snapshot()["batches"] == 1
+    assert batcher.snapshot()["calls"] == 10
+
+
+def test_full_batch_runs_without_waiting():
+    batches = []
+
+    def handler(batch):
+        batches.append([item["x"] for item in batch])
+        return [item["x"] for item in batch]
+
+    # 等待窗口很长：只有凑满 max_batch 才会立即执行
+    batcher = MicroBatcher("tool", handler, max_batch=4, max_wait_ms=10000)
+
+    async def run():
+        return await asyncio.wait_for(asyncio.gather(*(batcher.submit({"x": i}) for i in range(8))), timeout=1)
+
+    assert asyncio.run(run()) == list(range(8))
+    assert batches == [[0, 1, 2, 3], [4, 5, 6, 7]]
+
+
+def test_exception_in_results_fails_only_that_call():
+    def handler(batch):
+        return [ValueError("bad") if item["x"] == 1 else item["x"] for item in batch]
+
+    results = _run_calls(MicroBatcher("tool", handler), [{"x": 0}, {"x": 1}, {"x": 2}])
+    assert results[0] == 0 and results[2] == 2
+    assert isinstance(results[1], ValueError)
+
+
+def test_handler_error_fails_the_whole_batch():
+    def handler(batch):
+        raise RuntimeError("backend down")
+
+    results = _run_calls(MicroBatcher("tool", handler), [{"x": 0}, {"x": 1}])
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_wrong_result_count_fails_the_batch():
+    results = _run_calls(MicroBatcher("tool", lambda batch: [1]), [{"x": 0}, {"x": 1}])
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_invalid_max_batch_is_rejected():
+    with pytest.raises(ValueError):
+        MicroBatcher("tool", lambda batch: batch, max_batch=0)
+
+
+def test_batch_tool_merges_single_calls(server):
+    batches = []
+
+    @server.batch_tool("批量取值", max_batch=16, max_wait_ms=5, input_schema={
+        "type": "object",
+        "properties": {"key": {"type": "string"}},
+        "required": ["key"]
+    })
+    async def lookup(batch):
+        batches.append(len(batch))
+        return [item["key"].upper() for item in batch]
+
+    async def run():
+        return await asyncio.gather(*(server.handle_tool_call("lookup", {"key": key}) for key in "abcde"))
+
+    assert asyncio.run(run()) == list("ABCDE")
+    assert batches == [5]
+    assert server.get_batch_metrics()["lookup"]["batches"] == 1
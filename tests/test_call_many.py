@@ -0,0 +1,69 @@
+"""
+服务器端 tools/call_many：有界并发、按调用分别返回结果、提前停止时取消未完成的调用
+"""
+
+import asyncio
+from typing import Annotated
+
+from mcp_framework.core.decorators import Required
+
+
+async def _collect(server, tool_name, arguments_list, **kwargs):
+    return [item async for item in server.handle_tool_call_many(tool_name, arguments_list, **kwargs)]
+
+
+def test_each_argument_set_gets_its_own_result(server):
+    results = asyncio.run(_collect(server, "double", [{"value": i} for i in range(5)]))
+    assert sorted((index, result, error) for index, result, error in results) == \
+        [(i, i * 2, None) for i in range(5)]
+
+
+def test_failures_do_not_affect_other_calls(server):
+    results = asyncio.run(_collect(server, "double", [{"value": 1}, {}, "not an object", {"value": 3}]))
+    by_index = {index: (result, error) for index, result, error in results}
+    assert by_index[0] == (2, None)
+    assert by_index[3] == (6, None)
+    assert "missing required parameter" in str(by_index[1][1])
+    assert isinstance(by_index[2][1], TypeError)
+
+
+def test_concurrency_is_bounded(server):
+    server.fanout_concurrency = 3
+    state = {"active": 0, "peak": 0}
+
+    @server.tool("记录同时执行的调用数")
+    async def track(value: Annotated[int, Required("输入值")]) -> int:
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.01)
+        state["active"] -= 1
+        return value
+
+    asyncio.run(_collect(server, "track", [{"value": i} for i in range(12)], concurrency=10))
+    assert state["peak"] == 3
+
+    state["peak"] = 0
+    asyncio.run(_collect(server, "track", [{"value": i} for i in range(12)], concurrency=2))
+    assert state["peak"] == 2
+
+
+def test_stopping_early_cancels_pending_calls(server):
+    cancelled = []
+
+    @server.tool("慢工具")
+    async def slow(value: Annotated[int, Required("输入值")]) -> int:
+        try:
+            await asyncio.sleep(0 if value == 0 else 5)
+        except asyncio.CancelledError:
+            cancelled.append(value)
+            raise
+        return value
+
+    async def run():
+        results = server.handle_tool_call_many("slow", [{"value": i} for i in range(4)])
+        first = await results.__anext__()
+        await results.aclose()
+        return first
+
+    assert asyncio.run(run())[0] == 0
+    assert sorted(cancelled) == [1, 2, 3]
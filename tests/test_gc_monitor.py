@@ -0,0 +1,78 @@
+"""
+GCMonitor：按代记录回收停顿，按当前工具归属，慢停顿生成事件
+"""
+
+import gc
+
+import pytest
+
+from mcp_framework.core.gc_monitor import GCMonitor, tune_gc
+from mcp_framework.core.loop_monitor import current_tool
+from mcp_framework.core.metrics import PrometheusWriter
+
+
+@pytest.fixture
+def monitor():
+    monitor = GCMonitor(slow_pause_ms=0, inflight_tools=lambda: ["b_tool", "a_tool"])
+    monitor.start()
+    yield monitor
+    monitor.stop()
+
+
+def test_collections_are_recorded_per_generation(monitor):
+    gc.collect(0)
+    gc.collect(2)
+    snapshot = monitor.snapshot()
+    assert snapshot["running"] is True
+    assert snapshot["generations"]["0"]["collections"] >= 1
+    assert snapshot["generations"]["2"]["collections"] >= 1
+    assert snapshot["allocated_blocks"] > 0
+
+
+def test_pauses_are_attributed_to_the_current_tool(monitor):
+    token = current_tool.set("gc_tool")
+    try:
+        gc.collect()
+    finally:
+        current_tool.reset(token)
+    stats = monitor.snapshot()["tools"]["gc_tool"]
+    assert stats["count"] >= 1
+    assert stats["max_ms"] <= stats["total_ms"]
+
+    event = monitor.recent_events(1)[0]
+    assert event["tool"] == "gc_tool"
+    assert event["generation"] == 2
+    assert event["inflight_tools"] == ["a_tool", "b_tool"]
+
+
+def test_stop_removes_the_callback():
+    monitor = GCMonitor()
+    monitor.start()
+    monitor.stop()
+    gc.collect()
+    assert monitor._on_gc not in gc.callbacks
+    assert monitor.snapshot()["generations"]["2"]["collections"] == 0
+
+
+def test_prometheus_output(monitor):
+    token = current_tool.set("gc_tool")
+    try:
+        gc.collect()
+    finally:
+        current_tool.reset(token)
+    writer = PrometheusWriter()
+    monitor.write_prometheus(writer)
+    text = writer.render()
+    assert 'mcp_gc_pause_ms_count{generation="2"}' in text
+    assert 'mcp_gc_tool_pause_ms_total{tool="gc_tool"}' in text
+    assert "mcp_allocated_blocks " in text
+
+
+def test_tune_gc():
+    original = gc.get_threshold()
+    try:
+        assert tune_gc([1000, 20])["thresholds"][:2] == [1000, 20]
+        with pytest.raises(ValueError):
+            tune_gc([1, 2, 3, 4])
+    finally:
+        gc.set_threshold(*original)
@@ -0,0 +1,121 @@
+"""
+MCPHTTPClient：对进程内启动的 MCPHTTPServer 调用工具、批量请求和 SSE 流式调用
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from mcp_framework.benchmarks.synthetic_server import create_server, local_http_server
+from mcp_framework.client.base import MCPTimeoutError
+from mcp_framework.client.http_client import MCPHTTPClient
+
+
+@pytest.fixture
+def run_http(tmp_path, monkeypatch):
+    """在临时目录中启动本地 HTTP 服务器，并把已连接的客户端交给测试协程"""
+    monkeypatch.chdir(tmp_path)
+
+    def run(test, **client_kwargs):
+        async def main():
+            async with local_http_server() as base_url:
+                async with MCPHTTPClient(base_url, **client_kwargs) as client:
+                    return await test(client)
+        return asyncio.run(main())
+    return run
+
+
+def _text(result) -> str:
+    return result["content"][0]["text"]
+
+
+def test_call_and_list_tools(run_http):
+    async def test(client):
+        return await client.call_tool("echo", {"message": "你好"}), await client.get_tool_names()
+
+    result, names = run_http(test)
+    assert _text(result) == "你好"
+    assert {"echo", "payload", "stream_chunks"} <= set(names)
+
+
+def test_concurrent_calls_share_the_session(run_http):
+    async def test(client):
+        session = client._session
+        results = await asyncio.gather(*(client.call_tool("echo", {"message": str(i)}) for i in range(20)))
+        return [_text(r) for r in results], client._session is session
+
+    texts, same_session = run_http(test, limit_per_host=4)
+    assert texts == [str(i) for i in range(20)]
+    assert same_session
+
+
+def test_batch_responses_keep_request_order(run_http):
+    async def test(client):
+        return await client.call_tools_batch([
+            ("echo", {"message": "a"}),
+            ("missing_tool", {}),
+            ("echo", {"message": "c"}),
+        ])
+
+    first, missing, last = run_http(test)
+    assert _text(first["result"]) == "a"
+    assert "error" in missing
+    assert _text(last["result"]) == "c"
+
+
+def test_streaming_call_yields_chunks(run_http):
+    async def test(client):
+        return [chunk async for chunk in client.call_tool_stream("stream_chunks", {"count": 3, "chunk_size": 4})]
+
+    assert run_http(test) == ["xxxx"] * 3
+
+
+def test_expired_deadline_fails_without_a_request(run_http):
+    async def test(client):
+        sent = client.request_id
+        with pytest.raises(MCPTimeoutError):
+            await client.call_tool_stream("echo", {"message": "x"}, deadline=time.monotonic() - 1).__anext__()
+        with pytest.raises(MCPTimeoutError):
+            await client.send_request("tools/list", deadline=time.monotonic() - 1)
+        return client.request_id - sent
+
+    assert run_http(test) == 0
+
+
+def test_request_timeout(run_http):
+    async def test(client):
+        with pytest.raises(MCPTimeoutError):
+            await client.send_request("tools/call", {"name": "sleep_ms", "arguments": {"ms": 500}}, timeout=0.05)
+        # 超时的请求不影响后续调用
+        return _text(await client.call_tool("echo", {"message": "after"}))
+
+    assert run_http(test) == "after"
+
+
+def test_tool_cache_follows_the_server_tools_version(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    server = create_server()
+
+    async def main():
+        async with local_http_server(server) as base_url:
+            async with MCPHTTPClient(base_url, tools_cache_ttl=None) as client:
+                before = await client.get_tool_names()
+                server.remove_tool("payload")
+                assert await client.get_tool_names() == before
+                # 任意一次 /mcp 往返都会带回新的工具版本号
+                await client.call_tool("echo", {"message": "x"})
+                return before, await client.get_tool_names()
+
+    before, after = asyncio.run(main())
+    assert "payload" in before
+    assert "payload" not in after
+
+
+def test_tool_cache_expires_after_ttl(run_http):
+    async def test(client):
+        first = await client.list_tools()
+        return first, await client.list_tools()
+
+    first, second = run_http(test, tools_cache_ttl=0)
+    assert second is not first
@@ -0,0 +1,148 @@
+"""
+幂等键：重试加入进行中的调用、完成后重放结果、失败不被记住、可选持久化
+"""
+
+import asyncio
+
+import pytest
+
+from mcp_framework.core.idempotency import IdempotencyStore
+
+
+class _Counter:
+    """记录执行次数的调用，release 之前一直等待"""
+
+    def __init__(self, result="done", error=None):
+        self.calls = 0
+        self.result = result
+        self.error = error
+        self.release = None
+
+    async def __call__(self):
+        self.calls += 1
+        if self.release is not None:
+            await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def test_concurrent_retries_join_the_running_call():
+    store = IdempotencyStore()
+    call = _Counter()
+
+    async def run():
+        call.release = asyncio.Event()
+        first = asyncio.ensure_future(store.run("k", "tool", {"a": 1}, call))
+        retry = asyncio.ensure_future(store.run("k", "tool", {"a": 1}, call))
+        await asyncio.sleep(0.01)
+        call.release.set()
+        return await asyncio.gather(first, retry)
+
+    assert asyncio.run(run()) == ["done", "done"]
+    assert call.calls == 1
+
+
+def test_completed_result_is_replayed():
+    store = IdempotencyStore()
+    call = _Counter({"value": 1})
+
+    async def run():
+        first = await store.run("k", "tool", {}, call)
+        replay = await store.run("k", "tool", {}, call)
+        return first, replay
+
+    first, replay = asyncio.run(run())
+    assert first == replay == {"value": 1}
+    assert call.calls == 1
+
+
+def test_key_reused_for_a_different_call_is_rejected():
+    store = IdempotencyStore()
+
+    async def run():
+        await store.run("k", "tool", {"a": 1}, _Counter())
+        with pytest.raises(ValueError, match="different call"):
+            await store.run("k", "tool", {"a": 2}, _Counter())
+        with pytest.raises(ValueError, match="different call"):
+            await store.run("k", "other_tool", {"a": 1}, _Counter())
+
+    asyncio.run(run())
+
+
+def test_failed_call_is_not_remembered():
+    store = IdempotencyStore()
+    failing = _Counter(error=RuntimeError("boom"))
+    succeeding = _Counter("ok")
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await store.run("k", "tool", {}, failing)
+        return await store.run("k", "tool", {}, succeeding)
+
+    assert asyncio.run(run()) == "ok"
+    assert failing.calls == 1
+    assert succeeding.calls == 1
+
+
+def test_cancelled_request_keeps_running_for_the_retry():
+    store = IdempotencyStore()
+    call = _Counter()
+
+    async def run():
+        call.release = asyncio.Event()
+        original = asyncio.ensure_future(store.run("k", "tool", {}, call))
+        await asyncio.sleep(0.01)
+        # 例如客户端超时断开
+        original.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await original
+        retry = asyncio.ensure_future(store.run("k", "tool", {}, call))
+        await asyncio.sleep(0.01)
+        call.release.set()
+        return await retry
+
+    assert asyncio.run(run()) == "done"
+    assert call.calls == 1
+
+
+def test_result_expires_after_ttl():
+    store = IdempotencyStore(ttl=0.05)
+    call = _Counter()
+
+    async def run():
+        await store.run("k", "tool", {}, call)
+        await asyncio.sleep(0.1)
+        await store.run("k", "tool", {}, call)
+
+    asyncio.run(run())
+    assert call.calls == 2
+
+
+def test_persisted_result_survives_a_new_store(tmp_path):
+    path = tmp_path / "idempotency.db"
+    first = IdempotencyStore(path=path)
+    asyncio.run(first.run("k", "tool", {"a": 1}, _Counter({"items": (1, 2)})))
+    first.close()
+
+    second = IdempotencyStore(path=path)
+    call = _Counter("should not run")
+    result = asyncio.run(second.run("k", "tool", {"a": 1}, call))
+    with pytest.raises(ValueError, match="different call"):
+        asyncio.run(second.run("k", "tool", {"a": 2}, call))
+    second.close()
+    assert result == {"items": [1, 2]}
+    assert call.calls == 0
+
+
+def test_server_runs_calls_without_a_key_every_time(server):
+    call = _Counter()
+
+    async def run():
+        await server.run_idempotent(None, "tool", {}, call)
+        await server.run_idempotent("", "tool", {}, call)
+        await server.run_idempotent("k", "tool", {}, call)
+        await server.run_idempotent("k", "tool", {}, call)
+
+    asyncio.run(run())
+    assert call.calls == 3
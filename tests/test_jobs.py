@@ -0,0 +1,219 @@
+"""
+异步任务：结果持久化、取消、流式输出块、重启后恢复
+"""
+
+import asyncio
+import sqlite3
+import subprocess
+import sys
+from typing import Annotated
+
+import pytest
+
+from mcp_framework.core.decorators import Required
+from mcp_framework.core.jobs import (FINISHED_STATES, JOB_CANCELLED, JOB_FAILED, JOB_QUEUED, JOB_RUNNING,
+                                     JOB_SUCCEEDED, JobStore)
+
+
+@pytest.fixture
+def jobs_server(server):
+    """在公共服务器上追加一个可控的慢工具和一个流式工具"""
+    server.started_jobs = []
+
+    @server.tool("等待 release 后返回")
+    async def wait_release(name: Annotated[str, Required("名称")]) -> str:
+        server.started_jobs.append(name)
+        await server.release.wait()
+        return f"released {name}"
+
+    @server.streaming_tool("逐块输出")
+    async def count(n: Annotated[int, Required("块数")]):
+        for index in range(n):
+            yield f"chunk {index}"
+
+    return server
+
+
+async def _finished(server, job_id, timeout=5.0):
+    """等待任务结束并返回最终状态"""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        update = await server.jobs.wait_for_update(job_id, 0, timeout=0.2)
+        if update["status"] in FINISHED_STATES:
+            return update
+        assert asyncio.get_running_loop().time() < deadline, f"job still {update['status']}"
+
+
+async def _until(predicate, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+
+def test_job_result_is_persisted(jobs_server):
+    async def run():
+        submitted = await jobs_server.jobs.submit("double", {"value": 21})
+        assert submitted["status"] == JOB_QUEUED
+        update = await _finished(jobs_server, submitted["job_id"])
+        await jobs_server.jobs.shutdown()
+        return submitted["job_id"], update
+
+    job_id, update = asyncio.run(run())
+    assert update["status"] == JOB_SUCCEEDED
+    assert update["result"] == {"content": [{"type": "text", "text": "42"}]}
+
+    # 另一个存储实例（例如重启后的服务器）读到同样的结果
+    store = JobStore(jobs_server.job_store_path)
+    job = store.get(job_id)
+    store.close()
+    assert job["status"] == JOB_SUCCEEDED
+    assert job["result"] == "42"
+    assert job["arguments"] == {"value": 21}
+
+
+def test_failed_job_records_the_error(jobs_server):
+    async def run():
+        submitted = await jobs_server.jobs.submit("fail", {})
+        update = await _finished(jobs_server, submitted["job_id"])
+        await jobs_server.jobs.shutdown()
+        return update
+
+    update = asyncio.run(run())
+    assert update["status"] == JOB_FAILED
+    assert "boom" in update["error"]
+
+
+def test_streaming_job_persists_chunks(jobs_server):
+    async def run():
+        job_id = (await jobs_server.jobs.submit("count", {"n": 3}))["job_id"]
+        update = await _finished(jobs_server, job_id)
+        later = await jobs_server.jobs.wait_for_update(job_id, after=1, timeout=0)
+        await jobs_server.jobs.shutdown()
+        return update, later
+
+    update, later = asyncio.run(run())
+    assert update["status"] == JOB_SUCCEEDED
+    assert [c["content"] for c in update["chunks"]] == ["chunk 0", "chunk 1", "chunk 2"]
+    assert update["result"]["content"][0]["text"] == "chunk 0chunk 1chunk 2"
+    # 断线重连后只取 after 之后的块
+    assert [c["seq"] for c in later["chunks"]] == [2, 3]
+
+
+def test_cancel_running_job(jobs_server):
+    async def run():
+        jobs_server.release = asyncio.Event()
+        job_id = (await jobs_server.jobs.submit("wait_release", {"name": "a"}))["job_id"]
+        await _until(lambda: jobs_server.started_jobs)
+        assert jobs_server.jobs.get(job_id)["status"] == JOB_RUNNING
+        cancelled = await jobs_server.jobs.cancel(job_id)
+        update = await _finished(jobs_server, job_id)
+        await jobs_server.jobs.shutdown()
+        return cancelled, update
+
+    cancelled, update = asyncio.run(run())
+    assert cancelled["status"] == JOB_CANCELLED
+    assert update["status"] == JOB_CANCELLED
+    assert "result" not in update
+
+
+def test_cancel_queued_job_never_runs(jobs_server):
+    jobs_server.job_workers = 1
+
+    async def run():
+        jobs_server.release = asyncio.Event()
+        first = (await jobs_server.jobs.submit("wait_release", {"name": "first"}))["job_id"]
+        second = (await jobs_server.jobs.submit("wait_release", {"name": "second"}))["job_id"]
+        await _until(lambda: jobs_server.started_jobs)
+        await jobs_server.jobs.cancel(second)
+        jobs_server.release.set()
+        results = await _finished(jobs_server, first), await _finished(jobs_server, second)
+        await asyncio.sleep(0.05)
+        await jobs_server.jobs.shutdown()
+        return results
+
+    first, second = asyncio.run(run())
+    assert first["status"] == JOB_SUCCEEDED
+    assert second["status"] == JOB_CANCELLED
+    assert jobs_server.started_jobs == ["first"]
+
+
+def test_unknown_job_and_tool_are_rejected(jobs_server):
+    async def run():
+        with pytest.raises(ValueError, match="not found"):
+            await jobs_server.jobs.submit("nope", {})
+        with pytest.raises(ValueError, match="not found"):
+            await jobs_server.jobs.cancel("missing")
+        with pytest.raises(ValueError, match="not found"):
+            jobs_server.jobs.get("missing")
+
+    asyncio.run(run())
+
+
+def test_restart_requeues_queued_jobs_and_fails_orphaned_ones(jobs_server):
+    store = JobStore(jobs_server.job_store_path)
+    store.create("queued-job", "double", {"value": 5})
+    store.create("orphan-job", "double", {"value": 1})
+    store.mark_running("orphan-job")
+    # 运行该任务的进程已经退出
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    store._execute("UPDATE jobs SET pid = ? WHERE id = ?", (dead.pid, "orphan-job"))
+    store.close()
+
+    async def run():
+        jobs_server.resume_jobs()
+        results = await _finished(jobs_server, "queued-job"), jobs_server.jobs.get("orphan-job")
+        await jobs_server.jobs.shutdown()
+        return results
+
+    queued, orphan = asyncio.run(run())
+    assert queued["status"] == JOB_SUCCEEDED
+    assert queued["result"]["content"][0]["text"] == "10"
+    assert orphan["status"] == JOB_FAILED
+    assert "restarted" in orphan["error"]
+
+
+def test_jobs_run_through_tool_slot_with_their_priority(jobs_server):
+    async def run():
+        bulk = (await jobs_server.jobs.submit("double", {"value": 1}, priority="bulk", session="s1"))["job_id"]
+        streamed = (await jobs_server.jobs.submit("count", {"n": 2}))["job_id"]
+        bad = (await jobs_server.jobs.submit("double", {"value": 1}, priority="urgent"))["job_id"]
+        results = [await _finished(jobs_server, job_id) for job_id in (bulk, streamed, bad)]
+        await jobs_server.jobs.shutdown()
+        return bulk, results
+
+    bulk, (first, second, bad) = asyncio.run(run())
+    assert (first["status"], second["status"]) == (JOB_SUCCEEDED, JOB_SUCCEEDED)
+    assert bad["status"] == JOB_FAILED
+    assert "Unknown priority" in bad["error"]
+    store = JobStore(jobs_server.job_store_path)
+    job = store.get(bulk)
+    store.close()
+    assert (job["priority"], job["session"]) == ("bulk", "s1")
+    scheduler = jobs_server.get_scheduler_metrics()["classes"]
+    assert scheduler["bulk"]["completed"] == 1
+    assert scheduler["default"]["completed"] == 1
+    metrics = jobs_server.get_tool_metrics()
+    assert metrics["double"]["calls"] == 2
+    assert metrics["count"]["calls"] == 1
+    assert metrics["count"]["stream_chunks"] == 2
+
+
+def test_store_adds_columns_to_an_old_database(tmp_path):
+    path = tmp_path / "old.db"
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE jobs (id TEXT PRIMARY KEY, tool TEXT NOT NULL, arguments TEXT NOT NULL, "
+                 "status TEXT NOT NULL, result TEXT, error TEXT, pid INTEGER, created_at REAL NOT NULL, "
+                 "started_at REAL, finished_at REAL)")
+    conn.execute("INSERT INTO jobs (id, tool, arguments, status, created_at) VALUES ('old', 'double', '{}', ?, 0)",
+                 (JOB_QUEUED,))
+    conn.commit()
+    conn.close()
+
+    store = JobStore(path)
+    store.create("new", "double", {"value": 1}, "bulk", "s1")
+    old, new = store.get("old"), store.get("new")
+    store.close()
+    assert (old["priority"], old["session"]) == (None, None)
+    assert (new["priority"], new["session"]) == ("bulk", "s1")
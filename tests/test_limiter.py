@@ -0,0 +1,114 @@
+"""
+AdaptiveLimiter：出错退避、参数类错误不参与调整、超限拒绝
+"""
+
+import asyncio
+
+import pytest
+
+from mcp_framework.core.limiter import AdaptiveLimiter, ToolOverloadedError
+from mcp_framework.server.stdio_server import MCPStdioServer
+
+
+def _fail(limiter: AdaptiveLimiter, error: BaseException) -> None:
+    with pytest.raises(type(error)):
+        with limiter.guard():
+            raise error
+
+
+def test_errors_back_off_the_limit():
+    limiter = AdaptiveLimiter("tool", initial_limit=20, backoff=0.5)
+    _fail(limiter, RuntimeError("backend down"))
+    assert limiter.limit == 10
+    assert limiter.dropped == 1
+    _fail(limiter, TimeoutError())
+    assert limiter.limit == 5
+    assert limiter.inflight == 0
+
+
+def test_backoff_stops_at_min_limit():
+    limiter = AdaptiveLimiter("tool", initial_limit=4, min_limit=2, backoff=0.5)
+    for _ in range(5):
+        _fail(limiter, RuntimeError())
+    assert limiter.limit == 2
+
+
+@pytest.mark.parametrize("error", [ValueError("bad argument"), TypeError("wrong type")])
+def test_bad_input_errors_do_not_adjust_the_limit(error):
+    limiter = AdaptiveLimiter("tool", initial_limit=20, backoff=0.5)
+    _fail(limiter, error)
+    assert limiter.limit == 20
+    assert limiter.dropped == 0
+    assert limiter.inflight == 0
+
+
+def test_cancellation_does_not_adjust_the_limit():
+    limiter = AdaptiveLimiter("tool", initial_limit=20, backoff=0.5)
+    _fail(limiter, asyncio.CancelledError())
+    assert limiter.limit == 20
+    assert limiter.dropped == 0
+
+
+def test_calls_over_the_limit_are_rejected():
+    limiter = AdaptiveLimiter("tool", initial_limit=2)
+    with limiter.guard(), limiter.guard():
+        with pytest.raises(ToolOverloadedError) as info:
+            with limiter.guard():
+                pass
+        assert info.value.limit == 2
+    assert limiter.rejected == 1
+    assert limiter.accepted == 2
+    assert limiter.inflight == 0
+
+
+def test_latency_increase_shrinks_the_limit():
+    limiter = AdaptiveLimiter("tool", initial_limit=20, smoothing=0.5, tolerance=1.0, window=1)
+    # 满负载下先建立 10ms 的基线，再持续观测到 100ms
+    limiter.on_success(0.010, inflight=20)
+    baseline = limiter.estimated_limit
+    for _ in range(10):
+        limiter.on_success(0.100, inflight=20)
+    assert limiter.estimated_limit < baseline
+
+
+def test_low_utilisation_does_not_change_the_limit():
+    limiter = AdaptiveLimiter("tool", initial_limit=20)
+    limiter.on_success(0.010, inflight=1)
+    limiter.on_success(1.000, inflight=1)
+    assert limiter.limit == 20
+
+
+def test_server_counts_slot_errors_against_the_limiter(server):
+    server.adaptive_concurrency = True
+
+    async def run():
+        with pytest.raises(Exception):
+            await server.schedule_tool_call("fail", {})
+        # 缺少必需参数属于请求错误
+        with pytest.raises(Exception):
+            await server.schedule_tool_call("double", {})
+
+    asyncio.run(run())
+    assert server.get_limiter("fail").dropped == 1
+    assert server.get_limiter("double").dropped == 0
+    metrics = server.get_tool_metrics()
+    assert metrics["fail"]["errors"] == 1
+    assert metrics["double"]["errors"] == 1
+
+
+def test_unknown_tools_leave_no_limiter_or_metrics(server):
+    server.adaptive_concurrency = True
+    stdio = MCPStdioServer(server)
+
+    async def run():
+        for index in range(3):
+            with pytest.raises(ValueError, match="not found"):
+                await stdio._handle_tool_call({"name": f"bogus-{index}", "arguments": {}})
+        chunks = [chunk async for chunk in stdio._handle_tool_call_streaming({"name": "bogus-stream"})]
+        assert chunks[0]["type"] == "error"
+        await stdio._handle_tool_call({"name": "double", "arguments": {"value": 1}})
+
+    asyncio.run(run())
+    assert server.get_limiter("bogus-0") is None
+    assert list(server.get_limiter_metrics()["tools"]) == ["double"]
+    assert list(server.get_tool_metrics()) == ["double"]
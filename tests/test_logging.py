@@ -0,0 +1,85 @@
+"""
+setup_logging：队列日志在后台线程格式化输出，JSON 格式附带 extra 字段
+"""
+
+import json
+import logging
+import threading
+
+import pytest
+
+from mcp_framework.core import utils
+from mcp_framework.core.utils import JSONFormatter, setup_logging
+
+
+@pytest.fixture
+def root_logger():
+    """保存并恢复根日志器；pytest 在测试阶段才挂上自己的捕获处理器，由测试清空"""
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    yield root
+    utils._stop_queue_listener()
+    root.handlers = saved_handlers
+    root.setLevel(saved_level)
+
+
+def _json_record(message, *args, **extra):
+    record = logging.LogRecord("mcp.test", logging.WARNING, __file__, 1, message, args, None)
+    record.__dict__.update(extra)
+    return json.loads(JSONFormatter().format(record))
+
+
+def test_json_formatter_includes_extra_fields():
+    entry = _json_record("took %d ms", 12, tool="echo", request_id=7)
+    assert entry["message"] == "took 12 ms"
+    assert entry["level"] == "WARNING"
+    assert entry["logger"] == "mcp.test"
+    assert entry["tool"] == "echo"
+    assert entry["request_id"] == 7
+    assert "args" not in entry and "msg" not in entry
+
+
+def test_queue_handler_formats_on_the_listener_thread(root_logger, capsys):
+    root_logger.handlers = []
+    format_threads = []
+    original_format = JSONFormatter.format
+
+    def format(self, record):
+        format_threads.append(threading.current_thread().name)
+        return original_format(self, record)
+
+    JSONFormatter.format = format
+    try:
+        setup_logging(logging.INFO, log_format="json")
+        payload = {"state": "before"}
+        logging.getLogger("mcp.test").info("payload %s", payload, extra={"tool": "echo"})
+        payload["state"] = "after"
+        utils._stop_queue_listener()
+    finally:
+        JSONFormatter.format = original_format
+
+    entry = json.loads(capsys.readouterr().err.strip().splitlines()[-1])
+    assert entry["message"] == "payload {'state': 'before'}"
+    assert entry["tool"] == "echo"
+    assert format_threads and threading.main_thread().name not in format_threads
+
+
+def test_exceptions_are_formatted_before_queueing(root_logger, capsys):
+    root_logger.handlers = []
+    setup_logging(logging.INFO, log_format="json")
+    try:
+        raise RuntimeError("kaboom")
+    except RuntimeError:
+        logging.getLogger("mcp.test").exception("failed")
+    utils._stop_queue_listener()
+    entry = json.loads(capsys.readouterr().err.strip().splitlines()[-1])
+    assert entry["message"] == "failed"
+    assert "RuntimeError: kaboom" in entry["exception"]
+
+
+def test_application_configured_logging_is_left_alone(root_logger):
+    handler = logging.NullHandler()
+    root_logger.handlers = [handler]
+    setup_logging(logging.INFO, log_format="json")
+    assert root_logger.handlers == [handler]
+    assert utils._queue_listener is None
@@ -0,0 +1,87 @@
+"""
+LoopMonitor：循环延迟直方图、阻塞循环的慢事件及其所属工具
+"""
+
+import asyncio
+import time
+
+from mcp_framework.core.loop_monitor import LoopMonitor, current_tool
+
+
+def _monitored(test, **kwargs):
+    async def run():
+        monitor = LoopMonitor(**kwargs)
+        monitor.start()
+        try:
+            return monitor, await test(monitor)
+        finally:
+            monitor.stop()
+    return asyncio.run(run())
+
+
+def test_blocking_call_is_recorded_against_the_tool():
+    async def test(monitor):
+        async def handler():
+            with monitor.track("blocking_tool"):
+                await asyncio.sleep(0.06)
+                time.sleep(0.3)
+                await asyncio.sleep(0.06)
+
+        await asyncio.create_task(handler())
+        await asyncio.sleep(0.06)
+
+    monitor, _ = _monitored(test, interval=0.02, slow_threshold_ms=100)
+    events = monitor.recent_events()
+    assert len(events) == 1
+    assert events[0]["tool"] == "blocking_tool"
+    assert events[0]["duration_ms"] >= 200
+    assert any("time.sleep" in line or "handler" in line for line in events[0]["stack"])
+    assert monitor.snapshot()["slow_tools"]["blocking_tool"]["count"] == 1
+
+
+def test_idle_loop_records_lag_without_slow_events():
+    async def test(monitor):
+        await asyncio.sleep(0.2)
+
+    monitor, _ = _monitored(test, interval=0.02, slow_threshold_ms=100)
+    snapshot = monitor.snapshot()
+    assert snapshot["lag_ms"]["count"] >= 5
+    assert snapshot["slow_tools"] == {}
+    assert monitor.recent_events() == []
+
+
+def test_track_sets_and_restores_the_current_tool():
+    async def test(monitor):
+        task = asyncio.current_task()
+        seen = []
+        with monitor.track("outer"):
+            seen.append((current_tool.get(), monitor.tool_for_task(task)))
+            with monitor.track("inner"):
+                seen.append((current_tool.get(), monitor.tool_for_task(task)))
+            seen.append((current_tool.get(), monitor.tool_for_task(task)))
+        seen.append((current_tool.get(), monitor.tool_for_task(task)))
+        return seen
+
+    _, seen = _monitored(test)
+    assert seen == [("outer", "outer"), ("inner", "inner"), ("outer", "outer"), (None, None)]
+
+
+def test_track_outside_a_task_only_sets_the_context():
+    monitor = LoopMonitor()
+    with monitor.track("sync"):
+        assert current_tool.get() == "sync"
+    assert current_tool.get() is None
+
+
+def test_task_map_is_only_kept_without_task_contexts():
+    async def test(monitor):
+        with monitor.track("mapped"):
+            return dict(monitor._task_tools)
+
+    monitor, task_tools = _monitored(test)
+    if hasattr(asyncio.Task, "get_context"):
+        # Python 3.12+ 直接读取任务上下文
+        assert task_tools == {}
+    else:
+        assert list(task_tools.values()) == ["mapped"]
+    assert monitor._task_tools == {}
@@ -0,0 +1,124 @@
+"""
+工具调用指标：直方图、按工具的调用计数和 Prometheus 文本输出
+"""
+
+import asyncio
+
+import pytest
+
+from mcp_framework.core.batching import MicroBatcher
+from mcp_framework.core.metrics import RECORD_BUFFER_SIZE, Histogram, ServerMetrics, ToolMetrics, render_prometheus
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram([1, 10, 100])
+    for value in (0.5, 5, 5, 50, 500):
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 5
+    assert snapshot["sum"] == 560.5
+    assert snapshot["buckets"] == {"1": 1, "10": 3, "100": 4, "+Inf": 5}
+    assert histogram.quantile(0.5) == 10
+    assert histogram.quantile(0.99) == 100
+
+
+def test_recorded_values_match_observed_values():
+    observed, recorded = Histogram([1, 10, 100]), Histogram([1, 10, 100], record_scale=1000)
+    for value in (0.5, 1, 5, 10, 50, 100, 500, 7, 0.25):
+        observed.observe(value)
+        recorded.record(value / 1000)
+    assert recorded.count == 9
+    assert recorded.quantile(0.5) == observed.quantile(0.5)
+    assert recorded.snapshot() == observed.snapshot()
+    # 缓冲满时自动合并，读取时也会合并剩余的部分
+    for _ in range(RECORD_BUFFER_SIZE + 3):
+        recorded.record(0.002)
+    assert len(recorded._pending) == 3
+    assert recorded.snapshot()["buckets"]["10"] == 6 + RECORD_BUFFER_SIZE + 3
+    recorded.reset()
+    assert recorded.count == 0
+
+
+def test_tool_metrics_record_calls_and_errors():
+    metrics = ToolMetrics("tool")
+    started = metrics.start()
+    assert metrics.inflight == 1
+    metrics.finish(started)
+    metrics.finish(metrics.start(), error=True)
+    snapshot = metrics.snapshot()
+    assert (snapshot["calls"], snapshot["errors"], snapshot["inflight"]) == (2, 1, 0)
+
+
+def test_server_records_scheduled_calls(server):
+    async def run():
+        await server.schedule_tool_call("double", {"value": 1})
+        await server.schedule_tool_call("double", {"value": 2})
+        with pytest.raises(RuntimeError):
+            await server.schedule_tool_call("fail", {})
+
+    asyncio.run(run())
+    metrics = server.get_tool_metrics()
+    assert metrics["double"]["calls"] == 2
+    assert metrics["double"]["errors"] == 0
+    assert metrics["fail"]["calls"] == 1
+    assert metrics["fail"]["errors"] == 1
+    assert metrics["fail"]["inflight"] == 0
+
+
+def test_request_errors_are_counted(server):
+    async def run():
+        # 缺少必需参数同样是一次失败的调用
+        with pytest.raises(ValueError):
+            await server.schedule_tool_call("double", {})
+
+    asyncio.run(run())
+    assert server.get_tool_metrics()["double"]["errors"] == 1
+
+
+def test_instrumentation_can_be_disabled(server):
+    server.instrumentation_enabled = False
+    asyncio.run(server.schedule_tool_call("double", {"value": 1}))
+    assert server.get_tool_metrics() == {}
+
+
+def test_unknown_tool_names_do_not_create_metrics(server):
+    async def run():
+        for name in ("bogus-1", "bogus-2", "echo"):
+            async with server.tool_slot(name):
+                pass
+
+    asyncio.run(run())
+    server.record_tool_io("bogus-3", "x")
+    assert list(server.get_tool_metrics()) == ["echo"]
+
+
+def test_prometheus_text():
+    metrics = ServerMetrics()
+    tool = metrics.tool('say "hi"')
+    tool.finish(tool.start())
+    tool.add_io(10, 20)
+    text = render_prometheus(metrics, {"event_loop_lag_ms": Histogram([1])})
+    assert '# TYPE mcp_tool_calls_total counter' in text
+    assert 'mcp_tool_calls_total{tool="say \\"hi\\""} 1' in text
+    assert 'mcp_tool_bytes_out_total{tool="say \\"hi\\""} 20' in text
+    assert 'mcp_tool_latency_ms_bucket{tool="say \\"hi\\"",le="+Inf"} 1' in text
+    assert 'mcp_event_loop_lag_ms_count 0' in text
+    assert text.endswith("\n")
+
+
+def test_server_prometheus_includes_scheduler_limiter_and_batch_metrics(server):
+    server.adaptive_concurrency = True
+    server._batchers["echo"] = MicroBatcher("echo", lambda batch: batch, max_batch=4, max_wait_ms=1)
+
+    async def run():
+        await server.schedule_tool_call("double", {"value": 1})
+        await server._batchers["echo"].submit({"message": "x"})
+
+    asyncio.run(run())
+    text = server.render_prometheus_metrics()
+    assert 'mcp_scheduler_queue_wait_ms_count{priority="default"} 1' in text
+    assert 'mcp_scheduler_queued{priority="bulk"} 0' in text
+    assert 'mcp_tool_concurrency_limit{tool="double"} 20' in text
+    assert 'mcp_tool_concurrency_rejected_total{tool="double"} 0' in text
+    assert 'mcp_tool_batch_size_bucket{tool="echo",le="1"} 1' in text
+    assert 'mcp_tool_batch_wait_ms_count{tool="echo"} 1' in text
@@ -0,0 +1,117 @@
+"""
+ToolPipeline：引用解析、环检测、失败节点的下游跳过
+"""
+
+import asyncio
+
+import pytest
+
+from mcp_framework.core.pipeline import PipelineReference, ToolPipeline, parse_reference
+
+
+def _run(server, spec):
+    return asyncio.run(server.handle_tool_pipeline(spec))
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("$.page", PipelineReference("page", [])),
+    ("$.page.items[0].href", PipelineReference("page", ["items", 0, "href"])),
+    ("$.page['some key'][-1]", PipelineReference("page", ["some key", -1])),
+    ("$.page[\"k\"]", PipelineReference("page", ["k"])),
+])
+def test_parse_reference(text, expected):
+    assert parse_reference(text) == expected
+
+
+def test_plain_strings_are_not_references():
+    assert parse_reference("hello") is None
+    assert parse_reference("$5") is None
+
+
+@pytest.mark.parametrize("text", ["$.", "$.page.", "$.page[x]", "$.page[0"])
+def test_malformed_reference_is_rejected(text):
+    with pytest.raises(ValueError, match="Invalid reference"):
+        parse_reference(text)
+
+
+def test_references_pass_upstream_results(server):
+    result = _run(server, {
+        "nodes": [
+            {"id": "m", "tool": "make"},
+            {"id": "d", "tool": "double", "arguments": {"value": "$.m.items[1].n"}},
+            {"id": "e", "tool": "echo", "arguments": {"message": "$.m.label"}},
+            {"id": "lit", "tool": "echo", "arguments": {"message": "$$.m"}},
+        ],
+        "outputs": ["d", "e", "lit", "$.m.items[-1]"]
+    })
+    assert result["status"] == "ok"
+    assert result["outputs"] == {"d": 4, "e": "made", "lit": "$.m", "$.m.items[-1]": {"n": 3}}
+    assert result["nodes"]["d"]["start_ms"] >= result["nodes"]["m"]["start_ms"]
+
+
+def test_default_outputs_are_sink_nodes(server):
+    result = _run(server, {"nodes": [
+        {"id": "a", "tool": "double", "arguments": {"value": 1}},
+        {"id": "b", "tool": "double", "arguments": {"value": "$.a"}},
+    ]})
+    assert result["outputs"] == {"b": 4}
+
+
+def test_cycle_is_rejected(server):
+    with pytest.raises(ValueError, match="cycle"):
+        ToolPipeline(server, {"nodes": [
+            {"id": "a", "tool": "double", "arguments": {"value": "$.c"}},
+            {"id": "b", "tool": "double", "arguments": {"value": "$.a"}},
+            {"id": "c", "tool": "double", "arguments": {"value": "$.b"}},
+        ]})
+
+
+def test_self_reference_is_a_cycle(server):
+    with pytest.raises(ValueError, match="cycle"):
+        ToolPipeline(server, {"nodes": [{"id": "a", "tool": "double", "arguments": {"value": "$.a"}}]})
+
+
+@pytest.mark.parametrize("spec, message", [
+    ({"nodes": [{"id": "a", "tool": "double", "arguments": {"value": "$.missing"}}]}, "unknown node"),
+    ({"nodes": [{"id": "a", "tool": "nope"}]}, "nope"),
+    ({"nodes": [{"id": "a", "tool": "make"}, {"id": "a", "tool": "make"}]}, "Duplicate"),
+    ({"nodes": [{"id": "a", "tool": "make"}], "outputs": ["b"]}, "Invalid pipeline output"),
+    ({"nodes": []}, "non-empty"),
+])
+def test_invalid_pipelines_are_rejected(server, spec, message):
+    with pytest.raises(ValueError, match=message):
+        ToolPipeline(server, spec)
+
+
+def test_failure_skips_downstream_but_not_independent_branches(server):
+    result = _run(server, {
+        "nodes": [
+            {"id": "bad", "tool": "fail"},
+            {"id": "after", "tool": "echo", "arguments": {"message": "$.bad"}},
+            {"id": "after2", "tool": "double", "arguments": {"value": 1}, "depends_on": ["after"]},
+            {"id": "other", "tool": "double", "arguments": {"value": 5}},
+        ],
+        "outputs": ["after2", "other"]
+    })
+    nodes = result["nodes"]
+    assert result["status"] == "error"
+    assert nodes["bad"]["status"] == "error"
+    assert "boom" in nodes["bad"]["error"]
+    assert nodes["after"]["status"] == "skipped"
+    assert nodes["after2"]["status"] == "skipped"
+    assert nodes["other"]["status"] == "ok"
+    assert result["outputs"] == {"other": 10}
+    assert result["errors"] == {"after2": "Node 'after2' skipped"}
+
+
+def test_failed_nodes_are_recorded_by_tool_slot(server):
+    _run(server, {"nodes": [{"id": "bad", "tool": "fail"}, {"id": "ok", "tool": "double", "arguments": {"value": 1}}]})
+    metrics = server.get_tool_metrics()
+    assert metrics["fail"]["errors"] == 1
+    assert metrics["double"]["errors"] == 0
+
+
+def test_slot_errors_fail_only_the_node(server):
+    result = _run(server, {"priority": "urgent", "nodes": [{"id": "a", "tool": "double", "arguments": {"value": 1}}]})
+    assert result["nodes"]["a"]["status"] == "error"
+    assert "Unknown priority" in result["nodes"]["a"]["error"]
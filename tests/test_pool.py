@@ -0,0 +1,106 @@
+"""
+MCPProcessPool：租借时按在途请求数均衡、按调用次数回收、替换已退出的进程
+"""
+
+import asyncio
+from pathlib import Path
+
+from mcp_framework.client.pool import MCPProcessPool
+
+FAKE_SERVER = str(Path(__file__).with_name("fake_stdio_server.py"))
+
+
+def _with_pool(test, **kwargs):
+    async def run():
+        kwargs.setdefault("health_check_interval", 0)
+        async with MCPProcessPool(FAKE_SERVER, **kwargs) as pool:
+            return await test(pool)
+    return asyncio.run(run())
+
+
+async def _pid(client) -> int:
+    return (await client.send_request("pid"))["result"]["pid"]
+
+
+async def _wait_for(predicate, timeout: float = 5.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+
+def test_leases_go_to_the_least_loaded_process():
+    async def test(pool):
+        async with pool.lease() as first, pool.lease() as second:
+            stats = pool.stats()
+            return await _pid(first), await _pid(second), stats
+
+    first, second, stats = _with_pool(test, size=2)
+    assert first != second
+    assert stats["in_flight"] == 2
+    assert stats["total_spawned"] == 2
+
+
+def test_lease_is_reused_between_calls():
+    async def test(pool):
+        pids = set()
+        for _ in range(3):
+            async with pool.lease() as client:
+                pids.add(await _pid(client))
+        return pids, pool.stats()
+
+    pids, stats = _with_pool(test, size=1)
+    assert len(pids) == 1
+    assert stats["processes"][0]["calls"] == 3
+    assert stats["in_flight"] == 0
+
+
+def test_process_is_recycled_after_max_calls():
+    async def test(pool):
+        pids = []
+        for _ in range(4):
+            async with pool.lease() as client:
+                pids.append(await _pid(client))
+            # 回收后替换进程在后台启动
+            await _wait_for(lambda: pool.stats()["live"] == 1 and pool._processes)
+        return pids, pool.stats()
+
+    pids, stats = _with_pool(test, size=1, max_calls_per_process=2)
+    assert pids[0] == pids[1]
+    assert pids[2] == pids[3]
+    assert pids[1] != pids[2]
+    assert stats["total_recycled"] == 2
+    assert stats["total_spawned"] == 3
+
+
+def test_concurrency_limit_makes_leases_wait():
+    async def test(pool):
+        order = []
+
+        async def use(name, seconds):
+            async with pool.lease() as client:
+                order.append(f"{name} start")
+                await client.send_request("sleep", {"seconds": seconds})
+                order.append(f"{name} end")
+
+        await asyncio.gather(use("a", 0.2), use("b", 0))
+        return order
+
+    assert _with_pool(test, size=1, max_concurrency_per_process=1) == ["a start", "a end", "b start", "b end"]
+
+
+def test_dead_process_is_replaced_by_health_check():
+    async def test(pool):
+        async with pool.lease() as client:
+            old_pid = await _pid(client)
+        pool._processes[0].client.process.kill()
+        await pool._processes[0].client.process.wait()
+        await pool.health_check()
+        await _wait_for(lambda: pool.stats()["live"] == 1 and pool._processes)
+        async with pool.lease() as client:
+            new_pid = await _pid(client)
+        return old_pid, new_pid, pool.stats()
+
+    old_pid, new_pid, stats = _with_pool(test, size=1)
+    assert old_pid != new_pid
+    assert stats["total_recycled"] == 1
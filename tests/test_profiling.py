@@ -0,0 +1,97 @@
+"""
+按需剖析：CPU 采集窗口的输出格式、并发限制和内存窗口
+"""
+
+import asyncio
+import marshal
+import time
+
+import pytest
+
+from mcp_framework.core.profiling import Profiler, ProfilerBusyError
+
+
+def _busy_work(seconds):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(200))
+    return total
+
+
+async def _busy(seconds):
+    for _ in range(int(seconds / 0.01)):
+        _busy_work(0.01)
+        await asyncio.sleep(0)
+
+
+def _profile_while_busy(profiler, seconds=0.2, **kwargs):
+    async def main():
+        capture, _ = await asyncio.gather(profiler.profile(seconds, **kwargs), _busy(seconds))
+        return capture
+    return asyncio.run(main())
+
+
+def test_pstats_report_lists_functions_run_in_the_window():
+    capture = _profile_while_busy(Profiler(), output="pstats", sort="tottime", limit=10)
+    assert capture["format"] == "pstats"
+    assert "_busy_work" in capture["data"]
+
+
+def test_raw_output_is_a_marshalled_stats_dump():
+    capture = _profile_while_busy(Profiler(), output="raw")
+    stats = marshal.loads(capture["data"])
+    assert any(name == "_busy_work" for _, _, name in stats)
+
+
+def test_collapsed_output_samples_the_loop_thread():
+    capture = _profile_while_busy(Profiler(sample_interval=0.002), output="collapsed")
+    lines = capture["data"].splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) >= 1
+    assert any("_busy_work" in line for line in lines)
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"seconds": 0},
+    {"seconds": 10_000},
+    {"seconds": 1, "output": "svg"},
+    {"seconds": 1, "sort": "nope"},
+])
+def test_invalid_arguments_are_rejected(kwargs):
+    with pytest.raises(ValueError):
+        asyncio.run(Profiler().profile(**kwargs))
+
+
+def test_only_one_cpu_capture_at_a_time():
+    profiler = Profiler()
+
+    async def main():
+        first = asyncio.create_task(profiler.profile(0.1, output="collapsed"))
+        await asyncio.sleep(0.01)
+        assert profiler.active
+        with pytest.raises(ProfilerBusyError):
+            await profiler.profile(0.1, output="collapsed")
+        await first
+        assert not profiler.active
+
+    asyncio.run(main())
+
+
+def test_heap_window_reports_growth():
+    kept = []
+
+    async def allocate():
+        await asyncio.sleep(0.02)
+        kept.extend(bytearray(1024) for _ in range(500))
+
+    async def main():
+        result, _ = await asyncio.gather(Profiler().heap(0.1, limit=5), allocate())
+        return result
+
+    result = asyncio.run(main())
+    assert result["group_by"] == "lineno"
+    assert 0 < len(result["top"]) <= 5
+    assert result["total_size_diff"] >= 500 * 1024
+    assert any("test_profiling.py" in location for stat in result["top"] for location in stat["location"])
@@ -0,0 +1,71 @@
+"""
+SamplingProfiler：常驻栈采样按窗口写出 collapsed 文件，循环线程的样本标注当前工具
+"""
+
+import asyncio
+import time
+
+from mcp_framework.core.loop_monitor import LoopMonitor
+from mcp_framework.core.profiling import SamplingProfiler
+
+
+def _spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def _run_profiled(profiler, seconds, monitor=None):
+    monitor = monitor or LoopMonitor()
+
+    async def work():
+        with monitor.track("spin_tool"):
+            for _ in range(int(seconds / 0.02)):
+                _spin(0.02)
+                await asyncio.sleep(0)
+
+    async def main():
+        profiler.start()
+        try:
+            await asyncio.create_task(work())
+        finally:
+            profiler.stop()
+
+    asyncio.run(main())
+
+
+def test_loop_samples_are_labelled_with_the_current_tool(tmp_path):
+    monitor = LoopMonitor()
+    profiler = SamplingProfiler(tmp_path, interval=0.002, window=60, tool_lookup=monitor.tool_for_task)
+    _run_profiled(profiler, 0.2, monitor)
+
+    assert profiler.samples > 0
+    assert profiler.windows_written == 1
+    lines = profiler.last_file.read_text(encoding="utf-8").splitlines()
+    spinning = [line for line in lines if "_spin (" in line]
+    assert spinning
+    assert all(";tool:spin_tool;" in line for line in spinning)
+    assert not profiler.running
+
+
+def test_windows_rotate_and_only_recent_files_are_kept(tmp_path):
+    for second in range(3):
+        (tmp_path / f"20000101-00000{second}.collapsed").write_text("old 1\n", encoding="utf-8")
+    profiler = SamplingProfiler(tmp_path, interval=0.002, window=0.05, keep=2)
+    _run_profiled(profiler, 0.2)
+
+    assert profiler.windows_written >= 2
+    files = sorted(path.name for path in tmp_path.glob("*.collapsed"))
+    assert len(files) == 2
+    assert files[-1] == profiler.last_file.name
+    assert "20000101-000000.collapsed" not in files
+
+
+def test_snapshot_reports_overhead(tmp_path):
+    profiler = SamplingProfiler(tmp_path, interval=0.005, window=60)
+    _run_profiled(profiler, 0.1)
+    snapshot = profiler.snapshot()
+    assert snapshot["running"] is False
+    assert snapshot["samples"] == profiler.samples
+    assert 0 <= snapshot["overhead_ratio"] < 1
+    assert snapshot["last_file"] == str(profiler.last_file)
@@ -0,0 +1,165 @@
+"""
+ToolScheduler：类别之间的加权公平排队和类别内的会话轮转
+"""
+
+import asyncio
+from typing import List, Tuple
+
+import pytest
+
+from mcp_framework.core.scheduler import ToolScheduler
+
+
+async def _grant_order(scheduler: ToolScheduler, requests: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """占住唯一的槽位让所有请求排队，然后释放，返回各请求获得槽位的顺序"""
+    order = []
+    release = asyncio.Event()
+
+    async def blocker():
+        async with scheduler.slot(requests[0][0], "blocker"):
+            await release.wait()
+
+    async def request(priority: str, session: str):
+        async with scheduler.slot(priority, session):
+            order.append((priority, session))
+
+    holder = asyncio.create_task(blocker())
+    await asyncio.sleep(0)
+    tasks = []
+    for priority, session in requests:
+        tasks.append(asyncio.create_task(request(priority, session)))
+        # 逐个入队，保证排队顺序与列表一致
+        await asyncio.sleep(0)
+    assert scheduler.snapshot()["queued"] == len(requests)
+
+    release.set()
+    await asyncio.gather(holder, *tasks)
+    return order
+
+
+def test_weighted_fair_share_between_classes():
+    scheduler = ToolScheduler(max_concurrency=1, weights={"interactive": 8, "default": 4, "bulk": 1})
+    requests = [("bulk", "s")] * 18 + [("interactive", "s")] * 18
+    order = asyncio.run(_grant_order(scheduler, requests))
+
+    priorities = [priority for priority, _ in order]
+    # 两个类别都有积压时按 8:1 分配
+    assert priorities[:18].count("interactive") == 16
+    assert priorities[:18].count("bulk") == 2
+    # 低优先级类别不会被饿死
+    assert "bulk" in priorities[:2]
+    assert sorted(priorities) == sorted(p for p, _ in requests)
+
+
+def test_idle_class_does_not_bank_credit():
+    scheduler = ToolScheduler(max_concurrency=1, weights={"interactive": 1, "bulk": 1})
+
+    async def run():
+        # bulk 先独占一段时间，interactive 空闲期间的份额不能累积
+        await _grant_order(scheduler, [("bulk", "s")] * 10)
+        return await _grant_order(scheduler, [("bulk", "s")] * 4 + [("interactive", "s")] * 4)
+
+    priorities = [priority for priority, _ in asyncio.run(run())]
+    # 空闲类别从当前虚拟时间开始：若累积了空闲期间的份额，前 4 个槽位会全部给 interactive
+    assert "bulk" in priorities[:3]
+    assert priorities.count("interactive") == 4
+
+
+def test_round_robin_between_sessions():
+    scheduler = ToolScheduler(max_concurrency=1)
+    requests = [("default", "a")] * 3 + [("default", "b")] * 3 + [("default", "c")]
+    order = asyncio.run(_grant_order(scheduler, requests))
+    assert [session for _, session in order] == ["a", "b", "c", "a", "b", "a", "b"]
+
+
+def test_cancelled_waiter_is_removed_from_queue():
+    scheduler = ToolScheduler(max_concurrency=1)
+
+    async def run():
+        release = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(scheduler.slot().__aenter__())
+        await asyncio.sleep(0)
+        assert scheduler.snapshot()["queued"] == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert scheduler.snapshot()["queued"] == 0
+        release.set()
+        await holder
+        return scheduler.snapshot()
+
+    snapshot = asyncio.run(run())
+    assert snapshot["running"] == 0
+    assert snapshot["queued"] == 0
+
+
+def test_unknown_priority_is_rejected():
+    scheduler = ToolScheduler()
+
+    async def run():
+        async with scheduler.slot("urgent"):
+            pass
+
+    with pytest.raises(ValueError, match="Unknown priority"):
+        asyncio.run(run())
+
+
+def test_uncontended_slot_does_not_yield_to_the_loop():
+    scheduler = ToolScheduler(max_concurrency=2)
+
+    async def run():
+        other_ran = []
+        asyncio.get_running_loop().call_soon(other_ran.append, True)
+        async with scheduler.slot():
+            async with scheduler.slot():
+                pass
+        return list(other_ran), scheduler.snapshot()
+
+    other_ran, snapshot = asyncio.run(run())
+    assert other_ran == []
+    assert snapshot["running"] == 0
+    assert snapshot["classes"]["default"]["completed"] == 2
+    assert snapshot["classes"]["default"]["wait_ms"]["count"] == 2
+
+
+def test_tool_slot_undoes_completed_steps_when_entry_fails(server):
+    server.adaptive_concurrency = True
+    server.tool_concurrency = 1
+
+    async def run():
+        release = asyncio.Event()
+
+        async def hold():
+            async with server.tool_slot("double"):
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        # 排队中被取消：限制器名额和指标的并发计数都要归还
+        waiter = asyncio.create_task(server.tool_slot("echo").__aenter__())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        # 优先级无效：在获得槽位之前失败
+        with pytest.raises(ValueError, match="Unknown priority"):
+            async with server.tool_slot("echo", "urgent"):
+                pass
+        release.set()
+        await holder
+
+    asyncio.run(run())
+    echo = server.get_limiter("echo")
+    assert echo.inflight == 0
+    assert echo.dropped == 0
+    metrics = server.get_tool_metrics()["echo"]
+    assert metrics["inflight"] == 0
+    assert metrics["errors"] == 1
+    assert server.get_scheduler_metrics()["running"] == 0
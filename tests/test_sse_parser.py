@@ -0,0 +1,74 @@
+"""
+SSEParser：任意分块边界下的事件解析
+"""
+
+import pytest
+
+from mcp_framework.client.http_client import SSEParser
+
+
+def _feed_all(chunks):
+    parser = SSEParser()
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    return events
+
+
+def test_single_event():
+    assert _feed_all([b"data: hello\n\n"]) == [("message", "hello")]
+
+
+def test_event_field_and_multiline_data():
+    stream = b"event: progress\ndata: line 1\ndata: line 2\n\ndata:no-space\n\n"
+    assert _feed_all([stream]) == [("progress", "line 1\nline 2"), ("message", "no-space")]
+
+
+def test_comments_and_empty_blocks_are_ignored():
+    stream = b": keep-alive\n\n\ndata: x\n\n"
+    assert _feed_all([stream]) == [("message", "x")]
+
+
+def test_event_type_does_not_leak_into_next_event():
+    stream = b"event: done\ndata: 1\n\ndata: 2\n\n"
+    assert _feed_all([stream]) == [("done", "1"), ("message", "2")]
+
+
+def test_incomplete_event_is_held_until_blank_line():
+    parser = SSEParser()
+    assert parser.feed(b"data: par") == []
+    assert parser.feed(b"tial\n") == []
+    assert parser.feed(b"\n") == [("message", "partial")]
+
+
+@pytest.mark.parametrize("line_end", [b"\n", b"\r\n", b"\r"])
+def test_every_split_point_yields_the_same_events(line_end):
+    stream = (b"event: a" + line_end + b"data: one" + line_end + line_end +
+              b"data: two" + line_end + b"data: three" + line_end + line_end)
+    expected = [("a", "one"), ("message", "two\nthree")]
+    for split in range(len(stream) + 1):
+        assert _feed_all([stream[:split], stream[split:]]) == expected, split
+    assert _feed_all([stream[i:i + 1] for i in range(len(stream))]) == expected
+
+
+def test_crlf_split_between_chunks_is_one_line_break():
+    # \r\n 被拆开时不能把 \n 当作额外的空行，从而提前分发事件
+    parser = SSEParser()
+    assert parser.feed(b"data: a\r") == []
+    assert parser.feed(b"\ndata: b\r") == []
+    assert parser.feed(b"\n\r") == [("message", "a\nb")]
+    assert parser.feed(b"\n") == []
+    assert parser.feed(b"data: c\n\n") == [("message", "c")]
+
+
+def test_trailing_cr_dispatches_without_waiting_for_more_data():
+    parser = SSEParser()
+    assert parser.feed(b"data: a\r") == []
+    assert parser.feed(b"\r") == [("message", "a")]
+    assert parser.feed(b"data: b\r\r") == [("message", "b")]
+
+
+def test_multibyte_characters_split_between_chunks():
+    stream = "data: 你好 🌍\n\n".encode("utf-8")
+    for split in range(len(stream) + 1):
+        assert _feed_all([stream[:split], stream[split:]]) == [("message", "你好 🌍")], split
@@ -0,0 +1,120 @@
+"""
+MCPStdioClient：同一连接上按请求 id 多路复用、单个请求超时不影响连接
+"""
+
+import asyncio
+import time
+from pathlib import Path
+
+import pytest
+
+from mcp_framework.client.base import MCPConnectionError, MCPStdioClient, MCPTimeoutError
+
+FAKE_SERVER = str(Path(__file__).with_name("fake_stdio_server.py"))
+
+
+def _with_client(test, **kwargs):
+    async def run():
+        client = MCPStdioClient(FAKE_SERVER, **kwargs)
+        await client.connect()
+        try:
+            return await test(client)
+        finally:
+            await client.disconnect()
+    return asyncio.run(run())
+
+
+def test_concurrent_requests_are_matched_by_id():
+    async def test(client):
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(
+            client.send_request("sleep", {"seconds": seconds}) for seconds in (0.3, 0.1, 0.2)
+        ))
+        return responses, time.perf_counter() - started
+
+    responses, elapsed = _with_client(test)
+    assert [r["result"]["slept"] for r in responses] == [0.3, 0.1, 0.2]
+    # 三个请求在同一连接上重叠执行，而不是依次等待
+    assert elapsed < 0.55
+
+
+def test_timeout_only_fails_that_request():
+    async def test(client):
+        with pytest.raises(MCPTimeoutError):
+            await client.send_request("never", timeout=0.2)
+        response = await client.send_request("sleep", {"seconds": 0})
+        return response, dict(client._pending)
+
+    response, pending = _with_client(test)
+    assert response["result"] == {"slept": 0}
+    assert pending == {}
+
+
+def test_slow_request_does_not_block_fast_ones():
+    async def test(client):
+        slow = asyncio.ensure_future(client.send_request("sleep", {"seconds": 0.5}))
+        started = time.perf_counter()
+        await client.send_request("sleep", {"seconds": 0})
+        fast_elapsed = time.perf_counter() - started
+        await slow
+        return fast_elapsed
+
+    assert _with_client(test) < 0.4
+
+
+def test_stream_request_interleaves_with_plain_requests():
+    async def test(client):
+        async def collect():
+            return [message async for message in client.stream_request("count", {"n": 5})]
+
+        messages, response = await asyncio.gather(collect(), client.send_request("sleep", {"seconds": 0.02}))
+        return messages, response
+
+    messages, response = _with_client(test)
+    assert [m["params"]["chunk"] for m in messages if m.get("method") == "stream/chunk"] == [0, 1, 2, 3, 4]
+    assert messages[-1]["result"] == {"count": 5}
+    assert response["result"] == {"slept": 0.02}
+
+
+def test_server_exit_fails_pending_requests():
+    async def test(client):
+        pending = asyncio.ensure_future(client.send_request("never", timeout=5))
+        await asyncio.sleep(0.05)
+        with pytest.raises(MCPConnectionError):
+            await client.send_request("exit", timeout=5)
+        with pytest.raises(MCPConnectionError):
+            await pending
+        return client._pending
+
+    assert _with_client(test) == {}
+
+
+def test_server_without_ready_notification_is_probed_with_initialize():
+    async def run():
+        client = MCPStdioClient(FAKE_SERVER, server_args=["--no-ready"], startup_timeout=10, ready_grace_period=0.1)
+        started = time.monotonic()
+        await client.connect()
+        try:
+            elapsed = time.monotonic() - started
+            assert client.is_initialized
+            assert await client.initialize()
+            response = await client.send_request("tools/call", {"name": "echo", "arguments": {"n": 1}})
+            return elapsed, response
+        finally:
+            await client.disconnect()
+
+    elapsed, response = asyncio.run(run())
+    # 不需要等满 startup_timeout
+    assert elapsed < 5
+    assert response["result"]["content"][0]["text"] == '{"n": 1}'
+
+
+def test_unresponsive_server_fails_after_startup_timeout():
+    async def run():
+        client = MCPStdioClient(FAKE_SERVER, server_args=["--no-ready", "--hang"],
+                                startup_timeout=0.5, ready_grace_period=0.1)
+        with pytest.raises(Exception, match="没有响应"):
+            await client.connect()
+        assert client.process is None
+
+    asyncio.run(run())
@@ -0,0 +1,73 @@
+"""
+SyncClient：阻塞接口复用后台事件循环中的同一条连接
+"""
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from mcp_framework.client.loop import BackgroundLoop
+from mcp_framework.client.sync import SyncClient
+
+FAKE_SERVER = str(Path(__file__).with_name("fake_stdio_server.py"))
+
+
+@pytest.fixture
+def background_loop():
+    loop = BackgroundLoop(name="test-loop")
+    yield loop
+    loop.stop()
+
+
+def _server_pid(client: SyncClient) -> int:
+    response = client.background_loop.run(client._client._client.send_request("pid"))
+    return response["result"]["pid"]
+
+
+def _echoed(result) -> dict:
+    return json.loads(result["content"][0]["text"])
+
+
+def test_calls_reuse_one_connection(background_loop):
+    with SyncClient(FAKE_SERVER, background_loop=background_loop) as client:
+        first_pid = _server_pid(client)
+        assert _echoed(client.call("echo", message="hi")) == {"message": "hi"}
+        assert client.tools() == ["echo"]
+        assert _server_pid(client) == first_pid
+    assert not client.is_connected
+
+
+def test_threads_share_the_connection(background_loop):
+    with SyncClient(FAKE_SERVER, background_loop=background_loop) as client:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda i: _echoed(client.call("echo", index=i)), range(32)))
+    assert results == [{"index": i} for i in range(32)]
+
+
+def test_connection_lives_on_the_background_thread(background_loop):
+    with SyncClient(FAKE_SERVER, background_loop=background_loop) as client:
+        client.call("echo")
+        assert background_loop.is_running
+        assert background_loop._thread is not threading.current_thread()
+
+
+def test_sync_wait_inside_the_loop_thread_is_rejected(background_loop):
+    async def nested():
+        return background_loop.run(_answer())
+
+    with pytest.raises(Exception, match="不能在后台事件循环线程中同步等待"):
+        background_loop.run(nested())
+
+
+def test_stopped_loop_can_be_restarted(background_loop):
+    assert background_loop.run(_answer()) == 42
+    background_loop.stop()
+    assert not background_loop.is_running
+    assert background_loop.run(_answer()) == 42
+
+
+async def _answer():
+    return 42
@@ -0,0 +1,75 @@
+"""
+客户端工具缓存：按 role 分别缓存，服务器推送 list_changed 时失效
+"""
+
+import asyncio
+from pathlib import Path
+
+from mcp_framework.client.tools import ToolsClient
+
+FAKE_SERVER = str(Path(__file__).with_name("fake_stdio_server.py"))
+
+
+def _with_client(test):
+    async def run():
+        async with ToolsClient(FAKE_SERVER) as client:
+            return await test(client)
+    return asyncio.run(run())
+
+
+async def _until(predicate, timeout: float = 5.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+
+def _descriptions(tools):
+    return [tool.description for tool in tools]
+
+
+def test_tool_list_is_cached():
+    async def test(client):
+        first = await client.list_tools()
+        second = await client.list_tools()
+        tool = await client.get_tool("echo")
+        return first, second, tool
+
+    first, second, tool = _with_client(test)
+    assert second is first
+    assert _descriptions(first) == ["listing 1"]
+    assert tool is first[0]
+
+
+def test_cache_is_keyed_by_role():
+    async def test(client):
+        default = await client.list_tools()
+        admin = await client.list_tools(role="admin")
+        return default, admin, await client.tool_exists("admin_tool"), await client.tool_exists("admin_tool", "admin")
+
+    default, admin, default_has_admin, admin_has_admin = _with_client(test)
+    assert [t.name for t in default] == ["echo"]
+    assert [t.name for t in admin] == ["echo", "admin_tool"]
+    assert not default_has_admin
+    assert admin_has_admin
+
+
+def test_list_changed_notification_invalidates_every_role():
+    async def test(client):
+        await client.list_tools()
+        await client.list_tools(role="admin")
+        generation = client._tools_generation
+        await client.send_request("change_tools")
+        await _until(lambda: client._tools_generation > generation)
+        assert client._tools_cache == {}
+        return await client.list_tools()
+
+    assert _descriptions(_with_client(test)) == ["listing 3"]
+
+
+def test_force_refresh_bypasses_the_cache():
+    async def test(client):
+        await client.list_tools()
+        return await client.list_tools(force_refresh=True)
+
+    assert _descriptions(_with_client(test)) == ["listing 2"]
@@ -0,0 +1,133 @@
+"""
+请求追踪：采样、追踪 id 的传递和 Chrome trace 文件输出
+"""
+
+import asyncio
+import json
+
+from mcp_framework.core.tracing import (Tracer, current_trace_id, extract_trace_id, inject_trace,
+                                        trace_context, trace_span)
+
+
+def _events(path):
+    text = path.read_text(encoding="utf-8")
+    if not text.rstrip().endswith("]"):
+        text += "\n]"
+    return json.loads(text)
+
+
+def test_spans_are_written_as_chrome_trace_events(tmp_path):
+    tracer = Tracer(tmp_path / "trace.json", sample_rate=1)
+    with tracer.trace("tools/call", trace_id="abc", tool="echo") as trace_id:
+        assert trace_id == "abc"
+        assert current_trace_id() == "abc"
+        with trace_span("handler", step=1):
+            pass
+    tracer.close()
+
+    spans = {event["name"]: event for event in _events(tmp_path / "trace.json") if event["ph"] == "X"}
+    assert spans["tools/call"]["args"] == {"trace_id": "abc", "tool": "echo"}
+    assert spans["handler"]["args"] == {"trace_id": "abc", "step": 1}
+    assert spans["handler"]["tid"] == spans["tools/call"]["tid"]
+    assert spans["handler"]["ts"] >= spans["tools/call"]["ts"]
+
+
+def test_span_records_the_error(tmp_path):
+    tracer = Tracer(tmp_path / "trace.json", sample_rate=1)
+    try:
+        with tracer.trace("request"):
+            with trace_span("handler"):
+                raise ValueError("bad")
+    except ValueError:
+        pass
+    tracer.close()
+    spans = {event["name"]: event for event in _events(tmp_path / "trace.json") if event["ph"] == "X"}
+    assert "bad" in spans["handler"]["args"]["error"]
+
+
+def test_unsampled_requests_record_nothing(tmp_path):
+    tracer = Tracer(tmp_path / "trace.json", sample_rate=0)
+    with tracer.trace("request") as trace_id:
+        assert trace_id is None
+        assert current_trace_id() is None
+        with trace_span("handler") as span:
+            span.set(ignored=True)
+    tracer.close()
+    assert tracer.traces == 0
+    assert not (tmp_path / "trace.json").exists()
+
+    with tracer.trace("request", force=True) as trace_id:
+        assert trace_id is not None
+    assert tracer.traces == 1
+
+
+def test_sampling_is_stable_per_trace_id(tmp_path):
+    tracer = Tracer(tmp_path / "trace.json", sample_rate=0.5)
+    ids = [f"id-{i}" for i in range(200)]
+    first = [tracer.sampled(trace_id) for trace_id in ids]
+    assert first == [tracer.sampled(trace_id) for trace_id in ids]
+    assert 40 < sum(first) < 160
+
+
+def test_trace_id_propagates_to_new_tasks(tmp_path):
+    tracer = Tracer(tmp_path / "trace.json", sample_rate=1)
+    seen = []
+
+    async def child():
+        with trace_span("child"):
+            seen.append(current_trace_id())
+
+    async def main():
+        with tracer.trace("request", trace_id="t1"):
+            await asyncio.gather(child(), child())
+        tracer.close()
+
+    asyncio.run(main())
+    assert seen == ["t1", "t1"]
+    names = [event["name"] for event in _events(tmp_path / "trace.json") if event["ph"] == "X"]
+    assert names.count("child") == 2
+
+
+def test_client_trace_id_is_injected_into_params():
+    assert inject_trace({"name": "echo"}) == {"name": "echo"}
+    with trace_context("client-id") as trace_id:
+        assert trace_id == "client-id"
+        params = inject_trace({"name": "echo", "_meta": {"progressToken": 1}})
+    assert params["_meta"] == {"progressToken": 1, "traceId": "client-id"}
+    assert extract_trace_id(params) == "client-id"
+    assert extract_trace_id({"name": "echo"}) is None
+    assert extract_trace_id(None) is None
+    assert current_trace_id() is None
+
+
+def test_trace_file_rotates(tmp_path):
+    tracer = Tracer(tmp_path / "trace.json", sample_rate=1, max_bytes=200, backup_count=2, flush_events=1)
+    for _ in range(10):
+        with tracer.trace("request"):
+            pass
+    tracer.close()
+    assert (tmp_path / "trace.json.1").exists()
+    assert (tmp_path / "trace.json.2").exists()
+    assert not (tmp_path / "trace.json.3").exists()
+    assert _events(tmp_path / "trace.json.1")
+
+
+def test_http_request_joins_the_client_trace(tmp_path, monkeypatch):
+    from mcp_framework.benchmarks.synthetic_server import create_server, local_http_server
+    from mcp_framework.client.http_client import MCPHTTPClient
+
+    monkeypatch.chdir(tmp_path)
+    server = create_server()
+    server.trace_sample_rate = 1
+
+    async def main():
+        async with local_http_server(server) as base_url:
+            async with MCPHTTPClient(base_url) as client:
+                with trace_context("e2e-trace"):
+                    await client.call_tool("echo", {"message": "hi"})
+        return server.tracer.path
+
+    path = asyncio.run(main())
+    names = [event["name"] for event in _events(path)
+             if event["ph"] == "X" and event["args"]["trace_id"] == "e2e-trace"]
+    assert {"http /mcp", "dispatch echo", "handler", "encode_response"} <= set(names)